@@ -0,0 +1,173 @@
+"""
+Load tests the HTTP API served from a single process pinned to one core: lookups of many birthdates, revalidations
+answered with 304, rendered views and batches of thousands of birthdates.
+
+The load comes from other processes over keep-alive connections, one request at a time on each connection.
+
+Usage:
+    python benchmarks/bench_api.py [--seconds S] [--connections N] [--clients N] [--batch-size N]
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from api import ApiServer  # noqa: E402
+from content import DirectoryStore  # noqa: E402
+from metrics import Metrics  # noqa: E402
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+PORT = 8093
+
+
+def serve() -> None:
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {0})
+
+    # The data has no enneagram type 5, the views of its sign are answered with 404
+    logging.disable(logging.ERROR)
+
+    asyncio.run(ApiServer(lambda: STORE, Metrics()).serve("127.0.0.1", PORT))
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[dict[str, str], bytes]:
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    headers = {name.lower(): value for name, _, value in (line.partition(": ") for line in head[1:] if line)}
+
+    if "content-length" in headers:
+        return headers, await reader.readexactly(int(headers["content-length"]))
+
+    return headers, await reader.readuntil(b"\r\n0\r\n\r\n")
+
+
+async def load(requests: list[bytes], seconds: float, connections: int) -> int:
+    deadline = time.perf_counter() + seconds
+    completed = 0
+
+    async def connection() -> None:
+        nonlocal completed
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", PORT, limit=64 * 1024 * 1024)
+        generator = random.Random()
+        while time.perf_counter() < deadline:
+            writer.write(generator.choice(requests))
+            await read_response(reader)
+            completed += 1
+        writer.close()
+
+    await asyncio.gather(*(connection() for _ in range(connections)))
+
+    return completed
+
+
+def client(requests: list[bytes], seconds: float, connections: int, results: "multiprocessing.Queue[int]") -> None:
+    results.put(asyncio.run(load(requests, seconds, connections)))
+
+
+def cpu_seconds(pid: int) -> float:
+    # User and system time of the process, from the 14th and 15th fields of its stat file
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rpartition(")")[2].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run(
+    name: str, server: int, requests: list[bytes], seconds: float, connections: int, clients: int, unit: int = 1
+) -> None:
+    results: multiprocessing.Queue[int] = multiprocessing.Queue()
+    start = cpu_seconds(server)
+    processes = [
+        multiprocessing.Process(target=client, args=(requests, seconds, connections, results)) for _ in range(clients)
+    ]
+    for process in processes:
+        process.start()
+    completed = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    busy = cpu_seconds(server) - start
+
+    print(
+        f"{name:<24}{completed / seconds:>14,.0f}{completed * unit / seconds:>16,.0f}"
+        f"{busy / seconds:>10.0%}{completed / busy:>18,.0f}"
+    )
+
+
+def get(path: str, *headers: str) -> bytes:
+    return "\r\n".join([f"GET {path} HTTP/1.1", "Host: localhost", *headers, "", ""]).encode()
+
+
+async def etags(paths: list[str]) -> list[str]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    found = []
+    for path in paths:
+        writer.write(get(path))
+        headers, _ = await read_response(reader)
+        found.append(headers["etag"])
+    writer.close()
+
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--connections", type=int, default=32, help="connections of every client process")
+    parser.add_argument("--clients", type=int, default=2, help="client processes")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    days = [datetime(1940, 1, 1) + timedelta(days=day) for day in range(365 * 80)]
+    dates = [day.date().isoformat() for day in days]
+
+    server = multiprocessing.Process(target=serve, daemon=True)
+    server.start()
+    time.sleep(1.0)
+
+    readings = [f"/v1/reading/{date}" for date in generator.sample(dates, 2000)]
+    revalidations = [get(path, f"If-None-Match: {etag}") for path, etag in zip(readings, asyncio.run(etags(readings)))]
+    batch = json.dumps({"birthdates": generator.choices(dates, k=args.batch_size)}).encode()
+
+    # The server shares the cores with the clients here, the requests per second of its CPU time are what one core
+    # sustains on its own
+    print(f"{'':<24}{'requests/s':>14}{'birthdates/s':>16}{'server':>10}{'per CPU second':>18}")
+    scenarios = [
+        # A birthdate of 80 years per request, most of them asked for the first time
+        ("lookup (80 years)", [get(f"/v1/reading/{date}") for date in dates], args.connections, args.clients, 1),
+        ("lookup (2000 dates)", [get(path) for path in readings], args.connections, args.clients, 1),
+        ("revalidation (304)", revalidations, args.connections, args.clients, 1),
+        (
+            "content (short)",
+            [get(f"/v1/content/short/{date}") for date in generator.sample(dates, 2000)],
+            args.connections,
+            args.clients,
+            1,
+        ),
+        (
+            f"batch ({args.batch_size})",
+            [b"POST /v1/batch HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(batch), batch)],
+            2,
+            1,
+            args.batch_size,
+        ),
+    ]
+    for name, requests, connections, clients, unit in scenarios:
+        run(name, server.pid, requests, args.seconds, connections, clients, unit)  # type: ignore[reportArgumentType]
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
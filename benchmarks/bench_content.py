@@ -0,0 +1,87 @@
+"""
+Compares the directory, bundle and compressed bundle content stores.
+
+Reports the size on disk, the compression ratio, the memory held by each store and the latency of reading
+entries, both cold and with a skewed access pattern similar to the bot's.
+
+Usage:
+    python benchmarks/bench_content.py [--cache-bytes BYTES]
+"""
+
+from pathlib import Path
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from bundle import build_bundle  # noqa: E402
+from compressed import build_compressed_bundle  # noqa: E402
+from content import DirectoryStore, open_store  # noqa: E402
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+# Number of reads of the skewed workload
+READS = 20_000
+
+
+def read_latencies(store, keys: list[str]) -> list[float]:
+    latencies = []
+    for key in keys:
+        start = time.perf_counter()
+        store.get(key)
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies = sorted(latencies)
+    print(
+        f"  {name:<8} mean {statistics.fmean(latencies) * 1e6:8.1f} us"
+        f"   p99 {latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache-bytes", default=4 * 1024 * 1024, type=int, dest="cache_bytes")
+    args = parser.parse_args()
+
+    directory_store = DirectoryStore(DATA_DIRECTORY)
+    keys = directory_store.keys()
+
+    # A few popular entries receive most of the reads, like the views of common life paths
+    rng = random.Random(0)
+    skewed = rng.choices(keys, weights=[1 / (rank + 1) for rank in range(len(keys))], k=READS)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        bundle_path = Path(temporary_directory) / "plain.bundle"
+        compressed_path = Path(temporary_directory) / "compressed.bundle"
+
+        build_bundle(directory_store, bundle_path)
+        build_compressed_bundle(directory_store, compressed_path)
+
+        stores = {
+            "directory": directory_store,
+            "bundle": open_store(DATA_DIRECTORY, bundle_path),
+            "zstd": open_store(DATA_DIRECTORY, compressed_path, args.cache_bytes),
+        }
+
+        print(f"{len(keys)} entries, {READS} skewed reads, {args.cache_bytes} bytes of cache")
+        print(f"plain bundle: {bundle_path.stat().st_size} bytes, compressed bundle: {compressed_path.stat().st_size} bytes")
+
+        for name, store in stores.items():
+            print(name)
+            report("cold", read_latencies(store, keys))
+            report("skewed", read_latencies(store, skewed))
+
+        stats = stores["zstd"].stats()
+        print(
+            f"zstd ratio {stats['compression_ratio']:.2f}, resident {stats['resident_bytes']} bytes"
+            f" in {stats['cached_entries']} entries, hit rate {stats['hit_rate']:.1%},"
+            f" decompression mean {stats['decompression_mean_ms']:.3f} ms, p99 {stats['decompression_p99_ms']:.3f} ms"
+        )
@@ -0,0 +1,46 @@
+"""
+Benchmarks the birthdate extractor against the previous trigger pattern on adversarial messages.
+
+Usage:
+    python benchmarks/bench_dates.py
+"""
+
+from pathlib import Path
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from dates import BIRTHDATE_PATTERN, extract_birthdates  # noqa: E402
+
+# The trigger pattern used before the extractor, Telethon matches it from the start of the message
+LEGACY_PATTERN = re.compile(r"([\s\S]*)\d{2}\.\d{2}\.\d{4}([\s\S]*)")
+
+LENGTHS = (1_000, 10_000, 100_000)
+
+MESSAGES = {
+    "digits": lambda length: "1" * length,
+    "almost dates": lambda length: ("12.12.12 " * length)[:length],
+    "dots": lambda length: ("1." * length)[:length],
+    "text then date": lambda length: "a" * length + " 22.12.2002",
+    "many dates": lambda length: ("22.12.2002 " * length)[:length],
+}
+
+
+def bench(statement, number: int = 5) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=3)) / number
+
+
+if __name__ == "__main__":
+    print(f"{'message':<16}{'length':>10}{'legacy match':>16}{'trigger':>16}{'extract all':>16}")
+
+    for name, make_message in MESSAGES.items():
+        for length in LENGTHS:
+            message = make_message(length)
+
+            legacy = bench(lambda: LEGACY_PATTERN.match(message))
+            trigger = bench(lambda: BIRTHDATE_PATTERN.search(message))
+            extract = bench(lambda: extract_birthdates(message))
+
+            print(f"{name:<16}{length:>10}{legacy * 1e3:>14.3f}ms{trigger * 1e3:>14.3f}ms{extract * 1e3:>14.3f}ms")
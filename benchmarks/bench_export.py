@@ -0,0 +1,74 @@
+"""
+Times the PDF exports of many birthdates: the typesetting of every distinct reading in the process pool, and the
+exports served from the cache afterwards.
+
+Birthdates sharing a life path, a pin code and an enneagram type share a PDF, so the cache is what most exports hit.
+
+Usage:
+    python benchmarks/bench_export.py [--birthdates N] [--workers N]
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from content import DirectoryStore  # noqa: E402
+from export import ExportKey, PdfExporter  # noqa: E402
+from metrics import Metrics  # noqa: E402
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+async def export_all(exporter: PdfExporter, birthdates: list[datetime]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(exporter.export(birthdate, STORE) for birthdate in birthdates))
+
+    return time.perf_counter() - start
+
+
+async def bench(directory: Path, birthdates: list[datetime], workers: int) -> None:
+    metrics = Metrics()
+    exporter = PdfExporter(directory, workers, metrics=metrics)
+
+    cold_seconds = await export_all(exporter, birthdates)
+    rendered = metrics.get("export.render")
+    warm_seconds = await export_all(exporter, birthdates)
+    exporter.close()
+
+    size = sum(path.stat().st_size for path in directory.glob("*.pdf")) / max(rendered, 1)
+
+    print(f"{len(birthdates)} exports, {rendered} distinct PDFs of {size / 1024:.0f} KiB on average")
+    print(f"{'pass':<8}{'seconds':>10}{'ms per export':>16}{'ms per render':>16}")
+    print(f"{'cold':<8}{cold_seconds:>10.2f}{cold_seconds / len(birthdates) * 1000:>16.2f}"
+          f"{cold_seconds / max(rendered, 1) * 1000 * workers:>16.1f}")
+    print(f"{'cached':<8}{warm_seconds:>10.2f}{warm_seconds / len(birthdates) * 1000:>16.2f}{'-':>16}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--birthdates", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    # The data has no enneagram type 5, its sign is exported without it
+    logging.disable(logging.WARNING)
+
+    generator = random.Random(0)
+    birthdates = [datetime(1950, 1, 1) + timedelta(days=generator.randrange(365 * 60)) for _ in range(args.birthdates)]
+    # A few birthdates share their reading, e.g. the same day of another decade
+    print(f"{len({ExportKey.of(birthdate) for birthdate in birthdates})} distinct readings")
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(bench(Path(directory), birthdates, args.workers))
+
+
+if __name__ == "__main__":
+    main()
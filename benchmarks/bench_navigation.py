@@ -0,0 +1,112 @@
+"""
+Counts the Telegram API calls of a reading session in the classic and the edit-in-place navigation modes.
+
+A simulated chat replays sessions of random birthdates: the birthdate is sent, then every view of the menu is
+opened once. The paraphrased summaries are stood in for by the summaries they are generated from, and are
+preceded by their "please wait" notice as when they are not prefetched.
+
+Usage:
+    python benchmarks/bench_navigation.py [--sessions N]
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from callbacks import View  # noqa: E402
+from content import DirectoryStore  # noqa: E402
+from navigation import MENU_ITEMS, menu_header, plan_view_update  # noqa: E402
+from pin_code import get_pin_code  # noqa: E402
+from the_life import birthdate_to_life_path  # noqa: E402
+from views import (  # noqa: E402
+    load_summary_forbes,
+    load_summary_millman,
+    render_full_text_forbes,
+    render_full_text_millman,
+    render_json_summary,
+    render_zodiac_traits,
+)
+from zodiac import Zodiac  # noqa: E402
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+RENDERERS = {
+    View.FULL_TEXT_MILLMAN: lambda birthdate: render_full_text_millman(birthdate_to_life_path(birthdate), STORE),
+    View.FULL_TEXT_FORBES: lambda birthdate: render_full_text_forbes(get_pin_code(birthdate), STORE),
+    View.SUMMARY_MILLMAN: lambda birthdate: load_summary_millman(birthdate_to_life_path(birthdate), STORE),
+    View.SUMMARY_FORBES: lambda birthdate: load_summary_forbes(get_pin_code(birthdate), STORE),
+    View.JSON_SHORT_MILLMAN: lambda birthdate: render_json_summary(birthdate_to_life_path(birthdate), STORE),
+    View.JSON_LONG_MILLMAN: lambda birthdate: render_json_summary(birthdate_to_life_path(birthdate), STORE, True),
+    View.ZODIAC_TRAITS: lambda birthdate: render_zodiac_traits(Zodiac(birthdate), STORE),
+}
+
+
+class SimulatedChat:
+    """
+    Counts the messages sent and edited in a chat, and the messages the user has to scroll through.
+    """
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.edited = 0
+        self.characters = 0
+
+    def send(self, text: str) -> None:
+        self.sent += 1
+        self.characters += len(text)
+
+    def edit(self, text: str) -> None:
+        self.edited += 1
+        self.characters += len(text)
+
+
+def run_session(chat: SimulatedChat, birthdate: datetime, edit_in_place: bool) -> None:
+    chat.send(menu_header(birthdate))
+
+    for _, view in MENU_ITEMS:
+        if view in (View.SUMMARY_MILLMAN, View.SUMMARY_FORBES):
+            notice = "Genel özet hazırlanıyor, lütfen bekleyiniz..."
+            updates = [plan_view_update(notice, birthdate, view, edit_in_place, final=False)]
+        else:
+            updates = []
+
+        try:
+            content = RENDERERS[view](birthdate)
+        except FileNotFoundError:
+            # Reported to the user like the bot does, e.g. for the missing enneagram type 5
+            content = "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi."
+        updates.append(plan_view_update(content, birthdate, view, edit_in_place))
+
+        for update in updates:
+            if update.edit is not None:
+                chat.edit(update.edit)
+            for message in update.messages:
+                chat.send(message)
+            if update.send_menu:
+                chat.send(menu_header(birthdate))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default=200, type=int, dest="sessions")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    birthdates = [datetime(1940, 1, 1) + timedelta(days=rng.randrange(365 * 70)) for _ in range(args.sessions)]
+
+    print(f"{args.sessions} sessions, every view opened once")
+    print(f"{'mode':<16}{'sent':>10}{'edited':>10}{'API calls':>12}{'characters':>14}")
+
+    for name, edit_in_place in (("classic", False), ("edit in place", True)):
+        chat = SimulatedChat()
+        for birthdate in birthdates:
+            run_session(chat, birthdate, edit_in_place)
+
+        print(
+            f"{name:<16}{chat.sent / args.sessions:>10.1f}{chat.edited / args.sessions:>10.1f}"
+            f"{(chat.sent + chat.edited) / args.sessions:>12.1f}{chat.characters / args.sessions:>14.0f}"
+        )
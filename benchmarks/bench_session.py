@@ -0,0 +1,77 @@
+"""
+Times the session work done per update: recording the sender, looking them up to reply and saving, with Telethon's
+SQLite session against the buffered session of the bot.
+
+Telethon's session writes every entity it sees to its file; the buffered one writes them once per flush.
+
+Usage:
+    python benchmarks/bench_session.py [--updates N] [--users N]
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from metrics import Metrics  # noqa: E402
+from session import FLUSH_INTERVAL, BufferedSession  # noqa: E402
+from telethon.sessions import SQLiteSession  # noqa: E402
+from telethon.tl.types import User  # noqa: E402
+
+
+def handle_updates(session: SQLiteSession | BufferedSession, senders: list[User]) -> float:
+    start = time.perf_counter()
+    for sender in senders:
+        session.process_entities([sender])
+        session.get_input_entity(sender.id)
+        session.save()
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    generator = random.Random(0)
+    users = [
+        User(id=user_id, access_hash=generator.getrandbits(63), username=f"user{user_id}", first_name=f"User {user_id}")
+        for user_id in range(1, args.users + 1)
+    ]
+    # Users come back with a changed name now and then
+    senders = [
+        User(id=user.id, access_hash=user.access_hash, username=user.username, first_name=f"{user.first_name}*")
+        if generator.random() < 0.05
+        else user
+        for user in (generator.choice(users) for _ in range(args.updates))
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        telethon_session = SQLiteSession(str(Path(directory) / "telethon"))
+        telethon_seconds = handle_updates(telethon_session, senders)
+        telethon_session.close()
+
+        buffered_session = BufferedSession(Path(directory) / "buffered.session", metrics=Metrics())
+        buffered_seconds = handle_updates(buffered_session, senders)
+
+        # The flushes of the worker thread, all at once here instead of every few seconds
+        start = time.perf_counter()
+        rows = buffered_session.flush()
+        flush_seconds = time.perf_counter() - start
+        buffered_session.close()
+
+    print(f"{args.updates} updates from {args.users} users")
+    print(f"{'session':<12}{'us per update':>16}{'rows written':>16}")
+    print(f"{'telethon':<12}{telethon_seconds / args.updates * 1e6:>16.1f}{args.updates:>16}")
+    print(f"{'buffered':<12}{buffered_seconds / args.updates * 1e6:>16.1f}{rows:>16}")
+    print(f"\nflushing {rows} rows took {flush_seconds * 1000:.1f} ms, every {FLUSH_INTERVAL} seconds")
+
+
+if __name__ == "__main__":
+    main()
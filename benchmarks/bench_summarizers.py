@@ -0,0 +1,108 @@
+"""
+Times the offline extractive summarizer on the content, and the Forbes summary paraphrased in a single call against
+the section-wise fan-out with the stub summarizer standing in for Gemini.
+
+The stub takes a fixed delay per call plus a delay per generated token, as a model streaming its output does, so
+the fan-out timings are deterministic and need no network.
+
+Usage:
+    python benchmarks/bench_summarizers.py [--readings N] [--latency S] [--latency-per-token S]
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kahinbot"))
+
+from content import DirectoryStore  # noqa: E402
+from fanout import SectionFanout  # noqa: E402
+from metrics import Metrics  # noqa: E402
+from paraphraser import ExtractiveSummarizer, StubSummarizer  # noqa: E402
+from pin_code import get_pin_code  # noqa: E402
+from views import pin_code_keys  # noqa: E402
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+DIRECTORIES = [
+    "forbes/tr/Summarizations/",
+    "forbes/tr/MDs/",
+    "millman/tr/Summarizations/",
+    "millman/tr/MDs/",
+]
+
+
+def bench_extractive() -> None:
+    summarizer = ExtractiveSummarizer()
+
+    print(f"{'directory':<28}{'files':>7}{'mean ms':>10}{'max ms':>10}{'kept':>8}")
+    for directory in DIRECTORIES:
+        timings = []
+        kept = []
+        for key in (key for key in STORE.keys() if key.startswith(directory)):
+            content = STORE.read_text(key)
+
+            start = time.perf_counter()
+            summary = summarizer.paraphrase(content)
+            timings.append((time.perf_counter() - start) * 1000)
+            kept.append(len(summary) / len(content))
+
+        print(
+            f"{directory:<28}{len(timings):>7}{statistics.mean(timings):>10.2f}{max(timings):>10.2f}"
+            f"{statistics.mean(kept):>8.0%}"
+        )
+
+
+async def bench_fanout(readings: list[list[str]], summarizer: StubSummarizer) -> None:
+    single_first = []
+    for sections in readings:
+        summary = "\n\n".join(sections)
+
+        start = time.perf_counter()
+        await asyncio.to_thread(summarizer.paraphrase, summary)
+        single_first.append(time.perf_counter() - start)
+
+    fanout_first = []
+    fanout_total = []
+    for sections in readings:
+        # A new fan-out per reading, so that no section is served from the cache
+        fanout = SectionFanout(summarizer.paraphrase, metrics=Metrics())
+
+        start = time.perf_counter()
+        first = None
+        async for _ in fanout.stream(sections):
+            first = first or time.perf_counter() - start
+        fanout_first.append(first)
+        fanout_total.append(time.perf_counter() - start)
+
+    print(f"\n{'forbes summary':<28}{'first message s':>16}{'last message s':>16}")
+    print(f"{'single call':<28}{statistics.mean(single_first):>16.2f}{statistics.mean(single_first):>16.2f}")
+    print(f"{'fan-out':<28}{statistics.mean(fanout_first):>16.2f}{statistics.mean(fanout_total):>16.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per call of the stub")
+    parser.add_argument("--latency-per-token", type=float, default=0.002, help="seconds per generated token")
+    args = parser.parse_args()
+
+    bench_extractive()
+
+    generator = random.Random(0)
+    birthdates = [datetime(1950, 1, 1) + timedelta(days=generator.randrange(365 * 60)) for _ in range(args.readings)]
+    readings = [
+        [STORE.read_text(key) for key in pin_code_keys(get_pin_code(birthdate), "Summarizations")]
+        for birthdate in birthdates
+    ]
+
+    asyncio.run(bench_fanout(readings, StubSummarizer(args.latency, args.latency_per_token)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,30 @@ from .zodiac import *
 from .paraphraser import *
 from .pin_code import *
 from .the_life import *
+from .callbacks import *
+from .dates import *
+from .batch import *
+from .views import *
+from .inline import *
+from .content import *
+from .bundle import *
+from .compressed import *
+from .search import *
+from .people import *
+from .metrics import *
+from .prefetch import *
+from .navigation import *
+from .pages import *
+from .reload import *
+from .tracing import *
+from .fanout import *
+from .inflight import *
+from .admission import *
+from .extract import *
+from .session import *
+from .broadcast import *
+from .export import *
+from .api import *
 
 __version__ = "0.1"
 __author__ = "Şeyma Yardım"
@@ -0,0 +1,206 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the admission control of the requests, shedding load instead of letting every request slow down.
+
+Requests of a class, e.g. the cheap views or the paraphrased ones, run at most a fixed number at once, and the
+others wait in a bounded queue in their order of arrival, told their position as it changes. A request is turned
+away as soon as it is clear it would not start in time: when the queue is full, when the expected wait from the
+recent service times exceeds its deadline, or when the deadline passes while it waits. The requests that are
+admitted then run at their usual speed, instead of every request timing out together.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two updates of the position of a queued request
+POSITION_UPDATE_INTERVAL = 3.0
+
+# Weight of the latest request in the moving average of the service time
+SERVICE_TIME_WEIGHT = 0.2
+
+
+class OverloadedError(RuntimeError):
+    """
+    Raised when a request is shed instead of being admitted.
+
+    Attributes:
+        reason: Why it was shed: "full", "deadline" when it would not start in time, or "expired" when it waited
+            until its deadline.
+    """
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"The {name} queue shed a request: {reason}")
+
+        self.reason = reason
+
+
+class AdmissionQueue:
+    """
+    Admits the requests of a class up to a concurrency limit, queueing and shedding the others.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queued: int,
+        deadline: float,
+        metrics: Metrics = default_metrics,
+        update_interval: float = POSITION_UPDATE_INTERVAL,
+    ):
+        """
+        Args:
+            name: The name of the class of requests, used in the metrics.
+            max_concurrent: The maximum number of requests running at once.
+            max_queued: The maximum number of requests waiting.
+            deadline: The maximum seconds a request waits before it starts.
+            metrics: The registry counting the admitted, queued and shed requests. Defaults to the registry of the bot.
+            update_interval: The minimum seconds between two updates of the position of a waiting request.
+                Defaults to `POSITION_UPDATE_INTERVAL`.
+        """
+
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.deadline = deadline
+        self.metrics = metrics
+        self.update_interval = update_interval
+
+        self.running = 0
+        self.service_time: float | None = None
+
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queued(self) -> int:
+        """The number of requests waiting."""
+
+        return len(self._waiters)
+
+    def expected_wait(self, position: int) -> float:
+        """
+        Returns the seconds a request at the given position of the queue is expected to wait, from the moving
+        average of the service times. Nothing is expected until a request has finished.
+        """
+
+        return 0.0 if self.service_time is None else position * self.service_time / self.max_concurrent
+
+    @asynccontextmanager
+    async def admit(self, on_queued: Callable[[int], Awaitable[None]] | None = None) -> AsyncIterator[None]:
+        """
+        Waits until the request may run and holds its place while it runs.
+
+        Args:
+            on_queued: Called with the position of the request, starting from 1, when it is queued and whenever the
+                position changes, at most once per `update_interval`. Its errors are logged and ignored.
+                Defaults to None.
+
+        Raises:
+            OverloadedError: If the request is shed.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        await self._acquire(on_queued)
+        start = loop.time()
+        try:
+            yield
+        finally:
+            elapsed = loop.time() - start
+            if self.service_time is None:
+                self.service_time = elapsed
+            else:
+                self.service_time += SERVICE_TIME_WEIGHT * (elapsed - self.service_time)
+
+            self._release()
+
+    async def _acquire(self, on_queued: Callable[[int], Awaitable[None]] | None) -> None:
+        if self.running < self.max_concurrent and not self._waiters:
+            self.running += 1
+            self.metrics.increment(f"admission.{self.name}.admitted")
+
+            return None
+
+        if len(self._waiters) >= self.max_queued:
+            raise self._shed("full")
+        if self.expected_wait(len(self._waiters) + 1) > self.deadline:
+            raise self._shed("deadline")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        future: asyncio.Future[None] = loop.create_future()
+        self._waiters.append(future)
+        self.metrics.increment(f"admission.{self.name}.queued")
+
+        reported = None
+        try:
+            while not future.done():
+                position = self._waiters.index(future) + 1
+                if on_queued is not None and position != reported:
+                    reported = position
+                    try:
+                        await on_queued(position)
+                    except Exception as err:
+                        logger.warning("Showing the position in the %s queue failed: %r", self.name, err)
+
+                    continue
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise self._shed("expired")
+
+                await asyncio.wait({future}, timeout=min(remaining, self.update_interval))
+        except BaseException:
+            if future.done():
+                # The place was handed over just as the request gave up, it goes to the next one
+                self._release()
+            else:
+                future.cancel()
+                self._waiters.remove(future)
+
+            raise
+
+        self.metrics.increment(f"admission.{self.name}.admitted")
+
+    def _release(self) -> None:
+        # The place of a finished request goes straight to the first waiting one
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.running -= 1
+
+    def _shed(self, reason: str) -> OverloadedError:
+        self.metrics.increment(f"admission.{self.name}.shed")
+        self.metrics.increment(f"admission.{self.name}.shed.{reason}")
+
+        return OverloadedError(self.name, reason)
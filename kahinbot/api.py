@@ -0,0 +1,670 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+This module provides a local HTTP/JSON API to the numbers and the rendered content of the readings, for the other
+services that need them without going through Telegram or the command line.
+
+Endpoints:
+    GET /v1/life-path/<date>, /v1/pin-code/<date>, /v1/zodiac/<date>, /v1/reading/<date>: The numbers of a
+        birthdate, the last one all of them.
+    GET /v1/content/<view>/<date>: A rendered view of a birthdate, one of `CONTENT_VIEWS`, in the HTML of the bot.
+    POST /v1/batch: The readings of up to `MAX_BATCH_SIZE` birthdates given as `{"birthdates": [...]}`, optionally
+        with the rendered views given as `"views": [...]`, streamed back as one JSON line per birthdate, in order.
+    GET /v1/health: The version of the content being served.
+
+Dates are written as `yyyy-mm-dd` or `dd.mm.yyyy`, the batch also takes `dd/mm/yyyy`. The responses of the lookups
+carry an ETag and are answered with 304 Not Modified when the client already has them; they are kept in memory until
+the content changes.
+
+The server is a plain asyncio protocol with keep-alive and pipelining, so the bot can run it on its own event loop,
+next to the Telegram client and on the same content snapshot, or it can run alone from the command line.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from content import ContentStore
+from dates import parse_birthdate
+from the_life import birthdate_to_life_path
+from pin_code import get_pin_code
+from zodiac import Zodiac
+from views import render_full_text_forbes, render_full_text_millman, render_json_summary, render_zodiac_traits
+from collections.abc import Callable, Hashable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+from urllib.parse import unquote
+import asyncio
+import hashlib
+import json
+import logging
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Address the API listens on, only the local services can reach it by default
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+
+# Maximum size of the request line and the headers of a request
+MAX_HEADER_BYTES = 8 * 1024
+
+# Maximum size of the body of a request, enough for a full batch
+MAX_BODY_BYTES = 1024 * 1024
+
+# Maximum number of birthdates of a batch
+MAX_BATCH_SIZE = 10000
+
+# Number of birthdates of a batch computed and written at once, the other connections are served in between
+BATCH_CHUNK_SIZE = 256
+
+# Number of lookup responses and rendered views kept in memory
+MAX_CACHED_RESPONSES = 10000
+
+# Number of encoded readings the batches are made of kept in memory, about the birthdates of a century
+MAX_CACHED_READINGS = 40000
+
+# Seconds an idle connection is kept open
+KEEP_ALIVE_TIMEOUT = 15.0
+
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+}
+
+
+def zodiac_fields(birthdate: datetime) -> dict[str, Any]:
+    zodiac_sign = Zodiac(birthdate)
+
+    return {"zodiac": zodiac_sign.sign, "enneagram": zodiac_sign.enneagram}
+
+
+def reading_fields(birthdate: datetime) -> dict[str, Any]:
+    return {
+        "life_path": list(birthdate_to_life_path(birthdate)),
+        "pin_code": get_pin_code(birthdate),
+        **zodiac_fields(birthdate),
+    }
+
+
+# Computes the fields of the lookup endpoints from a birthdate
+LOOKUPS: dict[str, Callable[[datetime], dict[str, Any]]] = {
+    "life-path": lambda birthdate: {"life_path": list(birthdate_to_life_path(birthdate))},
+    "pin-code": lambda birthdate: {"pin_code": get_pin_code(birthdate)},
+    "zodiac": zodiac_fields,
+    "reading": reading_fields,
+}
+
+
+class ContentView(NamedTuple):
+    """
+    A view of a birthdate the API renders.
+
+    Attributes:
+        key: Returns what the view of a birthdate depends on, birthdates with the same key share the rendered view.
+        render: Renders the view of a birthdate from the store.
+    """
+
+    key: Callable[[datetime], Hashable]
+    render: Callable[[datetime, ContentStore], str]
+
+
+def _zodiac_key(birthdate: datetime) -> tuple[str, int]:
+    zodiac_sign = Zodiac(birthdate)
+
+    return zodiac_sign.sign, zodiac_sign.enneagram
+
+
+# Views the API renders, the same as the buttons of the bot that do not need Gemini
+CONTENT_VIEWS = {
+    "millman": ContentView(
+        birthdate_to_life_path,
+        lambda birthdate, store: render_full_text_millman(birthdate_to_life_path(birthdate), store),
+    ),
+    "forbes": ContentView(
+        lambda birthdate: tuple(get_pin_code(birthdate)),
+        lambda birthdate, store: render_full_text_forbes(get_pin_code(birthdate), store),
+    ),
+    "short": ContentView(
+        birthdate_to_life_path,
+        lambda birthdate, store: render_json_summary(birthdate_to_life_path(birthdate), store),
+    ),
+    "long": ContentView(
+        birthdate_to_life_path,
+        lambda birthdate, store: render_json_summary(birthdate_to_life_path(birthdate), store, extended=True),
+    ),
+    "zodiac": ContentView(_zodiac_key, lambda birthdate, store: render_zodiac_traits(Zodiac(birthdate), store)),
+}
+
+
+class Request(NamedTuple):
+    """
+    A parsed HTTP request.
+
+    Attributes:
+        method: The method, e.g. `GET`.
+        target: The request target, the path and the query string.
+        headers: The headers, by their lowercase names.
+        body: The body.
+        keep_alive: Whether the connection stays open after the response.
+    """
+
+    method: str
+    target: str
+    headers: dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+class Response(NamedTuple):
+    """
+    An HTTP response with its whole body.
+    """
+
+    status: int
+    body: bytes
+    etag: str | None = None
+    content_type: str = "application/json"
+    headers: tuple[tuple[str, str], ...] = ()
+
+
+class StreamingResponse(NamedTuple):
+    """
+    An HTTP response whose body is computed and sent in chunks.
+    """
+
+    status: int
+    chunks: Iterator[bytes]
+    content_type: str = "application/x-ndjson"
+
+
+def encode_json(value: object) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def error_response(status: int, message: str, headers: tuple[tuple[str, str], ...] = ()) -> Response:
+    return Response(status, encode_json({"error": message}), headers=headers)
+
+
+def _remember(cache: dict[Any, Any], key: Hashable, value: object, limit: int = MAX_CACHED_RESPONSES) -> None:
+    # Dictionaries keep the insertion order, the oldest entry goes first
+    if len(cache) >= limit:
+        del cache[next(iter(cache))]
+    cache[key] = value
+
+
+class ApiServer:
+    """
+    Answers the requests of the API from the current content store.
+    """
+
+    def __init__(self, store: Callable[[], ContentStore], metrics: Metrics = default_metrics):
+        """
+        Args:
+            store: Returns the current content store, read once per request, e.g. from the reloader of the bot.
+            metrics: The registry counting the requests. Defaults to the registry of the bot.
+        """
+
+        self.store = store
+        self.metrics = metrics
+
+        self._version: str | None = None
+        self._responses: dict[str, Response] = {}
+        self._rendered: dict[tuple[str, str, Hashable], str | None] = {}
+        # The numbers do not depend on the content, they are kept across reloads
+        self._readings: dict[str, bytes] = {}
+
+    def _current_store(self) -> ContentStore:
+        store = self.store()
+        if store.version != self._version:
+            # The cached responses may carry the old content
+            self._responses.clear()
+            self._rendered.clear()
+            self._version = store.version
+
+        return store
+
+    def respond(self, request: Request) -> Response | StreamingResponse:
+        """
+        Answers a request.
+
+        Args:
+            request: The request.
+
+        Returns:
+            The response, streamed for the batches.
+        """
+
+        self.metrics.increment("api.requests")
+        parts = unquote(request.target.partition("?")[0]).strip("/").split("/")
+
+        if parts[0] != "v1" or len(parts) < 2:
+            return error_response(404, "not found")
+
+        if parts[1] == "batch" and len(parts) == 2:
+            if request.method != "POST":
+                return error_response(405, "method not allowed", (("Allow", "POST"),))
+
+            return self.batch(request.body)
+
+        if request.method != "GET":
+            return error_response(405, "method not allowed", (("Allow", "GET"),))
+
+        if parts[1] == "health" and len(parts) == 2:
+            return Response(200, encode_json({"status": "ok", "version": self._current_store().version}))
+
+        if not (parts[1] in LOOKUPS and len(parts) == 3) and not (parts[1] == "content" and len(parts) == 4):
+            return error_response(404, "not found")
+
+        response = self._lookup("/".join(parts))
+        if response.etag is not None and response.etag in request.headers.get("if-none-match", ""):
+            self.metrics.increment("api.not_modified")
+            return Response(304, b"", response.etag)
+
+        return response
+
+    def _lookup(self, path: str) -> Response:
+        store = self._current_store()
+
+        response = self._responses.get(path)
+        if response is not None:
+            self.metrics.increment("api.cache_hit")
+            return response
+
+        parts = path.split("/")
+        birthdate = parse_birthdate(parts[-1])
+        if birthdate is None:
+            return error_response(400, f"invalid birthdate: {parts[-1]}")
+
+        fields: dict[str, Any] = {"birthdate": birthdate.date().isoformat()}
+        if parts[1] == "content":
+            if parts[2] not in CONTENT_VIEWS:
+                return error_response(404, f"unknown view: {parts[2]}")
+
+            content = self._render(parts[2], birthdate, store)
+            if content is None:
+                return error_response(404, "content not found")
+
+            fields.update(view=parts[2], content=content)
+        else:
+            fields.update(LOOKUPS[parts[1]](birthdate))
+
+        body = encode_json(fields)
+        response = Response(200, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+        _remember(self._responses, path, response)
+
+        return response
+
+    def _render(self, view: str, birthdate: datetime, store: ContentStore) -> str | None:
+        # Keyed by the version too, a batch streamed from the previous content may still be rendering
+        key = (store.version, view, CONTENT_VIEWS[view].key(birthdate))
+        if key not in self._rendered:
+            try:
+                content = CONTENT_VIEWS[view].render(birthdate, store)
+            except (FileNotFoundError, KeyError) as err:
+                logger.error("Rendering %s of %s failed: %s", view, birthdate.date(), err)
+                content = None
+
+            _remember(self._rendered, key, content)
+
+        return self._rendered[key]
+
+    def batch(self, body: bytes) -> Response | StreamingResponse:
+        """
+        Answers a batch request, streaming one JSON line per birthdate.
+
+        Invalid birthdates are answered with an `error` line, views whose content is missing with a null content.
+
+        Args:
+            body: The JSON body of the request.
+
+        Returns:
+            The streamed response, or an error response if the request is invalid.
+        """
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return error_response(400, "invalid JSON")
+
+        birthdates = request.get("birthdates") if isinstance(request, dict) else None
+        views = request.get("views", []) if isinstance(request, dict) else None
+        if not isinstance(birthdates, list) or not all(isinstance(text, str) for text in birthdates):
+            return error_response(400, "birthdates must be a list of strings")
+        if not isinstance(views, list) or not all(view in CONTENT_VIEWS for view in views):
+            return error_response(400, f"views must be a list of {', '.join(CONTENT_VIEWS)}")
+        if len(birthdates) > MAX_BATCH_SIZE:
+            return error_response(413, f"at most {MAX_BATCH_SIZE} birthdates per batch")
+
+        self.metrics.increment("api.batch.birthdates", len(birthdates))
+
+        return StreamingResponse(200, self._batch_lines(birthdates, views, self._current_store()))
+
+    def _batch_lines(self, birthdates: list[str], views: list[str], store: ContentStore) -> Iterator[bytes]:
+        # Lines of the distinct birthdates of the batch, people born on the same day are computed once
+        lines: dict[str, bytes] = {}
+
+        for start in range(0, len(birthdates), BATCH_CHUNK_SIZE):
+            chunk: list[bytes] = []
+            for text in birthdates[start : start + BATCH_CHUNK_SIZE]:
+                line = lines.get(text)
+                if line is None:
+                    line = lines[text] = self._batch_line(text, views, store)
+                chunk.append(line)
+
+            yield b"".join(chunk)
+
+    def _batch_line(self, text: str, views: list[str], store: ContentStore) -> bytes:
+        if not views and text in self._readings:
+            return self._readings[text]
+
+        birthdate = parse_birthdate(text)
+        if birthdate is None:
+            return encode_json({"input": text, "error": "invalid birthdate"}) + b"\n"
+
+        fields = {"birthdate": birthdate.date().isoformat(), **reading_fields(birthdate)}
+        if views:
+            fields["content"] = {view: self._render(view, birthdate, store) for view in views}
+            return encode_json(fields) + b"\n"
+
+        line = encode_json(fields) + b"\n"
+        _remember(self._readings, text, line, MAX_CACHED_READINGS)
+
+        return line
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.Server:
+        """
+        Starts listening, port 0 picks a free port.
+
+        Returns:
+            The listening server.
+        """
+
+        server = await asyncio.get_running_loop().create_server(lambda: _Connection(self), host, port)
+        logger.info("API listening on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+
+        return server
+
+    async def serve(self, host: str = API_HOST, port: int = API_PORT) -> None:
+        """
+        Serves the API until cancelled.
+        """
+
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def _head(
+    status: int,
+    content_type: str,
+    keep_alive: bool,
+    length: int | None = None,
+    etag: str | None = None,
+    headers: tuple[tuple[str, str], ...] = (),
+) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+    if status != 304:
+        lines.append(f"Content-Type: {content_type}; charset=utf-8")
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    if etag is not None:
+        # Cached, but checked with the server every time since the content may be reloaded
+        lines += [f"ETag: {etag}", "Cache-Control: no-cache"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    if not keep_alive:
+        lines.append("Connection: close")
+
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+class _Connection(asyncio.Protocol):
+    """
+    A connection to the API, answering its requests in order.
+    """
+
+    def __init__(self, server: ApiServer):
+        self.server = server
+        self.loop = asyncio.get_running_loop()
+        self.transport: asyncio.Transport | None = None
+        self.buffer = bytearray()
+
+        # Whether a response is being streamed, the pipelined requests wait in the buffer meanwhile
+        self.streaming = False
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+        self.last_active = self.loop.time()
+        self.idle_timer: asyncio.TimerHandle | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[reportAttributeAccessIssue]
+        self.idle_timer = self.loop.call_later(KEEP_ALIVE_TIMEOUT, self._check_idle)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        # Wakes up the stream waiting to write, which stops there
+        self.writable.set()
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+
+    def pause_writing(self) -> None:
+        self.writable.clear()
+
+    def resume_writing(self) -> None:
+        self.writable.set()
+
+    def _check_idle(self) -> None:
+        # Rescheduled rather than reset on every request, which would cost a timer per request
+        idle = 0.0 if self.streaming else self.loop.time() - self.last_active
+        if idle < KEEP_ALIVE_TIMEOUT:
+            self.idle_timer = self.loop.call_later(KEEP_ALIVE_TIMEOUT - idle, self._check_idle)
+        elif self.transport is not None:
+            self.transport.close()
+
+    def data_received(self, data: bytes) -> None:
+        self.buffer += data
+        self.last_active = self.loop.time()
+
+        if self.streaming:
+            if len(self.buffer) > MAX_HEADER_BYTES + MAX_BODY_BYTES and self.transport is not None:
+                self.transport.pause_reading()
+            return
+
+        self._process()
+
+    def _process(self) -> None:
+        while self.transport is not None and not self.streaming:
+            request = self._parse()
+            if request is None:
+                return
+
+            try:
+                response = self.server.respond(request)
+            except Exception:
+                logger.exception("Answering %s %s failed", request.method, request.target)
+                response = error_response(500, "internal error")
+
+            if isinstance(response, StreamingResponse):
+                self.streaming = True
+                self.loop.create_task(self._stream(response, request.keep_alive))
+                return
+
+            self._write(response, request.keep_alive)
+
+    def _parse(self) -> Request | None:
+        end = self.buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self.buffer) > MAX_HEADER_BYTES:
+                self._fail(431, "headers too large")
+            return None
+
+        lines = self.buffer[:end].decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            self._fail(400, "malformed request")
+            return None
+
+        if "transfer-encoding" in headers:
+            self._fail(501, "chunked requests are not supported")
+            return None
+        if length > MAX_BODY_BYTES:
+            self._fail(413, f"at most {MAX_BODY_BYTES} bytes per request")
+            return None
+        if len(self.buffer) < end + 4 + length:
+            return None
+
+        body = bytes(self.buffer[end + 4 : end + 4 + length])
+        del self.buffer[: end + 4 + length]
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        return Request(method, target, headers, body, keep_alive)
+
+    def _fail(self, status: int, message: str) -> None:
+        self._write(error_response(status, message), keep_alive=False)
+
+    def _write(self, response: Response, keep_alive: bool) -> None:
+        if self.transport is None:
+            return
+
+        head = _head(
+            response.status, response.content_type, keep_alive, len(response.body), response.etag, response.headers
+        )
+        self.transport.write(head + response.body)
+
+        if not keep_alive:
+            self.transport.close()
+            self.transport = None
+
+    async def _stream(self, response: StreamingResponse, keep_alive: bool) -> None:
+        try:
+            if self.transport is not None:
+                self.transport.write(_head(response.status, response.content_type, keep_alive))
+
+            for chunk in response.chunks:
+                await self.writable.wait()
+                if self.transport is None:
+                    return
+                self.transport.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                # Lets the other connections in before the next chunk is computed
+                await asyncio.sleep(0)
+
+            if self.transport is not None:
+                self.transport.write(b"0\r\n\r\n")
+        except Exception:
+            logger.exception("Streaming a batch failed")
+            # Closed without the last chunk, the client sees the response is incomplete
+            keep_alive = False
+
+        self.streaming = False
+        self.last_active = self.loop.time()
+
+        if self.transport is None:
+            return
+        if not keep_alive:
+            self.transport.close()
+            self.transport = None
+            return
+
+        self.transport.resume_reading()
+        self._process()
+
+
+if __name__ == "__main__":
+    from content import DirectoryStore, open_store
+    from reload import POLL_INTERVAL, ContentReloader, MemoryStore, open_watcher
+    from zodiac import ENNEAGRAM_DIRECTORY
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Serves the readings to the other services over HTTP.",
+        epilog="Contact: @Seymapro",
+    )
+
+    # Define command-line arguments
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    parser.add_argument(
+        "-d",
+        "--data-dir",
+        "--data-directory",
+        default="./data/",
+        type=Path,
+        help="path to the data directory",
+        dest="data_directory",
+    )
+    parser.add_argument(
+        "-b",
+        "--bundle",
+        default=None,
+        type=Path,
+        help="path to a bundle built with `bundle.py build`, read instead of the data directory",
+        dest="bundle",
+    )
+    parser.add_argument("--host", default=API_HOST, help="address to listen on", dest="host")
+    parser.add_argument("-p", "--port", default=API_PORT, type=int, help="port to listen on", dest="port")
+    parser.add_argument(
+        "--no-reload",
+        action="store_false",
+        help="do not reload the content when the files of the data directory change",
+        dest="reload",
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+    def build(previous: ContentStore | None, keys: set[str]) -> ContentStore:
+        if previous is None:
+            store = open_store(args.data_directory, args.bundle)
+            # Requests read a copy of the files, which stays the same while they are edited
+            if args.bundle is None and args.reload:
+                return MemoryStore.load(store)  # type: ignore[reportArgumentType]
+
+            return store
+
+        return previous.updated(DirectoryStore(args.data_directory), keys)  # type: ignore[reportAttributeAccessIssue]
+
+    async def main() -> None:
+        reloader = ContentReloader(build)
+        if args.bundle is None and args.reload:
+            asyncio.get_running_loop().create_task(
+                reloader.watch(open_watcher(args.data_directory, ENNEAGRAM_DIRECTORY, POLL_INTERVAL))
+            )
+
+        await ApiServer(lambda: reloader.current).serve(args.host, args.port)
+
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides batch computation and rendering of readings for many birthdates at once, e.g. for group chats.
+"""
+
+from the_life import birthdate_to_life_path
+from pin_code import get_pin_code
+from zodiac import Zodiac
+from collections.abc import Callable, Hashable
+from datetime import datetime
+from typing import NamedTuple
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+
+class BatchReading(NamedTuple):
+    """
+    The numbers computed for a single birthdate of a batch.
+    """
+
+    birthdate: datetime
+    life_path: tuple[int, int]
+    pin_code: tuple[int, ...]
+    zodiac_sign: str
+    enneagram: int
+
+
+def batch_readings(birthdates: list[datetime]) -> list[BatchReading]:
+    """
+    Computes the life path, pin code and zodiac sign of every given birthdate in one pass.
+
+    Each distinct birthdate is computed only once, even if it appears several times in the batch.
+
+    Args:
+        birthdates: The birthdates to compute the readings for.
+
+    Returns:
+        A list of readings, in the same order as the given birthdates.
+    """
+
+    computed: dict[datetime, BatchReading] = {}
+
+    for birthdate in birthdates:
+        if birthdate not in computed:
+            zodiac_sign = Zodiac(birthdate)
+            computed[birthdate] = BatchReading(
+                birthdate,
+                birthdate_to_life_path(birthdate),
+                tuple(get_pin_code(birthdate)),
+                zodiac_sign.sign,
+                zodiac_sign.enneagram,
+            )
+
+    return [computed[birthdate] for birthdate in birthdates]
+
+
+def group_by(readings: list[BatchReading], key: Callable[[BatchReading], Hashable]) -> dict[Hashable, list[int]]:
+    """
+    Groups the positions of the readings (starting from 1) by the value the key function returns for them.
+
+    Args:
+        readings: The readings to group.
+        key: The function returning the value to group a reading by.
+
+    Returns:
+        A dictionary mapping every distinct value to the positions of the readings having it,
+        in the order the values first appear.
+
+    Example:
+        >>> group_by(batch_readings([datetime(2002, 12, 22), datetime(2002, 7, 31)]), lambda reading: reading.enneagram)
+        {6: [1], 3: [2]}
+    """
+
+    groups: dict[Hashable, list[int]] = {}
+
+    for position, reading in enumerate(readings, start=1):
+        groups.setdefault(key(reading), []).append(position)
+
+    return groups
+
+
+def render_comparison_table(readings: list[BatchReading]) -> str:
+    """
+    Renders a compact comparison table of the readings, followed by the groups of people sharing a number.
+
+    Every distinct life path, sense of life digit and zodiac sign is rendered once, with the people sharing it
+    listed next to it.
+
+    Args:
+        readings: The readings to render.
+
+    Returns:
+        The table formatted with Telegram's HTML markup.
+    """
+
+    rows = [f"{'#':>2} {'Tarih':<10} {'Hayat':<5} {'Pin':<9} Burç"]
+    for position, reading in enumerate(readings, start=1):
+        rows.append(
+            f"{position:>2} {reading.birthdate.strftime('%d.%m.%Y'):<10} "
+            f"{f'{reading.life_path[0]}/{reading.life_path[1]}':<5} "
+            f"{''.join(map(str, reading.pin_code)):<9} {reading.zodiac_sign}"
+        )
+
+    content = "<b><u>KARŞILAŞTIRMA</b></u>\n\n<pre>" + "\n".join(rows) + "</pre>\n\n"
+
+    content += "<b><u>HAYAT SAYILARI</b></u>\n"
+    for life_path, positions in group_by(readings, lambda reading: f"{reading.life_path[0]}/{reading.life_path[1]}").items():
+        content += f"{life_path}: {', '.join(map(str, positions))}\n"
+
+    # The last digit of the pin code is the sense of life, it is the one most often compared between people
+    content += "\n<b><u>YAŞAM AMACI (PİN KODUNUN SON HANESİ)</b></u>\n"
+    for digit, positions in group_by(readings, lambda reading: reading.pin_code[-1]).items():
+        content += f"{digit}: {', '.join(map(str, positions))}\n"
+
+    content += "\n<b><u>BURÇLAR</b></u>\n"
+    for zodiac_sign, positions in group_by(readings, lambda reading: reading.zodiac_sign).items():
+        content += f"{zodiac_sign}: {', '.join(map(str, positions))}\n"
+
+    return content.strip()
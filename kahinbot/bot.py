@@ -24,15 +24,48 @@
 This module defines a Telegram bot that provides numerology readings based on user input.
 """
 
-from the_life import birthdate_to_life_path, life_path_to_content
-from pin_code import get_pin_code, pin_code_to_contents
-from paraphraser import paraphrase
-from zodiac import Zodiac
+from the_life import birthdate_to_life_path
+from pin_code import get_pin_code
+from paraphraser import get_summarizer, paraphrase
+from zodiac import ENNEAGRAM_DIRECTORY, Zodiac
+from dates import BIRTHDATE_PATTERN, extract_birthdates
+from batch import batch_readings, render_comparison_table
+from inline import InlineAnswerCache
+from content import ContentStore, DirectoryStore, open_store
+from search import SEARCH_KEY_PATTERNS, SearchIndex, open_index
+from people import PEOPLE_KEY_PATTERN, PeopleIndex
+from pages import PageIndex
+from reload import POLL_INTERVAL, ContentReloader, MemoryStore, open_watcher
+from views import (
+    life_path_key,
+    load_summary_forbes,
+    load_summary_millman,
+    pin_code_keys,
+    render_json_summary,
+    render_zodiac_traits,
+)
+from prefetch import PrefetchedView, Prefetcher
+from fanout import SectionFanout
+from inflight import InFlightRequests
+from admission import AdmissionQueue, OverloadedError
+from session import BufferedSession
+from broadcast import Broadcaster, SubscriberStore, Topic, render_daily
+from export import MAX_EXPORT_FILES, PdfExporter
+from api import ApiServer
+from navigation import ViewUpdate, menu_header, menu_items, page_items, plan_view_update, split_message
+from metrics import metrics
+from tracing import MAX_PROFILE_SECONDS, SamplingProfiler, Tracer, annotate, span, traced, write_collapsed_stacks
+from callbacks import CallbackDataError, CallbackPayload, View, decode_callback, encode_callback
 from telethon import TelegramClient, events, Button  # type: ignore[reportAttributeAccessIssue, reportUnknownVariableType]
-from datetime import datetime
+from telethon.errors import MessageNotModifiedError  # type: ignore[reportAttributeAccessIssue, reportUnknownVariableType]
+from telethon.tl.types import DocumentAttributeFilename
+from collections.abc import Awaitable, Callable
+from datetime import datetime, time
 from pathlib import Path
+from typing import NamedTuple
+import asyncio
+import html
 import os
-import json
 import logging
 
 __author__ = "Seymapro"
@@ -50,66 +83,370 @@ API_ID = int(os.environ["KAHIN_BOT_API_ID"])
 API_HASH = os.environ["KAHIN_BOT_API_HASH"]
 BOT_TOKEN = os.environ["KAHIN_BOT_BOT_TOKEN"]
 
+# Root of the data directory containing the Millman and Forbes content
+DATA_DIRECTORY = Path(os.environ.get("KAHIN_BOT_DATA_DIR", "/home/nigella/tg_bot/kahin-bot/data/"))
+
+# Optional content bundle built with `bundle.py build`, read instead of the data directory when set
+BUNDLE_PATH = Path(os.environ["KAHIN_BOT_BUNDLE"]) if os.environ.get("KAHIN_BOT_BUNDLE") else None
+
+# Memory budget in bytes for decompressed entries when the bundle is compressed
+CONTENT_CACHE_BYTES = int(os.environ.get("KAHIN_BOT_CONTENT_CACHE_BYTES", 4 * 1024 * 1024))
+
+# Search index built with `search.py build`, rebuilt at startup if it is missing or stale
+SEARCH_INDEX_PATH = Path(os.environ.get("KAHIN_BOT_SEARCH_INDEX", "./kahinbot.index"))
+
+# Whether the paraphrased Millman summary is prepared as soon as a birthdate arrives, each one costs a Gemini call
+PREFETCH_PARAPHRASE = os.environ.get("KAHIN_BOT_PREFETCH_PARAPHRASE", "0") == "1"
+
+# Whether the Forbes summary is paraphrased section by section, concurrently, sending each section once it is ready
+FORBES_FANOUT = os.environ.get("KAHIN_BOT_FORBES_FANOUT", "1") == "1"
+
+# Whether views edit the menu message the button was pressed on instead of sending a new menu after every view
+EDIT_IN_PLACE = os.environ.get("KAHIN_BOT_EDIT_IN_PLACE", "1") == "1"
+
+# Whether pressing a button cancels the views the user is still waiting for
+CANCEL_SUPERSEDED = os.environ.get("KAHIN_BOT_CANCEL_SUPERSEDED", "1") == "1"
+
+# Maximum number of cheap views, e.g. the full texts, and of paraphrased views sent at once, the others are queued
+MAX_CHEAP_VIEWS = int(os.environ.get("KAHIN_BOT_MAX_CHEAP_VIEWS", 16))
+MAX_EXPENSIVE_VIEWS = int(os.environ.get("KAHIN_BOT_MAX_EXPENSIVE_VIEWS", 4))
+
+# Whether the content is reloaded when the files of the data directory change, bundles are never reloaded
+HOT_RELOAD = os.environ.get("KAHIN_BOT_HOT_RELOAD", "1") == "1"
+
+# Seconds between two scans of the data directory when inotify is not available
+RELOAD_POLL_INTERVAL = float(os.environ.get("KAHIN_BOT_RELOAD_POLL_INTERVAL", POLL_INTERVAL))
+
+# Path of the file the spans of the traced requests are appended to, in the Chrome trace event format
+TRACE_PATH = Path(os.environ["KAHIN_BOT_TRACE_FILE"]) if os.environ.get("KAHIN_BOT_TRACE_FILE") else None
+
+# Share of the requests that are traced when a trace file is set
+TRACE_SAMPLE_RATE = float(os.environ.get("KAHIN_BOT_TRACE_SAMPLE_RATE", 1.0))
+
+# Directory the profiles of the profile command are written to
+PROFILE_DIRECTORY = Path(os.environ.get("KAHIN_BOT_PROFILE_DIR", "./profiles/"))
+
+# Ids of the users allowed to use the administration commands, separated by commas
+ADMIN_IDS = frozenset(int(user_id) for user_id in os.environ.get("KAHIN_BOT_ADMINS", "").split(",") if user_id.strip())
+
+# Key used to sign the callback data of inline buttons, falls back to the bot token
+CALLBACK_SECRET = os.environ.get("KAHIN_BOT_CALLBACK_SECRET", BOT_TOKEN).encode()
+
+# File the subscriptions to the daily messages and the progress of their broadcasts are kept in
+SUBSCRIBERS_PATH = Path(os.environ.get("KAHIN_BOT_SUBSCRIBERS_DB", "./subscribers.db"))
+
+# Local time of the day the daily messages are sent at, as `HH:MM`
+BROADCAST_TIME = time.fromisoformat(os.environ.get("KAHIN_BOT_BROADCAST_TIME", "09:00"))
+
+# Messages sent per second by the broadcast of the daily messages
+BROADCAST_RATE = float(os.environ.get("KAHIN_BOT_BROADCAST_RATE", 25))
+
+# Directory the exported PDFs are cached in and number of processes typesetting them
+EXPORT_DIRECTORY = Path(os.environ.get("KAHIN_BOT_EXPORT_DIR", "./exports/"))
+EXPORT_WORKERS = int(os.environ.get("KAHIN_BOT_EXPORT_WORKERS", 2))
+
+# Port of the HTTP API served to the other services from the content of the bot, not served when it is not set
+API_PORT = int(os.environ["KAHIN_BOT_API_PORT"]) if os.environ.get("KAHIN_BOT_API_PORT") else None
+API_HOST = os.environ.get("KAHIN_BOT_API_HOST", "127.0.0.1")
+
+# File the Telegram session is kept in, the entities and update state are written to it in batches
+SESSION_PATH = Path(os.environ.get("KAHIN_BOT_SESSION_FILE", "./bot.session"))
+
+# Typesets the readings into PDFs, once per life path, pin code, enneagram type and content version, see `export.py`.
+# Its workers are forked first, while the bot has no thread or connection yet
+exporter = PdfExporter(EXPORT_DIRECTORY, EXPORT_WORKERS)
+exporter.start()
+
 # Initialize the Telegram client with the bot token
-client = TelegramClient("bot", API_ID, API_HASH).start(bot_token=BOT_TOKEN)
+session = BufferedSession(SESSION_PATH)
+client = TelegramClient(session, API_ID, API_HASH).start(bot_token=BOT_TOKEN)
+
+# Maximum number of birthdates answered with a menu from a single message
+MAX_BIRTHDATES_PER_MESSAGE = 5
+
+# Maximum number of birthdates compared by a single batch command, keeps the buttons within Telegram's limits
+MAX_BIRTHDATES_PER_BATCH = 48
 
-# Dictionary to store user data, including their life path and message IDs
-user_data: dict[int, dict[str, int | tuple[int, int]]] = {}
+# Number of person buttons on each row under a batch comparison table
+BATCH_BUTTONS_PER_ROW = 3
 
+# Inline answers are the same for everyone asking for a birthdate, so Telegram may serve them from its cache for a day
+INLINE_CACHE_TIME = 24 * 60 * 60
 
-# TODO: Fix repetition.
-def create_json_summary(content_json: dict[str, list[str]] | dict[str, dict[str, list[str]]], key: str) -> str:
+# Queries without a birthdate are likely still being typed, their empty answers are cached only briefly
+INLINE_EMPTY_CACHE_TIME = 60
+
+# Traces the handled updates, see `tracing.py`
+tracer = Tracer(TRACE_PATH, TRACE_SAMPLE_RATE)
+
+# Samples the stacks of the bot on demand for the profile command
+profiler = SamplingProfiler()
+
+# Default number of seconds the profile command samples for
+PROFILE_SECONDS = 10
+
+# Maximum number of results sent for a search
+SEARCH_RESULT_LIMIT = 5
+
+# Maximum number of people sent for a famous people query
+PEOPLE_RESULT_LIMIT = 5
+
+
+class ContentSnapshot(NamedTuple):
     """
-    Create a formatted summary string from a JSON object.
+    Everything the handlers read from one version of the content, replaced as a whole when the data changes.
+
+    Attributes:
+        store: Store every view reads its content from, a snapshot of the data directory or a memory-mapped bundle.
+        page_index: Page boundaries of the full texts, read from the bundle or computed from the data directory.
+        inline_answers: Answers to inline queries, precomputed so answering a query never touches the disk.
+        search_index: Inverted index the search command answers from.
+        people_index: Trie of the famous people of the Millman JSONs, loaded from the search index.
+    """
+
+    store: ContentStore
+    page_index: PageIndex
+    inline_answers: InlineAnswerCache
+    search_index: SearchIndex
+    people_index: PeopleIndex
+
+    def retire(self, successor: "ContentSnapshot") -> None:
+        """
+        Closes the search index of the snapshot once it is replaced, unless the new snapshot kept it.
+
+        The search and famous people commands read the index on the event loop without awaiting in between, so no
+        handler is still reading it once the reloader swapped the snapshots.
+        """
+
+        if self.search_index is not successor.search_index:
+            self.search_index.close()
+
+
+def build_snapshot(previous: ContentSnapshot | None, keys: set[str]) -> ContentSnapshot:
+    """
+    Loads the content, or rebuilds only what depends on the changed entries of the previous snapshot.
 
     Args:
-        content_json: The JSON object containing the data.
-        key: The key to access the relevant data within the JSON.
+        previous: The snapshot in use, or None at startup.
+        keys: The keys of the changed entries.
 
     Returns:
-        A formatted string containing the summary information.
-    """
-
-    TRANSLATIONS = {
-        "challenges": "<b><u>ZORLUKLAR</b></u>",
-        "famous_people": "<b><u>ÜNLÜ İNSANLAR</b></u>",
-        "fulfilling_destiny": "<b><u>KADERİNİ GERÇEKLEŞTİRMEK</b></u>",
-        "guidelines": "<b><u>TAVSİYELER</b></u>",
-        "questions": "<b><u>SORULAR</b></u>",
-        "health": "<b><u>SAĞLIK</b></u>",
-        "advice": "<b><u>TAVSİYELER</b></u>",
-        "positive": "<b><u>POZİTİF YÖNLER</b></u>",
-        "negative": "<b><u>NEGATİF YÖNLER</b></u>",
-        "key_traits": "<b><u>TEMEL ÖZELLİKLER</b></u>",
-        "opportunities": "<b><u>FIRSATLAR</b></u>",
-        "relationships": "<b><u>İLİŞKİLER</b></u>",
-        "talents_work_finances": "<b><u>YETENEKLER, İŞ VE FİNANS</b></u>",
-    }
+        The new snapshot.
+    """
 
-    content = ""
+    if previous is None:
+        store = open_store(DATA_DIRECTORY, BUNDLE_PATH, CONTENT_CACHE_BYTES)
+        if BUNDLE_PATH is None and HOT_RELOAD:
+            # Requests read a copy of the files, which stays the same while they are edited
+            store = MemoryStore.load(store)  # type: ignore[reportArgumentType]
+
+        search_index = open_index(SEARCH_INDEX_PATH, store)
+
+        return ContentSnapshot(
+            store, PageIndex.load(store), InlineAnswerCache(store), search_index, PeopleIndex(search_index.famous_people())
+        )
+
+    store = previous.store.updated(DirectoryStore(DATA_DIRECTORY), keys)  # type: ignore[reportAttributeAccessIssue]
+
+    search_index, people_index = previous.search_index, previous.people_index
+    if any(pattern.fullmatch(key) for key in keys for pattern in [*SEARCH_KEY_PATTERNS.values(), PEOPLE_KEY_PATTERN]):
+        # Document frequencies change with any document, the index is rebuilt as a whole
+        search_index = open_index(SEARCH_INDEX_PATH, store)
+        people_index = PeopleIndex(search_index.famous_people())
+
+    return ContentSnapshot(
+        store,
+        previous.page_index.updated(store, keys),
+        previous.inline_answers.updated(store, keys),
+        search_index,
+        people_index,
+    )
+
+
+# Current content snapshot, the cached views are dropped when their content changes
+reloader = ContentReloader(
+    build_snapshot, on_reload=lambda keys: prefetcher.invalidate(keys), retire=ContentSnapshot.retire
+)
+
+
+def full_text_keys(view: View, birthdate: datetime) -> list[str]:
+    """
+    Returns the content keys of the documents the full text view of a birthdate is made of.
+    """
+
+    if view == View.FULL_TEXT_MILLMAN:
+        return [life_path_key(birthdate_to_life_path(birthdate), "MDs")]
+
+    return pin_code_keys(get_pin_code(birthdate), "MDs")
+
+
+def render_full_text_page(snapshot: ContentSnapshot, view: View, birthdate: datetime, page: int) -> str:
+    """
+    Renders a page of a full text view, reading the pages and the documents from the same snapshot.
+    """
+
+    return snapshot.page_index.render_page(full_text_keys(view, birthdate), page, snapshot.store)
+
+
+def render_paraphrased_summary_millman(snapshot: ContentSnapshot, birthdate: datetime) -> str:
+    """
+    Paraphrases the summary of the Millman reading of a birthdate, blocking until Gemini answers.
+    """
+
+    summary = load_summary_millman(birthdate_to_life_path(birthdate), snapshot.store)
+
+    return f"<b><u>GENEL ÖZET</b></u>\n{paraphrase(summary)}"
+
+
+def render_paraphrased_summary_forbes(snapshot: ContentSnapshot, birthdate: datetime) -> str:
+    """
+    Paraphrases the summary of the Forbes reading of a birthdate, blocking until Gemini answers.
+    """
+
+    summary = load_summary_forbes(get_pin_code(birthdate), snapshot.store)
+
+    return f"<b><u>GENEL ÖZET</b></u>\n{paraphrase(summary)}"
+
+
+def zodiac_key(birthdate: datetime) -> tuple[str, int]:
+    """
+    Returns the zodiac sign of a birthdate and its enneagram type, which the zodiac view depends on.
+    """
+
+    zodiac_sign = Zodiac(birthdate)
+
+    return zodiac_sign.sign, zodiac_sign.enneagram
+
+
+# Renders the views of a birthdate as soon as it arrives and serves the clicks from them
+prefetcher = Prefetcher(
+    {
+        View.FULL_TEXT_MILLMAN: PrefetchedView(
+            birthdate_to_life_path,
+            lambda snapshot, birthdate, page: render_full_text_page(snapshot, View.FULL_TEXT_MILLMAN, birthdate, page),
+            paged=True,
+            sources=lambda life_path: [life_path_key(life_path, "MDs")],
+        ),
+        View.FULL_TEXT_FORBES: PrefetchedView(
+            lambda birthdate: tuple(get_pin_code(birthdate)),
+            lambda snapshot, birthdate, page: render_full_text_page(snapshot, View.FULL_TEXT_FORBES, birthdate, page),
+            paged=True,
+            sources=lambda pin_code: pin_code_keys(list(pin_code), "MDs"),
+        ),
+        View.JSON_SHORT_MILLMAN: PrefetchedView(
+            birthdate_to_life_path,
+            lambda snapshot, birthdate: render_json_summary(birthdate_to_life_path(birthdate), snapshot.store),
+            sources=lambda life_path: [life_path_key(life_path, "JSONs")],
+        ),
+        View.JSON_LONG_MILLMAN: PrefetchedView(
+            birthdate_to_life_path,
+            lambda snapshot, birthdate: render_json_summary(birthdate_to_life_path(birthdate), snapshot.store, True),
+            sources=lambda life_path: [life_path_key(life_path, "JSONs_Extended")],
+        ),
+        View.ZODIAC_TRAITS: PrefetchedView(
+            zodiac_key,
+            lambda snapshot, birthdate: render_zodiac_traits(Zodiac(birthdate), snapshot.store),
+            sources=lambda zodiac_key: [f"enneagram/tip{zodiac_key[1]}.md"],
+        ),
+        View.SUMMARY_MILLMAN: PrefetchedView(
+            birthdate_to_life_path,
+            render_paraphrased_summary_millman,
+            speculative=PREFETCH_PARAPHRASE,
+            expensive=True,
+            sources=lambda life_path: [life_path_key(life_path, "Summarizations")],
+        ),
+        View.SUMMARY_FORBES: PrefetchedView(
+            lambda birthdate: tuple(get_pin_code(birthdate)),
+            render_paraphrased_summary_forbes,
+            speculative=False,
+            expensive=True,
+            sources=lambda pin_code: pin_code_keys(list(pin_code), "Summarizations"),
+        ),
+    },
+    # Every render reads a single snapshot, taken when it starts unless the request passes its own
+    snapshot=lambda: reloader.current,
+)
+
+# Paraphrases the sections of the Forbes summaries concurrently, see `fanout.py`
+fanout = SectionFanout(paraphrase)
+
+# Drops the repeated taps on a button whose view is still being sent
+in_flight = InFlightRequests(CANCEL_SUPERSEDED)
+
+# Views paraphrased on request unless they were prefetched, admitted separately from the cheap ones
+EXPENSIVE_VIEWS = frozenset({View.SUMMARY_MILLMAN, View.SUMMARY_FORBES})
+
+# Queues the views beyond the concurrency limits, turning them away when they would not start before the deadline
+cheap_views = AdmissionQueue("cheap", MAX_CHEAP_VIEWS, max_queued=200, deadline=15.0)
+expensive_views = AdmissionQueue("expensive", MAX_EXPENSIVE_VIEWS, max_queued=50, deadline=90.0)
+
+# Sends the daily messages to the subscribers, see `broadcast.py`
+subscribers = SubscriberStore(SUBSCRIBERS_PATH)
+broadcaster = Broadcaster(
+    subscribers,
+    lambda user_id, message: client.send_message(user_id, message, parse_mode="html"),  # type: ignore[reportUnknownMemberType, reportUnknownLambdaType]
+    lambda topic, birthdate, day: render_daily(topic, birthdate, day, reloader.current.store),
+    BROADCAST_RATE,
+)
+
+# Documents of the PDFs already uploaded to Telegram by file name, sent again without uploading them
+uploaded_exports: dict[str, object] = {}
+
+# Maps every view to the handler that sends it, filled in by the `view_handler` decorator
+view_handlers: dict[View, Callable[[events.callbackquery.CallbackQuery, CallbackPayload], Awaitable[None]]] = {}
+
+
+def view_button(  # type: ignore[reportUnknownParameterType]
+    text: str, view: View, birthdate: datetime, reply_to: int, page: int = 0, in_place: bool = False
+) -> Button:
+    """
+    Creates an inline button that opens the given view for the given birthdate.
+
+    Args:
+        text: The label of the button.
+        view: The view the button opens.
+        birthdate: The birthdate the view is rendered for.
+        reply_to: The id of the message the view replies to.
+        page: The page of the view the button opens. Defaults to 0.
+        in_place: Whether the view replaces the message the button is on. Defaults to False.
+
+    Returns:
+        The inline button carrying the signed callback data.
+    """
+
+    return Button.inline(text, encode_callback(view, birthdate, reply_to, CALLBACK_SECRET, page, in_place))  # type: ignore[reportUnknownMemberType]
 
-    if type(content_json[key]) is list:
-        if content_json[key]:
-            content += TRANSLATIONS[key] + "\n\n"
-            content += "\n".join([f"- {bulletpoint}" for bulletpoint in content_json[key]]) + "\n\n"
-    else:
-        content += TRANSLATIONS[key] + "\n\n"
-
-        for subtitle, bulletpoints in content_json[key].items():  # type: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
-            if bulletpoints:
-                content += TRANSLATIONS[subtitle] + "\n\n"
-                content += (
-                    "\n".join([f"- {bulletpoint}" for bulletpoint in bulletpoints])  # type: ignore[reportUnknownVariableType]
-                    + "\n\n"
-                )
 
-    return content
+def menu_buttons(birthdate: datetime, reply_to: int, active: View | None = None) -> list[list[Button]]:  # type: ignore[reportUnknownParameterType]
+    """
+    Creates the buttons of the reading menu of a birthdate, one per row.
+
+    Args:
+        birthdate: The birthdate the menu belongs to.
+        reply_to: The id of the message the views reply to.
+        active: The view shown in the menu message, marked on its button. Defaults to None.
+
+    Returns:
+        The rows of the menu buttons.
+    """
+
+    return [[view_button(label, view, birthdate, reply_to)] for label, view in menu_items(active)]  # type: ignore[reportUnknownVariableType]
+
+
+@traced("telegram.get_chat")
+async def get_chat(event: events.callbackquery.CallbackQuery | events.newmessage.NewMessage) -> object:
+    """
+    Returns the chat of the event, fetching it from Telegram if it is not cached yet.
+    """
+
+    return await event.get_chat()  # type: ignore[reportUnknownMemberType]
 
 
-# TODO: Fix repetition.
 async def send_message(
     event: events.callbackquery.CallbackQuery | events.newmessage.NewMessage,
     content: str,
+    birthdate: datetime,
+    reply_to: int,
     show_buttons: bool = True,
 ) -> None:
     """
@@ -118,359 +455,843 @@ async def send_message(
     Args:
         event: The Telegram event object (either a callback query or a new message).
         content: The message content to be sent.
+        birthdate: The birthdate the message and the navigation buttons belong to.
+        reply_to: The id of the message to reply to.
         show_buttons: Whether to show the navigation buttons after the message. Defaults to True.
     """
 
-    message = ""
-    for part in content.split("\n\n"):
-        if len(message) + len(part) + 2 > 4096:
+    for message in split_message(content):
+        with span("telegram.send_message"):
             await client.send_message(  # type: ignore[reportUnknownMemberType]
-                entity=await event.get_chat(),  # type: ignore[reportUnknownArgumentType, reportUnknownMemberType]
-                message=message.strip(),
-                reply_to=user_data[event.sender_id]["message_id"],  # type: ignore[reportArgumentType, reportUnknownMemberType]
+                entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+                message=message,
+                reply_to=reply_to,
                 parse_mode="html",
             )
-            message = ""
-        message += f"\n\n{part}"
-    else:
-        if not message.isspace():
+
+    if show_buttons:
+        with span("telegram.send_message"):
             await client.send_message(  # type: ignore[reportUnknownMemberType]
-                entity=await event.get_chat(),  # type: ignore[reportUnknownArgumentType, reportUnknownMemberType]
-                message=message.strip(),
-                reply_to=user_data[event.sender_id]["message_id"],  # type: ignore[reportArgumentType, reportUnknownMemberType]
+                entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+                message=menu_header(birthdate),
+                reply_to=reply_to,
                 parse_mode="html",
+                buttons=menu_buttons(birthdate, reply_to),
             )
 
-    if show_buttons:
-        life_path: tuple[int, int] = user_data[event.sender_id]["life_path"]  # type: ignore[reportUnknownMemberType]
-        pin_code: list[int] = user_data[event.sender_id]["pin_code"]  # type: ignore[reportUnknownMemberType]
-        zodiac_sign: str = user_data[event.sender_id]["zodiac_sign"]
-
-        await client.send_message(  # type: ignore[reportUnknownMemberType]
-            entity=await event.get_chat(),  # type: ignore[reportUnknownArgumentType, reportUnknownMemberType]
-            message=f"<b><u>HAYAT SAYISI</b></u>: {life_path[0]}/{life_path[1]}\n"
-            + f"<b><u>PİN KODU</b></u>: {''.join(map(str, pin_code))}\n"
-            + f"<b><u>BURÇ</b></u>: {zodiac_sign.sign}\n"
-            + f"<b><u>BURCUN ENNEAGRAM DEĞERİ</b></u>: {zodiac_sign.enneagram}",
-            reply_to=user_data[event.sender_id]["message_id"],  # type: ignore[reportArgumentType, reportUnknownMemberType]
-            parse_mode="html",
-            buttons=[
-                [Button.inline("Tam Metin (Millman)", "full_text_millman")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Tam Metin (Forbes)", "full_text_forbes")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Özet (Millman)", "summary_millman")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Özet (Forbes)", "summary_forbes")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Kısa Maddeler (Millman)", "json_short_millman")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Uzun Maddeler (Millman)", "json_long_millman")],  # type: ignore[reportUnknownMemberType]
-                [Button.inline("Enneagram Özellikleri", "zodiac_traits")],
-            ],
+
+async def show_view(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+    content: str,
+    final: bool = True,
+    pages: int = 1,
+) -> None:
+    """
+    Shows a view, either in the menu message the button was pressed on or as new messages, see `navigation.py`.
+
+    Args:
+        event: The callback query event of the pressed button.
+        payload: The decoded callback data of the pressed button.
+        content: The rendered view, or the page of it given in the payload.
+        final: Whether this is the last update of the view, e.g. not a "please wait" notice. Defaults to True.
+        pages: The number of pages of the view, the page buttons are shown if it has more than one. Defaults to 1.
+    """
+
+    update: ViewUpdate = plan_view_update(
+        content, payload.birthdate, payload.view, EDIT_IN_PLACE, final, payload.in_place
+    )
+
+    # In the classic mode, the pages are turned in the message showing them instead of the menu message
+    page_row = [
+        view_button(label, payload.view, payload.birthdate, payload.message_id, page, in_place=not EDIT_IN_PLACE)  # type: ignore[reportUnknownVariableType]
+        for label, page in page_items(payload.page, pages)
+    ]
+    page_buttons = [page_row] if page_row else []  # type: ignore[reportUnknownVariableType]
+
+    if update.edit is not None:
+        if EDIT_IN_PLACE:
+            buttons = page_buttons + menu_buttons(payload.birthdate, payload.message_id, payload.view)  # type: ignore[reportUnknownVariableType]
+        else:
+            buttons = page_buttons  # type: ignore[reportUnknownVariableType]
+
+        try:
+            with span("telegram.edit"):
+                await event.edit(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+                    update.edit,
+                    parse_mode="html",
+                    buttons=buttons or None,
+                )
+        except MessageNotModifiedError:
+            # The same view or page was pressed again
+            pass
+
+    for position, message in enumerate(update.messages, 1):
+        with span("telegram.send_message"):
+            await client.send_message(  # type: ignore[reportUnknownMemberType]
+                entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+                message=message,
+                reply_to=payload.message_id,
+                parse_mode="html",
+                # Sent pages carry their page buttons, the menu message carries them in the edit-in-place mode
+                buttons=(page_buttons or None) if update.edit is None and position == len(update.messages) else None,
+            )
+
+    if update.send_menu:
+        await send_message(event, "", payload.birthdate, payload.message_id)
+
+
+# Registered before `handle_birthdate` so it can stop the birthdates of a batch from being answered one by one
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/toplu(@\w+)?(\s|$)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+@tracer.handler("batch")
+async def handle_batch(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the batch command, which compares many birthdates in a single message.
+
+    All readings are computed in one pass and sent as one comparison table, with a button for every
+    person that opens their own reading menu on demand.
+
+    Args:
+        event: The new message event containing the command and the birthdates.
+    """
+
+    logger.info(event)
+
+    message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+    birthdates = extract_birthdates(message_raw, limit=MAX_BIRTHDATES_PER_BATCH + 1)  # type: ignore[reportUnknownArgumentType]
+
+    if not birthdates:
+        await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+            "Lütfen komutun ardından doğum tarihlerini yazın, örneğin:\n/toplu 22.12.2002 31.07.2002"
         )
 
+        raise events.StopPropagation
+
+    content = ""
+    if len(birthdates) > MAX_BIRTHDATES_PER_BATCH:
+        content += f"Tek seferde en fazla {MAX_BIRTHDATES_PER_BATCH} doğum tarihi karşılaştırılabilir, fazlası atlandı.\n\n"
+        birthdates = birthdates[:MAX_BIRTHDATES_PER_BATCH]
+
+    readings = batch_readings(birthdates)
+    content += render_comparison_table(readings)
+
+    buttons = [
+        view_button(f"{position}) {reading.birthdate.strftime('%d.%m.%Y')}", View.MENU, reading.birthdate, event.message.id)  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        for position, reading in enumerate(readings, start=1)
+    ]
+
+    await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        content,
+        parse_mode="html",
+        buttons=[buttons[i : i + BATCH_BUTTONS_PER_ROW] for i in range(0, len(buttons), BATCH_BUTTONS_PER_ROW)],
+    )
 
+    raise events.StopPropagation
+
+
+# Registered before `handle_birthdate` so the birthdate of the subscription is not answered with a menu
 @client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
-    events.NewMessage(incoming=True, pattern=r"([\s\S]*)\d{2}\.\d{2}\.\d{4}([\s\S]*)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+    events.NewMessage(incoming=True, pattern=r"^/abone(@\w+)?(\s|$)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
 )
-async def handle_birthdate(event: events.newmessage.NewMessage) -> None:
+@tracer.handler("subscribe")
+async def handle_subscribe(event: events.newmessage.NewMessage) -> None:
     """
-    Handles new messages containing a birthdate and calculates the life path.
+    Handles the subscription command, which subscribes the user to the daily message of their life path or zodiac
+    sign, or lists their subscriptions when no topic is given.
 
     Args:
-        event: The new message event containing the birthdate.
+        event: The new message event containing the command, the topic and the birthdate.
     """
 
     logger.info(event)
 
     message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+    arguments = message_raw.split()[1:]  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    topics = {topic.value: topic for topic in Topic}
+    birthdates = extract_birthdates(message_raw, limit=1)  # type: ignore[reportUnknownArgumentType]
+
+    if not arguments or arguments[0] not in topics or not birthdates:
+        subscriptions = await asyncio.to_thread(subscribers.subscriptions, event.sender_id)  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+        listing = "".join(
+            f"\n- {subscription.topic.value} {subscription.birthdate:%d.%m.%Y}" for subscription in subscriptions
+        )
+        await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+            (f"Abonelikleriniz:{listing}\n\n" if subscriptions else "")
+            + f"Her gün saat {BROADCAST_TIME:%H:%M}'da hayat sayınıza ya da burcunuza göre bir mesaj almak için, "
+            "örneğin:\n/abone yasam 22.12.2002\n/abone burc 22.12.2002\n\nAboneliği bitirmek için: /aboneiptal"
+        )
+
+        raise events.StopPropagation
+
     try:
-        birthdate = datetime.strptime(message_raw, "%d.%m.%Y")  # type: ignore[reportUnknownArgumentType]
-    except ValueError:
+        render_daily(topics[arguments[0]], birthdates[0], datetime.now().date(), reloader.current.store)  # type: ignore[reportUnknownArgumentType]
+    except (OSError, LookupError, ValueError):
+        await event.reply("Bu doğum tarihi için henüz günlük mesaj içeriğimiz yok.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+        raise events.StopPropagation
+
+    await asyncio.to_thread(subscribers.subscribe, event.sender_id, topics[arguments[0]], birthdates[0])  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+    await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        f"Abone oldunuz, ilk mesajınız saat {BROADCAST_TIME:%H:%M}'da gelecek. Bitirmek için: /aboneiptal"
+    )
+
+    raise events.StopPropagation
+
+
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/aboneiptal(@\w+)?(\s|$)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+@tracer.handler("unsubscribe")
+async def handle_unsubscribe(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the unsubscription command, which ends the subscription of the user to the given topic, or to all.
+
+    Args:
+        event: The new message event containing the command and optionally the topic.
+    """
+
+    logger.info(event)
+
+    message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+    arguments = message_raw.split()[1:]  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    topic = next((topic for topic in Topic if arguments and topic.value == arguments[0]), None)
+
+    if await asyncio.to_thread(subscribers.unsubscribe, event.sender_id, topic):  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+        await event.reply("Aboneliğiniz bitirildi.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    else:
+        await event.reply("Bitirilecek bir aboneliğiniz yok.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+    raise events.StopPropagation
+
+
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/ara(@\w+)?(\s|$)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+@tracer.handler("search")
+async def handle_search(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the search command, which lists the readings mentioning the given words.
+
+    Args:
+        event: The new message event containing the command and the words to search.
+    """
+
+    logger.info(event)
+
+    message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+    query = message_raw.split(maxsplit=1)[1] if len(message_raw.split(maxsplit=1)) > 1 else ""  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+
+    if not query:
+        await event.reply("Lütfen komutun ardından aramak istediğiniz kelimeyi yazın, örneğin:\n/ara kıskançlık")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+        raise events.StopPropagation
+
+    results = reloader.current.search_index.search(query, limit=SEARCH_RESULT_LIMIT)  # type: ignore[reportUnknownArgumentType]
+
+    if not results:
+        await event.reply(f"\"{html.escape(query)}\" için sonuç bulunamadı.", parse_mode="html")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownArgumentType]
+
+        raise events.StopPropagation
+
+    content = "\n\n".join(f"<b>{html.escape(result.title)}</b>\n{html.escape(result.snippet)}" for result in results)
+    await event.reply(content, parse_mode="html")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+    raise events.StopPropagation
+
+
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/unlu(@\w+)?(\s|$)")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+@tracer.handler("famous_people")
+async def handle_famous_people(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the famous people command, which finds the life paths of famous people by their names.
+
+    Args:
+        event: The new message event containing the command and the name.
+    """
+
+    logger.info(event)
+
+    message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+    query = message_raw.split(maxsplit=1)[1] if len(message_raw.split(maxsplit=1)) > 1 else ""  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+
+    if not query:
+        await event.reply("Lütfen komutun ardından bir isim yazın, örneğin:\n/unlu Walt Disney")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+        raise events.StopPropagation
+
+    people = reloader.current.people_index.search(query, limit=PEOPLE_RESULT_LIMIT)  # type: ignore[reportUnknownArgumentType]
+
+    if not people:
+        await event.reply(f"\"{html.escape(query)}\" isimli bir ünlü bulunamadı.", parse_mode="html")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownArgumentType]
+
+        raise events.StopPropagation
+
+    content = "\n".join(
+        f"<b>{html.escape(person.name)}</b>: Hayat sayısı "
+        + ", ".join(f"{number}/{digit}" for number, digit in person.life_paths)
+        for person in people
+    )
+    await event.reply(content, parse_mode="html")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+    raise events.StopPropagation
+
+
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=BIRTHDATE_PATTERN.search)  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+@tracer.handler("birthdate")
+async def handle_birthdate(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles new messages containing one or more birthdates and sends a reading menu for each of them.
+
+    Args:
+        event: The new message event containing the birthdates.
+    """
+
+    logger.info(event)
+
+    message_raw: str = event.raw_text.strip()  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+
+    # One more than the limit is extracted to find out whether the message had too many birthdates.
+    # Duplicates are dropped while keeping the order the birthdates were written in.
+    birthdates = list(dict.fromkeys(extract_birthdates(message_raw, limit=MAX_BIRTHDATES_PER_MESSAGE + 1)))  # type: ignore[reportUnknownArgumentType]
+    if not birthdates:
         await event.reply(f"Girilen mesaj ({message_raw}) hatalı!")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
 
         return None
-    except Exception as err:
+
+    if len(birthdates) > MAX_BIRTHDATES_PER_MESSAGE:
         await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
-            "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi."
+            f"Bir mesajda en fazla {MAX_BIRTHDATES_PER_MESSAGE} doğum tarihi işlenebilir, "
+            f"ilk {MAX_BIRTHDATES_PER_MESSAGE} tarih işleniyor."
         )
-        logger.error(err)
+        birthdates = birthdates[:MAX_BIRTHDATES_PER_MESSAGE]
 
-        return None
+    prefetcher.prefetch(event.sender_id, birthdates)  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
 
-    life_path = birthdate_to_life_path(birthdate)
-    pin_code = get_pin_code(birthdate)
-    zodiac_sign = Zodiac(birthdate)
+    for birthdate in birthdates:
+        await send_message(event, "", birthdate, event.message.id)  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
 
-    user_data[event.message.sender_id] = {  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
-        "message_id": event.message.id,  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
-        "life_path": life_path,
-        "pin_code": pin_code,
-        "birthdate": birthdate,
-        "zodiac_sign": zodiac_sign,
-    }
 
-    await send_message(event, "")
+@client.on(events.InlineQuery())  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
+@tracer.handler("inline_query")
+async def handle_inline_query(event: events.inlinequery.InlineQuery) -> None:
+    """
+    Answers inline queries such as `@ozetcibot 22.12.2002` with the life path, pin code and zodiac sign articles.
 
+    Args:
+        event: The inline query event.
+    """
+
+    birthdates = extract_birthdates(event.text, limit=1)  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+    if not birthdates:
+        await event.answer(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+            [],
+            cache_time=INLINE_EMPTY_CACHE_TIME,
+            switch_pm="Doğum tarihinizi yazın, örneğin 22.12.2002",
+            switch_pm_param="start",
+        )
+
+        return None
 
-@client.on(events.CallbackQuery(pattern=r"full_text_millman"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
-async def send_full_text_millman(event: events.callbackquery.CallbackQuery) -> None:
+    await event.answer(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        [
+            event.builder.article(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+                answer.title,
+                description=answer.description,
+                id=answer.id,
+                text=answer.text,
+                parse_mode="html",
+            )
+            for answer in reloader.current.inline_answers.answers(birthdates[0])
+        ],
+        cache_time=INLINE_CACHE_TIME,
+        private=False,
+    )
+
+
+def view_handler(
+    view: View,
+) -> Callable[
+    [Callable[[events.callbackquery.CallbackQuery, CallbackPayload], Awaitable[None]]],
+    Callable[[events.callbackquery.CallbackQuery, CallbackPayload], Awaitable[None]],
+]:
     """
-    Sends the full text of the numerology reading from the Millman source.
+    Registers the decorated function as the handler of the given view.
 
     Args:
-        event: The callback query event triggering the function.
+        view: The view the decorated function sends.
+
+    Returns:
+        A decorator that registers the function and returns it unchanged.
     """
 
-    life_path: tuple[int, int] = user_data[event.sender_id]["life_path"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    def decorator(
+        handler: Callable[[events.callbackquery.CallbackQuery, CallbackPayload], Awaitable[None]],
+    ) -> Callable[[events.callbackquery.CallbackQuery, CallbackPayload], Awaitable[None]]:
+        view_handlers[view] = handler
 
-    # TODO: Extract the file operations with error handling logic to a different function so it is cleaner.
-    try:
-        content = life_path_to_content(life_path, Path("/home/nigella/tg_bot/kahin-bot/data/millman/tr/MDs/"))
-    except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
-        logger.error(err)
+        return handler
 
-        return None
-    except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
-        logger.error(err)
+    return decorator
+
+
+@client.on(events.CallbackQuery())  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
+@tracer.handler("callback")
+async def dispatch_callback(event: events.callbackquery.CallbackQuery) -> None:
+    """
+    Decodes the callback data of a pressed inline button and routes it to the handler of the requested view.
+
+    A button pressed again while its view is still being sent is only acknowledged, see `inflight.py`. Views
+    beyond the concurrency limits are queued, see `admit_view`.
+
+    Args:
+        event: The callback query event of the pressed button.
+    """
+
+    try:
+        payload = decode_callback(event.data, CALLBACK_SECRET)  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+    except CallbackDataError as err:
+        await event.answer("Bu düğme artık geçerli değil, lütfen doğum tarihinizi tekrar gönderin.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        logger.warning(err)
 
         return None
 
-    # TODO: Change the actual data so we won't have to edit it on-fly like this.
-    for line in content.splitlines():
-        if line.startswith("#"):
-            content = content.replace(f"{line}\n", f"<b><u>{line.split('#')[-1].strip()}</b></u>")
+    annotate(view=payload.view.name, page=payload.page)
 
-    await send_message(event, content)
+    request = (payload.view, payload.birthdate, payload.page)
+    if not await in_flight.run(event.sender_id, request, lambda: admit_view(event, payload)):  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+        annotate(duplicate=True)
+        await event.answer("İsteğiniz hazırlanıyor, lütfen bekleyiniz.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
 
 
-# TODO: Implement.
-@client.on(events.CallbackQuery(pattern=r"full_text_forbes"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
-async def send_full_text_forbes(event: events.callbackquery.CallbackQuery) -> None:
+async def admit_view(event: events.callbackquery.CallbackQuery, payload: CallbackPayload) -> None:
     """
-    Placeholder function for sending the full text from the Forbes source (not yet implemented).
+    Runs the handler of the requested view once its admission queue lets it, showing the user their position in
+    the queue meanwhile, or telling them to try again later if it is shed.
 
     Args:
-        event: The callback query event triggering the function.
+        event: The callback query event of the pressed button.
+        payload: The decoded callback data of the pressed button.
+    """
+
+    if payload.view == View.EXPORT_PDF:
+        expensive = not exporter.is_cached(payload.birthdate, reloader.current.store)
+    else:
+        expensive = payload.view in EXPENSIVE_VIEWS and not prefetcher.is_ready(payload.view, payload.birthdate)
+    queue = expensive_views if expensive else cheap_views
+    notice = None
+
+    async def show_position(position: int) -> None:
+        nonlocal notice
+
+        text = f"Sıradasınız: {position}"
+        if EDIT_IN_PLACE or payload.in_place:
+            # Shown in the message the view replaces
+            await show_view(event, payload, text, final=False)
+        elif notice is None:
+            with span("telegram.send_message"):
+                notice = await client.send_message(  # type: ignore[reportUnknownMemberType]
+                    entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+                    message=text,
+                    reply_to=payload.message_id,
+                )
+        else:
+            with span("telegram.edit"):
+                await notice.edit(text)  # type: ignore[reportUnknownMemberType]
+
+    try:
+        async with queue.admit(show_position):
+            if notice is not None:
+                with span("telegram.delete"):
+                    await notice.delete()  # type: ignore[reportUnknownMemberType]
+                notice = None
+
+            await view_handlers[payload.view](event, payload)
+    except OverloadedError as err:
+        annotate(shed=err.reason)
+        await show_view(event, payload, "Şu anda çok yoğunuz, lütfen birkaç dakika sonra tekrar deneyin.")
+    finally:
+        if notice is not None:
+            with span("telegram.delete"):
+                await notice.delete()  # type: ignore[reportUnknownMemberType]
+
+
+async def render_or_report(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+    snapshot: ContentSnapshot | None = None,
+) -> str | None:
     """
+    Renders the requested view, reporting file and unknown errors to the user instead of raising them.
 
-    pin_code: list[int] = user_data[event.sender_id]["pin_code"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    Args:
+        event: The callback query event triggering the view.
+        payload: The decoded callback data of the pressed button.
+        snapshot: The content snapshot to render from. Defaults to None, which renders from the current one.
+
+    Returns:
+        The rendered content, or None if rendering failed and the user was notified.
+    """
 
-    # TODO: Extract the file operations with error handling logic to a different function so it is cleaner.
     try:
-        contents = pin_code_to_contents(pin_code, Path("/home/nigella/tg_bot/kahin-bot/data/forbes/tr/MDs/"))
+        with span("prefetch.get", view=payload.view.name, page=payload.page):
+            return await prefetcher.get(payload.view, payload.birthdate, payload.page, snapshot)
     except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
+        await show_view(event, payload, "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.")
         logger.error(err)
-
-        return None
     except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
+        await show_view(event, payload, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
         logger.error(err)
 
+    return None
+
+
+async def send_full_text_page(event: events.callbackquery.CallbackQuery, payload: CallbackPayload) -> None:
+    """
+    Sends the page of a full text view given in the payload, with the buttons turning its pages.
+
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
+
+    # The pages are counted and rendered from the same snapshot, even if the content is reloaded in between
+    snapshot = reloader.current
+
+    try:
+        pages = snapshot.page_index.count(full_text_keys(payload.view, payload.birthdate))
+    except KeyError:
+        # The missing document is reported by the render
+        pages = 1
+
+    # Buttons of an older page index may point past the last page, which is shown instead
+    payload = payload._replace(page=max(0, min(payload.page, pages - 1)))
+
+    content = await render_or_report(event, payload, snapshot)
+    if content is None:
         return None
 
-    content = "\n\n".join(contents).strip()
+    await show_view(event, payload, content, pages=pages)
 
-    # TODO: Change the actual data so we won't have to edit it on-fly like this.
-    for line in content.splitlines():
-        if line.startswith("#"):
-            content = content.replace(f"{line}", f"<b><u>{line.split('#')[-1].strip()}</b></u>")
 
-    await send_message(event, content)
+@view_handler(View.FULL_TEXT_MILLMAN)
+async def send_full_text_millman(event: events.callbackquery.CallbackQuery, payload: CallbackPayload) -> None:
+    """
+    Sends a page of the full text of the numerology reading from the Millman source.
 
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
+
+    await send_full_text_page(event, payload)
+
+
+@view_handler(View.FULL_TEXT_FORBES)
+async def send_full_text_forbes(event: events.callbackquery.CallbackQuery, payload: CallbackPayload) -> None:
+    """
+    Sends a page of the full text of the pin code reading from the Forbes source.
+
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
 
-@client.on(events.CallbackQuery(pattern=r"json_short_millman"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
+    await send_full_text_page(event, payload)
+
+
+@view_handler(View.JSON_SHORT_MILLMAN)
 async def send_json_short_summary_millman(
     event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
 ) -> None:
     """
     Sends a summarized version of the numerology reading from the Millman source based on a JSON file.
 
     Args:
         event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
     """
 
-    life_path: tuple[int, int] = user_data[event.sender_id]["life_path"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    content = await render_or_report(event, payload)
+    if content is None:
+        return None
+
+    await show_view(event, payload, content)
 
-    # TODO: Extract the file operations with error handling logic to a different function so it is cleaner.
-    try:
-        with open(
-            f"/home/nigella/tg_bot/kahin-bot/data/millman/tr/JSONs/{life_path[0]}_{life_path[1]}.json",
-            "r",
-        ) as f:
-            summary_json = json.loads(f.read())
-    except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
-        logger.error(err)
 
-        return None
-    except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
-        logger.error(err)
+@view_handler(View.JSON_LONG_MILLMAN)
+async def send_json_long_summary_millman(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+) -> None:
+    """
+    Sends a summarized version of the numerology reading from the Millman source based on an extended JSON file.
+
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
 
+    content = await render_or_report(event, payload)
+    if content is None:
         return None
 
-    # I know it looks disgusting but it works and we can't get rid of it reliably, at least not if
-    # we want the final data to be in a proper format with good ordering of headings.
-    summary_short = "<b><u>GENEL KISA ÖZET</b></u>\n\n"
-    summary_short += create_json_summary(summary_json, "key_traits")
-    summary_short += create_json_summary(summary_json, "challenges")
-    summary_short += create_json_summary(summary_json, "opportunities")
-    summary_short += create_json_summary(summary_json, "health")
-    summary_short += create_json_summary(summary_json, "relationships")
-    summary_short += create_json_summary(summary_json, "talents_work_finances")
-    summary_short += create_json_summary(summary_json, "fulfilling_destiny")
-    summary_short += create_json_summary(summary_json, "famous_people")
+    await show_view(event, payload, content)
 
-    await send_message(event, summary_short.strip())
 
+@view_handler(View.SUMMARY_MILLMAN)
+async def send_paraphrased_summary_millman(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+) -> None:
+    """
+    Sends a paraphrased summary of the numerology reading from the Millman source.
 
-@client.on(events.CallbackQuery(pattern=r"json_long_millman"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
-async def send_json_long_summary_millman(
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
+
+    if not prefetcher.is_ready(payload.view, payload.birthdate):
+        await show_view(event, payload, "Genel özet hazırlanıyor, lütfen bekleyiniz...", final=False)
+
+    content = await render_or_report(event, payload)
+    if content is None:
+        return None
+
+    await show_view(event, payload, content)
+
+
+@view_handler(View.SUMMARY_FORBES)
+async def send_paraphrased_summary_forbes(
     event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
 ) -> None:
     """
-    Sends a summarized version of the numerology reading from the Millman source based on a JSON file.
+    Sends a paraphrased summary of the pin code reading from the Forbes source.
 
     Args:
         event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
     """
 
-    life_path: tuple[int, int] = user_data[event.sender_id]["life_path"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    if FORBES_FANOUT:
+        return await stream_paraphrased_summary_forbes(event, payload)
+
+    if not prefetcher.is_ready(payload.view, payload.birthdate):
+        await show_view(event, payload, "Genel özet hazırlanıyor, lütfen bekleyiniz...", final=False)
+
+    content = await render_or_report(event, payload)
+    if content is None:
+        return None
+
+    await show_view(event, payload, content)
+
+
+async def stream_paraphrased_summary_forbes(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+) -> None:
+    """
+    Sends the paraphrased summary of every digit of the pin code as its own messages, in order, each one as soon
+    as it and the digits before it are paraphrased.
+
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
 
-    # TODO: Extract the file operations with error handling logic to a different function so it is cleaner.
     try:
-        with open(
-            f"/home/nigella/tg_bot/kahin-bot/data/millman/tr/JSONs_Extended/{life_path[0]}_{life_path[1]}.json",
-            "r",
-        ) as f:
-            summary_json = json.loads(f.read())
+        store = reloader.current.store
+        sections = [store.read_text(key) for key in pin_code_keys(get_pin_code(payload.birthdate), "Summarizations")]
     except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
+        await show_view(event, payload, "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.")
         logger.error(err)
 
         return None
-    except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
-        logger.error(err)
 
-        return None
+    await show_view(event, payload, "Genel özet hazırlanıyor, lütfen bekleyiniz...", final=False)
+
+    async for section in fanout.stream(sections):
+        content = section.content if section.position else f"<b><u>GENEL ÖZET</b></u>\n{section.content}"
 
-    # I know it looks disgusting but it works and we can't get rid of it reliably, at least not if
-    # we want the final data to be in a proper format with good ordering of headings.
-    summary_short = "<b><u>GENEL UZUN ÖZET</b></u>\n\n"
-    summary_short += create_json_summary(summary_json, "key_traits")
-    summary_short += create_json_summary(summary_json, "challenges")
-    summary_short += create_json_summary(summary_json, "opportunities")
-    summary_short += create_json_summary(summary_json, "health")
-    summary_short += create_json_summary(summary_json, "relationships")
-    summary_short += create_json_summary(summary_json, "talents_work_finances")
-    summary_short += create_json_summary(summary_json, "fulfilling_destiny")
-    summary_short += create_json_summary(summary_json, "famous_people")
+        for message in split_message(content):
+            with span("telegram.send_message"):
+                await client.send_message(  # type: ignore[reportUnknownMemberType]
+                    entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+                    message=message,
+                    reply_to=payload.message_id,
+                    parse_mode="html",
+                )
 
-    await send_message(event, summary_short.strip())
+    # Replaces the notice with the menu, or sends a new menu in the classic mode
+    await show_view(event, payload, "")
 
 
-@client.on(events.CallbackQuery(pattern=r"summary_millman"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
-async def send_paraphrased_summary_millman(
+@view_handler(View.ZODIAC_TRAITS)
+async def send_zodiac(
     event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
 ) -> None:
     """
-    Sends a paraphrased summary of the numerology reading from the Millman source.
+    Sends the zodiac sign of the user together with the traits of its enneagram type.
+
+    Args:
+        event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
+    """
+
+    content = await render_or_report(event, payload)
+    if content is None:
+        return None
+
+    await show_view(event, payload, content)
+
+
+@view_handler(View.EXPORT_PDF)
+async def send_pdf(
+    event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
+) -> None:
+    """
+    Sends the whole reading, the Millman, Forbes and enneagram content, as a single PDF file.
 
     Args:
         event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
     """
 
-    life_path: tuple[int, int] = user_data[event.sender_id]["life_path"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    store = reloader.current.store
+    if not exporter.is_cached(payload.birthdate, store):
+        await show_view(event, payload, "PDF hazırlanıyor, lütfen bekleyiniz...", final=False)
 
     try:
-        summary = life_path_to_content(
-            life_path,
-            Path("/home/nigella/tg_bot/kahin-bot/data/millman/tr/Summarizations/"),
-        )
+        with span("export.pdf"):
+            path = await exporter.export(payload.birthdate, store)
     except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
+        await show_view(event, payload, "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.")
         logger.error(err)
 
         return None
     except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
+        await show_view(event, payload, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
         logger.error(err)
 
         return None
 
-    await send_message(event, "Genel özet hazırlanıyor, lütfen bekleyiniz...", show_buttons=False)
-    await send_message(event, f"<b><u>GENEL ÖZET</b></u>\n{paraphrase(summary)}")
+    with span("telegram.send_file", uploaded=path.name in uploaded_exports):
+        message = await client.send_file(  # type: ignore[reportUnknownMemberType]
+            entity=await get_chat(event),  # type: ignore[reportUnknownArgumentType]
+            file=uploaded_exports.get(path.name) or str(path),
+            reply_to=payload.message_id,
+            force_document=True,
+            attributes=[DocumentAttributeFilename("numeroloji-okumasi.pdf")],
+        )
 
+    uploaded_exports[path.name] = message.document  # type: ignore[reportUnknownMemberType]
+    if len(uploaded_exports) > MAX_EXPORT_FILES:
+        del uploaded_exports[next(iter(uploaded_exports))]
 
-# TODO: Implement.
-@client.on(events.CallbackQuery(pattern=r"summary_forbes"))  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType, reportUntypedFunctionDecorator]
-async def send_paraphrased_summary_forbes(
+    await show_view(event, payload, "Okumanızın tamamı PDF olarak gönderildi.")
+
+
+@view_handler(View.MENU)
+async def send_menu(
     event: events.callbackquery.CallbackQuery,
+    payload: CallbackPayload,
 ) -> None:
     """
-    Placeholder function for sending a paraphrased summary from the Forbes source (not yet implemented).
+    Sends the reading menu of a birthdate, used by the person buttons under a batch comparison table.
 
     Args:
         event: The callback query event triggering the function.
+        payload: The decoded callback data of the pressed button.
     """
 
-    pin_code: list[int] = user_data[event.sender_id]["pin_code"]  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    prefetcher.prefetch(event.sender_id, [payload.birthdate])  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+
+    await send_message(event, "", payload.birthdate, payload.message_id)
 
-    try:
-        contents = pin_code_to_contents(
-            pin_code,
-            Path("/home/nigella/tg_bot/kahin-bot/data/forbes/tr/Summarizations/"),
-        )
-    except FileNotFoundError as err:
-        await send_message(
-            event,
-            "Dosya işlemlerinde hata ile karşılaşıldı, sorun yöneticiye bildirildi.",
-        )
-        logger.error(err)
 
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/istatistik(@\w+)?$")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+async def handle_statistics(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the statistics command, which sends the content version, the summarizer, the counters of the bot and the
+    prefetch hit rates to administrators.
+
+    Args:
+        event: The new message event containing the command.
+    """
+
+    if event.sender_id not in ADMIN_IDS:  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
         return None
-    except Exception as err:
-        await send_message(event, "Bilinmeyen bir hata ile karşılaşıldı ve yöneticiye haber verildi.")
-        logger.error(err)
 
+    subscriber_count = await asyncio.to_thread(subscribers.count)
+    last_report = await asyncio.to_thread(subscribers.last_report)
+    hit_rates = "\n".join(
+        f"{view.name.lower()}: {prefetcher.hit_rate(view):.1%}" for view in prefetcher.views
+    )
+    await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        f"<b>İçerik sürümü</b>: {reloader.number} ({reloader.current.store.version})\n"
+        f"<b>Özetleyici</b>: {get_summarizer().name}\n"
+        f"<b>Aboneler</b>: {subscriber_count}, son yayın: {last_report or '-'}\n\n"
+        f"<b>Önceden hazırlama isabet oranı</b>: {prefetcher.hit_rate():.1%}\n{hit_rates}\n\n"
+        f"<b>Sayaçlar</b>\n<pre>{html.escape(metrics.render())}</pre>",
+        parse_mode="html",
+    )
+
+
+@client.on(  # type: ignore[reportUnknownMemberType, reportUntypedFunctionDecorator]
+    events.NewMessage(incoming=True, pattern=r"^/profil(@\w+)?(\s+\d+)?$")  # type: ignore[reportAttributeAccessIssue, reportUnknownArgumentType, reportUnknownMemberType]
+)
+async def handle_profile(event: events.newmessage.NewMessage) -> None:
+    """
+    Handles the profile command, which samples the stacks of the bot for the given number of seconds and sends
+    them to administrators in the collapsed format read by flame graph tools.
+
+    Args:
+        event: The new message event containing the command and optionally the number of seconds.
+    """
+
+    if event.sender_id not in ADMIN_IDS:  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
         return None
 
-    await send_message(event, "Genel özet hazırlanıyor, lütfen bekleyiniz...", show_buttons=False)
+    if profiler.running:
+        await event.reply("Şu anda başka bir profil alınıyor, lütfen bitmesini bekleyin.")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        return None
 
-    content = "\n\n".join(contents).strip()
-    await send_message(event, f"<b><u>GENEL ÖZET</b></u>\n{paraphrase(content)}")
+    seconds = min(int(event.pattern_match[2] or PROFILE_SECONDS), MAX_PROFILE_SECONDS)  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownArgumentType]
+    await event.reply(f"Profil alınıyor, {seconds} saniye sürecek...")  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
 
+    # The profiler samples from a worker thread, the event loop keeps answering the other users meanwhile
+    stacks = await asyncio.to_thread(profiler.run, seconds)
 
-@client.on(events.CallbackQuery(pattern=r"zodiac_traits"))
-async def send_zodiac(
-    event: events.callbackquery.CallbackQuery,
-) -> None:
-    zodiac_sign: list[tuple] = user_data[event.sender_id]["zodiac_sign"]
+    path = PROFILE_DIRECTORY / f"profile-{datetime.now():%Y%m%d-%H%M%S}.collapsed"
+    write_collapsed_stacks(stacks, path)
+    logger.info("Profile of %d samples written to %s", stacks.total(), path)
+
+    await event.reply(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+        f"{stacks.total()} örnek alındı, {path} dosyasına yazıldı.",
+        file=str(path),
+    )
 
-    content = str(zodiac_sign)
 
-    # TODO: This is not a todo actually, i love my data as the way it is <3
-    for line in content.splitlines():
-        if line.startswith("#"):
-            content = content.replace(f"{line}", f"<b><u>{line.split('#')[-1].strip()}</b></u>")
+if BUNDLE_PATH is None and HOT_RELOAD:
+    client.loop.create_task(reloader.watch(open_watcher(DATA_DIRECTORY, ENNEAGRAM_DIRECTORY, RELOAD_POLL_INTERVAL)))  # type: ignore[reportUnknownMemberType]
 
-    await send_message(event, content)
+client.loop.create_task(broadcaster.run_daily(BROADCAST_TIME))  # type: ignore[reportUnknownMemberType]
+client.loop.create_task(session.run())  # type: ignore[reportUnknownMemberType]
 
+if API_PORT is not None:
+    # Serves the same snapshot as the bot, reloaded with it
+    client.loop.create_task(ApiServer(lambda: reloader.current.store).serve(API_HOST, API_PORT))  # type: ignore[reportUnknownMemberType]
 
 client.run_until_disconnected()  # type: ignore[reportUnknownMemberType]
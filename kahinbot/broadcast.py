@@ -0,0 +1,567 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+This module provides the daily messages sent to the subscribers of a life path or zodiac sign.
+
+Subscriptions are kept in a SQLite file. At the time of the day set for the broadcast, the subscribers are grouped
+by the content key of their subscriptions, one of the 45 life paths or 12 zodiac signs, and every distinct message
+is rendered once; a subscriber of both gets both in a single message. The messages are then sent at a steady rate
+under Telegram's limit for bots, waiting out the flood waits Telegram asks for, and the subscribers who blocked the
+bot are unsubscribed.
+
+Every recipient is checkpointed in the file before their message is sent and again once it was, a batch at a time,
+so a broadcast stopped halfway resumes with the recipients it had not reached. The recipients of the batch in
+flight when the process stopped may not have received their message; they are counted as unknown and skipped, as
+sending twice is worse than missing a day. Every run reports its throughput and completion time.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from content import ContentStore
+from the_life import birthdate_to_life_path
+from views import render_daily_life_path, render_daily_zodiac
+from zodiac import Zodiac
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from pathlib import Path
+from telethon.errors import (  # type: ignore[reportAttributeAccessIssue, reportUnknownVariableType]
+    FloodWaitError,
+    InputUserDeactivatedError,
+    PeerIdInvalidError,
+    RPCError,
+    UserIsBlockedError,
+)
+from typing import NamedTuple
+import asyncio
+import logging
+import sqlite3
+import threading
+import time as clock
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Messages sent per second, below the 30 Telegram allows a bot to send to different users
+BROADCAST_RATE = 25.0
+
+# Recipients checkpointed together, at most this many may go unknown if the process stops
+CHECKPOINT_SIZE = 500
+
+# Times a message is sent again after a flood wait before giving up on it
+MAX_FLOOD_RETRIES = 3
+
+# Errors meaning the user can not be sent messages anymore, e.g. they blocked the bot or deleted their account
+UNREACHABLE_ERRORS = (UserIsBlockedError, InputUserDeactivatedError, PeerIdInvalidError)
+
+
+class Topic(Enum):
+    """
+    What a subscription is about, named as in the subscription command.
+    """
+
+    LIFE_PATH = "yasam"
+    ZODIAC = "burc"
+
+
+class Subscription(NamedTuple):
+    """
+    A subscription of a user to the daily messages of a topic.
+
+    Attributes:
+        user_id: The id of the user.
+        topic: The topic of the messages.
+        birthdate: The birthdate the messages are about.
+    """
+
+    user_id: int
+    topic: Topic
+    birthdate: datetime
+
+
+class BroadcastReport(NamedTuple):
+    """
+    What a run of a broadcast did.
+
+    Attributes:
+        run_id: The day of the broadcast, in ISO format.
+        recipients: The number of users the run sent to.
+        rendered: The number of distinct messages rendered.
+        sent: The number of messages sent.
+        failed: The number of messages that could not be sent.
+        unreachable: The number of users who could not be sent messages anymore, now unsubscribed.
+        skipped: The number of users reached by an earlier run of the same day.
+        unknown: The number of users an earlier run stopped while sending to.
+        seconds: The seconds the run took.
+    """
+
+    run_id: str
+    recipients: int
+    rendered: int
+    sent: int
+    failed: int
+    unreachable: int
+    skipped: int
+    unknown: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """
+        Returns the messages sent per second.
+        """
+
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def render(self) -> str:
+        """
+        Renders the report as a line of text.
+        """
+
+        return (
+            f"{self.run_id}: {self.sent}/{self.recipients} sent, {self.failed} failed, {self.unreachable} unreachable, "
+            f"{self.skipped} skipped, {self.unknown} unknown, {self.rendered} rendered, "
+            f"{self.seconds:.1f} s, {self.throughput:.1f} messages/s"
+        )
+
+
+def content_key(topic: Topic, birthdate: datetime) -> str:
+    """
+    Returns what the daily message of a topic depends on for a birthdate, e.g. `yasam:12/3` or `burc:Koç`.
+    """
+
+    if topic == Topic.LIFE_PATH:
+        life_path = birthdate_to_life_path(birthdate)
+        return f"{topic.value}:{life_path[0]}/{life_path[1]}"
+
+    return f"{topic.value}:{Zodiac(birthdate).sign}"
+
+
+def render_daily(topic: Topic, birthdate: datetime, day: date, store: ContentStore) -> str:
+    """
+    Renders the daily message of a topic for a birthdate.
+
+    Args:
+        topic: The topic of the message.
+        birthdate: The birthdate the message is about.
+        day: The day the message is sent on.
+        store: The content store to read from.
+
+    Returns:
+        The rendered message.
+    """
+
+    if topic == Topic.LIFE_PATH:
+        return render_daily_life_path(birthdate_to_life_path(birthdate), store, day)
+
+    return render_daily_zodiac(Zodiac(birthdate), store, day)
+
+
+def next_run(now: datetime, at: time) -> datetime:
+    """
+    Returns the next time of the day the broadcast is sent at, today if it is not past yet.
+    """
+
+    run = datetime.combine(now.date(), at)
+
+    return run if run > now else run + timedelta(days=1)
+
+
+class SubscriberStore:
+    """
+    Keeps the subscriptions and the checkpoints of the broadcasts in a SQLite file.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: The path to the file, created if it does not exist.
+        """
+
+        self.path = path
+
+        # Used from the event loop and from the worker threads of the broadcast
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("pragma journal_mode=wal")
+            self._connection.execute(
+                "create table if not exists subscriptions (user_id integer, topic text, birthdate text, "
+                "primary key (user_id, topic))"
+            )
+            self._connection.execute(
+                "create table if not exists runs (run_id text primary key, started real, finished real, report text)"
+            )
+            # Status is claimed before sending, then sent, failed, unreachable or unknown
+            self._connection.execute(
+                "create table if not exists deliveries (run_id text, user_id integer, status text, "
+                "primary key (run_id, user_id))"
+            )
+
+    def subscribe(self, user_id: int, topic: Topic, birthdate: datetime) -> None:
+        """
+        Subscribes a user to the daily messages of a topic, replacing the birthdate of an earlier subscription.
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "insert or replace into subscriptions values (?, ?, ?)",
+                (user_id, topic.value, birthdate.date().isoformat()),
+            )
+
+    def unsubscribe(self, user_id: int, topic: Topic | None = None) -> int:
+        """
+        Unsubscribes a user from a topic, or from every topic if none is given.
+
+        Returns:
+            The number of subscriptions removed.
+        """
+
+        with self._lock, self._connection:
+            if topic is None:
+                return self._connection.execute("delete from subscriptions where user_id = ?", (user_id,)).rowcount
+
+            return self._connection.execute(
+                "delete from subscriptions where user_id = ? and topic = ?", (user_id, topic.value)
+            ).rowcount
+
+    def subscriptions(self, user_id: int) -> list[Subscription]:
+        """
+        Returns the subscriptions of a user.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "select user_id, topic, birthdate from subscriptions where user_id = ? order by topic", (user_id,)
+            ).fetchall()
+
+        return [_subscription(row) for row in rows]
+
+    def count(self) -> int:
+        """
+        Returns the number of subscribed users.
+        """
+
+        with self._lock:
+            return self._connection.execute("select count(distinct user_id) from subscriptions").fetchone()[0]
+
+    def start_run(self, run_id: str) -> dict[str, int]:
+        """
+        Starts a run, or resumes it if it was started before.
+
+        The recipients an earlier run was sending to when it stopped are marked unknown.
+
+        Returns:
+            The number of recipients of the earlier runs of the day, by status.
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute("insert or ignore into runs values (?, ?, null, null)", (run_id, clock.time()))
+            self._connection.execute(
+                "update deliveries set status = 'unknown' where run_id = ? and status = 'claimed'", (run_id,)
+            )
+
+            return dict(
+                self._connection.execute(
+                    "select status, count(*) from deliveries where run_id = ? group by status", (run_id,)
+                ).fetchall()
+            )
+
+    def is_started(self, run_id: str) -> bool:
+        """
+        Returns whether a run was started.
+        """
+
+        with self._lock:
+            return self._connection.execute("select 1 from runs where run_id = ?", (run_id,)).fetchone() is not None
+
+    def is_finished(self, run_id: str) -> bool:
+        """
+        Returns whether a run was finished.
+        """
+
+        with self._lock:
+            row = self._connection.execute("select finished from runs where run_id = ?", (run_id,)).fetchone()
+
+        return row is not None and row[0] is not None
+
+    def recipients(self, run_id: str) -> list[Subscription]:
+        """
+        Returns the subscriptions of the users a run has not sent to yet, grouped by user.
+        """
+
+        with self._lock:
+            rows = self._connection.execute(
+                "select user_id, topic, birthdate from subscriptions where user_id not in "
+                "(select user_id from deliveries where run_id = ?) order by user_id, topic",
+                (run_id,),
+            ).fetchall()
+
+        return [_subscription(row) for row in rows]
+
+    def claim(self, run_id: str, user_ids: list[int]) -> None:
+        """
+        Records that a run is about to send to the given users.
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "insert into deliveries values (?, ?, 'claimed')", [(run_id, user_id) for user_id in user_ids]
+            )
+
+    def record(self, run_id: str, statuses: dict[int, str]) -> None:
+        """
+        Records how sending to the given users went, unsubscribing the unreachable ones.
+        """
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "update deliveries set status = ? where run_id = ? and user_id = ?",
+                [(status, run_id, user_id) for user_id, status in statuses.items()],
+            )
+            self._connection.executemany(
+                "delete from subscriptions where user_id = ?",
+                [(user_id,) for user_id, status in statuses.items() if status == "unreachable"],
+            )
+
+    def finish_run(self, report: BroadcastReport) -> None:
+        """
+        Records that a run finished, with its report.
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "update runs set finished = ?, report = ? where run_id = ?",
+                (clock.time(), report.render(), report.run_id),
+            )
+
+    def last_report(self) -> str | None:
+        """
+        Returns the report of the last finished run, or None if no run finished yet.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "select report from runs where finished is not null order by run_id desc limit 1"
+            ).fetchone()
+
+        return None if row is None else row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class RateLimiter:
+    """
+    Spaces out the messages evenly at a given rate, all waiting together when Telegram asks for a flood wait.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: The messages allowed per second.
+        """
+
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._paused_until = 0.0
+
+    async def acquire(self) -> None:
+        """
+        Waits for the turn of the next message.
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            turn = max(now, self._next)
+            self._next = turn + self.interval
+
+            await asyncio.sleep(turn - now)
+
+            # A flood wait that started while waiting holds back the turns already given out too
+            if loop.time() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds back the messages not sent yet for the given seconds, including the ones already waiting for their turn.
+        """
+
+        self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + seconds)
+        self._next = max(self._next, self._paused_until)
+
+
+class Broadcaster:
+    """
+    Sends the daily messages to the subscribers.
+    """
+
+    def __init__(
+        self,
+        store: SubscriberStore,
+        send: Callable[[int, str], Awaitable[object]],
+        render: Callable[[Topic, datetime, date], str],
+        rate: float = BROADCAST_RATE,
+        checkpoint_size: int = CHECKPOINT_SIZE,
+        metrics: Metrics = default_metrics,
+    ):
+        """
+        Args:
+            store: The store of the subscriptions and checkpoints.
+            send: Sends a message formatted with Telegram's HTML markup to a user.
+            render: Renders the daily message of a topic for a birthdate on a day, e.g. `render_daily` with a store.
+            rate: The messages sent per second. Defaults to `BROADCAST_RATE`.
+            checkpoint_size: The recipients checkpointed together. Defaults to `CHECKPOINT_SIZE`.
+            metrics: The registry counting the messages. Defaults to the registry of the bot.
+        """
+
+        self.store = store
+        self.send = send
+        self.render = render
+        self.limiter = RateLimiter(rate)
+        self.checkpoint_size = checkpoint_size
+        self.metrics = metrics
+
+    def _render_messages(self, recipients: list[Subscription], day: date) -> tuple[dict[int, str | None], int]:
+        # Every distinct message is rendered once, from the first subscription that needs it
+        rendered: dict[str, str | None] = {}
+        parts: dict[int, list[str | None]] = {}
+        for subscription in recipients:
+            key = content_key(subscription.topic, subscription.birthdate)
+            if key not in rendered:
+                try:
+                    rendered[key] = self.render(subscription.topic, subscription.birthdate, day)
+                except (OSError, LookupError, ValueError):
+                    logger.exception("Could not render the daily message of %s", key)
+                    rendered[key] = None
+            parts.setdefault(subscription.user_id, []).append(rendered[key])
+
+        messages = {
+            user_id: None if None in user_parts else "\n\n".join(user_parts)  # type: ignore[reportCallIssue, reportArgumentType]
+            for user_id, user_parts in parts.items()
+        }
+
+        return messages, len(rendered)
+
+    async def _deliver(self, user_id: int, message: str | None) -> str:
+        if message is None:
+            return "failed"
+
+        for _ in range(MAX_FLOOD_RETRIES + 1):
+            await self.limiter.acquire()
+            try:
+                await self.send(user_id, message)
+            except FloodWaitError as error:  # type: ignore[reportUnknownVariableType]
+                self.metrics.increment("broadcast.flood_wait")
+                self.limiter.pause(error.seconds)  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+                continue
+            except UNREACHABLE_ERRORS:
+                return "unreachable"
+            except (RPCError, ValueError, OSError):
+                logger.exception("Could not send the daily message to %d", user_id)
+                return "failed"
+
+            return "sent"
+
+        return "failed"
+
+    async def broadcast(self, day: date) -> BroadcastReport:
+        """
+        Sends the daily messages of a day to the subscribers not reached yet on that day.
+
+        Args:
+            day: The day of the broadcast, which also picks the messages.
+
+        Returns:
+            The report of the run.
+        """
+
+        run_id = day.isoformat()
+        start = clock.perf_counter()
+
+        earlier = await asyncio.to_thread(self.store.start_run, run_id)
+        recipients = await asyncio.to_thread(self.store.recipients, run_id)
+        messages, rendered = await asyncio.to_thread(self._render_messages, recipients, day)
+        logger.info("Broadcast %s to %d users, %d distinct messages", run_id, len(messages), rendered)
+
+        statuses: dict[str, int] = {"sent": 0, "failed": 0, "unreachable": 0}
+        user_ids = list(messages)
+        for offset in range(0, len(user_ids), self.checkpoint_size):
+            batch = user_ids[offset : offset + self.checkpoint_size]
+            await asyncio.to_thread(self.store.claim, run_id, batch)
+
+            results = await asyncio.gather(*(self._deliver(user_id, messages[user_id]) for user_id in batch))
+            await asyncio.to_thread(self.store.record, run_id, dict(zip(batch, results)))
+
+            for status in results:
+                statuses[status] += 1
+                self.metrics.increment(f"broadcast.{status}")
+
+        report = BroadcastReport(
+            run_id,
+            len(user_ids),
+            rendered,
+            statuses["sent"],
+            statuses["failed"],
+            statuses["unreachable"],
+            sum(count for status, count in earlier.items() if status != "unknown"),
+            earlier.get("unknown", 0),
+            clock.perf_counter() - start,
+        )
+        await asyncio.to_thread(self.store.finish_run, report)
+        logger.info("Broadcast finished, %s", report.render())
+
+        return report
+
+    async def run_daily(self, at: time) -> None:
+        """
+        Broadcasts every day at the given time until cancelled, first resuming the run of today if it was stopped.
+
+        Args:
+            at: The local time of the day to broadcast at.
+        """
+
+        today = datetime.now().date()
+        started = await asyncio.to_thread(self.store.is_started, today.isoformat())
+        if started and not await asyncio.to_thread(self.store.is_finished, today.isoformat()):
+            try:
+                await self.broadcast(today)
+            except sqlite3.Error:
+                logger.exception("Broadcast of %s stopped", today)
+
+        while True:
+            run = next_run(datetime.now(), at)
+            await asyncio.sleep((run - datetime.now()).total_seconds())
+
+            try:
+                await self.broadcast(run.date())
+            except sqlite3.Error:
+                logger.exception("Broadcast of %s stopped", run.date())
+
+
+def _subscription(row: tuple[int, str, str]) -> Subscription:
+    user_id, topic, birthdate = row
+
+    return Subscription(user_id, Topic(topic), datetime.fromisoformat(birthdate))
@@ -0,0 +1,322 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides a single-file, memory-mapped content bundle and the command to build it.
+
+A bundle starts with a fixed size header, followed by the raw content of every entry and ends with
+an index mapping every key to the offset and the length of its content:
+
+    header:  magic (4s) | format version (H) | flags (H) | content digest (8s) | entry count (I) | index offset (Q)
+    content: the entries, back to back
+    index:   key length (H) | key (UTF-8) | offset (Q) | length (I), for every entry
+"""
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+import errno
+import hashlib
+import mmap
+import os
+import struct
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+BUNDLE_MAGIC = b"KHNB"
+
+# Version of the file layout, bump it whenever the layout changes
+BUNDLE_FORMAT_VERSION = 1
+
+if TYPE_CHECKING:
+    from content import ContentStore
+
+_HEADER = struct.Struct(">4sHH8sIQ")
+_KEY_LENGTH = struct.Struct(">H")
+_INDEX_ENTRY = struct.Struct(">QI")
+
+
+class BundleError(ValueError):
+    """
+    Raised when a file is not a valid bundle.
+    """
+
+
+class Bundle:
+    """
+    Reads a bundle through a read-only memory map.
+
+    Entries are returned as `memoryview` slices of the map without copying, and the pages of the map are
+    shared through the page cache by every process reading the same bundle. Release the returned slices
+    before closing the bundle.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Maps the bundle into memory and loads its index.
+
+        Args:
+            path: The path to the bundle.
+
+        Raises:
+            BundleError: If the file is not a bundle, is truncated or has an unsupported format version.
+        """
+
+        self.path = path
+
+        with open(path, "rb") as f:
+            # Empty files cannot be mapped at all
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise BundleError(f"{path} is too short to be a bundle")
+
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, self.flags, digest, count, index_offset = _HEADER.unpack_from(self._mmap)
+
+        if magic != BUNDLE_MAGIC:
+            self._mmap.close()
+            raise BundleError(f"{path} is not a bundle")
+        if format_version != BUNDLE_FORMAT_VERSION:
+            self._mmap.close()
+            raise BundleError(f"{path} has unsupported bundle format version {format_version}")
+
+        self._version = digest.hex()
+        self._view = memoryview(self._mmap)
+
+        self._index: dict[str, tuple[int, int]] = {}
+        try:
+            self._load_index(count, index_offset)
+        except (struct.error, UnicodeDecodeError) as err:
+            self.close()
+            raise BundleError(f"{path} is truncated or corrupted") from err
+
+    def _load_index(self, count: int, index_offset: int) -> None:
+        position = index_offset
+        for _ in range(count):
+            (key_length,) = _KEY_LENGTH.unpack_from(self._mmap, position)
+            position += _KEY_LENGTH.size
+            if position + key_length > len(self._mmap):
+                raise struct.error("key past the end of the bundle")
+            key = bytes(self._view[position : position + key_length]).decode("UTF-8")
+            position += key_length
+            offset, length = _INDEX_ENTRY.unpack_from(self._mmap, position)
+            if offset + length > index_offset:
+                raise struct.error(f"entry {key} past the start of the index")
+            self._index[key] = (offset, length)
+            position += _INDEX_ENTRY.size
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def keys(self) -> list[str]:
+        return sorted(self._index)
+
+    def get(self, key: str) -> memoryview:
+        try:
+            offset, length = self._index[key]
+        except KeyError:
+            raise FileNotFoundError(errno.ENOENT, "No such entry in the bundle", key) from None
+
+        return self._view[offset : offset + length]
+
+    def read_text(self, key: str) -> str:
+        return str(self.get(key), "UTF-8")
+
+    def close(self) -> None:
+        """
+        Unmaps the bundle.
+        """
+
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "Bundle":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+
+def build_bundle(
+    store: "ContentStore", output: Path, flags: int = 0, extra_entries: dict[str, bytes] | None = None
+) -> str:
+    """
+    Packs every entry of the store into a bundle.
+
+    The bundle is written next to the output path first and moved into place afterwards, so readers
+    never see a partially written bundle.
+
+    Args:
+        store: The store to pack.
+        output: The path to write the bundle to.
+        flags: The flags to record in the header. Defaults to 0.
+        extra_entries: Entries computed from the store to pack along with it, e.g. the page index. Defaults to None.
+
+    Returns:
+        The content version of the bundle.
+    """
+
+    entries = {key: bytes(store.get(key)) for key in store.keys()}
+
+    return write_bundle({**entries, **(extra_entries or {})}, output, flags)
+
+
+def write_bundle(entries: dict[str, bytes], output: Path, flags: int = 0) -> str:
+    """
+    Writes the given entries into a bundle.
+
+    Args:
+        entries: The raw content of every entry, by key.
+        output: The path to write the bundle to.
+        flags: The flags to record in the header. Defaults to 0.
+
+    Returns:
+        The content version of the bundle.
+    """
+
+    digest = hashlib.sha256()
+    index = b""
+    offset = _HEADER.size
+
+    temporary_output = output.with_name(output.name + ".tmp")
+    with open(temporary_output, "wb") as f:
+        f.seek(_HEADER.size)
+
+        for key in sorted(entries):
+            content = entries[key]
+            encoded_key = key.encode("UTF-8")
+
+            f.write(content)
+            digest.update(_KEY_LENGTH.pack(len(encoded_key)) + encoded_key + _INDEX_ENTRY.pack(0, len(content)))
+            digest.update(content)
+
+            index += _KEY_LENGTH.pack(len(encoded_key)) + encoded_key + _INDEX_ENTRY.pack(offset, len(content))
+            offset += len(content)
+
+        f.write(index)
+
+        version = digest.digest()[:8]
+        f.seek(0)
+        f.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, flags, version, len(entries), offset))
+
+    os.replace(temporary_output, output)
+
+    return version.hex()
+
+
+if __name__ == "__main__":
+    from content import DirectoryStore
+    from compressed import FLAG_ZSTD, CompressedStore, build_compressed_bundle
+    from pages import PAGE_INDEX_KEY, build_page_index, page_index_to_json
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Builds and inspects the content bundle used by the bot.",
+        epilog="Contact: @Seymapro",
+    )
+
+    # Define command-line arguments
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="pack the content files into a bundle")
+    build_parser.add_argument(
+        "-d",
+        "--data-dir",
+        "--data-directory",
+        default="./data/",
+        type=Path,
+        help="path to the data directory",
+        dest="data_directory",
+    )
+    build_parser.add_argument(
+        "-e",
+        "--enneagram-dir",
+        "--enneagram-directory",
+        default="./kahinbot/enneagram/",
+        type=Path,
+        help="path to the enneagram directory",
+        dest="enneagram_directory",
+    )
+    build_parser.add_argument(
+        "-o",
+        "--output",
+        default="./kahinbot.bundle",
+        type=Path,
+        help="path to write the bundle to",
+        dest="output",
+    )
+    build_parser.add_argument(
+        "-z",
+        "--zstd",
+        action="store_true",
+        help="compress every entry separately with a trained zstd dictionary (requires `zstandard`)",
+        dest="zstd",
+    )
+    build_parser.add_argument(
+        "--dictionary-size",
+        default=64 * 1024,
+        type=int,
+        help="maximum size of the trained zstd dictionary in bytes",
+        dest="dictionary_size",
+    )
+    build_parser.add_argument(
+        "--level",
+        default=19,
+        type=int,
+        help="zstd compression level",
+        dest="level",
+    )
+
+    info_parser = subparsers.add_parser("info", help="print the version and the entries of a bundle")
+    info_parser.add_argument("bundle", type=Path, help="path to the bundle")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        store = DirectoryStore(args.data_directory, args.enneagram_directory)
+        extra_entries = {PAGE_INDEX_KEY: page_index_to_json(build_page_index(store))}
+        if args.zstd:
+            version = build_compressed_bundle(store, args.output, args.dictionary_size, args.level, extra_entries)
+        else:
+            version = build_bundle(store, args.output, extra_entries=extra_entries)
+
+        print(
+            f"Bundle {version} with {len(store.keys())} entries has been written "
+            f"to file {args.output} ({args.output.stat().st_size} bytes)"
+        )
+    else:
+        with Bundle(args.bundle) as bundle:
+            print(f"Version: {bundle.version}")
+            print(f"Entries: {len(bundle.keys())}")
+            for key in bundle.keys():
+                print(f"  {key} ({len(bundle.get(key))} bytes)")
+
+            if bundle.flags & FLAG_ZSTD:
+                stats = CompressedStore(bundle).stats()
+                print(
+                    f"Compressed: {stats['compressed_bytes']} bytes, uncompressed: {stats['uncompressed_bytes']} bytes, "
+                    f"ratio: {stats['compression_ratio']:.2f}"
+                )
@@ -0,0 +1,180 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides compact, versioned encoding and decoding of inline button callback payloads.
+"""
+
+from datetime import datetime
+from enum import IntEnum
+from typing import NamedTuple
+import base64
+import hashlib
+import hmac
+import struct
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Version of the payload layout, bump it whenever the layout of the payload changes
+CALLBACK_VERSION = 3
+
+# Payload versions that can still be decoded, the buttons of older messages keep working after an upgrade
+SUPPORTED_CALLBACK_VERSIONS = (2, 3)
+
+# Set in the flags of the buttons that update the message they are on, e.g. the page buttons of a reader
+FLAG_IN_PLACE = 0x1
+
+# Telegram rejects inline buttons whose callback data is longer than this many bytes
+MAX_CALLBACK_DATA_LENGTH = 64
+
+# Version 2: payload version, view id, birthdate as a 3 byte day ordinal and the id of the message to reply to
+_BODY_V2 = struct.Struct(">BB3sI")
+
+# Version 3: the version 2 fields followed by the flags and the page number
+_BODY = struct.Struct(">BB3sIBH")
+
+_BODIES = {2: _BODY_V2, 3: _BODY}
+
+# Number of bytes of the HMAC-SHA256 digest appended to the payload
+_SIGNATURE_LENGTH = 8
+
+
+class View(IntEnum):
+    """
+    Identifiers of the views that can be requested through an inline button.
+    """
+
+    FULL_TEXT_MILLMAN = 1
+    FULL_TEXT_FORBES = 2
+    SUMMARY_MILLMAN = 3
+    SUMMARY_FORBES = 4
+    JSON_SHORT_MILLMAN = 5
+    JSON_LONG_MILLMAN = 6
+    ZODIAC_TRAITS = 7
+    MENU = 8
+    EXPORT_PDF = 9
+
+
+class CallbackPayload(NamedTuple):
+    """
+    Decoded contents of the callback data of an inline button.
+    """
+
+    view: View
+    birthdate: datetime
+    message_id: int
+    page: int = 0
+    in_place: bool = False
+
+
+class CallbackDataError(ValueError):
+    """
+    Raised when a callback payload cannot be decoded.
+    """
+
+
+def _sign(body: bytes, secret: bytes) -> bytes:
+    return hmac.new(secret, body, hashlib.sha256).digest()[:_SIGNATURE_LENGTH]
+
+
+def encode_callback(
+    view: View, birthdate: datetime, message_id: int, secret: bytes, page: int = 0, in_place: bool = False
+) -> bytes:
+    """
+    Encodes a view and the birthdate it belongs to into signed callback data for an inline button.
+
+    The payload carries everything the handler of the view needs, so a button keeps working
+    in any process and after restarts without keeping the birthdate of the user in memory.
+
+    Args:
+        view: The view the button should open.
+        birthdate: The birthdate the view should be rendered for.
+        message_id: The id of the message the view should reply to.
+        secret: The key used to sign the payload.
+        page: The page of the view to open. Defaults to 0.
+        in_place: Whether the view should replace the message the button is on. Defaults to False.
+
+    Returns:
+        The URL-safe Base64 encoded payload, without padding.
+
+    Raises:
+        CallbackDataError: If the encoded payload exceeds Telegram's callback data limit.
+
+    Example:
+        >>> encode_callback(View.ZODIAC_TRAITS, datetime(2002, 12, 22), 42, b"secret")
+        b'AwcLKEYAAAAqAAAAUE_oGf92-7k'
+    """
+
+    flags = FLAG_IN_PLACE if in_place else 0
+    body = _BODY.pack(CALLBACK_VERSION, view, birthdate.toordinal().to_bytes(3, "big"), message_id, flags, page)
+    data = base64.urlsafe_b64encode(body + _sign(body, secret)).rstrip(b"=")
+
+    if len(data) > MAX_CALLBACK_DATA_LENGTH:
+        raise CallbackDataError(f"Callback data is {len(data)} bytes long, the limit is {MAX_CALLBACK_DATA_LENGTH}")
+
+    return data
+
+
+def decode_callback(data: bytes, secret: bytes) -> CallbackPayload:
+    """
+    Decodes and verifies callback data created by `encode_callback`.
+
+    Args:
+        data: The callback data received from Telegram.
+        secret: The key the payload was signed with.
+
+    Returns:
+        The decoded payload.
+
+    Raises:
+        CallbackDataError: If the payload is malformed, tampered with, has an unknown version or points to an unknown view.
+    """
+
+    try:
+        payload = base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+        version = payload[0]
+    except (ValueError, IndexError) as err:
+        raise CallbackDataError(f"Malformed callback data: {data!r}") from err
+
+    if version not in SUPPORTED_CALLBACK_VERSIONS:
+        raise CallbackDataError(f"Unsupported callback data version: {version}")
+
+    layout = _BODIES[version]
+    try:
+        fields = layout.unpack_from(payload)
+    except struct.error as err:
+        raise CallbackDataError(f"Malformed callback data: {data!r}") from err
+
+    _, view_id, ordinal, message_id, flags, page = fields if version >= 3 else (*fields, 0, 0)
+
+    body, signature = payload[: layout.size], payload[layout.size :]
+    if not hmac.compare_digest(signature, _sign(body, secret)):
+        raise CallbackDataError(f"Invalid callback data signature: {data!r}")
+
+    try:
+        view = View(view_id)
+        birthdate = datetime.fromordinal(int.from_bytes(ordinal, "big"))
+    except ValueError as err:
+        raise CallbackDataError(f"Invalid callback data contents: {data!r}") from err
+
+    return CallbackPayload(view, birthdate, message_id, page, bool(flags & FLAG_IN_PLACE))
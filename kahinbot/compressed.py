@@ -0,0 +1,204 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides a compressed content store that decompresses its entries lazily.
+
+Every entry of a compressed bundle is a separate zstd frame compressed with a dictionary trained on
+the whole corpus, so a single entry can be decompressed without touching the others. Decompressed
+entries are kept in a least recently used cache bounded by their total size.
+
+Requires the optional `zstandard` package.
+"""
+
+from bundle import Bundle, write_bundle
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import TYPE_CHECKING
+import errno
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if TYPE_CHECKING:
+    from content import ContentStore
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Header flag marking the entries of a bundle as zstd frames
+FLAG_ZSTD = 0x1
+
+# Key of the entry holding the trained dictionary, stored uncompressed
+DICTIONARY_KEY = "_zstd/dictionary"
+
+# Number of the most recent decompression latencies kept for the statistics
+LATENCY_SAMPLES = 1024
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise RuntimeError("Compressed bundles require the `zstandard` package, install it with `pip install zstandard`")
+
+
+def build_compressed_bundle(
+    store: "ContentStore",
+    output: Path,
+    dictionary_size: int = 64 * 1024,
+    level: int = 19,
+    extra_entries: dict[str, bytes] | None = None,
+) -> str:
+    """
+    Packs every entry of the store into a bundle, compressing each entry separately with a trained dictionary.
+
+    Args:
+        store: The store to pack.
+        output: The path to write the bundle to.
+        dictionary_size: The maximum size of the trained dictionary in bytes. Defaults to 64 KiB.
+        level: The zstd compression level. Defaults to 19.
+        extra_entries: Entries computed from the store to pack along with it, e.g. the page index. Defaults to None.
+
+    Returns:
+        The content version of the bundle.
+    """
+
+    _require_zstandard()
+
+    contents = {**{key: bytes(store.get(key)) for key in store.keys()}, **(extra_entries or {})}
+
+    dictionary = zstandard.train_dictionary(dictionary_size, list(contents.values()))  # type: ignore[reportOptionalMemberAccess]
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary, write_content_size=True)  # type: ignore[reportOptionalMemberAccess]
+
+    entries = {key: compressor.compress(content) for key, content in contents.items()}
+    entries[DICTIONARY_KEY] = dictionary.as_bytes()
+
+    return write_bundle(entries, output, FLAG_ZSTD)
+
+
+class CompressedStore:
+    """
+    Reads a compressed bundle, decompressing entries on demand into a bounded least recently used cache.
+    """
+
+    def __init__(self, bundle: Bundle, cache_bytes: int = 4 * 1024 * 1024):
+        """
+        Loads the dictionary of the bundle.
+
+        Args:
+            bundle: The compressed bundle to read.
+            cache_bytes: The maximum total size of the decompressed entries kept in memory. Defaults to 4 MiB.
+        """
+
+        _require_zstandard()
+
+        self.bundle = bundle
+        self.cache_bytes = cache_bytes
+
+        dictionary = zstandard.ZstdCompressionDict(bundle.get(DICTIONARY_KEY).tobytes())  # type: ignore[reportOptionalMemberAccess]
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)  # type: ignore[reportOptionalMemberAccess]
+        self._dictionary_bytes = len(dictionary.as_bytes())
+
+        self._keys = [key for key in bundle.keys() if key != DICTIONARY_KEY]
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def version(self) -> str:
+        return self.bundle.version
+
+    def keys(self) -> list[str]:
+        return list(self._keys)
+
+    def get(self, key: str) -> bytes:
+        if key == DICTIONARY_KEY:
+            raise FileNotFoundError(errno.ENOENT, "No such entry in the bundle", key)
+
+        with self._lock:
+            content = self._cache.get(key)
+            if content is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+
+                return content
+
+            frame = self.bundle.get(key)
+            start = time.perf_counter()
+            content = self._decompressor.decompress(frame)
+            self._latencies.append(time.perf_counter() - start)
+            frame.release()
+            self.misses += 1
+
+            # Entries larger than the whole cache are served without being cached
+            if len(content) <= self.cache_bytes:
+                self._cache[key] = content
+                self._cached_bytes += len(content)
+
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+
+            return content
+
+    def read_text(self, key: str) -> str:
+        return self.get(key).decode("UTF-8")
+
+    def stats(self) -> dict[str, float]:
+        """
+        Reports the trade-off between memory and CPU of the store.
+
+        Returns:
+            A dictionary containing the compressed and uncompressed sizes and their ratio, the memory held by the
+            cache and the dictionary, the cache hit rate and the mean and 99th percentile decompression latency.
+        """
+
+        compressed_bytes = 0
+        uncompressed_bytes = 0
+        for key in self._keys:
+            frame = self.bundle.get(key)
+            compressed_bytes += len(frame)
+            uncompressed_bytes += zstandard.frame_content_size(frame)  # type: ignore[reportOptionalMemberAccess]
+            frame.release()
+
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests = self.hits + self.misses
+
+            return {
+                "entries": len(self._keys),
+                "compressed_bytes": compressed_bytes,
+                "uncompressed_bytes": uncompressed_bytes,
+                "compression_ratio": uncompressed_bytes / compressed_bytes if compressed_bytes else 0.0,
+                "resident_bytes": self._cached_bytes + self._dictionary_bytes,
+                "cached_entries": len(self._cache),
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "decompression_mean_ms": sum(latencies) / len(latencies) * 1e3 if latencies else 0.0,
+                "decompression_p99_ms": latencies[int(len(latencies) * 0.99)] * 1e3 if latencies else 0.0,
+            }
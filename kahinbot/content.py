@@ -0,0 +1,184 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides access to the content of the readings through stores addressed by keys.
+
+Keys are paths relative to the data directory, e.g. `millman/tr/MDs/11_2.md` or `forbes/tr/MDs/1_4.md`,
+except for the enneagram types which live under `enneagram/`, e.g. `enneagram/tip1.md`.
+"""
+
+from zodiac import ENNEAGRAM_DIRECTORY
+from bundle import Bundle
+from compressed import FLAG_ZSTD, CompressedStore
+from pathlib import Path
+from typing import Protocol
+import hashlib
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Glob patterns, relative to the data directory, of the files the bot reads at runtime
+CONTENT_PATTERNS = (
+    "millman/*/MDs/*.md",
+    "millman/*/JSONs/*.json",
+    "millman/*/JSONs_Extended/*.json",
+    "millman/*/Summarizations/*.md",
+    "forbes/*/MDs/*.md",
+    "forbes/*/Summarizations/*.md",
+)
+
+# Prefix of the keys of the enneagram types, which are shipped with the package instead of the data directory
+ENNEAGRAM_PREFIX = "enneagram/"
+
+# Digests of the content files by path, with the size and modification time they were computed for
+_file_digests: dict[Path, tuple[int, int, bytes]] = {}
+
+
+def _file_digest(path: Path) -> bytes:
+    # Files are only read again when their size or modification time changed since they were last hashed
+    stat = path.stat()
+    cached = _file_digests.get(path)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+    _file_digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+
+    return digest
+
+
+class ContentStore(Protocol):
+    """
+    Interface shared by every content store.
+    """
+
+    @property
+    def version(self) -> str:
+        """A digest identifying the content of the store."""
+        ...
+
+    def keys(self) -> list[str]:
+        """Returns the sorted keys of every entry in the store."""
+        ...
+
+    def get(self, key: str) -> bytes | memoryview:
+        """Returns the raw content of the entry, raising `FileNotFoundError` if there is no such entry."""
+        ...
+
+    def read_text(self, key: str) -> str:
+        """Returns the content of the entry decoded as UTF-8, raising `FileNotFoundError` if there is no such entry."""
+        ...
+
+
+class DirectoryStore:
+    """
+    Reads the content directly from the files of the data directory and the enneagram directory.
+    """
+
+    def __init__(self, data_directory: Path, enneagram_directory: Path = ENNEAGRAM_DIRECTORY):
+        """
+        Indexes the content files of the given directories.
+
+        Args:
+            data_directory: The path to the data directory.
+            enneagram_directory: The path to the directory containing the enneagram types.
+        """
+
+        self.data_directory = data_directory
+        self.enneagram_directory = enneagram_directory
+
+        paths: dict[str, Path] = {}
+        for pattern in CONTENT_PATTERNS:
+            for path in data_directory.glob(pattern):
+                paths[path.relative_to(data_directory).as_posix()] = path
+        for path in enneagram_directory.glob("tip*.md"):
+            paths[ENNEAGRAM_PREFIX + path.name] = path
+
+        self._paths = paths
+        self._keys = sorted(paths)
+        self._version: str | None = None
+
+    @property
+    def version(self) -> str:
+        # Computed from the content of the files, so a checkout or a copy that only changes their modification
+        # times keeps the version, and with it the search index and the cached exports
+        if self._version is None:
+            digest = hashlib.sha256()
+            for key in self._keys:
+                digest.update(key.encode() + b":" + _file_digest(self._paths[key]) + b"\n")
+            self._version = digest.hexdigest()[:16]
+
+        return self._version
+
+    def path(self, key: str) -> Path:
+        """
+        Returns the path of the file backing the given key.
+
+        Args:
+            key: The key of the entry.
+
+        Returns:
+            The path of the file, which may not exist.
+        """
+
+        if key.startswith(ENNEAGRAM_PREFIX):
+            return self.enneagram_directory / key.removeprefix(ENNEAGRAM_PREFIX)
+
+        return self.data_directory / key
+
+    def keys(self) -> list[str]:
+        return list(self._keys)
+
+    def get(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def read_text(self, key: str) -> str:
+        return self.get(key).decode("UTF-8")
+
+
+def open_store(
+    data_directory: Path, bundle_path: Path | None = None, cache_bytes: int = 4 * 1024 * 1024
+) -> ContentStore:
+    """
+    Opens the content store the bot should read from.
+
+    Args:
+        data_directory: The path to the data directory, used when no bundle is given.
+        bundle_path: The path to a bundle built with `bundle.py build`. Defaults to None.
+        cache_bytes: The size of the cache of decompressed entries, used for compressed bundles. Defaults to 4 MiB.
+
+    Returns:
+        The bundle if a path to it is given, wrapped in a lazily decompressing store if it is compressed,
+        otherwise a store reading the data directory.
+    """
+
+    if bundle_path is not None:
+        bundle = Bundle(bundle_path)
+        if bundle.flags & FLAG_ZSTD:
+            return CompressedStore(bundle, cache_bytes)
+
+        return bundle
+
+    return DirectoryStore(data_directory)
@@ -0,0 +1,145 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides a linear-time extractor for the birthdates contained in a message.
+"""
+
+from datetime import datetime
+import re
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Matches `dd.mm.yyyy`, `dd/mm/yyyy` and `yyyy-mm-dd`, days and months may be written with a single digit.
+# There are no unbounded repetitions, so scanning a message takes time linear in its length. The leading
+# lookahead lets the scanner skip non-digit characters before evaluating the more expensive lookbehind.
+BIRTHDATE_PATTERN = re.compile(
+    r"(?=\d)(?<!\d)(?:"
+    r"(?P<day>\d{1,2})(?P<separator>[./])(?P<month>\d{1,2})(?P=separator)(?P<year>\d{4})"
+    r"|(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})"
+    r")(?!\d)"
+)
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def is_leap_year(year: int) -> bool:
+    """
+    Checks whether the given year is a leap year in the Gregorian calendar.
+
+    Args:
+        year: The year to check.
+
+    Returns:
+        True if the year is a leap year, False otherwise.
+
+    Example:
+        >>> is_leap_year(2000), is_leap_year(1900)
+        (True, False)
+    """
+
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def to_birthdate(year: int, month: int, day: int) -> datetime | None:
+    """
+    Validates the calendar ranges of the given date components.
+
+    Args:
+        year: The year of the date.
+        month: The month of the date.
+        day: The day of the date.
+
+    Returns:
+        The date as a datetime object, or None if the components do not form a valid date.
+
+    Example:
+        >>> to_birthdate(2002, 2, 29) is None
+        True
+    """
+
+    if not 1 <= year <= 9999 or not 1 <= month <= 12:
+        return None
+
+    days_in_month = 29 if month == 2 and is_leap_year(year) else _DAYS_IN_MONTH[month - 1]
+    if not 1 <= day <= days_in_month:
+        return None
+
+    return datetime(year, month, day)
+
+
+def _match_to_birthdate(match: re.Match[str]) -> datetime | None:
+    if match["year"] is not None:
+        return to_birthdate(int(match["year"]), int(match["month"]), int(match["day"]))
+
+    return to_birthdate(int(match["iso_year"]), int(match["iso_month"]), int(match["iso_day"]))
+
+
+def parse_birthdate(text: str) -> datetime | None:
+    """
+    Parses a text that is a single birthdate and nothing else, in any of the formats of `BIRTHDATE_PATTERN`.
+
+    Args:
+        text: The text to parse, e.g. a birthdate given to the API.
+
+    Returns:
+        The birthdate, or None if the text is not exactly one valid date.
+
+    Example:
+        >>> parse_birthdate("2002-12-22"), parse_birthdate("22.12.2002 "), parse_birthdate("31.02.2002")
+        (datetime.datetime(2002, 12, 22, 0, 0), None, None)
+    """
+
+    match = BIRTHDATE_PATTERN.fullmatch(text)
+
+    return None if match is None else _match_to_birthdate(match)
+
+
+def extract_birthdates(text: str, limit: int | None = None) -> list[datetime]:
+    """
+    Extracts every valid birthdate from the given text, in the order they appear.
+
+    Args:
+        text: The text to search, e.g. the raw text of a message.
+        limit: Stop scanning after this many valid birthdates are found. Defaults to no limit.
+
+    Returns:
+        A list of the valid birthdates found in the text. Invalid dates such as `31.02.2002` are skipped.
+
+    Example:
+        >>> extract_birthdates("Doğum tarihim 22.12.2002, kardeşiminki 2005-7-1")
+        [datetime.datetime(2002, 12, 22, 0, 0), datetime.datetime(2005, 7, 1, 0, 0)]
+    """
+
+    birthdates: list[datetime] = []
+
+    for match in BIRTHDATE_PATTERN.finditer(text):
+        birthdate = _match_to_birthdate(match)
+
+        if birthdate is not None:
+            birthdates.append(birthdate)
+
+            if len(birthdates) == limit:
+                break
+
+    return birthdates
@@ -0,0 +1,399 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+This module provides the export of a whole reading, the Millman, Forbes and enneagram content of a birthdate, as a
+single PDF file typeset with PyMuPDF.
+
+The PDF only depends on the life path, the pin code and the enneagram type of the birthdate and on the version of
+the content, so it is cached on disk under a name made of them and every reading is typeset once. Typesetting runs
+in a process pool, so the event loop keeps answering meanwhile, and exports of the same reading asked for at once
+share a single render.
+
+Requires the optional `pymupdf` package.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from content import ContentStore
+from pin_code import get_pin_code
+from the_life import birthdate_to_life_path
+from views import life_path_key, pin_code_keys
+from zodiac import Zodiac
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+import asyncio
+import html
+import logging
+import multiprocessing
+import os
+import re
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Number of processes typesetting the PDFs
+EXPORT_WORKERS = 2
+
+# Number of PDFs kept on disk, the least recently sent ones are removed beyond it
+MAX_EXPORT_FILES = 1000
+
+# Paper size and margins of the PDF, in points
+PAPER_SIZE = "a4"
+MARGIN = 56
+
+# Stylesheet of the typeset reading
+STYLESHEET = """
+body { font-family: serif; font-size: 11pt; line-height: 1.3; }
+h1 { font-size: 20pt; text-align: center; margin-bottom: 6pt; }
+h2 { font-size: 16pt; margin-top: 18pt; }
+h3 { font-size: 13pt; margin-top: 12pt; }
+h4, h5 { font-size: 11pt; margin-top: 8pt; }
+p { text-align: justify; margin: 0 0 6pt 0; }
+p.subtitle { text-align: center; font-style: italic; }
+li { margin-bottom: 3pt; }
+"""
+
+# Matches a bullet of the Markdown content, with its indentation
+BULLET_PATTERN = re.compile(r"^\s*[-*•]\s+")
+
+# Matches the bold spans of the Markdown content, after escaping
+BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+
+
+class ExportKey(NamedTuple):
+    """
+    What the exported reading of a birthdate depends on, besides the content.
+
+    Attributes:
+        life_path: The life path number tuple (initial sum, final number).
+        pin_code: The pin code.
+        enneagram: The enneagram type of the zodiac sign.
+    """
+
+    life_path: tuple[int, int]
+    pin_code: tuple[int, ...]
+    enneagram: int
+
+    @classmethod
+    def of(cls, birthdate: datetime) -> "ExportKey":
+        """
+        Returns the key of the reading of a birthdate.
+        """
+
+        return cls(birthdate_to_life_path(birthdate), tuple(get_pin_code(birthdate)), Zodiac(birthdate).enneagram)
+
+    def file_name(self, version: str) -> str:
+        """
+        Returns the name of the cached PDF of the reading for the given version of the content.
+        """
+
+        pin_code = "".join(map(str, self.pin_code))
+
+        return f"{self.life_path[0]}_{self.life_path[1]}-{pin_code}-{self.enneagram}-{version}.pdf"
+
+
+def _inline(text: str) -> str:
+    return BOLD_PATTERN.sub(r"<b>\1</b>", html.escape(text))
+
+
+def markdown_to_html(content: str, heading_level: int = 2) -> str:
+    """
+    Converts the Markdown of the content, its headings, bullets, bold spans and paragraphs, into HTML.
+
+    Args:
+        content: The Markdown content.
+        heading_level: The HTML level of the `#` headings, the deeper ones follow. Defaults to 2, below the title.
+
+    Returns:
+        The HTML content.
+    """
+
+    blocks: list[str] = []
+    paragraph: list[str] = []
+    bullets: list[str] = []
+
+    def close() -> None:
+        if paragraph:
+            blocks.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+        if bullets:
+            blocks.append("<ul>" + "".join(f"<li>{_inline(bullet)}</li>" for bullet in bullets) + "</ul>")
+            bullets.clear()
+
+    for line in content.splitlines():
+        stripped = line.strip()
+
+        if stripped.startswith("#"):
+            close()
+            title = stripped.lstrip("#").strip()
+            if title:
+                level = min(heading_level + len(stripped) - len(stripped.lstrip("#")) - 1, 6)
+                blocks.append(f"<h{level}>{_inline(title)}</h{level}>")
+        elif BULLET_PATTERN.match(line) or stripped in ("-", "*"):
+            if paragraph:
+                close()
+            bullet = BULLET_PATTERN.sub("", line).strip() if BULLET_PATTERN.match(line) else ""
+            # The enneagram types have empty bullets between their groups of traits
+            if bullet:
+                bullets.append(bullet)
+        elif not stripped:
+            close()
+        else:
+            if bullets:
+                close()
+            paragraph.append(stripped)
+
+    close()
+
+    return "\n".join(blocks)
+
+
+def reading_sections(key: ExportKey, store: ContentStore) -> list[tuple[str, str]]:
+    """
+    Reads the sections of an exported reading from the store.
+
+    Args:
+        key: The key of the reading.
+        store: The content store to read from.
+
+    Returns:
+        The title and the Markdown content of every section, in order.
+
+    Raises:
+        FileNotFoundError: If the Millman or Forbes content is missing. A missing enneagram type is left out.
+    """
+
+    sections = [
+        (
+            f"Hayat Sayısı {key.life_path[0]}/{key.life_path[1]} (Millman)",
+            store.read_text(life_path_key(key.life_path, "MDs")),
+        ),
+        (
+            f"Pin Kodu {' '.join(map(str, key.pin_code))} (Forbes)",
+            "\n\n".join(store.read_text(content_key) for content_key in pin_code_keys(list(key.pin_code), "MDs")),
+        ),
+    ]
+
+    try:
+        sections.append((f"Mizaç {key.enneagram} (Enneagram)", store.read_text(f"enneagram/tip{key.enneagram}.md")))
+    except FileNotFoundError:
+        logger.warning("Enneagram type %d is missing, left out of the export", key.enneagram)
+
+    return sections
+
+
+def render_pdf(path: str, title: str, subtitle: str, sections: list[tuple[str, str]]) -> int:
+    """
+    Typesets a reading into a PDF file, in a worker process.
+
+    The file is written next to its path and renamed to it once complete, so a half written file is never served.
+
+    Args:
+        path: The path to write the PDF to.
+        title: The title of the reading.
+        subtitle: The line under the title.
+        sections: The title and the Markdown content of every section, in order.
+
+    Returns:
+        The number of pages.
+    """
+
+    body = [f"<h1>{html.escape(title)}</h1>", f'<p class="subtitle">{html.escape(subtitle)}</p>']
+    for number, (section_title, content) in enumerate(sections):
+        # The `#` headings of a section are one level below its title
+        body.append(f'<h2 id="section-{number}">{html.escape(section_title)}</h2>')
+        body.append(markdown_to_html(content, heading_level=3))
+
+    story = pymupdf.Story("\n".join(body), user_css=STYLESHEET)
+    paper = pymupdf.paper_rect(PAPER_SIZE)
+    where = paper + (MARGIN, MARGIN, -MARGIN, -MARGIN)
+
+    # The pages the section titles are placed on, for the outline of the PDF
+    outline: list[list[int | str]] = []
+    page = 0
+
+    def record(position: object) -> None:
+        if position.open_close & 1 and (position.id or "").startswith("section-"):  # type: ignore[reportAttributeAccessIssue]
+            outline.append([1, position.text, page])  # type: ignore[reportAttributeAccessIssue]
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    writer = pymupdf.DocumentWriter(temporary)
+    more = True
+    while more:
+        page += 1
+        device = writer.begin_page(paper)
+        more, _ = story.place(where)
+        story.element_positions(record)
+        story.draw(device)
+        writer.end_page()
+    writer.close()
+
+    with pymupdf.open(temporary) as document:
+        document.set_metadata({"title": f"{title} - {subtitle}", "creator": "Kahin Bot"})
+        document.set_toc(outline)
+        pages = document.page_count
+        document.save(path + ".part", garbage=3, deflate=True)
+    os.remove(temporary)
+    os.replace(path + ".part", path)
+
+    return pages
+
+
+class PdfExporter:
+    """
+    Exports the readings as PDF files, typeset in a process pool and cached on disk.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        workers: int = EXPORT_WORKERS,
+        max_files: int = MAX_EXPORT_FILES,
+        metrics: Metrics = default_metrics,
+    ):
+        """
+        Args:
+            directory: The directory the PDFs are cached in, created if it does not exist.
+            workers: The number of processes typesetting the PDFs. Defaults to `EXPORT_WORKERS`.
+            max_files: The number of PDFs kept in the directory. Defaults to `MAX_EXPORT_FILES`.
+            metrics: The registry counting the cache hits and renders. Defaults to the registry of the bot.
+        """
+
+        self.directory = directory
+        self.workers = workers
+        self.max_files = max_files
+        self.metrics = metrics
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._rendering: dict[Path, asyncio.Future[Path]] = {}
+
+    def path(self, birthdate: datetime, store: ContentStore) -> Path:
+        """
+        Returns the path of the cached PDF of the reading of a birthdate, which may not exist yet.
+        """
+
+        return self.directory / ExportKey.of(birthdate).file_name(store.version)
+
+    def is_cached(self, birthdate: datetime, store: ContentStore) -> bool:
+        """
+        Returns whether the PDF of the reading of a birthdate is cached.
+        """
+
+        return self.path(birthdate, store).exists()
+
+    def start(self) -> None:
+        """
+        Starts the worker processes, unless they are running or PyMuPDF is not installed.
+
+        The workers are forked from the calling process, so the bot starts them before it opens any thread or
+        connection. A fork server would run the module of the bot again, which starts the Telegram client when it
+        is imported. Exports started without calling this start the workers themselves.
+        """
+
+        if self._executor is not None or pymupdf is None:
+            return None
+
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"))
+        # Forked with the first task, before the thread managing them starts
+        self._executor.submit(os.getpid).result()
+
+    async def export(self, birthdate: datetime, store: ContentStore) -> Path:
+        """
+        Returns the PDF of the reading of a birthdate, typesetting it unless it is cached.
+
+        Args:
+            birthdate: The birthdate of the reading.
+            store: The content store to read from.
+
+        Returns:
+            The path of the PDF.
+
+        Raises:
+            RuntimeError: If PyMuPDF is not installed.
+            FileNotFoundError: If the content of the reading is missing.
+        """
+
+        if pymupdf is None:
+            raise RuntimeError("PyMuPDF is not installed")
+
+        key = ExportKey.of(birthdate)
+        path = self.directory / key.file_name(store.version)
+
+        if path.exists():
+            self.metrics.increment("export.hit")
+            # The modification time orders the files for the removal of the least recently sent ones
+            await asyncio.to_thread(os.utime, path)
+            return path
+
+        if path not in self._rendering:
+            self.metrics.increment("export.render")
+            self._rendering[path] = asyncio.ensure_future(self._render(key, store, path))
+            self._rendering[path].add_done_callback(lambda _: self._rendering.pop(path, None))
+        else:
+            self.metrics.increment("export.shared")
+
+        # A cancelled request does not cancel the render the others wait for
+        return await asyncio.shield(self._rendering[path])
+
+    async def _render(self, key: ExportKey, store: ContentStore, path: Path) -> Path:
+        sections = reading_sections(key, store)
+
+        if self._executor is None:
+            await asyncio.to_thread(self.start)
+
+        await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+        pages = await asyncio.get_running_loop().run_in_executor(
+            self._executor,  # type: ignore[reportArgumentType]
+            render_pdf,
+            str(path),
+            "Numeroloji Okuması",
+            f"Hayat sayısı {key.life_path[0]}/{key.life_path[1]} · Pin kodu {' '.join(map(str, key.pin_code))} · "
+            f"Mizaç {key.enneagram}",
+            sections,
+        )
+        logger.info("Exported %d pages to %s", pages, path)
+
+        await asyncio.to_thread(self._prune)
+
+        return path
+
+    def _prune(self) -> None:
+        files = sorted(self.directory.glob("*.pdf"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in files[self.max_files :]:
+            path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
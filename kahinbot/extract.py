@@ -0,0 +1,602 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the local extraction of the books into the Markdown files of the data directory.
+
+The text, headings and bullet lists are read from the PDF with PyMuPDF instead of uploading every part of the
+book to Gemini, which is left with the steps that need it, such as the JSON structuring and the translation.
+Headings are told apart from the body text by their font size, or by being short bold lines of the body size,
+and their levels follow the sizes. Pages are extracted in parallel across a process pool, each worker opening
+the book once for a contiguous range of pages and each page extracted once even if it belongs to several parts,
+and the parts are then assembled in order. A report compares the extracted
+files with the existing ones.
+"""
+
+from search import normalize
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import NamedTuple
+import os
+import re
+
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Pages of every life path in "The Life You Were Born to Live", both ends included, starting from 0
+PAGE_RANGE_TO_LIFE_PATHS = {
+    (130, 136): [(19, 10)],
+    (136, 142): [(28, 10)],
+    (142, 148): [(37, 10)],
+    (148, 153): [(46, 10)],
+    (154, 161): [(29, 11)],
+    (161, 167): [(38, 11)],
+    (167, 173): [(47, 11)],
+    (174, 180): [(20, 2)],
+    (181, 188): [(39, 12)],
+    (188, 194): [(48, 12)],
+    (195, 202): [(30, 3)],
+    (202, 207): [(21, 3), (12, 3)],
+    (209, 215): [(40, 4)],
+    (215, 221): [(22, 4)],
+    (221, 228): [(31, 4), (13, 4)],
+    (229, 236): [(32, 5), (23, 5)],
+    (236, 242): [(41, 5), (14, 5)],
+    (243, 249): [(15, 6)],
+    (249, 256): [(24, 6), (42, 6)],
+    (256, 263): [(33, 6)],
+    (264, 269): [(16, 7)],
+    (269, 276): [(25, 7)],
+    (276, 282): [(34, 7), (43, 7)],
+    (283, 289): [(17, 8)],
+    (289, 296): [(26, 8)],
+    (296, 303): [(35, 8)],
+    (303, 309): [(44, 8)],
+    (310, 316): [(18, 9)],
+    (316, 323): [(27, 9)],
+    (323, 331): [(36, 9)],
+    (331, 338): [(45, 9)],
+}
+
+# Pages of the introduction and of every digit of every place in "Human Pin Code", the end excluded
+DIGITS_TO_PAGE_RANGE: dict[int, dict[int | str, tuple[int, int]]] = {
+    1: {
+        "initial": (59, 61),
+        1: (61, 65),
+        2: (65, 67),
+        3: (67, 69),
+        4: (69, 71),
+        5: (71, 73),
+        6: (73, 76),
+        7: (76, 78),
+        8: (78, 80),
+        9: (80, 83),
+    },
+    2: {
+        "initial": (85, 87),
+        1: (87, 89),
+        2: (89, 91),
+        3: (91, 93),
+        4: (93, 96),
+        5: (98, 101),
+        6: (101, 103),
+        7: (103, 105),
+        8: (105, 107),
+        9: (107, 109),
+    },
+    3: {
+        "initial": (111, 112),
+        1: (112, 115),
+        2: (115, 117),
+        3: (117, 119),
+        4: (119, 122),
+        5: (122, 124),
+        6: (124, 126),
+        7: (126, 129),
+        8: (129, 131),
+        9: (131, 133),
+    },
+    4: {
+        "initial": (135, 136),
+        1: (136, 138),
+        2: (138, 140),
+        3: (140, 142),
+        4: (142, 144),
+        5: (144, 146),
+        6: (146, 148),
+        7: (148, 150),
+        8: (150, 152),
+        9: (152, 155),
+    },
+    5: {
+        "initial": (157, 159),
+        1: (159, 161),
+        2: (161, 163),
+        3: (163, 165),
+        4: (165, 167),
+        5: (167, 169),
+        6: (169, 171),
+        7: (171, 173),
+        8: (173, 175),
+        9: (175, 177),
+    },
+    6: {
+        "initial": (180, 182),
+        1: (182, 184),
+        2: (184, 186),
+        3: (186, 188),
+        4: (188, 191),
+        5: (191, 193),
+        6: (193, 195),
+        7: (195, 198),
+        8: (198, 201),
+        9: (201, 203),
+    },
+    7: {
+        "initial": (204, 205),
+        1: (205, 207),
+        2: (207, 209),
+        3: (209, 211),
+        4: (211, 213),
+        5: (213, 214),
+        6: (214, 216),
+        7: (216, 218),
+        8: (218, 220),
+        9: (220, 222),
+    },
+    8: {
+        "initial": (224, 226),
+        1: (226, 228),
+        2: (228, 230),
+        3: (230, 232),
+        4: (232, 234),
+        5: (234, 236),
+        6: (236, 238),
+        7: (238, 240),
+        8: (240, 242),
+        9: (242, 244),
+    },
+    9: {
+        "initial": (246, 247),
+        1: (247, 248),
+        2: (248, 249),
+        3: (249, 250),
+        4: (250, 251),
+        5: (251, 252),
+        6: (252, 253),
+        7: (253, 254),
+        8: (254, 255),
+        9: (255, 256),
+    },
+}
+
+# Pages of every Markdown file extracted from the books, by the name of the file without its extension
+BOOK_PARTS: dict[str, dict[str, range]] = {
+    "millman": {
+        f"{initial}_{final}": range(start, end + 1)
+        for (start, end), life_paths in PAGE_RANGE_TO_LIFE_PATHS.items()
+        for initial, final in life_paths
+    },
+    "forbes": {
+        f"{place}_{digit}": range(start, end)
+        for place, digits in DIGITS_TO_PAGE_RANGE.items()
+        for digit, (start, end) in digits.items()
+    },
+}
+
+# Minimum font size of a heading relative to the body text
+HEADING_SIZE_RATIO = 1.15
+
+# Number of heading levels, starting from "##" as in the existing files
+HEADING_LEVELS = 3
+
+# Maximum length of a line taken for a heading
+MAX_HEADING_LENGTH = 100
+
+# Flag of PyMuPDF marking bold spans
+BOLD_FLAG = 16
+
+_BULLET_PATTERN = re.compile(r"^(?:[•●▪■◦‣∙*–-]|(\d+)[.)])\s+")
+
+_PAGE_NUMBER_PATTERN = re.compile(r"^\d{1,4}$")
+
+_SENTENCE_END_PATTERN = re.compile(r"[.!?:…\"”’)]$")
+
+_MARKDOWN_PATTERN = re.compile(r"^(?:#+|\*|\d+\.)\s+|\*\*|__", re.MULTILINE)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class Line(NamedTuple):
+    """
+    A line of text of a page.
+
+    Attributes:
+        text: The text of the line, stripped.
+        size: The font size of the line, rounded to tenths of a point.
+        bold: Whether every span of the line is bold.
+        block: The number of the block of the line on its page, the lines of a paragraph share it.
+    """
+
+    text: str
+    size: float
+    bold: bool
+    block: int
+
+
+def page_lines(page: dict) -> list[Line]:
+    """
+    Reads the lines of a page from its text dictionary, dropping the page numbers.
+
+    Args:
+        page: The result of `page.get_text("dict")` of PyMuPDF.
+
+    Returns:
+        The lines of the page in reading order.
+    """
+
+    lines = []
+    for number, block in enumerate(page["blocks"]):
+        # Image blocks have no lines
+        for line in block.get("lines", []):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            text = " ".join("".join(span["text"] for span in line["spans"]).split())
+            if not spans or _PAGE_NUMBER_PATTERN.match(text):
+                continue
+
+            # The size of the line is the size of most of its text
+            sizes: Counter[float] = Counter()
+            for span in spans:
+                sizes[round(span["size"], 1)] += len(span["text"])
+
+            bold = all(span["flags"] & BOLD_FLAG or "bold" in span["font"].lower() for span in spans)
+            lines.append(Line(text, sizes.most_common(1)[0][0], bold, number))
+
+    return lines
+
+
+def extract_pages(path: str, numbers: list[int]) -> list[list[Line]]:
+    """
+    Extracts the lines of the given pages of a PDF, run in the worker processes.
+
+    Args:
+        path: The path to the PDF.
+        numbers: The numbers of the pages, starting from 0.
+
+    Returns:
+        The lines of every page, in the order of the numbers.
+
+    Raises:
+        RuntimeError: If PyMuPDF is not installed.
+    """
+
+    if pymupdf is None:
+        raise RuntimeError("PyMuPDF is not installed")
+
+    with pymupdf.open(path) as document:
+        return [page_lines(document[number].get_text("dict", sort=True)) for number in numbers]
+
+
+def split_pages(numbers: list[int], count: int) -> list[list[int]]:
+    """
+    Splits the page numbers into contiguous ranges of about the same length, one per worker.
+
+    Args:
+        numbers: The sorted page numbers.
+        count: The maximum number of ranges.
+
+    Returns:
+        The ranges, in order, none of them empty.
+    """
+
+    size = -(-len(numbers) // max(count, 1))
+
+    return [numbers[start : start + size] for start in range(0, len(numbers), size)] if numbers else []
+
+
+def _heading_sizes(pages: list[list[Line]]) -> tuple[float, dict[float, int]]:
+    # The body size is the size of most of the text, larger sizes are heading levels from the largest
+    sizes: Counter[float] = Counter()
+    for line in (line for lines in pages for line in lines):
+        sizes[line.size] += len(line.text)
+
+    if not sizes:
+        return 0.0, {}
+
+    body = sizes.most_common(1)[0][0]
+    headings = sorted((size for size in sizes if size >= body * HEADING_SIZE_RATIO), reverse=True)
+
+    return body, {size: min(level, HEADING_LEVELS - 1) for level, size in enumerate(headings)}
+
+
+def _join(text: str, line: str) -> str:
+    # Words hyphenated at the end of a line are joined back
+    if text.endswith("-") and line[:1].islower():
+        return text[:-1] + line
+
+    return f"{text} {line}"
+
+
+def _is_bullet(kind: int | str) -> bool:
+    return isinstance(kind, str) and kind != ""
+
+
+def _classify(line: Line, body: float, levels: dict[float, int]) -> tuple[int | str, str]:
+    # The heading level, the marker of a bullet or "" for the body text, and the text without the marker
+    if len(line.text) <= MAX_HEADING_LENGTH:
+        if line.size in levels:
+            return levels[line.size], line.text
+        if line.bold and line.size == body and not line.text.endswith((".", ",", ";")):
+            return min(len(levels), HEADING_LEVELS - 1), line.text
+
+    if match := _BULLET_PATTERN.match(line.text):
+        return f"{match.group(1)}." if match.group(1) else "*", line.text[match.end() :]
+
+    return "", line.text
+
+
+def _continues(element: list, kind: int | str, text: str, origin: tuple[int, int]) -> bool:
+    # Whether the line goes on with the element before it
+    last_kind, last_text, last_origin = element
+    if kind == "" and last_kind == "" and last_origin[0] == origin[0] - 1:
+        # A paragraph cut at the end of the previous page
+        return not _SENTENCE_END_PATTERN.search(last_text) and text[:1].islower()
+
+    if last_origin != origin:
+        return False
+
+    # The next line of a paragraph or a heading, or of a bullet, which has no marker of its own
+    return (kind == "" and not isinstance(last_kind, int)) or (isinstance(kind, int) and kind == last_kind)
+
+
+def lines_to_markdown(pages: list[list[Line]]) -> str:
+    """
+    Assembles the lines of consecutive pages into Markdown.
+
+    Headings are the lines of a larger font than the body text, or short bold lines of the body size, one level
+    below the smallest larger font. Lines of the same block are joined into paragraphs, and a paragraph cut at the
+    end of a page goes on with the first line of the next page.
+
+    Args:
+        pages: The lines of every page, in order.
+
+    Returns:
+        The Markdown text.
+    """
+
+    body, levels = _heading_sizes(pages)
+
+    # The kind, text and origin, i.e. the page and block, of every heading, bullet and paragraph
+    elements: list[list] = []
+    for page, lines in enumerate(pages):
+        for line in lines:
+            kind, text = _classify(line, body, levels)
+            if elements and _continues(elements[-1], kind, text, (page, line.block)):
+                elements[-1][1] = _join(elements[-1][1], text)
+                elements[-1][2] = (page, line.block)
+            else:
+                elements.append([kind, text, (page, line.block)])
+
+    markdown = []
+    for number, (kind, text, _) in enumerate(elements):
+        if isinstance(kind, int):
+            element = f"{'#' * (kind + 2)} {text}"
+        else:
+            element = f"{kind} {text}" if kind else text
+
+        # The items of a list are not separated by blank lines
+        if number and not (_is_bullet(kind) and _is_bullet(elements[number - 1][0])):
+            markdown.append("")
+        markdown.append(element)
+
+    return "\n".join(markdown) + "\n" if markdown else ""
+
+
+def extract_book(
+    book: Path, parts: dict[str, range], output: Path, workers: int | None = None
+) -> dict[str, Path]:
+    """
+    Extracts the parts of a book into Markdown files, extracting the pages in parallel.
+
+    Args:
+        book: The path to the PDF of the book.
+        parts: The pages of every part, by the name of its file without the extension, see `BOOK_PARTS`.
+        output: The directory to write the files to.
+        workers: The number of worker processes. Defaults to None, which uses one per CPU.
+
+    Returns:
+        The path of every written file, by the name of its part.
+
+    Raises:
+        RuntimeError: If PyMuPDF is not installed.
+    """
+
+    if pymupdf is None:
+        raise RuntimeError("PyMuPDF is not installed")
+
+    # The parts sharing a page, e.g. two life paths of the same chapter, extract it only once
+    numbers = sorted({number for pages in parts.values() for number in pages})
+    # Opening and parsing the book costs more than a page, so every worker opens it once for a range of pages
+    ranges = split_pages(numbers, workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max(len(ranges), 1)) as executor:
+        extracted = executor.map(extract_pages, [str(book)] * len(ranges), ranges)
+        lines = {number: page for batch, pages in zip(ranges, extracted) for number, page in zip(batch, pages)}
+
+    output.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, pages in parts.items():
+        paths[name] = output / f"{name}.md"
+        paths[name].write_text(lines_to_markdown([lines[number] for number in pages]), encoding="UTF-8")
+
+    return paths
+
+
+class Comparison(NamedTuple):
+    """
+    How an extracted Markdown file compares with the existing one.
+
+    Attributes:
+        name: The name of the file without its extension.
+        similarity: The similarity of their words, from 0 to 1.
+        words: The number of words of the extracted file and of the existing one.
+        headings: The number of headings of the extracted file and of the existing one.
+        bullets: The number of bullets of the extracted file and of the existing one.
+    """
+
+    name: str
+    similarity: float
+    words: tuple[int, int]
+    headings: tuple[int, int]
+    bullets: tuple[int, int]
+
+
+def _words(markdown: str) -> list[str]:
+    return [normalize(word) for word in _WORD_PATTERN.findall(_MARKDOWN_PATTERN.sub("", markdown))]
+
+
+def _count(markdown: str, prefixes: tuple[str, ...]) -> int:
+    return sum(1 for line in markdown.splitlines() if line.startswith(prefixes))
+
+
+def compare_markdown(name: str, extracted: str, existing: str) -> Comparison:
+    """
+    Compares an extracted Markdown file with the existing one.
+    """
+
+    extracted_words = _words(extracted)
+    existing_words = _words(existing)
+
+    return Comparison(
+        name,
+        SequenceMatcher(None, extracted_words, existing_words).ratio(),
+        (len(extracted_words), len(existing_words)),
+        (_count(extracted, ("#",)), _count(existing, ("#",))),
+        (_count(extracted, ("* ", "- ")), _count(existing, ("* ", "- "))),
+    )
+
+
+def compare_directories(extracted: Path, existing: Path) -> list[Comparison]:
+    """
+    Compares the Markdown files of two directories that have the same name.
+    """
+
+    return [
+        compare_markdown(
+            path.stem,
+            path.read_text(encoding="UTF-8"),
+            (existing / path.name).read_text(encoding="UTF-8"),
+        )
+        for path in sorted(extracted.glob("*.md"))
+        if (existing / path.name).is_file()
+    ]
+
+
+def render_report(comparisons: Iterable[Comparison]) -> str:
+    """
+    Renders the comparisons as a Markdown table, from the least similar file, followed by their mean similarity.
+    """
+
+    comparisons = sorted(comparisons, key=lambda comparison: comparison.similarity)
+    rows = [
+        "| File | Similarity | Words | Headings | Bullets |",
+        "| --- | ---: | ---: | ---: | ---: |",
+    ]
+    for comparison in comparisons:
+        rows.append(
+            f"| {comparison.name} | {comparison.similarity:.1%} "
+            + "".join(f"| {extracted} / {existing} " for extracted, existing in comparison[2:])
+            + "|"
+        )
+
+    if comparisons:
+        mean = sum(comparison.similarity for comparison in comparisons) / len(comparisons)
+        rows.append(f"\nMean similarity of {len(comparisons)} files: {mean:.1%} (extracted / existing)")
+
+    return "\n".join(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Extracts the books into Markdown files locally and compares them with the existing files.",
+        epilog="Contact: @Seymapro",
+    )
+
+    # Define command-line arguments
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = subparsers.add_parser("extract", help="extract the parts of a book into Markdown files")
+    extract_parser.add_argument("book_name", choices=sorted(BOOK_PARTS), help="which book it is")
+    extract_parser.add_argument("book", type=Path, help="path to the PDF of the book")
+    extract_parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        type=Path,
+        help="directory to write the Markdown files to",
+        dest="output",
+    )
+    extract_parser.add_argument(
+        "-w",
+        "--workers",
+        default=None,
+        type=int,
+        help="number of worker processes, one per CPU by default",
+        dest="workers",
+    )
+    extract_parser.add_argument(
+        "-c",
+        "--compare",
+        default=None,
+        type=Path,
+        help="directory of the existing Markdown files to report the differences with",
+        dest="compare",
+    )
+
+    diff_parser = subparsers.add_parser("diff", help="report the differences of two directories of Markdown files")
+    diff_parser.add_argument("extracted", type=Path, help="directory of the extracted Markdown files")
+    diff_parser.add_argument("existing", type=Path, help="directory of the existing Markdown files")
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        start = time.perf_counter()
+        paths = extract_book(args.book, BOOK_PARTS[args.book_name], args.output, args.workers)
+        print(f"{len(paths)} files have been written to {args.output} in {time.perf_counter() - start:.1f} seconds")
+
+        if args.compare is not None:
+            print(render_report(compare_directories(args.output, args.compare)))
+    else:
+        print(render_report(compare_directories(args.extracted, args.existing)))
@@ -0,0 +1,188 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the section-wise fan-out of long paraphrases.
+
+Instead of paraphrasing a whole reading in a single long call, every section is paraphrased on its own,
+concurrently, with an output budget in proportion to its length. The sections are yielded back in their
+original order as soon as every section before them is ready, so the first ones can be sent while the others
+are still being written. A section that fails or takes too long is replaced by its original text, the others
+are not affected. Paraphrased sections are cached by their text, since every reading is made of the same few
+dozen sections.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from paraphraser import CHARACTERS_PER_TOKEN
+from views import format_headings
+from tracing import span
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from typing import NamedTuple
+import asyncio
+import logging
+import re
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of sections paraphrased at once, shared by every user
+MAX_CONCURRENT_SECTIONS = 4
+
+# Seconds a section is waited for before its original text is used instead
+SECTION_TIMEOUT = 60.0
+
+# Output budget of a section relative to the tokens of its original text, a paraphrase is rarely much longer
+SECTION_BUDGET_RATIO = 1.5
+
+# Bounds of the output budget of a section, in tokens
+MIN_SECTION_TOKENS = 256
+MAX_SECTION_TOKENS = 2048
+
+# Maximum number of paraphrased sections kept
+SECTION_CACHE_SIZE = 256
+
+_BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+
+
+class Section(NamedTuple):
+    """
+    A section of a reading, paraphrased or not.
+
+    Attributes:
+        position: The position of the section in the reading, starting from 0.
+        content: The content of the section, ready to be sent.
+        paraphrased: Whether the content is a paraphrase, or the original text after a failure.
+    """
+
+    position: int
+    content: str
+    paraphrased: bool
+
+
+def section_budget(section: str) -> int:
+    """
+    Returns the output budget of a section in tokens.
+    """
+
+    tokens = len(section) / CHARACTERS_PER_TOKEN * SECTION_BUDGET_RATIO
+
+    return max(MIN_SECTION_TOKENS, min(int(tokens), MAX_SECTION_TOKENS))
+
+
+def render_static_section(section: str) -> str:
+    """
+    Renders the original Markdown text of a section, shown when its paraphrase fails.
+    """
+
+    return _BOLD_PATTERN.sub(r"<b>\1</b>", format_headings(section.strip()))
+
+
+class SectionFanout:
+    """
+    Paraphrases the sections of readings concurrently, at most a fixed number at once across every reading.
+    """
+
+    def __init__(
+        self,
+        paraphrase: Callable[[str, int], str],
+        max_concurrent: int = MAX_CONCURRENT_SECTIONS,
+        timeout: float = SECTION_TIMEOUT,
+        cache_size: int = SECTION_CACHE_SIZE,
+        metrics: Metrics = default_metrics,
+    ):
+        """
+        Args:
+            paraphrase: Paraphrases a section within an output budget in tokens, called in a worker thread.
+            max_concurrent: The maximum number of sections paraphrased at once. Defaults to `MAX_CONCURRENT_SECTIONS`.
+            timeout: The seconds a section is waited for. Defaults to `SECTION_TIMEOUT`.
+            cache_size: The maximum number of paraphrased sections kept. Defaults to `SECTION_CACHE_SIZE`.
+            metrics: The registry counting the paraphrased and failed sections. Defaults to the registry of the bot.
+        """
+
+        self.paraphrase = paraphrase
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.metrics = metrics
+
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+    async def stream(self, sections: list[str]) -> AsyncIterator[Section]:
+        """
+        Paraphrases the sections concurrently and yields them in their original order.
+
+        The sections still running are cancelled if the caller stops iterating.
+
+        Args:
+            sections: The original Markdown texts of the sections.
+
+        Yields:
+            The sections, each one as soon as it and every section before it are ready.
+        """
+
+        tasks = [asyncio.create_task(self._section(position, section)) for position, section in enumerate(sections)]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _section(self, position: int, section: str) -> Section:
+        if (cached := self._cache.get(section)) is not None:
+            self._cache.move_to_end(section)
+            self.metrics.increment("fanout.cached")
+
+            return Section(position, cached, True)
+
+        await self._slots.acquire()
+        thread = asyncio.ensure_future(asyncio.to_thread(self.paraphrase, section, section_budget(section)))
+        # The thread cannot be stopped, the slot stays taken until it ends even if the section stopped waiting
+        thread.add_done_callback(self._release)
+
+        try:
+            with span("fanout.section", position=position):
+                content = await asyncio.wait_for(asyncio.shield(thread), self.timeout)
+        except Exception as err:
+            # Only this section falls back to its original text, the reading goes on
+            logger.warning("Paraphrasing section %d failed, sending its original text: %r", position, err)
+            self.metrics.increment("fanout.fallback")
+
+            return Section(position, render_static_section(section), False)
+
+        self.metrics.increment("fanout.paraphrased")
+
+        self._cache[section] = content
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return Section(position, content, True)
+
+    def _release(self, thread: "asyncio.Future[str]") -> None:
+        self._slots.release()
+
+        # The failure of a section that was not waited for anymore was already replaced by its original text
+        if not thread.cancelled():
+            thread.exception()
@@ -0,0 +1,113 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the tracking of the requests each user has in flight.
+
+Impatient users tap a button again while its view is still being sent. A tap on a view the user is already
+waiting for is dropped instead of sending the view twice, and a tap on another view can cancel the views the
+user is still waiting for, since they moved on. Renders shared through the prefetcher keep running regardless,
+only the sending is cancelled.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from collections.abc import Callable, Coroutine, Hashable
+from typing import Any
+import asyncio
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+
+class InFlightRequests:
+    """
+    Runs the requests of every user, dropping the duplicates of requests still running.
+    """
+
+    def __init__(self, cancel_superseded: bool = True, metrics: Metrics = default_metrics):
+        """
+        Args:
+            cancel_superseded: Whether a new request of a user cancels their other requests still running.
+                Defaults to True.
+            metrics: The registry counting the dropped and cancelled requests. Defaults to the registry of the bot.
+        """
+
+        self.cancel_superseded = cancel_superseded
+        self.metrics = metrics
+
+        self._running: dict[int, dict[Hashable, asyncio.Task[None]]] = {}
+
+    def is_running(self, user_id: int, key: Hashable) -> bool:
+        """
+        Returns whether the user has a request with the given key running.
+        """
+
+        return key in self._running.get(user_id, {})
+
+    async def run(self, user_id: int, key: Hashable, request: Callable[[], Coroutine[Any, Any, None]]) -> bool:
+        """
+        Runs a request of a user unless the same request of theirs is still running.
+
+        The request runs in its own task, so that cancelling it does not cancel the caller.
+
+        Args:
+            user_id: The id of the user.
+            key: What identifies the request, e.g. the view and the birthdate it shows.
+            request: Starts the request.
+
+        Returns:
+            False if the request was dropped as a duplicate, True once it finished or was cancelled by a newer one.
+
+        Raises:
+            Exception: Whatever the request raised.
+        """
+
+        running = self._running.setdefault(user_id, {})
+        if key in running:
+            self.metrics.increment("inflight.duplicate")
+
+            return False
+
+        if self.cancel_superseded:
+            for task in running.values():
+                if task.cancel():
+                    self.metrics.increment("inflight.superseded")
+
+            # Forgotten right away, so the same request can be made again while they are winding down
+            running.clear()
+
+        task = asyncio.create_task(request())
+        running[key] = task
+        try:
+            await asyncio.wait({task})
+        finally:
+            # The caller itself may be cancelled while waiting
+            task.cancel()
+            if running.get(key) is task:
+                del running[key]
+            if not running and self._running.get(user_id) is running:
+                del self._running[user_id]
+
+        if not task.cancelled():
+            task.result()
+
+        return True
@@ -0,0 +1,236 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides a precomputed cache of the answers to inline queries.
+"""
+
+from the_life import birthdate_to_life_path
+from pin_code import get_pin_code
+from zodiac import Zodiac
+from content import ContentStore
+from views import create_json_summary, format_headings, load_json
+from datetime import datetime
+from typing import NamedTuple
+import copy
+import re
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Telegram rejects inline results whose message text is longer than this many characters
+INLINE_TEXT_LIMIT = 4096
+
+# Maximum length of the description shown under the title of an inline result
+INLINE_DESCRIPTION_LIMIT = 120
+
+_BOLD_PATTERN = re.compile(r"\*\*(.+?)\*\*")
+_BULLET_PATTERN = re.compile(r"^\s*[*-]\s+")
+
+_LIFE_PATH_KEY_PATTERN = re.compile(r"millman/tr/JSONs/(\d+)_(\d+)\.json")
+_PIN_SECTION_KEY_PATTERN = re.compile(r"forbes/tr/Summarizations/([1-9])_([1-9])\.md")
+_ENNEAGRAM_KEY_PATTERN = re.compile(r"enneagram/tip(\d+)\.md")
+
+
+class InlineAnswer(NamedTuple):
+    """
+    A single article answering an inline query.
+    """
+
+    id: str
+    title: str
+    description: str
+    text: str
+
+
+def truncate(content: str, limit: int) -> str:
+    """
+    Truncates the content to the given length, preferably at a line break.
+
+    Args:
+        content: The content to truncate.
+        limit: The maximum length of the result.
+
+    Returns:
+        The content itself if it fits, otherwise its longest prefix ending at a line break followed by an ellipsis.
+
+    Example:
+        >>> truncate("first line\\nsecond line", 15)
+        'first line\\n…'
+    """
+
+    if len(content) <= limit:
+        return content
+
+    cut = content.rfind("\n", 0, limit - 1)
+    if cut <= 0:
+        cut = limit - 1
+
+    return content[:cut].rstrip() + "\n…"
+
+
+def first_line(content: str) -> str:
+    """
+    Returns the first non-empty line of the content without Markdown decorations.
+
+    Args:
+        content: The Markdown content.
+
+    Returns:
+        The first line with leading `#`, `*` and `-` characters and bold markers removed.
+    """
+
+    for line in content.splitlines():
+        line = line.strip().lstrip("#*- ").replace("**", "").strip()
+        if line:
+            return line
+
+    return ""
+
+
+class InlineAnswerCache:
+    """
+    Precomputes the inline answers for every life path, pin code digit and enneagram type.
+
+    Answering a query only looks these up and joins them, so no file is read while answering.
+    """
+
+    def __init__(self, store: ContentStore):
+        """
+        Loads and renders every answer from the content store.
+
+        Args:
+            store: The content store to read from.
+        """
+
+        self.life_paths: dict[tuple[int, int], InlineAnswer] = {}
+        self.pin_sections: dict[tuple[int, int], str] = {}
+        self.enneagram_types: dict[int, str] = {}
+
+        for key in store.keys():
+            self._load(store, key)
+
+    def updated(self, store: ContentStore, keys: set[str]) -> "InlineAnswerCache":
+        """
+        Returns a new cache with the answers of the given entries rendered again, leaving this one as it is.
+
+        Args:
+            store: The content store to read from.
+            keys: The keys of the changed entries. The answers of those missing from the store are removed.
+
+        Returns:
+            The new cache, sharing the unchanged answers with this one.
+        """
+
+        cache = copy.copy(self)
+        cache.life_paths = dict(self.life_paths)
+        cache.pin_sections = dict(self.pin_sections)
+        cache.enneagram_types = dict(self.enneagram_types)
+
+        for key in keys:
+            cache._load(store, key)
+
+        return cache
+
+    def _load(self, store: ContentStore, key: str) -> None:
+        if match := _LIFE_PATH_KEY_PATTERN.fullmatch(key):
+            life_path = (int(match[1]), int(match[2]))
+            try:
+                summary_json = load_json(life_path, store)
+            except FileNotFoundError:
+                self.life_paths.pop(life_path, None)
+                return
+
+            self.life_paths[life_path] = InlineAnswer(
+                f"life_path:{life_path[0]}_{life_path[1]}",
+                f"Hayat Sayısı: {life_path[0]}/{life_path[1]}",
+                truncate(summary_json["key_traits"][0] if summary_json["key_traits"] else "", INLINE_DESCRIPTION_LIMIT),
+                truncate(
+                    f"<b><u>HAYAT SAYISI</b></u>: {life_path[0]}/{life_path[1]}\n\n"
+                    + create_json_summary(summary_json, "key_traits")
+                    + create_json_summary(summary_json, "challenges"),
+                    INLINE_TEXT_LIMIT,
+                ).strip(),
+            )
+        elif match := _PIN_SECTION_KEY_PATTERN.fullmatch(key):
+            # Every digit of a pin code is described by the heading and the first bullet point of its summary
+            position, digit = int(match[1]), int(match[2])
+            try:
+                lines = [line for line in store.read_text(key).splitlines() if line.strip()]
+            except FileNotFoundError:
+                self.pin_sections.pop((position, digit), None)
+                return
+
+            heading = first_line(lines[0]).removesuffix("- Özet").strip() if lines else f"{position}. Hane"
+            bulletpoint = _BOLD_PATTERN.sub(r"<b>\1</b>", _BULLET_PATTERN.sub("", lines[1]).strip()) if len(lines) > 1 else ""
+
+            self.pin_sections[(position, digit)] = f"<b><u>{heading}</b></u>\n{bulletpoint}"
+        elif match := _ENNEAGRAM_KEY_PATTERN.fullmatch(key):
+            try:
+                self.enneagram_types[int(match[1])] = format_headings(store.read_text(key).strip())
+            except FileNotFoundError:
+                self.enneagram_types.pop(int(match[1]), None)
+
+    def answers(self, birthdate: datetime) -> list[InlineAnswer]:
+        """
+        Returns the life path, pin code and zodiac sign articles of the given birthdate.
+
+        Args:
+            birthdate: The birthdate the query asked for.
+
+        Returns:
+            The articles, skipping those whose content is not available.
+        """
+
+        answers: list[InlineAnswer] = []
+
+        life_path = birthdate_to_life_path(birthdate)
+        if life_path in self.life_paths:
+            answers.append(self.life_paths[life_path])
+
+        pin_code = get_pin_code(birthdate)
+        pin_code_str = "".join(map(str, pin_code))
+        sections = [self.pin_sections[section] for section in enumerate(pin_code, start=1) if section in self.pin_sections]
+        if sections:
+            answers.append(
+                InlineAnswer(
+                    f"pin_code:{pin_code_str}",
+                    f"Pin Kodu: {pin_code_str}",
+                    f"Yaşam amacı: {pin_code[-1]}",
+                    truncate(f"<b><u>PİN KODU</b></u>: {pin_code_str}\n\n" + "\n\n".join(sections), INLINE_TEXT_LIMIT),
+                )
+            )
+
+        zodiac_sign = Zodiac(birthdate)
+        header = (
+            f"<b><u>BURÇ</b></u>: {zodiac_sign.sign}\n<b><u>BURCUN ENNEAGRAM DEĞERİ</b></u>: {zodiac_sign.enneagram}"
+        )
+        answers.append(
+            InlineAnswer(
+                f"zodiac:{zodiac_sign.sign}",
+                f"Burç: {zodiac_sign.sign}",
+                f"Enneagram tipi: {zodiac_sign.enneagram}",
+                truncate(f"{header}\n\n{self.enneagram_types.get(zodiac_sign.enneagram, '')}".strip(), INLINE_TEXT_LIMIT),
+            )
+        )
+
+        return answers
@@ -0,0 +1,79 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the counters the bot keeps about its own behaviour, e.g. prefetch hits and misses.
+"""
+
+from collections import Counter
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+
+class Metrics:
+    """
+    A registry of named counters.
+
+    Names are dotted paths, e.g. `prefetch.hit` or `prefetch.summary_millman.miss`, so related counters can be
+    summed by their prefix.
+    """
+
+    def __init__(self) -> None:
+        self.counters: Counter[str] = Counter()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Adds the amount to the named counter.
+
+        Args:
+            name: The name of the counter.
+            amount: The amount to add. Defaults to 1.
+        """
+
+        self.counters[name] += amount
+
+    def get(self, name: str) -> int:
+        return self.counters[name]
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """
+        Returns the numerator counter divided by the sum of both counters, e.g. the hit rate from the hits and misses.
+
+        Returns:
+            The ratio, or 0.0 if both counters are zero.
+        """
+
+        total = self.counters[numerator] + self.counters[denominator]
+
+        return self.counters[numerator] / total if total else 0.0
+
+    def render(self) -> str:
+        """
+        Returns every counter on its own line, sorted by name.
+        """
+
+        return "\n".join(f"{name}: {value}" for name, value in sorted(self.counters.items()))
+
+
+# Registry shared by the whole bot
+metrics = Metrics()
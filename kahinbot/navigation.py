@@ -0,0 +1,183 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the layout of the reading menu and decides how the messages of a view are sent.
+
+In the classic mode, every view is sent as new messages followed by a new menu. In the edit-in-place mode,
+the menu message the user pressed a button of is kept and edited instead: the view is shown inside the menu
+message itself, and only the part of a long view that does not fit is sent below it, without repeating the menu.
+The pages of a paginated view are turned by editing the message showing them in both modes.
+"""
+
+from the_life import birthdate_to_life_path
+from pin_code import get_pin_code
+from zodiac import Zodiac
+from callbacks import View
+from datetime import datetime
+from typing import NamedTuple
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Maximum length of a Telegram message
+MESSAGE_LENGTH_LIMIT = 4096
+
+# Buttons of the reading menu, one per row
+MENU_ITEMS = (
+    ("Tam Metin (Millman)", View.FULL_TEXT_MILLMAN),
+    ("Tam Metin (Forbes)", View.FULL_TEXT_FORBES),
+    ("Özet (Millman)", View.SUMMARY_MILLMAN),
+    ("Özet (Forbes)", View.SUMMARY_FORBES),
+    ("Kısa Maddeler (Millman)", View.JSON_SHORT_MILLMAN),
+    ("Uzun Maddeler (Millman)", View.JSON_LONG_MILLMAN),
+    ("Enneagram Özellikleri", View.ZODIAC_TRAITS),
+    ("İndir (PDF)", View.EXPORT_PDF),
+)
+
+# Marks the button of the view shown in the menu message in the edit-in-place mode
+ACTIVE_MARKER = "▸ "
+
+# Labels of the buttons turning the pages of a paginated view
+PREVIOUS_PAGE_LABEL = "◀"
+NEXT_PAGE_LABEL = "▶"
+
+
+class ViewUpdate(NamedTuple):
+    """
+    The messages to send and edit to show a view.
+
+    Attributes:
+        edit: The new text of the message the button was pressed on, or None to leave it as it is.
+        messages: The new messages to send, in order.
+        send_menu: Whether to send a new menu message after the messages.
+    """
+
+    edit: str | None
+    messages: list[str]
+    send_menu: bool
+
+
+def split_message(content: str, limit: int = MESSAGE_LENGTH_LIMIT) -> list[str]:
+    """
+    Splits the content into messages at paragraph boundaries.
+
+    Args:
+        content: The content to split.
+        limit: The maximum length of a message. Defaults to Telegram's limit.
+
+    Returns:
+        The messages, without the empty ones.
+    """
+
+    messages = []
+
+    message = ""
+    for part in content.split("\n\n"):
+        if len(message) + len(part) + 2 > limit:
+            messages.append(message.strip())
+            message = ""
+        message += f"\n\n{part}"
+
+    if not message.isspace():
+        messages.append(message.strip())
+
+    return [message for message in messages if message]
+
+
+def menu_header(birthdate: datetime) -> str:
+    """
+    Returns the header of the reading menu, with the life path, pin code, zodiac sign and enneagram type.
+    """
+
+    # Everything is recomputed from the birthdate, the buttons carry it so no session has to be kept
+    life_path = birthdate_to_life_path(birthdate)
+    pin_code = get_pin_code(birthdate)
+    zodiac_sign = Zodiac(birthdate)
+
+    return (
+        f"<b><u>HAYAT SAYISI</b></u>: {life_path[0]}/{life_path[1]}\n"
+        + f"<b><u>PİN KODU</b></u>: {''.join(map(str, pin_code))}\n"
+        + f"<b><u>BURÇ</b></u>: {zodiac_sign.sign}\n"
+        + f"<b><u>BURCUN ENNEAGRAM DEĞERİ</b></u>: {zodiac_sign.enneagram}"
+    )
+
+
+def menu_items(active: View | None = None) -> list[tuple[str, View]]:
+    """
+    Returns the label and view of every button of the reading menu, marking the active view.
+    """
+
+    return [(f"{ACTIVE_MARKER}{label}" if view == active else label, view) for label, view in MENU_ITEMS]
+
+
+def page_items(page: int, count: int) -> list[tuple[str, int]]:
+    """
+    Returns the label and page of the buttons turning the pages of a view, leaving out those past its ends.
+
+    Args:
+        page: The page shown, starting from 0.
+        count: The number of pages of the view.
+    """
+
+    items = []
+    if page > 0:
+        items.append((PREVIOUS_PAGE_LABEL, page - 1))
+    if page < count - 1:
+        items.append((NEXT_PAGE_LABEL, page + 1))
+
+    return items
+
+
+def plan_view_update(
+    content: str, birthdate: datetime, view: View, edit_in_place: bool, final: bool = True, in_place: bool = False
+) -> ViewUpdate:
+    """
+    Decides how a view is shown.
+
+    Args:
+        content: The rendered view.
+        birthdate: The birthdate the view belongs to.
+        view: The view, marked as active in the edit-in-place mode.
+        edit_in_place: Whether the menu message is edited instead of sending a new menu.
+        final: Whether this is the last update of the view, e.g. not a "please wait" notice. Defaults to True.
+        in_place: Whether the button was pressed on a message showing the view alone, i.e. a page turn in the
+            classic mode, which is edited to show the content. Defaults to False.
+
+    Returns:
+        The messages to send and edit.
+    """
+
+    if in_place and not edit_in_place:
+        return ViewUpdate(content, [], False)
+
+    if not edit_in_place:
+        return ViewUpdate(None, split_message(content), final)
+
+    # The menu message holds as much of the view as fits after the header, the rest follows it as new messages
+    header = menu_header(birthdate)
+    messages = split_message(content, MESSAGE_LENGTH_LIMIT - len(header) - 2)
+    if not messages or len(header) + 2 + len(messages[0]) > MESSAGE_LENGTH_LIMIT:
+        # Nothing to show, or a single paragraph too long to fit next to the header
+        return ViewUpdate(header, split_message(content), False)
+
+    return ViewUpdate(f"{header}\n\n{messages[0]}", split_message("\n\n".join(messages[1:])), False)
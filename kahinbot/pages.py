@@ -0,0 +1,277 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the page boundaries of the long readings and renders them one page at a time.
+
+The full texts are split into pages at paragraph boundaries, so that a page still fits in a Telegram message
+once its headings are formatted and the reading menu header and page buttons are added. The boundaries are
+byte offsets into the raw content, computed when the bundle is built and stored in it, so serving a page only
+formats the bytes of that page.
+"""
+
+from navigation import MESSAGE_LENGTH_LIMIT
+from views import format_headings
+from tracing import traced
+from typing import TYPE_CHECKING
+import json
+import logging
+import re
+
+if TYPE_CHECKING:
+    from content import ContentStore
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Key of the page index entry in a bundle
+PAGE_INDEX_KEY = "_pages/index.json"
+
+# Maximum length of a formatted page, leaving room for the menu header and the page footer
+PAGE_LENGTH_LIMIT = MESSAGE_LENGTH_LIMIT - 512
+
+# Paginated documents, mapped to whether the line after each of their headings is joined to it when formatted
+PAGED_KEY_PATTERNS = {
+    re.compile(r"millman/tr/MDs/\d+_\d+\.md"): True,
+    re.compile(r"forbes/tr/MDs/\d_(\d|initial)\.md"): False,
+}
+
+# Separators the documents are split at, from the preferred to the last resort, some documents have CRLF line breaks
+_SEPARATORS = (re.compile(rb"\r?\n[ \t]*\r?\n"), re.compile(rb"\n"), re.compile(rb" "))
+
+
+def _is_paged(key: str) -> bool:
+    return any(pattern.fullmatch(key) for pattern in PAGED_KEY_PATTERNS)
+
+
+def _join_next_line(key: str) -> bool:
+    for pattern, join_next_line in PAGED_KEY_PATTERNS.items():
+        if pattern.fullmatch(key):
+            return join_next_line
+
+    raise KeyError(f"{key} is not a paginated document")
+
+
+def format_page(key: str, content: bytes | memoryview) -> str:
+    """
+    Formats a part of a paginated document.
+
+    Args:
+        key: The content key of the document.
+        content: The raw bytes of the part.
+
+    Returns:
+        The part with its headings formatted.
+    """
+
+    # The line break keeps a heading at the very end formatted like the others
+    return format_headings(str(content, "UTF-8").strip() + "\n", join_next_line=_join_next_line(key)).strip()
+
+
+def _is_heading(content: bytes) -> bool:
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+
+    return bool(lines) and all(line.startswith(b"#") for line in lines)
+
+
+def _segments(key: str, content: bytes, start: int, end: int, limit: int, level: int = 0) -> list[tuple[int, int]]:
+    # Splits the range at the separator of the given level, splitting the parts that are still too long further
+    separator = _SEPARATORS[level] if level < len(_SEPARATORS) else None
+
+    if separator is None:
+        # A single word longer than a page, cut at the last character boundary that fits
+        segments = []
+        while end - start > limit:
+            cut = start + limit
+            while cut > start and (content[cut] & 0xC0) == 0x80:
+                cut -= 1
+            segments.append((start, cut))
+            start = cut
+        return [*segments, (start, end)]
+
+    segments = []
+    position = start
+    while position < end:
+        match = separator.search(content, position, end)
+        part_end = end if match is None else match.end()
+
+        if len(format_page(key, content[position:part_end])) > limit:
+            segments.extend(_segments(key, content, position, part_end, limit, level + 1))
+        else:
+            segments.append((position, part_end))
+        position = part_end
+
+    return segments
+
+
+def paginate(key: str, content: bytes, limit: int = PAGE_LENGTH_LIMIT) -> list[tuple[int, int]]:
+    """
+    Computes the page boundaries of a document.
+
+    Paragraphs are packed into pages while the formatted page fits the limit. Paragraphs longer than a page are
+    split at line breaks, then at spaces.
+
+    Args:
+        key: The content key of the document.
+        content: The raw bytes of the document.
+        limit: The maximum length of a formatted page. Defaults to `PAGE_LENGTH_LIMIT`.
+
+    Returns:
+        The start and end byte offsets of every page, at least one.
+    """
+
+    segments: list[tuple[int, int]] = []
+    for start, end in _segments(key, content, 0, len(content), limit):
+        # Headings are kept together with the paragraph after them
+        if segments and _is_heading(content[segments[-1][0] : segments[-1][1]]):
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    pages: list[tuple[int, int]] = []
+    for start, end in segments:
+        if pages and len(format_page(key, content[pages[-1][0] : end])) <= limit:
+            pages[-1] = (pages[-1][0], end)
+        else:
+            pages.append((start, end))
+
+    return pages or [(0, len(content))]
+
+
+def build_page_index(store: "ContentStore") -> dict[str, list[tuple[int, int]]]:
+    """
+    Computes the page boundaries of every paginated document of the store.
+
+    Args:
+        store: The store to read the documents from.
+
+    Returns:
+        The page boundaries of every paginated document, by key.
+    """
+
+    return {
+        key: paginate(key, bytes(store.get(key)))
+        for key in store.keys()
+        if _is_paged(key)
+    }
+
+
+def page_index_to_json(pages: dict[str, list[tuple[int, int]]]) -> bytes:
+    return json.dumps(pages, separators=(",", ":")).encode("UTF-8")
+
+
+class PageIndex:
+    """
+    Serves the pages of readings made of one or more paginated documents, e.g. the nine Forbes sections of a pin code.
+    """
+
+    def __init__(self, pages: dict[str, list[tuple[int, int]]]):
+        """
+        Args:
+            pages: The page boundaries of every paginated document, by key.
+        """
+
+        self.pages = pages
+
+    @classmethod
+    def load(cls, store: "ContentStore") -> "PageIndex":
+        """
+        Loads the page index stored in a bundle, computing it if the store has none, e.g. a data directory.
+
+        Args:
+            store: The store holding the documents.
+
+        Returns:
+            The page index of the store.
+        """
+
+        try:
+            pages = json.loads(bytes(store.get(PAGE_INDEX_KEY)))
+        except FileNotFoundError:
+            logger.info("The content store has no page index, computing it")
+
+            return cls(build_page_index(store))
+
+        return cls({key: [(start, end) for start, end in boundaries] for key, boundaries in pages.items()})
+
+    def updated(self, store: "ContentStore", keys: set[str]) -> "PageIndex":
+        """
+        Returns a new page index with the pages of the given documents computed again, leaving this one as it is.
+
+        Args:
+            store: The store holding the documents.
+            keys: The keys of the changed entries. The pages of those missing from the store are removed.
+
+        Returns:
+            The new page index, sharing the unchanged pages with this one.
+        """
+
+        pages = dict(self.pages)
+        for key in filter(_is_paged, keys):
+            try:
+                pages[key] = paginate(key, bytes(store.get(key)))
+            except FileNotFoundError:
+                pages.pop(key, None)
+
+        return PageIndex(pages)
+
+    def count(self, keys: list[str]) -> int:
+        """
+        Returns the number of pages of the reading made of the given documents.
+        """
+
+        return sum(len(self.pages[key]) for key in keys)
+
+    @traced()
+    def render_page(self, keys: list[str], page: int, store: "ContentStore") -> str:
+        """
+        Formats a single page of the reading made of the given documents, in order.
+
+        Args:
+            keys: The content keys of the documents.
+            page: The page number, starting from 0. Pages past the end render the last page.
+            store: The store holding the documents.
+
+        Returns:
+            The formatted page, followed by the page number if the reading has more than one page.
+
+        Raises:
+            FileNotFoundError: If a document is missing from the page index or the store.
+        """
+
+        try:
+            pages = [(key, start, end) for key in keys for start, end in self.pages[key]]
+        except KeyError as err:
+            raise FileNotFoundError(f"No page index for {err.args[0]}") from None
+
+        page = max(0, min(page, len(pages) - 1))
+        key, start, end = pages[page]
+
+        content = store.get(key)
+        formatted = format_page(key, content[start:end])
+
+        if len(pages) == 1:
+            return formatted
+
+        return f"{formatted}\n\n<i>Sayfa {page + 1}/{len(pages)}</i>"
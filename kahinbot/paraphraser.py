@@ -21,18 +21,44 @@
 # SOFTWARE.
 
 """
-This module provides a function for paraphrasing Turkish text using Google Gemini Pro.
+This module provides the summarizers paraphrasing Turkish text, and a function paraphrasing with the summarizer of
+the bot.
+
+Every summarizer has the same interface: Google Gemini Pro, an offline extractive summarizer picking the most
+central sentences of the text, and a stub with a configurable latency and failure rate for tests and benchmarks.
 """
 
+from metrics import Metrics, metrics as default_metrics
+from search import tokenize
+from tracing import traced
+from collections import Counter, defaultdict
+from typing import Protocol
+import logging
+import math
 import os
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import random
+import re
+import threading
+import time
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
 
 __author__ = "Seymapro"
 __version__ = "1.0.0"
 
-# Configure the Google Gemini API with the API key from environment variables
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+logger = logging.getLogger(__name__)
+
+# Names of the summarizers accepted by `open_summarizer`, "auto" picks Gemini when it is available
+SUMMARIZER_NAMES = ("auto", "gemini", "extractive", "stub")
+
+# Name of the summarizer used by `paraphrase`
+SUMMARIZER_NAME = os.environ.get("KAHIN_BOT_SUMMARIZER", "auto")
+
+# Name of the Gemini model paraphrasing the text
+GEMINI_MODEL = "gemini-1.5-pro"
 
 # Define generation configuration for the Gemini model
 generation_config: dict[str, int | float | str] = {
@@ -43,37 +69,397 @@ generation_config: dict[str, int | float | str] = {
     "response_mime_type": "text/plain",  # Response format (plain text)
 }
 
-# Initialize the Google Gemini Pro model with specific safety settings
-model = genai.GenerativeModel(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
-    model_name="gemini-1.5-pro",
-    generation_config=generation_config,
-    safety_settings={
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-    },
-    # System instruction to guide the model's behavior
-    system_instruction="You are a professional paraphraser specialized in Turkish language. Paraphrase the given text to a more natural-sounding and expressive version. Do not use Markdown, use only plain text.",
-)
+# System instruction to guide the model's behavior
+SYSTEM_INSTRUCTION = "You are a professional paraphraser specialized in Turkish language. Paraphrase the given text to a more natural-sounding and expressive version. Do not use Markdown, use only plain text."
+
+# Rough number of characters of Turkish text per token
+CHARACTERS_PER_TOKEN = 3
+
+# Share of the sentences of a text kept by the extractive summarizer
+SUMMARY_RATIO = 0.4
+
+# Minimum number of sentences kept by the extractive summarizer, if the text has that many
+MIN_SUMMARY_SENTENCES = 3
+
+# Probability of following a similarity edge instead of jumping to a random sentence in TextRank
+DAMPING = 0.85
+
+# Maximum number of iterations of TextRank, and the change of the scores at which it stops earlier
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?…])\s+")
+
+_BULLET_PATTERN = re.compile(r"^[*+-]\s+(?:\*\*[^*]+\*\*\s*)?")
+
+_EMPHASIS_PATTERN = re.compile(r"\*\*|__")
+
+
+class Summarizer(Protocol):
+    """
+    Interface shared by every summarizer.
+    """
+
+    @property
+    def name(self) -> str:
+        """The name of the summarizer, one of `SUMMARIZER_NAMES`."""
+        ...
+
+    def paraphrase(self, content: str, max_output_tokens: int | None = None) -> str:
+        """Paraphrases the Turkish text in plain text, in at most `max_output_tokens` tokens if given."""
+        ...
 
 
-def paraphrase(content: str) -> str:
+class GeminiSummarizer:
+    """
+    Paraphrases text with Google Gemini Pro.
     """
-    Paraphrases the given Turkish text using Google Gemini Pro.
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = GEMINI_MODEL):
+        """
+        Args:
+            api_key: The Gemini API key.
+            model_name: The name of the model. Defaults to `GEMINI_MODEL`.
+
+        Raises:
+            RuntimeError: If `google-generativeai` is not installed.
+        """
+
+        if genai is None:
+            raise RuntimeError("google-generativeai is not installed")
+
+        from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+        # Configure the Google Gemini API with the API key
+        genai.configure(api_key=api_key)  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+
+        # Initialize the Google Gemini Pro model with specific safety settings
+        self.model = genai.GenerativeModel(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+            model_name=model_name,
+            generation_config=generation_config,
+            safety_settings={
+                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+            },
+            system_instruction=SYSTEM_INSTRUCTION,
+        )
+
+    @traced("gemini.paraphrase")
+    def paraphrase(self, content: str, max_output_tokens: int | None = None) -> str:
+        """
+        Paraphrases the given Turkish text using Google Gemini Pro.
+
+        Args:
+            content: The Turkish text to be paraphrased.
+            max_output_tokens: The maximum number of tokens of the paraphrase. Defaults to None, which uses the
+                limit of `generation_config`.
+
+        Returns:
+            The paraphrased version of the input text.
+        """
+
+        # Start a new chat session with the Gemini model
+        chat_session = self.model.start_chat(history=[])  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+
+        # Send the input text to the model and get the response
+        response = chat_session.send_message(  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+            content,
+            generation_config=None if max_output_tokens is None else {"max_output_tokens": max_output_tokens},
+        )
+
+        # Return the paraphrased text from the model's response
+        return response.text  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+
+
+def split_sentences(content: str) -> tuple[str | None, list[str]]:
+    """
+    Splits a Markdown text into its title and the plain text of its sentences.
+
+    The labels of the bullets, e.g. `* **Öneri:**`, are dropped, as are the headings after the first line.
 
     Args:
-        content: The Turkish text to be paraphrased.
+        content: The Markdown text.
 
     Returns:
-        The paraphrased version of the input text.
+        The text of the heading on the first line if there is one, and the sentences in their order in the text.
+    """
+
+    title = None
+    sentences = []
+    for number, line in enumerate(content.strip().splitlines()):
+        line = line.strip()
+        if line.startswith("#"):
+            if number == 0:
+                title = _EMPHASIS_PATTERN.sub("", line.lstrip("#")).strip()
+            continue
+
+        line = _EMPHASIS_PATTERN.sub("", _BULLET_PATTERN.sub("", line)).strip()
+        sentences.extend(sentence for sentence in _SENTENCE_PATTERN.split(line) if sentence)
+
+    return title, sentences
+
+
+def _similarities(sentences: list[str]) -> list[dict[int, float]]:
+    # Cosine similarities of the TF-IDF vectors of the sentences, only between sentences sharing a term
+    counts = [Counter(term for term, _ in tokenize(sentence)) for sentence in sentences]
+    frequencies = Counter(term for terms in counts for term in terms)
+
+    postings: defaultdict[str, list[tuple[int, float]]] = defaultdict(list)
+    for number, terms in enumerate(counts):
+        weights = {term: count * math.log(len(sentences) / frequencies[term] + 1) for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        for term, weight in weights.items():
+            postings[term].append((number, weight / norm))
+
+    edges: list[dict[int, float]] = [defaultdict(float) for _ in sentences]
+    for posting in postings.values():
+        for position, (first, first_weight) in enumerate(posting):
+            for second, second_weight in posting[position + 1 :]:
+                edges[first][second] += first_weight * second_weight
+                edges[second][first] += first_weight * second_weight
+
+    return edges
+
+
+def rank_sentences(sentences: list[str]) -> list[float]:
+    """
+    Scores the centrality of the sentences of a text with TextRank over their TF-IDF cosine similarities.
+
+    Args:
+        sentences: The sentences of the text.
+
+    Returns:
+        The score of every sentence, summing to 1.
+    """
+
+    count = len(sentences)
+    if count == 0:
+        return []
+
+    edges = _similarities(sentences)
+    totals = [sum(neighbours.values()) for neighbours in edges]
+
+    scores = [1 / count] * count
+    for _ in range(MAX_ITERATIONS):
+        # The score of a sentence without any similar sentence is spread evenly, as a random jump
+        dangling = sum(score for score, total in zip(scores, totals) if total == 0) / count
+        updated = [
+            (1 - DAMPING) / count
+            + DAMPING * (dangling + sum(scores[other] * weight / totals[other] for other, weight in edges[number].items()))
+            for number in range(count)
+        ]
+
+        change = sum(abs(new - old) for new, old in zip(updated, scores))
+        scores = updated
+        if change < TOLERANCE:
+            break
+
+    return scores
+
+
+class ExtractiveSummarizer:
+    """
+    Summarizes text offline by keeping its most central sentences, in their original order.
+    """
+
+    name = "extractive"
+
+    def __init__(self, ratio: float = SUMMARY_RATIO, min_sentences: int = MIN_SUMMARY_SENTENCES):
+        """
+        Args:
+            ratio: The share of the sentences kept. Defaults to `SUMMARY_RATIO`.
+            min_sentences: The minimum number of sentences kept. Defaults to `MIN_SUMMARY_SENTENCES`.
+        """
+
+        self.ratio = ratio
+        self.min_sentences = min_sentences
+
+    @traced("extractive.paraphrase")
+    def paraphrase(self, content: str, max_output_tokens: int | None = None) -> str:
+        """
+        Summarizes the given Turkish text with its most central sentences.
+
+        Args:
+            content: The Markdown text to be summarized.
+            max_output_tokens: The maximum number of tokens of the summary, estimated from its length. At least one
+                sentence is kept regardless. Defaults to None.
+
+        Returns:
+            The title of the text on its own line if it has one, followed by the kept sentences in plain text.
+        """
+
+        title, sentences = split_sentences(content)
+        scores = rank_sentences(sentences)
+
+        limit = math.inf if max_output_tokens is None else max_output_tokens * CHARACTERS_PER_TOKEN
+        length = 0 if title is None else len(title) + 1
+        wanted = max(self.min_sentences, math.ceil(len(sentences) * self.ratio))
+
+        kept: list[int] = []
+        for number in sorted(range(len(sentences)), key=lambda number: -scores[number])[:wanted]:
+            if kept and length + len(sentences[number]) + 1 > limit:
+                continue
+
+            kept.append(number)
+            length += len(sentences[number]) + 1
+
+        summary = " ".join(sentences[number] for number in sorted(kept))
+
+        return summary if title is None else f"{title}\n{summary}"
+
+
+class StubSummarizer:
+    """
+    Returns the text as it is after a configurable delay, failing at a configurable rate.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self, latency: float = 0.0, latency_per_token: float = 0.0, failure_rate: float = 0.0, seed: int | None = None
+    ):
+        """
+        Args:
+            latency: The seconds every call takes. Defaults to 0.
+            latency_per_token: The seconds added per token of the output, as a model generating it would. Defaults to 0.
+            failure_rate: The probability of a call raising `RuntimeError` after its delay. Defaults to 0.
+            seed: The seed of the failures, for reproducible runs. Defaults to None.
+        """
+
+        self.latency = latency
+        self.latency_per_token = latency_per_token
+        self.failure_rate = failure_rate
+
+        self._random = random.Random(seed)
+
+    @traced("stub.paraphrase")
+    def paraphrase(self, content: str, max_output_tokens: int | None = None) -> str:
+        """
+        Returns the given text, cut to `max_output_tokens` tokens if given.
+        """
+
+        if max_output_tokens is not None:
+            content = content[: max_output_tokens * CHARACTERS_PER_TOKEN]
+
+        failed = self._random.random() < self.failure_rate
+        time.sleep(self.latency + self.latency_per_token * len(content) / CHARACTERS_PER_TOKEN)
+        if failed:
+            raise RuntimeError("Simulated summarizer failure")
+
+        return content
+
+
+class FallbackSummarizer:
     """
+    Paraphrases with a summarizer, falling back to another one for the calls it fails.
+    """
+
+    def __init__(self, primary: Summarizer, fallback: Summarizer, metrics: Metrics = default_metrics):
+        """
+        Args:
+            primary: The summarizer tried first.
+            fallback: The summarizer used when the primary one raises.
+            metrics: The registry counting the fallbacks. Defaults to the registry of the bot.
+        """
 
-    # Start a new chat session with the Gemini model
-    chat_session = model.start_chat(history=[])  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+        self.primary = primary
+        self.fallback = fallback
+        self.metrics = metrics
+
+    @property
+    def name(self) -> str:
+        return self.primary.name
+
+    def paraphrase(self, content: str, max_output_tokens: int | None = None) -> str:
+        try:
+            return self.primary.paraphrase(content, max_output_tokens)
+        except Exception as err:
+            logger.warning("The %s summarizer failed, using the %s one: %r", self.primary.name, self.fallback.name, err)
+            self.metrics.increment("summarizer.fallback")
+
+            return self.fallback.paraphrase(content, max_output_tokens)
+
+
+def open_summarizer(name: str = "auto") -> Summarizer:
+    """
+    Opens a summarizer by name.
+
+    Args:
+        name: One of `SUMMARIZER_NAMES`. "auto" uses Gemini if it is installed and `GEMINI_API_KEY` is set, with the
+            extractive summarizer for the calls it fails, and the extractive summarizer alone otherwise.
+            Defaults to "auto".
 
-    # Send the input text to the model and get the response
-    response = chat_session.send_message(content)  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    Returns:
+        The summarizer.
+
+    Raises:
+        ValueError: If the name is unknown.
+        KeyError: If Gemini is asked for and `GEMINI_API_KEY` is not set.
+        RuntimeError: If Gemini is asked for and `google-generativeai` is not installed.
+    """
+
+    if name == "gemini":
+        return GeminiSummarizer(os.environ["GEMINI_API_KEY"])
+    if name == "extractive":
+        return ExtractiveSummarizer()
+    if name == "stub":
+        return StubSummarizer()
+    if name != "auto":
+        raise ValueError(f"Unknown summarizer {name!r}, expected one of {', '.join(SUMMARIZER_NAMES)}")
+
+    if genai is None or not os.environ.get("GEMINI_API_KEY"):
+        logger.warning("Gemini is not available, summarizing with the extractive summarizer")
+
+        return ExtractiveSummarizer()
+
+    return FallbackSummarizer(GeminiSummarizer(os.environ["GEMINI_API_KEY"]), ExtractiveSummarizer())
+
+
+_summarizer: Summarizer | None = None
+
+_summarizer_lock = threading.Lock()
+
+
+def get_summarizer() -> Summarizer:
+    """
+    Returns the summarizer used by `paraphrase`, opening the one named by `SUMMARIZER_NAME` on the first call.
+    """
+
+    global _summarizer
+
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = open_summarizer(SUMMARIZER_NAME)
+
+        return _summarizer
+
+
+def set_summarizer(summarizer: Summarizer) -> None:
+    """
+    Replaces the summarizer used by `paraphrase`.
+    """
+
+    global _summarizer
+
+    with _summarizer_lock:
+        _summarizer = summarizer
+
+
+def paraphrase(content: str, max_output_tokens: int | None = None) -> str:
+    """
+    Paraphrases the given Turkish text with the summarizer of the bot.
+
+    Args:
+        content: The Turkish text to be paraphrased.
+        max_output_tokens: The maximum number of tokens of the paraphrase. Defaults to None, which leaves the
+            length to the summarizer.
+
+    Returns:
+        The paraphrased version of the input text.
+    """
 
-    # Return the paraphrased text from the model's response
-    return response.text  # type: ignore[reportUnknownMemberType, reportUnknownVariableType]
+    return get_summarizer().paraphrase(content, max_output_tokens)
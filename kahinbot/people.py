@@ -0,0 +1,313 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides the reverse lookup from famous people to their Millman life paths.
+
+The `famous_people` lists of every Millman JSON, in every language, are normalized and deduplicated into a
+single table at build time. At runtime the names are loaded into a trie that answers prefix and fuzzy queries.
+"""
+
+from typing import TYPE_CHECKING, NamedTuple
+import json
+import re
+import unicodedata
+
+if TYPE_CHECKING:
+    from content import ContentStore
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Pattern of the content keys of the Millman JSONs, capturing the life path
+PEOPLE_KEY_PATTERN = re.compile(r"millman/\w+/JSONs(?:_Extended)?/(\d+)_(\d+)\.json")
+
+# Some entries are followed by a description, e.g. "Isaac Asimov, bilimkurgu ... yazardı."
+DESCRIPTION_PATTERN = re.compile(r",\s+(?!(?:Jr|Sr)\.?$)")
+
+# Titles that are not part of the name, in normalized form
+TITLES = frozenset(
+    ("president", "baskan", "sir", "dr", "king", "kral", "queen", "kralice", "pope", "papa", "prince", "prens",
+     "princess", "prenses", "saint", "st")
+)
+
+# Normalization of the Turkish letters that have no decomposition
+TURKISH_FOLD = str.maketrans({"ı": "i", "İ": "i", "I": "i"})
+
+# Maximum edit distance of fuzzy matches by the length of the query
+FUZZY_DISTANCES = ((4, 0), (8, 1))
+MAX_FUZZY_DISTANCE = 2
+
+
+class Person(NamedTuple):
+    """
+    A famous person, the normalized names they can be found by and the life paths listing them.
+    """
+
+    name: str
+    aliases: tuple[str, ...]
+    life_paths: tuple[tuple[int, int], ...]
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a name for matching by removing case, accents and punctuation.
+
+    Args:
+        name: The name to normalize.
+
+    Returns:
+        The lowercase ASCII words of the name separated by single spaces.
+
+    Example:
+        >>> normalize_name("Frédéric  Chopin")
+        'frederic chopin'
+    """
+
+    decomposed = unicodedata.normalize("NFKD", name.translate(TURKISH_FOLD))
+    ascii_name = "".join(character for character in decomposed if not unicodedata.combining(character)).lower()
+
+    return " ".join(re.findall(r"[a-z0-9]+", ascii_name))
+
+
+def clean_name(entry: str) -> str:
+    """
+    Returns the name of a `famous_people` entry without the description that some entries have.
+
+    Example:
+        >>> clean_name("William F. Buckley, Jr.")
+        'William F. Buckley, Jr.'
+        >>> clean_name("David Niven, şıklığı ve espri anlayışıyla tanınan ünlü bir İngiliz aktördü.")
+        'David Niven'
+    """
+
+    return DESCRIPTION_PATTERN.split(entry.strip(), maxsplit=1)[0]
+
+
+def aliases(name: str) -> list[str]:
+    """
+    Returns the normalized names a person can be found by.
+
+    The first alias is the name without its titles and its parenthesized part, which identifies the person. It is
+    followed by the name with its titles and the parenthesized part on its own, with and without its titles.
+
+    Example:
+        >>> aliases("President Bill Clinton")
+        ['bill clinton', 'president bill clinton']
+        >>> aliases("Theodore Geisel (Dr. Seuss)")
+        ['theodore geisel', 'seuss', 'dr seuss']
+    """
+
+    result = []
+    for part in (re.sub(r"\(.*?\)", " ", name), *re.findall(r"\((.*?)\)", name)):
+        words = normalize_name(part).split()
+        titled = " ".join(words)
+        while len(words) > 1 and words[0] in TITLES:
+            words = words[1:]
+
+        for alias in (" ".join(words), titled):
+            if alias and alias not in result:
+                result.append(alias)
+
+    return result
+
+
+def famous_people(store: "ContentStore") -> list[Person]:
+    """
+    Collects the famous people of every Millman JSON into a deduplicated table.
+
+    People are deduplicated by their name without titles, so "President Bill Clinton" and "Başkan Bill Clinton" are
+    the same person found by both names. Their name is taken from the first file listing them.
+
+    Args:
+        store: The store to read the JSONs from.
+
+    Returns:
+        Every famous person with the sorted life paths listing them, sorted by name.
+    """
+
+    people: dict[str, tuple[str, list[str], set[tuple[int, int]]]] = {}
+
+    for key in store.keys():
+        match = PEOPLE_KEY_PATTERN.fullmatch(key)
+        if match is None:
+            continue
+
+        life_path = (int(match[1]), int(match[2]))
+        for entry in json.loads(store.read_text(key)).get("famous_people", []):
+            name = clean_name(entry)
+            names = aliases(name)
+            if not names:
+                continue
+
+            _, person_aliases, life_paths = people.setdefault(names[0], (name, [], set()))
+            person_aliases.extend(alias for alias in names if alias not in person_aliases)
+            life_paths.add(life_path)
+
+    return sorted(
+        (
+            Person(name, tuple(person_aliases), tuple(sorted(life_paths)))
+            for name, person_aliases, life_paths in people.values()
+        ),
+        key=lambda person: normalize_name(person.name),
+    )
+
+
+class _TrieNode:
+    __slots__ = ("children", "people")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.people: list[int] = []
+
+
+class PeopleIndex:
+    """
+    Finds famous people by a prefix of any word of their names, or by a misspelling of their names.
+    """
+
+    def __init__(self, people: list[Person]):
+        """
+        Inserts every alias of every person into the trie, starting from each of its words.
+
+        Args:
+            people: The famous people, as returned by `famous_people`.
+        """
+
+        self.people = people
+        self.root = _TrieNode()
+
+        for person_id, person in enumerate(people):
+            for alias in person.aliases:
+                words = alias.split()
+                for start in range(len(words)):
+                    self._insert(" ".join(words[start:]), person_id)
+
+    def _insert(self, key: str, person_id: int) -> None:
+        node = self.root
+        for character in key:
+            node = node.children.setdefault(character, _TrieNode())
+
+        if person_id not in node.people:
+            node.people.append(person_id)
+
+    def _collect(self, node: _TrieNode, found: dict[int, int], depth: int) -> None:
+        stack = [(node, depth)]
+        while stack:
+            node, depth = stack.pop()
+            for person_id in node.people:
+                if person_id not in found or depth < found[person_id]:
+                    found[person_id] = depth
+            stack.extend((child, depth + 1) for child in node.children.values())
+
+    def prefix(self, query: str) -> list[Person]:
+        """
+        Returns the people having a word sequence of a name that starts with the query, closest matches first.
+        """
+
+        node = self.root
+        for character in normalize_name(query):
+            node = node.children.get(character)
+            if node is None:
+                return []
+
+        found: dict[int, int] = {}
+        self._collect(node, found, 0)
+
+        return [self.people[person_id] for person_id in sorted(found, key=lambda person_id: (found[person_id], person_id))]
+
+    def fuzzy(self, query: str, max_distance: int) -> list[Person]:
+        """
+        Returns the people having a word sequence of a name within the given edit distance of the query, closest
+        matches first. Insertions, deletions, substitutions and transpositions of adjacent letters cost 1 each.
+
+        The distance rows are computed while walking the trie, so shared prefixes are computed once and whole
+        subtrees are skipped as soon as every distance in a row exceeds the maximum.
+        """
+
+        query = normalize_name(query)
+        found: dict[int, int] = {}
+
+        first_row = list(range(len(query) + 1))
+        stack = [(child, character, first_row, first_row, "") for character, child in self.root.children.items()]
+        while stack:
+            node, character, previous_row, second_previous_row, previous_character = stack.pop()
+
+            row = [previous_row[0] + 1]
+            for column in range(1, len(query) + 1):
+                distance = min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (query[column - 1] != character),
+                )
+                if column > 1 and query[column - 1] == previous_character and query[column - 2] == character:
+                    distance = min(distance, second_previous_row[column - 2] + 1)
+                row.append(distance)
+
+            if row[-1] <= max_distance:
+                for person_id in node.people:
+                    if person_id not in found or row[-1] < found[person_id]:
+                        found[person_id] = row[-1]
+
+            if min(row) <= max_distance:
+                stack.extend(
+                    (child, next_character, row, previous_row, character)
+                    for next_character, child in node.children.items()
+                )
+
+        return [self.people[person_id] for person_id in sorted(found, key=lambda person_id: (found[person_id], person_id))]
+
+    def search(self, query: str, limit: int = 5) -> list[Person]:
+        """
+        Finds people by prefix, falling back to fuzzy matching if no name starts with the query.
+
+        Args:
+            query: A name or the start of a name.
+            limit: The maximum number of people returned. Defaults to 5.
+
+        Returns:
+            The matching people, best first.
+        """
+
+        if not normalize_name(query):
+            return []
+
+        if people := self.prefix(query):
+            return people[:limit]
+
+        length = len(normalize_name(query))
+        max_distance = next((distance for bound, distance in FUZZY_DISTANCES if length <= bound), MAX_FUZZY_DISTANCE)
+        if max_distance == 0:
+            return []
+
+        return self.fuzzy(query, max_distance)[:limit]
+
+
+def people_to_json(people: list[Person]) -> bytes:
+    return json.dumps([list(person) for person in people], ensure_ascii=False).encode("UTF-8")
+
+
+def people_from_json(content: bytes | memoryview) -> list[Person]:
+    return [
+        Person(name, tuple(person_aliases), tuple((number, digit) for number, digit in life_paths))
+        for name, person_aliases, life_paths in json.loads(bytes(content))
+    ]
@@ -20,6 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from tracing import traced
 from datetime import datetime
 from pathlib import Path
 
@@ -52,6 +53,7 @@ def downgrade_number(number: int) -> int:
     return number
 
 
+@traced()
 def get_pin_code(birthdate: datetime) -> list[int]:
     """
     Generates a pin code based on the given birthdate.
@@ -109,6 +111,7 @@ def get_pin_code(birthdate: datetime) -> list[int]:
     return pin_code
 
 
+@traced()
 def pin_code_to_contents(pin_code: list[int], content_dir: Path) -> list[str]:
     """
     Retrieves content based on the pin code from specified markdown files.
@@ -0,0 +1,324 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides speculative prefetching of the views of a birthdate.
+
+As soon as a birthdate arrives, the views the user is likely to open are rendered in the background and kept
+in a bounded cache shared by every user, keyed by what the view depends on (e.g. the life path), so a click is
+answered from what was already prepared. Expensive views such as the paraphrased summaries can be prefetched
+too, at a lower priority: at most a few of them run at once and those that have not started yet are cancelled
+when the user leaves, i.e. sends another birthdate or does not click anything for a while. Paginated views are
+cached page by page, only their first page is prefetched.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from callbacks import View
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from datetime import datetime
+from itertools import product
+from typing import NamedTuple
+import asyncio
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# The view, what it depends on and the page of a cached render
+_Key = tuple[View, Hashable, int]
+
+
+class PrefetchedView(NamedTuple):
+    """
+    How a view is rendered and cached.
+
+    Attributes:
+        key: Returns what the view depends on for a birthdate, views of birthdates with the same key are shared.
+        render: Renders the view for a birthdate, called in a worker thread. Paginated views also get the page, and
+            the views of a prefetcher with snapshots get the snapshot before the birthdate.
+        speculative: Whether the view is rendered as soon as a birthdate arrives.
+        expensive: Whether speculative renders wait for a free slot, so they never crowd out requested views.
+        paged: Whether the view is rendered one page at a time.
+        sources: Returns the content keys the view of a key is rendered from, so the cached renders can be dropped
+            when they change. Defaults to None, for views that are never dropped.
+    """
+
+    key: Callable[[datetime], Hashable]
+    render: Callable[..., str]
+    speculative: bool = True
+    expensive: bool = False
+    paged: bool = False
+    sources: Callable[[Hashable], list[str]] | None = None
+
+
+class Prefetcher:
+    """
+    Renders views ahead of the clicks asking for them and serves the clicks from the rendered views.
+    """
+
+    def __init__(
+        self,
+        views: dict[View, PrefetchedView],
+        metrics: Metrics = default_metrics,
+        capacity: int = 512,
+        ttl: float = 10 * 60,
+        max_expensive: int = 2,
+        snapshot: Callable[[], object] | None = None,
+    ):
+        """
+        Args:
+            views: How every cached view is rendered.
+            metrics: The registry counting the hits and misses. Defaults to the registry of the bot.
+            capacity: The maximum number of rendered views kept. Defaults to 512.
+            ttl: The seconds after which the waiting speculative renders of a user are cancelled. Defaults to 10 minutes.
+            max_expensive: The maximum number of expensive speculative renders running at once. Defaults to 2.
+            snapshot: Returns the current snapshot of the content, read when a render starts and passed to it.
+                Defaults to None, for views reading their content themselves.
+        """
+
+        self.views = views
+        self.metrics = metrics
+        self.capacity = capacity
+        self.ttl = ttl
+        self.snapshot = snapshot
+
+        self._entries: OrderedDict[_Key, asyncio.Task[str]] = OrderedDict()
+        self._waiting: set[_Key] = set()
+        self._owners: dict[_Key, set[int]] = {}
+        self._user_keys: dict[int, set[_Key]] = {}
+        self._expiries: dict[int, asyncio.TimerHandle] = {}
+        self._slots = asyncio.Semaphore(max_expensive)
+
+    def prefetch(self, user_id: int, birthdates: list[datetime]) -> None:
+        """
+        Starts rendering the speculative views of the birthdates in the background.
+
+        The waiting speculative renders of the birthdates the user sent before are cancelled, unless another user
+        is waiting for them too.
+
+        Args:
+            user_id: The id of the user who sent the birthdates.
+            birthdates: The birthdates to prefetch the views of.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        keys = set()
+        for (view, prefetched), birthdate in product(self.views.items(), birthdates):
+            if not prefetched.speculative:
+                continue
+
+            key = (view, prefetched.key(birthdate), 0)
+            keys.add(key)
+
+            if key not in self._entries:
+                if prefetched.expensive:
+                    self._waiting.add(key)
+                self._owners[key] = set()
+                self._store(key, loop.create_task(self._render(key, prefetched, birthdate, 0, speculative=True)))
+                self.metrics.increment("prefetch.started")
+
+            # Only renders nobody has asked for yet can be cancelled, they are the ones with owners
+            if key in self._owners:
+                self._owners[key].add(user_id)
+
+        self.cancel(user_id, keep=keys)
+        self._user_keys[user_id] = {key for key in keys if key in self._owners}
+        self._expiries[user_id] = loop.call_later(self.ttl, self.cancel, user_id)
+
+    def cancel(self, user_id: int, keep: set[_Key] | None = None) -> None:
+        """
+        Cancels the speculative renders of a user that have not started and nobody else is waiting for.
+
+        Args:
+            user_id: The id of the user.
+            keep: The renders not to cancel. Defaults to None.
+        """
+
+        if expiry := self._expiries.pop(user_id, None):
+            expiry.cancel()
+
+        for key in self._user_keys.pop(user_id, set()) - (keep or set()):
+            owners = self._owners.get(key)
+            if owners is None:
+                continue
+
+            owners.discard(user_id)
+            if owners:
+                continue
+
+            del self._owners[key]
+            if key in self._waiting:
+                self._entries[key].cancel()
+                self.metrics.increment("prefetch.cancelled")
+
+    def is_ready(self, view: View, birthdate: datetime, page: int = 0) -> bool:
+        """
+        Returns whether the view of the birthdate has already been rendered.
+        """
+
+        task = self._entries.get((view, self.views[view].key(birthdate), page))
+
+        return task is not None and task.done() and not task.cancelled() and task.exception() is None
+
+    async def get(self, view: View, birthdate: datetime, page: int = 0, snapshot: object = None) -> str:
+        """
+        Returns the view of the birthdate, waiting for its speculative render if it is running and rendering it
+        otherwise.
+
+        Args:
+            view: The view to return.
+            birthdate: The birthdate to return the view of.
+            page: The page to return, ignored by the views that are not paginated. Defaults to 0.
+            snapshot: The snapshot to render from on a miss, e.g. the one the caller counted the pages of. Defaults
+                to None, which renders from the current snapshot.
+
+        Returns:
+            The rendered view.
+        """
+
+        prefetched = self.views[view]
+        page = page if prefetched.paged else 0
+        key = (view, prefetched.key(birthdate), page)
+        name = view.name.lower()
+
+        task = self._entries.get(key)
+        if task is not None and key in self._waiting:
+            # Nothing was prepared yet, the click should not wait for the low priority slot
+            self._waiting.discard(key)
+            task.cancel()
+            task = None
+
+        if task is None:
+            self.metrics.increment("prefetch.miss")
+            self.metrics.increment(f"prefetch.{name}.miss")
+
+            task = asyncio.get_running_loop().create_task(
+                self._render(key, prefetched, birthdate, page, speculative=False, snapshot=snapshot)
+            )
+            self._store(key, task)
+        else:
+            self.metrics.increment("prefetch.hit")
+            self.metrics.increment(f"prefetch.{name}.hit")
+
+            self._entries.move_to_end(key)
+
+        # Someone is waiting for the render now, it must not be cancelled with the users who speculated on it
+        self._owners.pop(key, None)
+
+        # Shielded so cancelling one waiting handler does not cancel the render shared with the others
+        return await asyncio.shield(task)
+
+    def invalidate(self, keys: set[str]) -> int:
+        """
+        Drops the renders of the views whose content changed, so the next request renders them again.
+
+        Renders that are still waiting for a slot are kept, they will read the new content. Running renders are
+        dropped too but not cancelled, the requests waiting for them still get their result.
+
+        Args:
+            keys: The content keys of the changed entries.
+
+        Returns:
+            The number of dropped renders.
+        """
+
+        dropped = [
+            key
+            for key in self._entries
+            if key not in self._waiting
+            and (sources := self.views[key[0]].sources) is not None
+            and not keys.isdisjoint(sources(key[1]))
+        ]
+
+        for key in dropped:
+            del self._entries[key]
+            self._owners.pop(key, None)
+
+        self.metrics.increment("prefetch.invalidated", len(dropped))
+
+        return len(dropped)
+
+    def hit_rate(self, view: View | None = None) -> float:
+        """
+        Returns the share of the requested views that were served from a prefetched render.
+
+        Args:
+            view: The view to return the hit rate of. Defaults to None, which returns the hit rate of every view.
+        """
+
+        prefix = "prefetch" if view is None else f"prefetch.{view.name.lower()}"
+
+        return self.metrics.ratio(f"{prefix}.hit", f"{prefix}.miss")
+
+    async def _render(
+        self,
+        key: _Key,
+        prefetched: PrefetchedView,
+        birthdate: datetime,
+        page: int,
+        speculative: bool,
+        snapshot: object = None,
+    ) -> str:
+        if speculative and prefetched.expensive:
+            async with self._slots:
+                self._waiting.discard(key)
+
+                # Read once the slot is free, a render that waited for it sees the content reloaded meanwhile
+                arguments = self._arguments(prefetched, birthdate, page, snapshot)
+
+                return await asyncio.to_thread(prefetched.render, *arguments)
+
+        return await asyncio.to_thread(prefetched.render, *self._arguments(prefetched, birthdate, page, snapshot))
+
+    def _arguments(
+        self, prefetched: PrefetchedView, birthdate: datetime, page: int, snapshot: object
+    ) -> tuple[object, ...]:
+        arguments = (birthdate, page) if prefetched.paged else (birthdate,)
+
+        if self.snapshot is None:
+            return arguments
+
+        return (self.snapshot() if snapshot is None else snapshot, *arguments)
+
+    def _store(self, key: _Key, task: asyncio.Task[str]) -> None:
+        self._entries[key] = task
+        self._entries.move_to_end(key)
+        task.add_done_callback(lambda task: self._done(key, task))
+
+        # Only finished renders are evicted, the running ones are still awaited by someone
+        for old_key in [old_key for old_key, old_task in self._entries.items() if old_task.done()]:
+            if len(self._entries) <= self.capacity:
+                break
+            del self._entries[old_key]
+
+    def _done(self, key: _Key, task: asyncio.Task[str]) -> None:
+        # The render may have been replaced meanwhile, e.g. dropped because its content changed
+        if self._entries.get(key) is not task:
+            return
+
+        self._waiting.discard(key)
+        self._owners.pop(key, None)
+
+        # Failed renders are forgotten so the next request tries again
+        if task.cancelled() or task.exception() is not None:
+            del self._entries[key]
@@ -0,0 +1,384 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides hot reloading of the content when the files of the data directory change.
+
+The content is served from an in-memory snapshot, so the files can be edited while the bot runs. A watcher
+reports the keys of the files that changed, either through inotify on Linux or by polling their sizes and
+modification times. Only those entries are read again and only what was derived from them is rebuilt; the new
+snapshot then replaces the current one in a single assignment, with the next version number. Requests keep the
+snapshot they started with until they finish.
+
+Requires the optional `inotify_simple` package for inotify.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from content import CONTENT_PATTERNS, ENNEAGRAM_PREFIX, DirectoryStore
+from collections.abc import Callable
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Generic, TypeVar
+import asyncio
+import logging
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the data directory when inotify is not available
+POLL_INTERVAL = 2.0
+
+# Seconds a change waits for the ones following it, e.g. an editor writing a file in several steps
+DEBOUNCE_DELAY = 0.5
+
+Snapshot = TypeVar("Snapshot")
+
+
+class MemoryStore:
+    """
+    Holds every entry of a directory store in memory, so it does not change when the files do.
+    """
+
+    def __init__(self, entries: dict[str, bytes], version: str):
+        """
+        Args:
+            entries: The raw content of every entry, by key.
+            version: The version of the directory store the entries were read from.
+        """
+
+        self._entries = entries
+        self._keys = sorted(entries)
+        self._version = version
+
+    @classmethod
+    def load(cls, store: DirectoryStore) -> "MemoryStore":
+        """
+        Reads every entry of the directory store.
+        """
+
+        return cls({key: store.get(key) for key in store.keys()}, store.version)
+
+    def updated(self, store: DirectoryStore, keys: set[str]) -> "MemoryStore":
+        """
+        Returns a new snapshot with the given entries read again, leaving this one as it is.
+
+        Args:
+            store: The directory store of the current files.
+            keys: The keys of the changed entries. Those missing from the directory store are removed.
+
+        Returns:
+            The new snapshot, sharing the unchanged entries with this one.
+        """
+
+        entries = dict(self._entries)
+        for key in keys:
+            try:
+                entries[key] = store.get(key)
+            except FileNotFoundError:
+                entries.pop(key, None)
+
+        return MemoryStore(entries, store.version)
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def keys(self) -> list[str]:
+        return list(self._keys)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._entries[key]
+        except KeyError:
+            raise FileNotFoundError(f"No entry {key} in the content snapshot") from None
+
+    def read_text(self, key: str) -> str:
+        return self.get(key).decode("UTF-8")
+
+
+def content_key(path: Path, data_directory: Path, enneagram_directory: Path) -> str | None:
+    """
+    Returns the content key of a file, or None if the bot does not read it.
+
+    Args:
+        path: The path of the file.
+        data_directory: The path to the data directory.
+        enneagram_directory: The path to the directory containing the enneagram types.
+    """
+
+    if path.parent == enneagram_directory:
+        return ENNEAGRAM_PREFIX + path.name if fnmatchcase(path.name, "tip*.md") else None
+
+    try:
+        key = path.relative_to(data_directory).as_posix()
+    except ValueError:
+        return None
+
+    return key if any(fnmatchcase(key, pattern) for pattern in CONTENT_PATTERNS) else None
+
+
+class PollingWatcher:
+    """
+    Detects changed files by comparing the sizes and modification times of the content files at an interval.
+    """
+
+    def __init__(self, data_directory: Path, enneagram_directory: Path, interval: float = POLL_INTERVAL):
+        """
+        Args:
+            data_directory: The path to the data directory.
+            enneagram_directory: The path to the directory containing the enneagram types.
+            interval: The seconds between two scans. Defaults to `POLL_INTERVAL`.
+        """
+
+        self.data_directory = data_directory
+        self.enneagram_directory = enneagram_directory
+        self.interval = interval
+
+        self._stats = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        store = DirectoryStore(self.data_directory, self.enneagram_directory)
+
+        stats = {}
+        for key in store.keys():
+            try:
+                stat = store.path(key).stat()
+            except FileNotFoundError:
+                continue
+            stats[key] = (stat.st_size, stat.st_mtime_ns)
+
+        return stats
+
+    async def changes(self) -> set[str]:
+        """
+        Waits until content files are added, removed or modified.
+
+        Returns:
+            The keys of the changed files.
+        """
+
+        while True:
+            await asyncio.sleep(self.interval)
+
+            stats = await asyncio.to_thread(self._scan)
+            changed = {key for key in stats.keys() | self._stats.keys() if stats.get(key) != self._stats.get(key)}
+            self._stats = stats
+
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detects changed files through inotify events on the directories holding the content files.
+    """
+
+    def __init__(self, data_directory: Path, enneagram_directory: Path, delay: float = DEBOUNCE_DELAY):
+        """
+        Args:
+            data_directory: The path to the data directory.
+            enneagram_directory: The path to the directory containing the enneagram types.
+            delay: The seconds to wait for more events after the first one. Defaults to `DEBOUNCE_DELAY`.
+
+        Raises:
+            RuntimeError: If `inotify_simple` is not installed.
+        """
+
+        if inotify_simple is None:
+            raise RuntimeError("Watching with inotify requires the `inotify_simple` package, install it with `pip install inotify_simple`")
+
+        self.data_directory = data_directory
+        self.enneagram_directory = enneagram_directory
+        self.delay = delay
+
+        # Editors often replace a file with a renamed temporary one instead of writing it
+        mask = (
+            inotify_simple.flags.CLOSE_WRITE
+            | inotify_simple.flags.MOVED_TO
+            | inotify_simple.flags.MOVED_FROM
+            | inotify_simple.flags.DELETE
+            | inotify_simple.flags.CREATE
+        )
+
+        directories = {enneagram_directory}
+        for pattern in CONTENT_PATTERNS:
+            directories.update(data_directory.glob(pattern.rsplit("/", 1)[0]))
+
+        self._inotify = inotify_simple.INotify()
+        self._directories = {self._inotify.add_watch(directory, mask): directory for directory in directories}
+
+    def _read(self) -> set[str] | None:
+        # Returns None if the events were dropped, since any file may have changed then
+        changed: set[str] = set()
+        for event in self._inotify.read(timeout=1000, read_delay=int(self.delay * 1000)):
+            if event.mask & inotify_simple.flags.Q_OVERFLOW:  # type: ignore[reportOptionalMemberAccess]
+                return None
+
+            directory = self._directories.get(event.wd)
+            if directory is None or not event.name:
+                continue
+
+            if key := content_key(directory / event.name, self.data_directory, self.enneagram_directory):
+                changed.add(key)
+
+        return changed
+
+    async def changes(self) -> set[str]:
+        """
+        Waits until content files are added, removed or modified.
+
+        Returns:
+            The keys of the changed files.
+        """
+
+        while True:
+            changed = await asyncio.to_thread(self._read)
+            if changed is None:
+                logger.warning("Inotify dropped events, reloading every content file")
+
+                return set(DirectoryStore(self.data_directory, self.enneagram_directory).keys())
+
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+def open_watcher(
+    data_directory: Path, enneagram_directory: Path, interval: float = POLL_INTERVAL
+) -> InotifyWatcher | PollingWatcher:
+    """
+    Opens an inotify watcher if it is available, falling back to polling otherwise.
+
+    Args:
+        data_directory: The path to the data directory.
+        enneagram_directory: The path to the directory containing the enneagram types.
+        interval: The seconds between two scans when polling. Defaults to `POLL_INTERVAL`.
+
+    Returns:
+        The watcher of the content files.
+    """
+
+    if inotify_simple is not None:
+        try:
+            return InotifyWatcher(data_directory, enneagram_directory)
+        except OSError as err:
+            logger.warning("Inotify is not available (%s), polling the data directory instead", err)
+
+    return PollingWatcher(data_directory, enneagram_directory, interval)
+
+
+class ContentReloader(Generic[Snapshot]):
+    """
+    Keeps the current snapshot of everything derived from the content and replaces it when the content changes.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[Snapshot | None, set[str]], Snapshot],
+        on_reload: Callable[[set[str]], object] | None = None,
+        metrics: Metrics = default_metrics,
+        retire: Callable[[Snapshot, Snapshot], object] | None = None,
+    ):
+        """
+        Builds the first snapshot.
+
+        Args:
+            build: Builds a snapshot from the previous one and the keys of the changed entries, or from scratch
+                if there is no previous snapshot. It must not modify the previous snapshot, which may still be in use.
+            on_reload: Called with the keys of the changed entries once the new snapshot is in use, e.g. to drop
+                what was cached from the previous one. Defaults to None.
+            metrics: The registry counting the reloads. Defaults to the registry of the bot.
+            retire: Called with the replaced snapshot and the new one once the new one is in use, e.g. to close what
+                they do not share. Defaults to None.
+        """
+
+        self.build = build
+        self.on_reload = on_reload
+        self.metrics = metrics
+        self.retire = retire
+
+        self.current = build(None, set())
+        self.number = 1
+
+        self._lock = asyncio.Lock()
+
+    async def reload(self, keys: set[str]) -> bool:
+        """
+        Builds a new snapshot with the changed entries and swaps it in, keeping the current one if it fails.
+
+        Args:
+            keys: The keys of the changed entries.
+
+        Returns:
+            Whether the snapshot was replaced.
+        """
+
+        async with self._lock:
+            try:
+                snapshot = await asyncio.to_thread(self.build, self.current, keys)
+            except Exception:
+                logger.exception("Reloading %d content entries failed, keeping snapshot %d", len(keys), self.number)
+                self.metrics.increment("reload.failed")
+
+                return False
+
+            # Handlers read `current` once and keep using what they read, the old snapshot lives as long as they do
+            previous, self.current = self.current, snapshot
+            self.number += 1
+            self.metrics.increment("reload.count")
+            self.metrics.increment("reload.entries", len(keys))
+
+            logger.info("Content snapshot %d loaded with %d changed entries", self.number, len(keys))
+
+            if self.on_reload is not None:
+                self.on_reload(keys)
+
+            if self.retire is not None:
+                self.retire(previous, snapshot)
+
+            return True
+
+    async def watch(self, watcher: InotifyWatcher | PollingWatcher) -> None:
+        """
+        Reloads the changed entries reported by the watcher until cancelled.
+
+        Args:
+            watcher: The watcher of the content files.
+        """
+
+        try:
+            while True:
+                await self.reload(await watcher.changes())
+        finally:
+            watcher.close()
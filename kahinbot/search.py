@@ -0,0 +1,480 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides full-text search over the readings through an inverted index built ahead of time.
+
+The index is a bundle (see `bundle.py`) holding:
+    meta:            the layout version, the content version it was built from and the id, key, title and length of every document
+    people:          the famous people of the Millman JSONs and their life paths, see `people.py`
+    documents/<id>:  the plain text of the document, used for the snippets
+    terms/<term>:    the postings of the term, document id (H) | term frequency (H) | first offset (I) for
+                     every document containing it, sorted by document id
+
+Every top-level section of the Turkish Millman JSONs, every Turkish Forbes file and every enneagram type is
+a document. Words are normalized with Turkish casing, folded to ASCII and stemmed by stripping common suffixes,
+so "sağlığı", "Sağlık" and "saglikli" all find the same documents.
+"""
+
+from bundle import Bundle, write_bundle
+from people import Person, famous_people, people_from_json, people_to_json
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+import heapq
+import json
+import logging
+import math
+import re
+import struct
+
+if TYPE_CHECKING:
+    from content import ContentStore
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Version of the index layout, bump it whenever the entries change so stale indexes get rebuilt
+SEARCH_INDEX_VERSION = 2
+
+# Patterns of the content keys that are searched
+SEARCH_KEY_PATTERNS = {
+    "millman": re.compile(r"millman/tr/JSONs_Extended/(\d+)_(\d+)\.json"),
+    "forbes": re.compile(r"forbes/tr/MDs/(\d)_(\d|initial)\.md"),
+    "enneagram": re.compile(r"enneagram/tip(\d)\.md"),
+}
+
+# Titles of the sections of the Millman JSONs, famous people have their own command
+SECTION_TITLES = {
+    "key_traits": "Temel özellikler",
+    "challenges": "Zorluklar",
+    "opportunities": "Fırsatlar",
+    "health": "Sağlık",
+    "relationships": "İlişkiler",
+    "talents_work_finances": "Yetenekler, iş ve finans",
+    "fulfilling_destiny": "Kaderini gerçekleştirmek",
+}
+
+# Lowercasing rules of the Turkish alphabet that differ from the default ones
+TURKISH_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+
+# Folding of the Turkish letters to ASCII, so queries typed without a Turkish keyboard match too
+ASCII_FOLD = str.maketrans("ıiğşçöüâîû", "iigscouaiu")
+
+# Common inflectional and derivational suffixes after folding, stripped longest first
+SUFFIXES = tuple(
+    sorted(
+        (
+            "lari", "leri", "lar", "ler",
+            "ligi", "lugu", "lik", "luk",
+            "siz", "suz", "li", "lu",
+            "dan", "den", "tan", "ten", "da", "de", "ta", "te",
+            "nin", "nun", "in", "un",
+            "yla", "yle", "la", "le",
+            "mak", "mek", "ma", "me",
+            "yi", "yu", "ya", "ye", "si", "su",
+            "i", "u", "a", "e",
+        ),
+        key=len,
+        reverse=True,
+    )
+)
+
+# Minimum length of a stem, suffixes are never stripped below it
+MIN_STEM_LENGTH = 4
+
+# Final consonants softened before a vowel, restored after a suffix is stripped
+HARDENED_CONSONANTS = str.maketrans("gbd", "kpt")
+
+# Words that are too common to be searched
+STOPWORDS = frozenset(
+    ("ve", "ile", "bir", "bu", "su", "o", "da", "de", "icin", "cok", "daha", "gibi", "olan", "olarak",
+     "ne", "mi", "mu", "ki", "ya", "veya", "ama", "en", "her", "sey", "kendi", "hem", "ise")
+)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Number of characters shown around the first match of a document
+SNIPPET_LENGTH = 160
+
+_POSTING = struct.Struct(">HHI")
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class SearchResult(NamedTuple):
+    """
+    A document matching a search query.
+    """
+
+    key: str
+    title: str
+    score: float
+    snippet: str
+
+
+def normalize(word: str) -> str:
+    """
+    Lowercases a word with the Turkish rules and folds it to ASCII.
+
+    Args:
+        word: The word to normalize.
+
+    Returns:
+        The normalized word.
+
+    Example:
+        >>> normalize("İLİŞKİ")
+        'iliski'
+    """
+
+    return word.translate(TURKISH_LOWER).lower().translate(ASCII_FOLD)
+
+
+def stem(word: str) -> str:
+    """
+    Strips up to three common suffixes from a normalized word.
+
+    Args:
+        word: The normalized word.
+
+    Returns:
+        The stem of the word.
+
+    Example:
+        >>> stem("iliskilerde")
+        'ilisk'
+    """
+
+    stripped = False
+    for _ in range(3):
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                word = word[: -len(suffix)]
+                stripped = True
+                break
+        else:
+            break
+
+    return word[:-1] + word[-1].translate(HARDENED_CONSONANTS) if stripped else word
+
+
+def tokenize(text: str) -> list[tuple[str, int]]:
+    """
+    Splits a text into searchable terms.
+
+    Args:
+        text: The text to tokenize.
+
+    Returns:
+        The terms of the text and the offsets of the words they come from, stopwords excluded.
+    """
+
+    terms = []
+    for match in _WORD_PATTERN.finditer(text):
+        word = normalize(match.group())
+        if len(word) > 1 and word not in STOPWORDS:
+            terms.append((stem(word), match.start()))
+
+    return terms
+
+
+def _json_text(content: list[str] | dict[str, list[str]]) -> str:
+    if isinstance(content, list):
+        return "\n".join(content)
+
+    return "\n".join(_json_text(value) for value in content.values())
+
+
+def search_documents(store: "ContentStore") -> list[tuple[str, str, str]]:
+    """
+    Collects the searchable documents of the store.
+
+    Args:
+        store: The store to read the content from.
+
+    Returns:
+        The key, title and plain text of every document.
+    """
+
+    documents = []
+    for key in store.keys():
+        if match := SEARCH_KEY_PATTERNS["millman"].fullmatch(key):
+            content = json.loads(store.read_text(key))
+            for section, title in SECTION_TITLES.items():
+                if text := _json_text(content.get(section, [])):
+                    documents.append((f"{key}#{section}", f"Hayat sayısı {match[1]}/{match[2]} · {title}", text))
+        elif match := SEARCH_KEY_PATTERNS["forbes"].fullmatch(key):
+            title = f"Pin kodu {match[1]}. hane" + (f" · {match[2]} rakamı" if match[2] != "initial" else "")
+            documents.append((key, title, store.read_text(key)))
+        elif match := SEARCH_KEY_PATTERNS["enneagram"].fullmatch(key):
+            documents.append((key, f"Enneagram tip {match[1]}", store.read_text(key)))
+
+    return documents
+
+
+def build_index(store: "ContentStore", output: Path) -> str:
+    """
+    Tokenizes the searchable documents of the store and writes their inverted index, along with the famous
+    people table.
+
+    Args:
+        store: The store to read the content from.
+        output: The path to write the index to.
+
+    Returns:
+        The version of the index.
+    """
+
+    documents = search_documents(store)
+    postings: dict[str, dict[int, list[int]]] = {}
+    lengths = []
+
+    for document_id, (_, _, text) in enumerate(documents):
+        terms = tokenize(text)
+        lengths.append(len(terms))
+
+        for term, offset in terms:
+            posting = postings.setdefault(term, {}).get(document_id)
+            if posting is None:
+                postings[term][document_id] = [1, offset]
+            else:
+                posting[0] += 1
+
+    meta = {
+        "format": SEARCH_INDEX_VERSION,
+        "content_version": store.version,
+        "documents": [[key, title, length] for (key, title, _), length in zip(documents, lengths)],
+    }
+
+    entries = {
+        "meta": json.dumps(meta, ensure_ascii=False).encode("UTF-8"),
+        "people": people_to_json(famous_people(store)),
+    }
+    for document_id, (_, _, text) in enumerate(documents):
+        entries[f"documents/{document_id}"] = text.encode("UTF-8")
+    for term, term_postings in postings.items():
+        entries[f"terms/{term}"] = b"".join(
+            _POSTING.pack(document_id, min(tf, 0xFFFF), offset) for document_id, (tf, offset) in term_postings.items()
+        )
+
+    return write_bundle(entries, output)
+
+
+class SearchIndex:
+    """
+    Answers search queries from an index written by `build_index`.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Opens the index and loads the document table.
+
+        Args:
+            path: The path to the index.
+        """
+
+        self.bundle = Bundle(path)
+
+        meta = json.loads(self.bundle.read_text("meta"))
+        self.format: int = meta.get("format", 1)
+        self.content_version: str = meta["content_version"]
+        self.documents: list[tuple[str, str, int]] = [tuple(document) for document in meta["documents"]]
+        self.average_length = sum(length for _, _, length in self.documents) / max(len(self.documents), 1)
+
+    @property
+    def version(self) -> str:
+        return self.bundle.version
+
+    def famous_people(self) -> list[Person]:
+        """
+        Returns the famous people table built along with the index.
+        """
+
+        return people_from_json(self.bundle.get("people"))
+
+    def postings(self, term: str) -> list[tuple[int, int, int]]:
+        """
+        Returns the document id, term frequency and first offset of every document containing the term.
+        """
+
+        try:
+            return list(_POSTING.iter_unpack(self.bundle.get(f"terms/{term}")))
+        except FileNotFoundError:
+            return []
+
+    def snippet(self, document_id: int, offset: int) -> str:
+        """
+        Returns the text of the document around the given offset, cut at word boundaries.
+        """
+
+        text = self.bundle.read_text(f"documents/{document_id}")
+        start = max(text.rfind(" ", 0, max(offset - SNIPPET_LENGTH // 4, 0)) + 1, text.rfind("\n", 0, offset) + 1)
+        end = text.find(" ", start + SNIPPET_LENGTH)
+        end = len(text) if end == -1 else end
+        end = min(end, text.find("\n", offset) if text.find("\n", offset) != -1 else end)
+
+        return (
+            ("…" if start > 0 and text[start - 1] != "\n" else "")
+            + text[start:end].strip()
+            + ("…" if end < len(text) and text[end] != "\n" else "")
+        )
+
+    def search(self, query: str, limit: int = 5) -> list[SearchResult]:
+        """
+        Ranks the documents matching any word of the query with BM25.
+
+        Args:
+            query: The words to search.
+            limit: The maximum number of results. Defaults to 5.
+
+        Returns:
+            The best matching documents, best first, with a snippet around the first match of the rarest word.
+        """
+
+        scores: dict[int, float] = {}
+        first_offsets: dict[int, tuple[int, int]] = {}
+
+        for term in dict.fromkeys(term for term, _ in tokenize(query)):
+            postings = self.postings(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (len(self.documents) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for document_id, tf, offset in postings:
+                length = self.documents[document_id][2]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length)
+                scores[document_id] = scores.get(document_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+                if document_id not in first_offsets or len(postings) < first_offsets[document_id][0]:
+                    first_offsets[document_id] = (len(postings), offset)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+        return [
+            SearchResult(
+                self.documents[document_id][0],
+                self.documents[document_id][1],
+                score,
+                self.snippet(document_id, first_offsets[document_id][1]),
+            )
+            for document_id, score in best
+        ]
+
+    def close(self) -> None:
+        self.bundle.close()
+
+
+def open_index(path: Path, store: "ContentStore") -> SearchIndex:
+    """
+    Opens the search index, rebuilding it first if it is missing or was built from other content.
+
+    Args:
+        path: The path to the index.
+        store: The content store the index should match.
+
+    Returns:
+        The search index.
+    """
+
+    if path.exists():
+        index = SearchIndex(path)
+        if index.format == SEARCH_INDEX_VERSION and index.content_version == store.version:
+            return index
+
+        index.close()
+        logger.warning("Search index %s is stale, rebuilding it", path)
+    else:
+        logger.warning("Search index %s is missing, building it", path)
+
+    build_index(store, path)
+
+    return SearchIndex(path)
+
+
+if __name__ == "__main__":
+    from content import open_store
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Builds and queries the full-text search index used by the bot.",
+        epilog="Contact: @Seymapro",
+    )
+
+    # Define command-line arguments
+    parser.add_argument(
+        "--version", action="version", version=f"%(prog)s {__version__}"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="tokenize the content and write the index")
+    build_parser.add_argument(
+        "-d",
+        "--data-dir",
+        "--data-directory",
+        default="./data/",
+        type=Path,
+        help="path to the data directory",
+        dest="data_directory",
+    )
+    build_parser.add_argument(
+        "-b",
+        "--bundle",
+        default=None,
+        type=Path,
+        help="path to a content bundle to read instead of the data directory",
+        dest="bundle",
+    )
+    build_parser.add_argument(
+        "-o",
+        "--output",
+        default="./kahinbot.index",
+        type=Path,
+        help="path to write the index to",
+        dest="output",
+    )
+
+    query_parser = subparsers.add_parser("query", help="search the index")
+    query_parser.add_argument("index", type=Path, help="path to the index")
+    query_parser.add_argument("query", nargs="+", help="words to search")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        store = open_store(args.data_directory, args.bundle)
+        version = build_index(store, args.output)
+
+        print(f"Index {version} has been written to file {args.output} ({args.output.stat().st_size} bytes)")
+    else:
+        index = SearchIndex(args.index)
+
+        start = time.perf_counter()
+        results = index.search(" ".join(args.query))
+        elapsed = time.perf_counter() - start
+
+        for result in results:
+            print(f"{result.score:6.2f}  {result.title}\n        {result.snippet}")
+        print(f"{len(results)} results in {elapsed * 1e6:.0f} µs")
@@ -0,0 +1,416 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""
+This module provides a Telethon session that keeps its entities and update state in memory.
+
+Telethon's default session writes every entity it sees and every update state to its SQLite file as it goes, on
+the event loop. This session answers every lookup from memory and records what changed; the changes are written
+in a single transaction from a worker thread every few seconds, when the session is closed, and right away only
+when the authorization changes. The file keeps Telethon's own format, so an existing `bot.session` file is used
+as is.
+
+Several processes can share the file: it is opened in write-ahead logging mode, so reading never waits for a
+write, and the entities missing from memory are looked up in the file before giving up, which finds the ones the
+other processes wrote. A lookup missing from the file too is answered from memory for a few seconds, until the
+other processes have had the time to write the entity. Read-only sessions use the authorization and the entities
+of the file without ever writing to it. Sent files are only cached in memory.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from datetime import datetime, timezone
+from pathlib import Path
+from telethon import utils
+from telethon.crypto import AuthKey
+from telethon.sessions import MemorySession
+from telethon.tl.types import PeerChannel, PeerChat, PeerUser
+from telethon.tl.types.updates import State
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two writes of the changed entities and update states
+FLUSH_INTERVAL = 5.0
+
+# Seconds a connection waits for the write of another process to finish
+BUSY_TIMEOUT = 10.0
+
+# Seconds a lookup missing from the file is not looked up again, the interval the other processes write their entities
+MISS_EXPIRY = FLUSH_INTERVAL
+
+# Version of Telethon's session format, see telethon.sessions.sqlite
+SESSION_VERSION = 7
+
+# Tables of Telethon's session format, the sent files are not used
+SCHEMA = (
+    "create table if not exists version (version integer primary key)",
+    "create table if not exists sessions (dc_id integer primary key, server_address text, port integer, "
+    "auth_key blob, takeout_id integer)",
+    "create table if not exists entities (id integer primary key, hash integer not null, username text, "
+    "phone integer, name text, date integer)",
+    "create table if not exists sent_files (md5_digest blob, file_size integer, type integer, id integer, "
+    "hash integer, primary key(md5_digest, file_size, type))",
+    "create table if not exists update_state (id integer primary key, pts integer, qts integer, date integer, "
+    "seq integer)",
+)
+
+# The id, access hash, lowercase username, phone and display name of an entity
+Entity = tuple[int, int, str | None, str | None, str | None]
+
+
+class BufferedSession(MemorySession):
+    """
+    A Telethon session answering from memory and writing its changes to a SQLite file in batches.
+    """
+
+    def __init__(self, path: Path, read_only: bool = False, metrics: Metrics = default_metrics):
+        """
+        Args:
+            path: The path to the session file, created unless read-only.
+            read_only: Whether the session only reads the file, e.g. a worker process sharing the file of the bot.
+                Defaults to False.
+            metrics: The registry counting the writes and the lookups in the file. Defaults to the registry of the bot.
+
+        Raises:
+            ValueError: If the file was written by a version of Telethon with another session format.
+        """
+
+        super().__init__()
+
+        self.path = path
+        self.read_only = read_only
+        self.metrics = metrics
+
+        self._by_id: dict[int, Entity] = {}
+        self._by_username: dict[str, int] = {}
+        self._by_phone: dict[str, int] = {}
+        self._by_name: dict[str, int] = {}
+
+        # The lookups missing from the file, mapped to when they expire, the oldest first
+        self._misses: dict[tuple[str, object], float] = {}
+
+        # The changes not written yet, swapped out by the flushing thread
+        self._lock = threading.Lock()
+        self._changed_entities: dict[int, Entity] = {}
+        self._changed_states: dict[int, State] = {}
+        self._changed_session = False
+
+        # Lookups on the event loop and writes from the worker thread use their own connection
+        self._writer = None if read_only else self._connect()
+        self._writer_lock = threading.Lock()
+        if self._writer is not None:
+            self._create_tables(self._writer)
+        self._reader = self._connect()
+
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            connection = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", timeout=BUSY_TIMEOUT, uri=True, check_same_thread=False
+            )
+        else:
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            connection.execute("pragma journal_mode=wal")
+            connection.execute("pragma synchronous=normal")
+
+        return connection
+
+    def _create_tables(self, connection: sqlite3.Connection) -> None:
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+            row = connection.execute("select version from version").fetchone()
+            if row is None:
+                connection.execute("insert into version values (?)", (SESSION_VERSION,))
+            elif row[0] != SESSION_VERSION:
+                raise ValueError(
+                    f"{self.path} has version {row[0]} of the session format instead of {SESSION_VERSION}, "
+                    "open it once with the installed Telethon to upgrade it"
+                )
+
+    def _load(self) -> None:
+        row = self._reader.execute("select dc_id, server_address, port, auth_key, takeout_id from sessions").fetchone()
+        if row is not None:
+            self._dc_id, self._server_address, self._port, auth_key, self._takeout_id = row
+            self._auth_key = AuthKey(data=auth_key) if auth_key else None
+
+        # The oldest first, so that a username taken over by another entity points to the latest one
+        for row in self._reader.execute("select id, hash, username, phone, name from entities order by date"):
+            self._remember(_entity(row))
+
+        for entity_id, pts, qts, date, seq in self._reader.execute("select * from update_state"):
+            self._update_states[entity_id] = State(
+                pts, qts, datetime.fromtimestamp(date, tz=timezone.utc), seq, unread_count=0
+            )
+
+    def _remember(self, entity: Entity) -> None:
+        entity_id, _, username, phone, name = entity
+
+        previous = self._by_id.get(entity_id)
+        if previous is not None:
+            _, _, previous_username, previous_phone, previous_name = previous
+            for index, key in (
+                (self._by_username, previous_username),
+                (self._by_phone, previous_phone),
+                (self._by_name, previous_name),
+            ):
+                if key is not None and index.get(key) == entity_id:
+                    del index[key]
+
+        self._by_id[entity_id] = entity
+        for index, key in ((self._by_username, username), (self._by_phone, phone), (self._by_name, name)):
+            if key is not None:
+                index[key] = entity_id
+
+        for column, key in (("id", entity_id), ("username", username), ("phone", phone), ("name", name)):
+            self._misses.pop((column, key), None)
+
+    def _lookup(self, column: str, *values: object) -> tuple[int, int] | None:
+        now = time.monotonic()
+        keys = [(column, value) for value in values]
+        if all(self._misses.get(key, 0.0) > now for key in keys):
+            return None
+
+        # Another process sharing the file may have met the entity
+        self.metrics.increment("session.lookup")
+        row = self._reader.execute(
+            f"select id, hash, username, phone, name from entities where {column} in ({', '.join('?' * len(values))}) "
+            "order by date desc limit 1",
+            values,
+        ).fetchone()
+        if row is None:
+            for key in keys:
+                self._misses.pop(key, None)
+                self._misses[key] = now + MISS_EXPIRY
+
+            # Every miss expires after as long, so the expired ones are the first
+            while True:
+                key, expiry = next(iter(self._misses.items()))
+                if expiry > now:
+                    break
+                del self._misses[key]
+
+            return None
+
+        entity = _entity(row)
+        if entity[0] not in self._by_id:
+            self._remember(entity)
+
+        return entity[0], entity[1]
+
+    def clone(self, to_instance: MemorySession | None = None) -> MemorySession:
+        return super().clone(to_instance or MemorySession())
+
+    def set_dc(self, dc_id: int, server_address: str, port: int) -> None:
+        super().set_dc(dc_id, server_address, port)
+        self._changed_session = True
+
+    @MemorySession.auth_key.setter
+    def auth_key(self, value: AuthKey | None) -> None:
+        self._auth_key = value
+        self._changed_session = True
+
+    @MemorySession.takeout_id.setter
+    def takeout_id(self, value: int | None) -> None:
+        self._takeout_id = value
+        self._changed_session = True
+
+    def set_update_state(self, entity_id: int, state: State) -> None:
+        if self._update_states.get(entity_id) == state:
+            return
+
+        self._update_states[entity_id] = state
+        if not self.read_only:
+            with self._lock:
+                self._changed_states[entity_id] = state
+
+    def process_entities(self, tlo: object) -> None:
+        for row in self._entities_to_rows(tlo):
+            entity = _entity(row)
+            if self._by_id.get(entity[0]) == entity:
+                continue
+
+            self._remember(entity)
+            if not self.read_only:
+                with self._lock:
+                    self._changed_entities[entity[0]] = entity
+
+    def get_entity_rows_by_phone(self, phone: str) -> tuple[int, int] | None:
+        if phone in self._by_phone:
+            return self._by_id[self._by_phone[phone]][:2]
+
+        return self._lookup("phone", phone)
+
+    def get_entity_rows_by_username(self, username: str) -> tuple[int, int] | None:
+        if username in self._by_username:
+            return self._by_id[self._by_username[username]][:2]
+
+        return self._lookup("username", username)
+
+    def get_entity_rows_by_name(self, name: str) -> tuple[int, int] | None:
+        if name in self._by_name:
+            return self._by_id[self._by_name[name]][:2]
+
+        return self._lookup("name", name)
+
+    def get_entity_rows_by_id(self, id: int, exact: bool = True) -> tuple[int, int] | None:
+        if exact:
+            ids = (id,)
+        else:
+            ids = (utils.get_peer_id(PeerUser(id)), utils.get_peer_id(PeerChat(id)), utils.get_peer_id(PeerChannel(id)))
+
+        for entity_id in ids:
+            if entity_id in self._by_id:
+                return self._by_id[entity_id][:2]
+
+        return self._lookup("id", *ids)
+
+    def save(self) -> None:
+        """
+        Writes the changes right away if the authorization changed, the others are left to `flush`.
+        """
+
+        if self._changed_session:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Writes the changed entities and update states in a single transaction.
+
+        If the write fails, the changes are kept to be written with the next ones.
+
+        Returns:
+            The number of rows written.
+
+        Raises:
+            sqlite3.Error: If the write fails.
+        """
+
+        if self._writer is None:
+            return 0
+
+        with self._lock:
+            entities, self._changed_entities = self._changed_entities, {}
+            states, self._changed_states = self._changed_states, {}
+            changed_session, self._changed_session = self._changed_session, False
+            session = (
+                self._dc_id,
+                self._server_address,
+                self._port,
+                self._auth_key.key if self._auth_key else b"",
+                self._takeout_id,
+            )
+
+        if not entities and not states and not changed_session:
+            return 0
+
+        now = int(time.time())
+        try:
+            with self._writer_lock, self._writer:
+                if changed_session:
+                    # Telethon keeps a single row for the data center in use
+                    self._writer.execute("delete from sessions")
+                    self._writer.execute("insert into sessions values (?, ?, ?, ?, ?)", session)
+                self._writer.executemany(
+                    "insert or replace into entities values (?, ?, ?, ?, ?, ?)",
+                    [entity + (now,) for entity in entities.values()],
+                )
+                self._writer.executemany(
+                    "insert or replace into update_state values (?, ?, ?, ?, ?)",
+                    [
+                        (entity_id, state.pts, state.qts, int(state.date.timestamp()), state.seq)
+                        for entity_id, state in states.items()
+                    ],
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self._changed_entities = entities | self._changed_entities
+                self._changed_states = states | self._changed_states
+                self._changed_session = self._changed_session or changed_session
+            raise
+
+        rows = len(entities) + len(states) + changed_session
+        self.metrics.increment("session.flush")
+        self.metrics.increment("session.rows", rows)
+
+        return rows
+
+    async def run(self, interval: float = FLUSH_INTERVAL) -> None:
+        """
+        Writes the changes from a worker thread every interval until cancelled.
+
+        Args:
+            interval: The seconds between two writes. Defaults to `FLUSH_INTERVAL`.
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                await asyncio.to_thread(self.flush)
+            except sqlite3.Error:
+                logger.exception("Could not write the session to %s", self.path)
+
+    def close(self) -> None:
+        """
+        Writes the remaining changes and closes the file.
+        """
+
+        if self._writer is not None:
+            self.flush()
+            with self._writer_lock:
+                self._writer.close()
+            self._writer = None
+
+        self._reader.close()
+
+    def delete(self) -> None:
+        """
+        Closes the file without writing the changes and removes it, e.g. once logged out.
+        """
+
+        if self.read_only:
+            return
+
+        if self._writer is not None:
+            with self._writer_lock:
+                self._writer.close()
+            self._writer = None
+        self._reader.close()
+
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+
+def _entity(row: tuple[int, int, str | None, str | int | None, str | None]) -> Entity:
+    # The phone column has an integer affinity, Telethon looks phones up as strings
+    entity_id, entity_hash, username, phone, name = row
+
+    return entity_id, entity_hash, username, None if phone is None else str(phone), name
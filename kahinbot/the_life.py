@@ -24,6 +24,7 @@
 This module provides functions for calculating life path numbers from birthdates and generating reports based on data files.
 """
 
+from tracing import traced
 from datetime import datetime
 from pathlib import Path
 
@@ -31,6 +32,7 @@ __author__ = "Seymapro"
 __version__ = "1.0.0"
 
 
+@traced()
 def birthdate_to_life_path(birthdate: datetime) -> tuple[int, int]:
     """
     Calculates the life path number from a given birthdate.
@@ -48,6 +50,7 @@ def birthdate_to_life_path(birthdate: datetime) -> tuple[int, int]:
     return first_sum, last_sum
 
 
+@traced()
 def life_path_to_content(life_path: tuple[int, int], data_directory: Path) -> str:
     """
     Retrieves the content associated with a specific life path from data files.
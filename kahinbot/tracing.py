@@ -0,0 +1,426 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides lightweight request tracing and an on-demand sampling profiler.
+
+Every handled update opens a trace with its own id, kept in a context variable so it follows the request into
+the helpers it calls, including those running in worker threads. The spans of a trace are appended to a local
+file in the Chrome trace event format, which `chrome://tracing` and Perfetto open directly; their ids follow
+the OpenTelemetry sizes so they can be forwarded to an OTLP collector as they are. A writer thread keeps the
+file open and appends the spans handed to it, so handlers never wait for the disk.
+
+The sampling profiler records the stacks of every thread at a fixed interval and writes them in the collapsed
+format read by `flamegraph.pl` and speedscope.
+"""
+
+from metrics import Metrics, metrics as default_metrics
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, TypeVar, cast
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+logger = logging.getLogger(__name__)
+
+# Sizes in bytes of the trace and span ids, as in OpenTelemetry
+TRACE_ID_BYTES = 16
+SPAN_ID_BYTES = 8
+
+# Seconds between two samples of the profiler
+PROFILE_INTERVAL = 0.005
+
+# Maximum number of seconds a single profile runs for
+MAX_PROFILE_SECONDS = 120
+
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+
+class _Trace:
+    # The spans of a single request, written when the request ends
+    def __init__(self, tracer: "Tracer"):
+        self.tracer = tracer
+        self.trace_id = os.urandom(TRACE_ID_BYTES).hex()
+        self.events: list[dict[str, Any]] = []
+        self.closed = False
+
+    def add(self, event: dict[str, Any]) -> None:
+        # Spans of renders outliving the request, e.g. prefetches, are written on their own
+        if self.closed:
+            self.tracer.write([event])
+        else:
+            self.events.append(event)
+
+    def close(self) -> None:
+        self.closed = True
+        self.tracer.write(self.events)
+
+
+# The trace of the current request, the id of the innermost open span and the attributes recorded with it
+_current: ContextVar[tuple[_Trace, str, dict[str, Any]] | None] = ContextVar("kahinbot_trace", default=None)
+
+
+def current_trace_id() -> str | None:
+    """
+    Returns the id of the trace of the current request, or None if it is not traced.
+    """
+
+    current = _current.get()
+
+    return None if current is None else current[0].trace_id
+
+
+def annotate(**attributes: Any) -> None:
+    """
+    Adds attributes to the innermost open span, e.g. what a request turned out to ask for.
+    """
+
+    if (current := _current.get()) is not None:
+        current[2].update(attributes)
+
+
+@contextmanager
+def _open_span(trace: _Trace, name: str, parent_id: str | None, attributes: dict[str, Any]) -> Iterator[None]:
+    span_id = os.urandom(SPAN_ID_BYTES).hex()
+    token = _current.set((trace, span_id, attributes))
+
+    timestamp = time.time_ns() // 1000
+    start = time.perf_counter_ns()
+    try:
+        yield
+    except BaseException as err:
+        attributes["error"] = type(err).__name__
+        raise
+    finally:
+        duration = (time.perf_counter_ns() - start) / 1000
+        _current.reset(token)
+
+        trace.add(
+            {
+                "name": name,
+                "cat": "kahinbot",
+                "ph": "X",
+                "ts": timestamp,
+                "dur": duration,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"trace_id": trace.trace_id, "span_id": span_id, "parent_span_id": parent_id, **attributes},
+            }
+        )
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """
+    Records the time spent in the block as a span of the current request, doing nothing if it is not traced.
+
+    Args:
+        name: The name of the span, e.g. `telegram.send_message`.
+        **attributes: The attributes recorded with the span.
+    """
+
+    current = _current.get()
+    if current is None:
+        yield
+        return
+
+    with _open_span(current[0], name, current[1], attributes):
+        yield
+
+
+def traced(name: str | None = None) -> Callable[[Function], Function]:
+    """
+    Records every call of the decorated function or coroutine function as a span of the current request.
+
+    Args:
+        name: The name of the span. Defaults to None, which uses the qualified name of the function.
+
+    Returns:
+        The decorator.
+    """
+
+    def decorator(function: Function) -> Function:
+        span_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name):
+                    return await function(*args, **kwargs)
+
+            return cast(Function, async_wrapper)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # Most calls are not traced, they skip the context manager entirely
+            if _current.get() is None:
+                return function(*args, **kwargs)
+
+            with span(span_name):
+                return function(*args, **kwargs)
+
+        return cast(Function, wrapper)
+
+    return decorator
+
+
+class Tracer:
+    """
+    Opens the traces of the requests and appends their spans to a Chrome trace file.
+
+    The file holds a JSON array of events that is never closed, so spans can be appended while the bot runs;
+    trace viewers accept it as it is.
+    """
+
+    def __init__(self, path: Path | None, sample_rate: float = 1.0, metrics: Metrics = default_metrics):
+        """
+        Args:
+            path: The path of the trace file, or None to trace nothing.
+            sample_rate: The share of the requests that are traced. Defaults to 1.0.
+            metrics: The registry counting the traced requests. Defaults to the registry of the bot.
+        """
+
+        self.path = path
+        self.sample_rate = sample_rate
+        self.metrics = metrics
+
+        # Spans to append, or an event to set once everything before it is written, or None to stop the writer
+        self._queue: queue.SimpleQueue[list[dict[str, Any]] | threading.Event | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def request(self, name: str, **attributes: Any) -> Iterator[str | None]:
+        """
+        Traces the block as a request, unless it is not sampled.
+
+        Args:
+            name: The name of the root span, e.g. `callback`.
+            **attributes: The attributes recorded with the root span.
+
+        Yields:
+            The id of the trace, or None if the request is not traced.
+        """
+
+        if self.path is None or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = _Trace(self)
+        self.metrics.increment("trace.requests")
+        try:
+            with _open_span(trace, name, None, attributes):
+                yield trace.trace_id
+        finally:
+            trace.close()
+
+    def handler(self, name: str) -> Callable[[Function], Function]:
+        """
+        Traces every call of the decorated event handler as a request.
+
+        Args:
+            name: The name of the root span.
+
+        Returns:
+            The decorator.
+        """
+
+        def decorator(function: Function) -> Function:
+            @functools.wraps(function)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.request(name):
+                    return await cast(Callable[..., Awaitable[Any]], function)(*args, **kwargs)
+
+            return cast(Function, wrapper)
+
+        return decorator
+
+    def write(self, events: list[dict[str, Any]]) -> None:
+        """
+        Hands the events to the writer thread, which appends them to the trace file.
+        """
+
+        if self.path is None or not events:
+            return
+
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_events, name="trace-writer", daemon=True)
+                    self._writer.start()
+
+        self._queue.put(events)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Waits until the events handed to the writer thread so far are written to the trace file.
+
+        Args:
+            timeout: The maximum number of seconds to wait. Defaults to 5 seconds.
+
+        Returns:
+            Whether the events were written in time.
+        """
+
+        if self._writer is None:
+            return True
+
+        written = threading.Event()
+        self._queue.put(written)
+
+        return written.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Writes the remaining events and stops the writer thread.
+        """
+
+        with self._lock:
+            writer, self._writer = self._writer, None
+
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _write_events(self) -> None:
+        try:
+            with open(self.path, "a", encoding="UTF-8") as f:  # type: ignore[reportArgumentType]
+                if f.tell() == 0:
+                    f.write("[\n")
+
+                while True:
+                    # Everything queued meanwhile is written at once, with a single flush
+                    items = [self._queue.get()]
+                    while True:
+                        try:
+                            items.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+
+                    for item in items:
+                        if isinstance(item, list):
+                            f.write("".join(json.dumps(event, ensure_ascii=False) + ",\n" for event in item))
+                            continue
+
+                        f.flush()
+                        if item is None:
+                            return
+                        item.set()
+
+                    f.flush()
+        except OSError:
+            logger.exception("Writing the trace file %s failed, tracing stops", self.path)
+            self.path = None
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread of the process, one profile at a time.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        """
+        Args:
+            interval: The seconds between two samples. Defaults to `PROFILE_INTERVAL`.
+        """
+
+        self.interval = interval
+
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def run(self, seconds: float) -> Counter[str]:
+        """
+        Samples the stacks for the given duration, blocking the calling thread.
+
+        Args:
+            seconds: The duration of the profile, at most `MAX_PROFILE_SECONDS`.
+
+        Returns:
+            The number of samples of every collapsed stack, e.g. `MainThread;bot.dispatch_callback;...`.
+
+        Raises:
+            RuntimeError: If a profile is already running.
+        """
+
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+
+        stacks: Counter[str] = Counter()
+        try:
+            deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+            while time.monotonic() < deadline:
+                self._sample(stacks)
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+
+        return stacks
+
+    def _sample(self, stacks: Counter[str]) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{Path(code.co_filename).stem}.{code.co_qualname}".replace(";", ":").replace(" ", "_"))
+                frame = frame.f_back
+
+            stacks[";".join([names.get(thread_id, str(thread_id)).replace(" ", "_"), *reversed(frames)])] += 1
+
+
+def write_collapsed_stacks(stacks: Counter[str], path: Path) -> None:
+    """
+    Writes the stacks of a profile in the collapsed format, one stack and its number of samples per line.
+
+    Args:
+        stacks: The number of samples of every collapsed stack.
+        path: The path to write the profile to.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="UTF-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
@@ -0,0 +1,337 @@
+# MIT License
+
+# Copyright (c) 2024 Şeyma Yardım
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+This module provides functions for rendering the readings into messages formatted with Telegram's HTML markup.
+"""
+
+from content import ContentStore
+from zodiac import Zodiac
+from tracing import traced
+from datetime import date
+import html
+import json
+
+__author__ = "Seymapro"
+__version__ = "1.0.0"
+
+# Order of the headings in the bullet point summaries created from the Millman JSONs
+JSON_SUMMARY_KEYS = (
+    "key_traits",
+    "challenges",
+    "opportunities",
+    "health",
+    "relationships",
+    "talents_work_finances",
+    "fulfilling_destiny",
+    "famous_people",
+)
+
+# Lists of the Millman JSONs the advice of the daily life path message is picked from, in order
+DAILY_ADVICE_KEYS = (
+    ("health", "advice"),
+    ("relationships", "advice"),
+    ("talents_work_finances", "advice"),
+    ("fulfilling_destiny", "guidelines"),
+)
+
+
+# TODO: Fix repetition.
+@traced()
+def create_json_summary(content_json: dict[str, list[str]] | dict[str, dict[str, list[str]]], key: str) -> str:
+    """
+    Create a formatted summary string from a JSON object.
+
+    Args:
+        content_json: The JSON object containing the data.
+        key: The key to access the relevant data within the JSON.
+
+    Returns:
+        A formatted string containing the summary information.
+    """
+
+    TRANSLATIONS = {
+        "challenges": "<b><u>ZORLUKLAR</b></u>",
+        "famous_people": "<b><u>ÜNLÜ İNSANLAR</b></u>",
+        "fulfilling_destiny": "<b><u>KADERİNİ GERÇEKLEŞTİRMEK</b></u>",
+        "guidelines": "<b><u>TAVSİYELER</b></u>",
+        "questions": "<b><u>SORULAR</b></u>",
+        "health": "<b><u>SAĞLIK</b></u>",
+        "advice": "<b><u>TAVSİYELER</b></u>",
+        "positive": "<b><u>POZİTİF YÖNLER</b></u>",
+        "negative": "<b><u>NEGATİF YÖNLER</b></u>",
+        "key_traits": "<b><u>TEMEL ÖZELLİKLER</b></u>",
+        "opportunities": "<b><u>FIRSATLAR</b></u>",
+        "relationships": "<b><u>İLİŞKİLER</b></u>",
+        "talents_work_finances": "<b><u>YETENEKLER, İŞ VE FİNANS</b></u>",
+    }
+
+    content = ""
+
+    if type(content_json[key]) is list:
+        if content_json[key]:
+            content += TRANSLATIONS[key] + "\n\n"
+            content += "\n".join([f"- {bulletpoint}" for bulletpoint in content_json[key]]) + "\n\n"
+    else:
+        content += TRANSLATIONS[key] + "\n\n"
+
+        for subtitle, bulletpoints in content_json[key].items():  # type: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
+            if bulletpoints:
+                content += TRANSLATIONS[subtitle] + "\n\n"
+                content += (
+                    "\n".join([f"- {bulletpoint}" for bulletpoint in bulletpoints])  # type: ignore[reportUnknownVariableType]
+                    + "\n\n"
+                )
+
+    return content
+
+
+# TODO: Change the actual data so we won't have to edit it on-fly like this.
+def format_headings(content: str, join_next_line: bool = False) -> str:
+    """
+    Replaces the Markdown headings of the content with bold and underlined HTML.
+
+    Args:
+        content: The Markdown content.
+        join_next_line: Whether to also remove the line break after each heading. Defaults to False.
+
+    Returns:
+        The content with its headings formatted.
+    """
+
+    for line in content.splitlines():
+        if line.startswith("#"):
+            heading = f"{line}\n" if join_next_line else line
+            content = content.replace(heading, f"<b><u>{line.split('#')[-1].strip()}</b></u>")
+
+    return content
+
+
+def life_path_key(life_path: tuple[int, int], directory: str) -> str:
+    """
+    Returns the content key of the given life path in the given Millman directory.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        directory: The name of the directory, e.g. `MDs` or `JSONs`.
+
+    Returns:
+        The content key.
+
+    Example:
+        >>> life_path_key((11, 2), "JSONs")
+        'millman/tr/JSONs/11_2.json'
+    """
+
+    extension = "json" if directory.startswith("JSONs") else "md"
+
+    return f"millman/tr/{directory}/{life_path[0]}_{life_path[1]}.{extension}"
+
+
+def pin_code_keys(pin_code: list[int], directory: str) -> list[str]:
+    """
+    Returns the content keys of every digit of the given pin code in the given Forbes directory.
+
+    Args:
+        pin_code: A list of integers representing the pin code.
+        directory: The name of the directory, e.g. `MDs` or `Summarizations`.
+
+    Returns:
+        The content keys, in the order of the pin code.
+    """
+
+    return [f"forbes/tr/{directory}/{i}_{pin}.md" for i, pin in enumerate(pin_code, start=1)]
+
+
+@traced()
+def load_json(life_path: tuple[int, int], store: ContentStore, extended: bool = False) -> dict[str, list[str]]:
+    """
+    Loads the Millman JSON of the given life path.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        store: The content store to read from.
+        extended: Whether to load the extended JSON instead of the short one. Defaults to False.
+
+    Returns:
+        The parsed JSON object.
+    """
+
+    return json.loads(store.read_text(life_path_key(life_path, "JSONs_Extended" if extended else "JSONs")))
+
+
+@traced()
+def render_full_text_millman(life_path: tuple[int, int], store: ContentStore) -> str:
+    """
+    Renders the full text of the given life path from the Millman source.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        store: The content store to read from.
+
+    Returns:
+        The rendered content.
+    """
+
+    content = store.read_text(life_path_key(life_path, "MDs"))
+
+    return format_headings(content, join_next_line=True)
+
+
+@traced()
+def render_full_text_forbes(pin_code: list[int], store: ContentStore) -> str:
+    """
+    Renders the full text of the given pin code from the Forbes source.
+
+    Args:
+        pin_code: A list of integers representing the pin code.
+        store: The content store to read from.
+
+    Returns:
+        The rendered content.
+    """
+
+    contents = [store.read_text(key).strip() for key in pin_code_keys(pin_code, "MDs")]
+
+    return format_headings("\n\n".join(contents).strip())
+
+
+@traced()
+def render_json_summary(life_path: tuple[int, int], store: ContentStore, extended: bool = False) -> str:
+    """
+    Renders the bullet point summary of the given life path from the Millman JSONs.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        store: The content store to read from.
+        extended: Whether to render the long summary instead of the short one. Defaults to False.
+
+    Returns:
+        The rendered content.
+    """
+
+    summary_json = load_json(life_path, store, extended)
+
+    # I know it looks disgusting but it works and we can't get rid of it reliably, at least not if
+    # we want the final data to be in a proper format with good ordering of headings.
+    summary = "<b><u>GENEL UZUN ÖZET</b></u>\n\n" if extended else "<b><u>GENEL KISA ÖZET</b></u>\n\n"
+    for key in JSON_SUMMARY_KEYS:
+        summary += create_json_summary(summary_json, key)
+
+    return summary.strip()
+
+
+@traced()
+def render_zodiac_traits(zodiac_sign: Zodiac, store: ContentStore) -> str:
+    """
+    Renders the zodiac sign and the traits of its enneagram type.
+
+    Args:
+        zodiac_sign: The zodiac sign of the user.
+        store: The content store to read from.
+
+    Returns:
+        The rendered content.
+    """
+
+    content = store.read_text(f"enneagram/tip{zodiac_sign.enneagram}.md").strip()
+
+    # TODO: This is not a todo actually, i love my data as the way it is <3
+    return format_headings(f"Burç: {zodiac_sign.sign} \nEnneagram: {zodiac_sign.enneagram}\nİçerik: {content}")
+
+
+def render_daily_life_path(life_path: tuple[int, int], store: ContentStore, day: date) -> str:
+    """
+    Renders the daily message of the given life path, an advice of its Millman JSON that changes every day.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        store: The content store to read from.
+        day: The day the message is sent on.
+
+    Returns:
+        The rendered content.
+    """
+
+    content_json = load_json(life_path, store)
+    advice = [item for section, key in DAILY_ADVICE_KEYS for item in content_json[section][key]]  # type: ignore[reportArgumentType, reportCallIssue]
+
+    return (
+        f"<b><u>GÜNÜN TAVSİYESİ</b></u>\n\n<b>Hayat sayısı {life_path[0]}/{life_path[1]}</b>\n\n"
+        f"{html.escape(advice[day.toordinal() % len(advice)])}"
+    )
+
+
+def render_daily_zodiac(zodiac_sign: Zodiac, store: ContentStore, day: date) -> str:
+    """
+    Renders the daily message of the given zodiac sign, a trait of its enneagram type that changes every day.
+
+    Args:
+        zodiac_sign: The zodiac sign.
+        store: The content store to read from.
+        day: The day the message is sent on.
+
+    Returns:
+        The rendered content.
+    """
+
+    content = store.read_text(f"enneagram/tip{zodiac_sign.enneagram}.md")
+    traits = [line[2:].strip() for line in content.splitlines() if line.startswith("- ") and line[2:].strip()]
+
+    return (
+        f"<b><u>GÜNÜN BURÇ MESAJI</b></u>\n\n<b>{zodiac_sign.sign} (Mizaç {zodiac_sign.enneagram})</b>\n\n"
+        f"{html.escape(traits[day.toordinal() % len(traits)])}"
+    )
+
+
+@traced()
+def load_summary_millman(life_path: tuple[int, int], store: ContentStore) -> str:
+    """
+    Loads the summary of the given life path from the Millman source, to be paraphrased.
+
+    Args:
+        life_path: The life path number tuple (initial sum, final number).
+        store: The content store to read from.
+
+    Returns:
+        The summary.
+    """
+
+    return store.read_text(life_path_key(life_path, "Summarizations"))
+
+
+@traced()
+def load_summary_forbes(pin_code: list[int], store: ContentStore) -> str:
+    """
+    Loads the summaries of every digit of the given pin code from the Forbes source, to be paraphrased.
+
+    Args:
+        pin_code: A list of integers representing the pin code.
+        store: The content store to read from.
+
+    Returns:
+        The summaries joined in the order of the pin code.
+    """
+
+    contents = [store.read_text(key).strip() for key in pin_code_keys(pin_code, "Summarizations")]
+
+    return "\n\n".join(contents).strip()
@@ -1,6 +1,10 @@
+from tracing import traced
 from datetime import datetime
 from pathlib import Path
 
+# Directory containing the descriptions of the enneagram types, shipped with the package
+ENNEAGRAM_DIRECTORY = Path(__file__).resolve().parent / "enneagram"
+
 
 class Zodiac:
     def __init__(self, birthdate: datetime):
@@ -22,6 +26,7 @@ class Zodiac:
 
         self.sign, self.enneagram = self.find_zodiac(self.birthdate)
 
+    @traced()
     def find_zodiac(self, birthdate: datetime):
         day = birthdate.day
         month = birthdate.month
@@ -53,6 +58,7 @@ class Zodiac:
         else:
             raise Exception("Invalid date")
 
+    @traced()
     def zodiac_to_contents(self, content_dir: Path) -> list[str]:
         contents: list[str] = []
         pin = self.enneagram
@@ -63,4 +69,4 @@ class Zodiac:
         return "\n".join(contents)
 
     def __str__(self):
-        return f"Burç: {self.sign} \nEnneagram: {self.enneagram}\nİçerik: {self.zodiac_to_contents(Path('/home/nigella/tg_bot/kahin-bot/kahinbot/enneagram'))}"
+        return f"Burç: {self.sign} \nEnneagram: {self.enneagram}\nİçerik: {self.zodiac_to_contents(ENNEAGRAM_DIRECTORY)}"
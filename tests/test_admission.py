@@ -0,0 +1,124 @@
+from kahinbot.admission import AdmissionQueue, OverloadedError
+from kahinbot.metrics import Metrics
+
+import asyncio
+import unittest
+
+
+class AdmissionQueueTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.metrics = Metrics()
+        self.queue = AdmissionQueue("test", 2, max_queued=3, deadline=5.0, metrics=self.metrics, update_interval=0.01)
+        self.release = asyncio.Event()
+        self.started: list[int] = []
+        self.positions: dict[int, list[int]] = {}
+
+    def request(self, number: int) -> asyncio.Task[None]:
+        async def show_position(position: int) -> None:
+            self.positions.setdefault(number, []).append(position)
+
+        async def run() -> None:
+            async with self.queue.admit(show_position):
+                self.started.append(number)
+                await self.release.wait()
+
+        return asyncio.create_task(run())
+
+    async def test_concurrency_limit(self) -> None:
+        tasks = [self.request(number) for number in range(5)]
+        await asyncio.sleep(0.05)
+
+        self.assertListEqual([0, 1], self.started)
+        self.assertEqual(2, self.queue.running)
+        self.assertEqual(3, self.queue.queued)
+
+        self.release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertListEqual([0, 1, 2, 3, 4], self.started)
+        self.assertEqual(0, self.queue.running)
+        self.assertEqual(5, self.metrics.get("admission.test.admitted"))
+        self.assertEqual(3, self.metrics.get("admission.test.queued"))
+
+    async def test_positions(self) -> None:
+        tasks = [self.request(number) for number in range(4)]
+        await asyncio.sleep(0.05)
+
+        self.assertDictEqual({2: [1], 3: [2]}, self.positions)
+
+        # The first request stops, the first queued one starts and the second one moves up
+        self.started.clear()
+        tasks[0].cancel()
+        await asyncio.sleep(0.05)
+
+        self.assertListEqual([2], self.started)
+        self.assertDictEqual({2: [1], 3: [2, 1]}, self.positions)
+
+        self.release.set()
+        await asyncio.gather(*tasks[1:])
+
+    async def test_full(self) -> None:
+        tasks = [self.request(number) for number in range(5)]
+        await asyncio.sleep(0.05)
+
+        with self.assertRaises(OverloadedError) as context:
+            await self.request(5)
+
+        self.assertEqual("full", context.exception.reason)
+        self.assertEqual(1, self.metrics.get("admission.test.shed.full"))
+
+        self.release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_expired(self) -> None:
+        self.queue.deadline = 0.05
+        tasks = [self.request(number) for number in range(3)]
+
+        with self.assertRaises(OverloadedError) as context:
+            await tasks[2]
+
+        self.assertEqual("expired", context.exception.reason)
+        self.assertEqual(0, self.queue.queued)
+
+        self.release.set()
+        await asyncio.gather(*tasks[:2])
+        self.assertListEqual([0, 1], self.started)
+
+    async def test_expected_wait(self) -> None:
+        self.queue.service_time = 4.0
+        tasks = [self.request(number) for number in range(4)]
+        await asyncio.sleep(0.05)
+
+        # The third in the queue would wait 6 seconds with 2 requests running at once, past the 5 seconds deadline
+        self.assertEqual(6.0, self.queue.expected_wait(3))
+        with self.assertRaises(OverloadedError) as context:
+            await self.request(4)
+
+        self.assertEqual("deadline", context.exception.reason)
+
+        self.release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_cancelled_while_queued(self) -> None:
+        tasks = [self.request(number) for number in range(4)]
+        await asyncio.sleep(0.05)
+
+        tasks[2].cancel()
+        await asyncio.sleep(0.05)
+        self.assertEqual(1, self.queue.queued)
+
+        self.release.set()
+        await asyncio.gather(tasks[0], tasks[1], tasks[3])
+        self.assertListEqual([0, 1, 3], self.started)
+        self.assertEqual(0, self.queue.running)
+
+    async def test_service_time(self) -> None:
+        self.release.set()
+        await self.request(0)
+
+        self.assertIsNotNone(self.queue.service_time)
+        self.assertLess(self.queue.service_time, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+from pathlib import Path
+from kahinbot.api import MAX_BATCH_SIZE, ApiServer, Request, Response, StreamingResponse
+from kahinbot.content import DirectoryStore
+from kahinbot.metrics import Metrics
+from kahinbot.reload import MemoryStore
+
+import asyncio
+import json
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+def get(target: str, **headers: str) -> Request:
+    return Request("GET", target, headers, b"", True)
+
+
+def post(target: str, body: object) -> Request:
+    return Request("POST", target, {}, json.dumps(body).encode(), True)
+
+
+class ApiServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = STORE
+        self.metrics = Metrics()
+        self.server = ApiServer(lambda: self.store, self.metrics)
+
+    def json(self, request: Request) -> tuple[int, object]:
+        response = self.server.respond(request)
+        assert isinstance(response, Response)
+
+        return response.status, json.loads(response.body)
+
+    def test_lookups(self) -> None:
+        self.assertEqual(
+            (200, {"birthdate": "2002-12-22", "life_path": [11, 2]}), self.json(get("/v1/life-path/2002-12-22"))
+        )
+        self.assertEqual(
+            (200, {"birthdate": "2002-12-22", "pin_code": [4, 3, 4, 2, 6, 7, 7, 5, 2]}),
+            self.json(get("/v1/pin-code/22.12.2002")),
+        )
+        self.assertEqual(
+            (200, {"birthdate": "2002-12-22", "zodiac": "Oğlak", "enneagram": 6}),
+            self.json(get("/v1/zodiac/2002-12-22")),
+        )
+        _, reading = self.json(get("/v1/reading/2002-12-22"))
+        self.assertEqual({"birthdate", "life_path", "pin_code", "zodiac", "enneagram"}, set(reading))  # type: ignore[reportArgumentType]
+
+    def test_content(self) -> None:
+        status, body = self.json(get("/v1/content/short/2002-12-22"))
+
+        self.assertEqual(200, status)
+        self.assertTrue(body["content"].startswith("<b><u>GENEL KISA ÖZET</b></u>"))  # type: ignore[reportIndexIssue]
+        # The data has no enneagram type 5
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(404, self.json(get("/v1/content/zodiac/2002-02-01"))[0])
+
+    def test_errors(self) -> None:
+        self.assertEqual(400, self.json(get("/v1/reading/2002-02-30"))[0])
+        self.assertEqual(404, self.json(get("/v1/content/summary/2002-12-22"))[0])
+        self.assertEqual(404, self.json(get("/v2/reading/2002-12-22"))[0])
+        self.assertEqual(405, self.json(post("/v1/reading/2002-12-22", {}))[0])
+        self.assertEqual(405, self.json(get("/v1/batch"))[0])
+
+    def test_etag(self) -> None:
+        response = self.server.respond(get("/v1/reading/2002-12-22"))
+        assert isinstance(response, Response) and response.etag is not None
+
+        self.assertEqual(
+            Response(304, b"", response.etag),
+            self.server.respond(get("/v1/reading/2002-12-22", **{"if-none-match": response.etag})),
+        )
+        self.assertEqual(200, self.json(get("/v1/reading/2002-12-22", **{"if-none-match": '"0"'}))[0])
+        self.assertEqual(2, self.metrics.get("api.cache_hit"))
+        self.assertEqual(1, self.metrics.get("api.not_modified"))
+
+    def test_reloaded(self) -> None:
+        self.store = MemoryStore.load(STORE)
+        first = self.server.respond(get("/v1/content/short/2002-12-22"))
+
+        self.store = MemoryStore({key: bytes(self.store.get(key)) for key in self.store.keys()}, "reloaded")
+        second = self.server.respond(get("/v1/content/short/2002-12-22"))
+
+        # Rendered again from the new content, the ETag only changes with the response
+        self.assertEqual(0, self.metrics.get("api.cache_hit"))
+        assert isinstance(first, Response) and isinstance(second, Response)
+        self.assertEqual(first.etag, second.etag)
+
+    def test_batch(self) -> None:
+        birthdates = ["2002-12-22", "31.02.2002", "01/07/1990", "2002-12-22"]
+        response = self.server.respond(post("/v1/batch", {"birthdates": birthdates, "views": ["short"]}))
+        assert isinstance(response, StreamingResponse)
+
+        lines = [json.loads(line) for line in b"".join(response.chunks).splitlines()]
+
+        self.assertEqual(["2002-12-22", None, "1990-07-01", "2002-12-22"], [line.get("birthdate") for line in lines])
+        self.assertEqual({"input": "31.02.2002", "error": "invalid birthdate"}, lines[1])
+        self.assertEqual([27, 9], lines[2]["life_path"])
+        self.assertTrue(lines[0]["content"]["short"].startswith("<b><u>GENEL KISA ÖZET"))
+
+    def test_invalid_batch(self) -> None:
+        self.assertEqual(400, self.json(Request("POST", "/v1/batch", {}, b"{", True))[0])
+        self.assertEqual(400, self.json(post("/v1/batch", {"birthdates": [20021222]}))[0])
+        self.assertEqual(400, self.json(post("/v1/batch", {"birthdates": [], "views": ["summary"]}))[0])
+        self.assertEqual(413, self.json(post("/v1/batch", {"birthdates": ["2002-12-22"] * (MAX_BATCH_SIZE + 1)}))[0])
+
+
+class ConnectionTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = await ApiServer(lambda: STORE, Metrics()).start("127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def asyncTearDown(self) -> None:
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_response(self) -> tuple[bytes, dict[str, str], bytes]:
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+        headers = {name.lower(): value for name, _, value in (line.partition(": ") for line in head[1:] if line)}
+
+        if "content-length" in headers:
+            return head[0].encode(), headers, await self.reader.readexactly(int(headers["content-length"]))
+
+        body = b""
+        while size := int(await self.reader.readline(), 16):
+            body += await self.reader.readexactly(size)
+            await self.reader.readline()
+        await self.reader.readline()
+
+        return head[0].encode(), headers, body
+
+    async def test_pipelined(self) -> None:
+        batch = json.dumps({"birthdates": ["2002-12-22"] * 1000}).encode()
+        self.writer.write(
+            b"GET /v1/life-path/2002-12-22 HTTP/1.1\r\nHost: test\r\n\r\n"
+            b"POST /v1/batch HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s"
+            b"GET /v1/zodiac/2002-12-22 HTTP/1.1\r\n\r\n" % (len(batch), batch)
+        )
+
+        status, _, body = await self.read_response()
+        self.assertEqual(b"HTTP/1.1 200 OK", status)
+        self.assertEqual([11, 2], json.loads(body)["life_path"])
+
+        status, headers, body = await self.read_response()
+        self.assertEqual("chunked", headers["transfer-encoding"])
+        self.assertEqual(1000, len(body.splitlines()))
+
+        _, _, body = await self.read_response()
+        self.assertEqual("Oğlak", json.loads(body)["zodiac"])
+
+    async def test_connection_close(self) -> None:
+        self.writer.write(b"GET /v1/health HTTP/1.1\r\nConnection: close\r\n\r\n")
+
+        _, headers, _ = await self.read_response()
+
+        self.assertEqual("close", headers["connection"])
+        self.assertEqual(b"", await self.reader.read())
+
+    async def test_malformed(self) -> None:
+        self.writer.write(b"GARBAGE\r\n\r\n")
+
+        status, _, _ = await self.read_response()
+
+        self.assertEqual(b"HTTP/1.1 400 Bad Request", status)
+
+
+if __name__ == "__main__":
+    unittest.main()
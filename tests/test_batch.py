@@ -0,0 +1,44 @@
+from datetime import datetime
+from kahinbot.batch import batch_readings, group_by, render_comparison_table
+
+import unittest
+
+
+class BatchReadingsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.birthdates = [datetime(2002, 12, 22), datetime(2002, 7, 31), datetime(2002, 12, 22)]
+
+    def test_order(self) -> None:
+        readings = batch_readings(self.birthdates)
+
+        self.assertListEqual(self.birthdates, [reading.birthdate for reading in readings])
+
+    def test_values(self) -> None:
+        reading = batch_readings(self.birthdates)[1]
+
+        self.assertTupleEqual((15, 6), reading.life_path)
+        self.assertTupleEqual((4, 7, 4, 6, 1, 2, 2, 4, 3), reading.pin_code)
+        self.assertEqual("Aslan", reading.zodiac_sign)
+
+    def test_shared_readings(self) -> None:
+        readings = batch_readings(self.birthdates)
+
+        self.assertIs(readings[0], readings[2])
+
+
+class ComparisonTableTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.readings = batch_readings([datetime(2002, 12, 22), datetime(2002, 7, 31), datetime(2002, 12, 22)])
+
+    def test_groups(self) -> None:
+        self.assertDictEqual({(11, 2): [1, 3], (15, 6): [2]}, group_by(self.readings, lambda reading: reading.life_path))
+
+    def test_distinct_values_rendered_once(self) -> None:
+        table = render_comparison_table(self.readings)
+
+        self.assertEqual(1, table.count("11/2: 1, 3"))
+        self.assertEqual(1, table.count("Oğlak: 1, 3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
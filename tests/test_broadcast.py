@@ -0,0 +1,219 @@
+from datetime import date, datetime, time
+from pathlib import Path
+from kahinbot.broadcast import (
+    Broadcaster,
+    RateLimiter,
+    SubscriberStore,
+    Subscription,
+    Topic,
+    content_key,
+    next_run,
+    render_daily,
+)
+from kahinbot.content import DirectoryStore
+from kahinbot.metrics import Metrics
+from telethon.errors import FloodWaitError, UserIsBlockedError
+
+import asyncio
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+DAY = date(2026, 10, 19)
+
+
+class ContentKeyTestCase(unittest.TestCase):
+    def test_keys(self) -> None:
+        self.assertEqual("yasam:11/2", content_key(Topic.LIFE_PATH, datetime(2002, 12, 22)))
+        self.assertEqual("burc:Oğlak", content_key(Topic.ZODIAC, datetime(2002, 12, 22)))
+
+    def test_render(self) -> None:
+        message = render_daily(Topic.LIFE_PATH, datetime(2002, 12, 22), DAY, STORE)
+
+        self.assertTrue(message.startswith("<b><u>GÜNÜN TAVSİYESİ</b></u>\n\n<b>Hayat sayısı 11/2</b>"))
+        self.assertNotEqual(message, render_daily(Topic.LIFE_PATH, datetime(2002, 12, 22), date(2026, 10, 20), STORE))
+        self.assertIn("Oğlak (Mizaç 6)", render_daily(Topic.ZODIAC, datetime(2002, 12, 22), DAY, STORE))
+
+
+class NextRunTestCase(unittest.TestCase):
+    def test_next_run(self) -> None:
+        self.assertEqual(datetime(2026, 10, 19, 9), next_run(datetime(2026, 10, 19, 8, 59), time(9)))
+        self.assertEqual(datetime(2026, 10, 20, 9), next_run(datetime(2026, 10, 19, 9), time(9)))
+
+
+class SubscriberStoreTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SubscriberStore(Path(self.directory.name) / "subscribers.db")
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_subscriptions(self) -> None:
+        self.store.subscribe(1, Topic.LIFE_PATH, datetime(1983, 10, 1))
+        self.store.subscribe(1, Topic.LIFE_PATH, datetime(2002, 12, 22))
+        self.store.subscribe(1, Topic.ZODIAC, datetime(2002, 12, 22))
+        self.store.subscribe(2, Topic.ZODIAC, datetime(1990, 1, 1))
+
+        self.assertListEqual(
+            [
+                Subscription(1, Topic.ZODIAC, datetime(2002, 12, 22)),
+                Subscription(1, Topic.LIFE_PATH, datetime(2002, 12, 22)),
+            ],
+            self.store.subscriptions(1),
+        )
+        self.assertEqual(2, self.store.count())
+
+        self.assertEqual(1, self.store.unsubscribe(1, Topic.ZODIAC))
+        self.assertEqual(1, self.store.unsubscribe(1))
+        self.assertEqual(0, self.store.unsubscribe(1))
+        self.assertEqual(1, self.store.count())
+
+
+class BroadcasterTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "subscribers.db"
+        self.store = SubscriberStore(self.path)
+        self.metrics = Metrics()
+        self.sent: list[tuple[int, str]] = []
+        self.rendered: list[tuple[Topic, str]] = []
+
+        for user_id in range(1, 11):
+            self.store.subscribe(user_id, Topic.LIFE_PATH, datetime(1983, 10, user_id % 2 + 1))
+        self.store.subscribe(1, Topic.ZODIAC, datetime(2002, 12, 22))
+
+    async def asyncTearDown(self) -> None:
+        self.store.close()
+        self.directory.cleanup()
+
+    def broadcaster(self, send=None, rate: float = 10000.0) -> Broadcaster:
+        async def record(user_id: int, message: str) -> None:
+            self.sent.append((user_id, message))
+
+        def render(topic: Topic, birthdate: datetime, day: date) -> str:
+            self.rendered.append((topic, content_key(topic, birthdate)))
+            return content_key(topic, birthdate)
+
+        return Broadcaster(self.store, send or record, render, rate, checkpoint_size=3, metrics=self.metrics)
+
+    async def test_rendered_once(self) -> None:
+        report = await self.broadcaster().broadcast(DAY)
+
+        self.assertEqual(3, len(self.rendered))
+        self.assertEqual(3, report.rendered)
+        self.assertEqual(10, report.sent)
+        self.assertListEqual(list(range(1, 11)), sorted(user_id for user_id, _ in self.sent))
+        self.assertIn((1, "burc:Oğlak\n\nyasam:24/6"), self.sent)
+        self.assertEqual(10, self.metrics.get("broadcast.sent"))
+        self.assertTrue(self.store.is_finished(DAY.isoformat()))
+        self.assertIn("10/10 sent", self.store.last_report())
+
+    async def test_sent_once_a_day(self) -> None:
+        await self.broadcaster().broadcast(DAY)
+        self.store.subscribe(11, Topic.ZODIAC, datetime(2002, 12, 22))
+
+        report = await self.broadcaster().broadcast(DAY)
+
+        self.assertEqual(1, report.recipients)
+        self.assertEqual(10, report.skipped)
+        self.assertEqual(11, len(self.sent))
+
+    async def test_resumed_after_crash(self) -> None:
+        async def crash(user_id: int, message: str) -> None:
+            if user_id >= 5:
+                raise RuntimeError("crashed")
+            self.sent.append((user_id, message))
+
+        with self.assertRaises(RuntimeError):
+            await self.broadcaster(crash).broadcast(DAY)
+
+        # Users 1 to 3 were checkpointed as sent, 4 was sent to and 5 and 6 were not, all three are in doubt
+        self.assertFalse(self.store.is_finished(DAY.isoformat()))
+        self.sent.clear()
+        self.store.close()
+        self.store = SubscriberStore(self.path)
+
+        report = await self.broadcaster().broadcast(DAY)
+
+        self.assertListEqual([7, 8, 9, 10], sorted(user_id for user_id, _ in self.sent))
+        self.assertEqual(3, report.skipped)
+        self.assertEqual(3, report.unknown)
+        self.assertEqual(4, report.sent)
+
+    async def test_errors(self) -> None:
+        async def send(user_id: int, message: str) -> None:
+            if user_id == 2:
+                raise UserIsBlockedError(request=None)
+            if user_id == 4:
+                raise ValueError("Could not find the input entity")
+            self.sent.append((user_id, message))
+
+        report = await self.broadcaster(send).broadcast(DAY)
+
+        self.assertEqual((8, 1, 1), (report.sent, report.failed, report.unreachable))
+        self.assertListEqual([], self.store.subscriptions(2))
+
+    async def test_flood_wait(self) -> None:
+        loop = asyncio.get_running_loop()
+        started: list[tuple[int, float]] = []
+        floods: list[float] = []
+
+        async def send(user_id: int, message: str) -> None:
+            started.append((user_id, loop.time()))
+            if not floods:
+                floods.append(loop.time())
+                raise FloodWaitError(request=None, capture=1)
+            self.sent.append((user_id, message))
+
+        # All the recipients are waiting for their turn when the flood wait starts
+        broadcaster = Broadcaster(
+            self.store, send, lambda *args: "mesaj", 100.0, checkpoint_size=10, metrics=self.metrics
+        )
+        report = await broadcaster.broadcast(DAY)
+
+        self.assertEqual(10, report.sent)
+        self.assertEqual(1, self.metrics.get("broadcast.flood_wait"))
+        self.assertEqual(11, len(started))
+        for user_id, sent_at in started[1:]:
+            self.assertGreaterEqual(sent_at, floods[0] + 1, user_id)
+
+    async def test_render_failure(self) -> None:
+        def render(topic: Topic, birthdate: datetime, day: date) -> str:
+            if topic == Topic.ZODIAC:
+                raise FileNotFoundError("enneagram/tip5.md")
+            return "mesaj"
+
+        broadcaster = self.broadcaster()
+        broadcaster.render = render
+        with self.assertLogs(level="ERROR"):
+            report = await broadcaster.broadcast(DAY)
+
+        self.assertEqual((9, 1), (report.sent, report.failed))
+
+
+class RateLimiterTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_rate(self) -> None:
+        limiter = RateLimiter(100.0)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        await asyncio.gather(*(limiter.acquire() for _ in range(11)))
+
+        self.assertGreaterEqual(loop.time() - start, 0.09)
+
+    async def test_pause(self) -> None:
+        limiter = RateLimiter(1000.0)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        limiter.pause(0.05)
+        await limiter.acquire()
+
+        self.assertGreaterEqual(loop.time() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
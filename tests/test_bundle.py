@@ -0,0 +1,69 @@
+from pathlib import Path
+from kahinbot.bundle import Bundle, BundleError, build_bundle
+from kahinbot.content import DirectoryStore
+
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class BundleTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "kahinbot.bundle"
+        self.version = build_bundle(STORE, self.path)
+        self.bundle = Bundle(self.path)
+
+    def tearDown(self) -> None:
+        self.bundle.close()
+        self.directory.cleanup()
+
+    def test_keys(self) -> None:
+        self.assertListEqual(STORE.keys(), self.bundle.keys())
+        self.assertIn("enneagram/tip1.md", self.bundle.keys())
+
+    def test_content(self) -> None:
+        for key in ("millman/tr/MDs/11_2.md", "forbes/tr/MDs/1_4.md", "enneagram/tip1.md"):
+            with self.subTest(key=key):
+                self.assertEqual(STORE.read_text(key), self.bundle.read_text(key))
+
+    def test_zero_copy(self) -> None:
+        entry = self.bundle.get("millman/tr/JSONs/11_2.json")
+
+        self.assertIsInstance(entry, memoryview)
+        self.assertEqual(STORE.get("millman/tr/JSONs/11_2.json"), entry.tobytes())
+        entry.release()
+
+    def test_missing_key(self) -> None:
+        self.assertRaises(FileNotFoundError, self.bundle.get, "enneagram/tip5.md")
+
+    def test_version(self) -> None:
+        self.assertEqual(self.version, self.bundle.version)
+        self.assertEqual(self.version, build_bundle(STORE, Path(self.directory.name) / "other.bundle"))
+
+    def test_not_a_bundle(self) -> None:
+        path = Path(self.directory.name) / "not.bundle"
+        path.write_bytes(b"not a bundle" * 10)
+
+        self.assertRaises(BundleError, Bundle, path)
+
+    def test_empty(self) -> None:
+        path = Path(self.directory.name) / "empty.bundle"
+        path.write_bytes(b"")
+
+        self.assertRaises(BundleError, Bundle, path)
+
+    def test_truncated(self) -> None:
+        data = self.path.read_bytes()
+
+        for size in (10, len(data) // 2, len(data) - 3):
+            with self.subTest(size=size):
+                path = Path(self.directory.name) / "truncated.bundle"
+                path.write_bytes(data[:size])
+
+                self.assertRaises(BundleError, Bundle, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+from datetime import datetime
+from kahinbot.callbacks import (
+    _BODY_V2,
+    _sign,
+    MAX_CALLBACK_DATA_LENGTH,
+    CallbackDataError,
+    View,
+    decode_callback,
+    encode_callback,
+)
+
+import base64
+import unittest
+
+SECRET = b"secret"
+
+
+class CallbackEncodingTestCase(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        for view in View:
+            with self.subTest(view=view):
+                payload = decode_callback(encode_callback(view, datetime(2002, 12, 22), 42, SECRET), SECRET)
+
+                self.assertEqual(view, payload.view)
+                self.assertEqual(datetime(2002, 12, 22), payload.birthdate)
+                self.assertEqual(42, payload.message_id)
+
+    def test_page(self) -> None:
+        data = encode_callback(View.FULL_TEXT_FORBES, datetime(2002, 12, 22), 42, SECRET, page=7, in_place=True)
+        payload = decode_callback(data, SECRET)
+
+        self.assertEqual(7, payload.page)
+        self.assertTrue(payload.in_place)
+
+    def test_defaults(self) -> None:
+        payload = decode_callback(encode_callback(View.MENU, datetime(2002, 12, 22), 42, SECRET), SECRET)
+
+        self.assertEqual(0, payload.page)
+        self.assertFalse(payload.in_place)
+
+    def test_length_limit(self) -> None:
+        data = encode_callback(View.ZODIAC_TRAITS, datetime(9999, 12, 31), 2**32 - 1, SECRET, page=2**16 - 1)
+
+        self.assertLessEqual(len(data), MAX_CALLBACK_DATA_LENGTH)
+
+
+class CallbackDecodingTestCase(unittest.TestCase):
+    def test_legacy_data(self) -> None:
+        self.assertRaises(CallbackDataError, decode_callback, b"full_text_millman", SECRET)
+
+    def test_version_2_data(self) -> None:
+        body = _BODY_V2.pack(2, View.ZODIAC_TRAITS, datetime(2002, 12, 22).toordinal().to_bytes(3, "big"), 42)
+        data = base64.urlsafe_b64encode(body + _sign(body, SECRET)).rstrip(b"=")
+
+        self.assertEqual(
+            (View.ZODIAC_TRAITS, datetime(2002, 12, 22), 42, 0, False), tuple(decode_callback(data, SECRET))
+        )
+
+    def test_unknown_version(self) -> None:
+        data = base64.urlsafe_b64encode(bytes([9]) + bytes(30)).rstrip(b"=")
+
+        self.assertRaises(CallbackDataError, decode_callback, data, SECRET)
+
+    def test_empty_data(self) -> None:
+        self.assertRaises(CallbackDataError, decode_callback, b"", SECRET)
+
+    def test_wrong_secret(self) -> None:
+        data = encode_callback(View.ZODIAC_TRAITS, datetime(2002, 12, 22), 42, SECRET)
+
+        self.assertRaises(CallbackDataError, decode_callback, data, b"other")
+
+    def test_tampered_birthdate(self) -> None:
+        data = bytearray(encode_callback(View.ZODIAC_TRAITS, datetime(2002, 12, 22), 42, SECRET))
+        data[4] = ord("A") if data[4] != ord("A") else ord("B")
+
+        self.assertRaises(CallbackDataError, decode_callback, bytes(data), SECRET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+from pathlib import Path
+from kahinbot.bundle import Bundle
+from kahinbot.compressed import DICTIONARY_KEY, CompressedStore, build_compressed_bundle, zstandard
+from kahinbot.content import DirectoryStore, open_store
+
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+@unittest.skipIf(zstandard is None, "zstandard is not installed")
+class CompressedStoreTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.directory.name) / "kahinbot.bundle"
+        cls.version = build_compressed_bundle(STORE, cls.path, level=3)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.directory.cleanup()
+
+    def setUp(self) -> None:
+        self.bundle = Bundle(self.path)
+        self.store = CompressedStore(self.bundle, cache_bytes=64 * 1024)
+
+    def tearDown(self) -> None:
+        self.bundle.close()
+
+    def test_open_store(self) -> None:
+        store = open_store(Path("unused"), self.path)
+
+        self.assertEqual("CompressedStore", type(store).__name__)
+        self.assertEqual(self.version, store.version)
+        self.assertEqual(STORE.get("enneagram/tip1.md"), store.get("enneagram/tip1.md"))
+
+    def test_keys(self) -> None:
+        self.assertListEqual(STORE.keys(), self.store.keys())
+        self.assertNotIn(DICTIONARY_KEY, self.store.keys())
+
+    def test_content(self) -> None:
+        for key in STORE.keys():
+            with self.subTest(key=key):
+                self.assertEqual(STORE.get(key), self.store.get(key))
+
+    def test_missing_key(self) -> None:
+        self.assertRaises(FileNotFoundError, self.store.get, "enneagram/tip5.md")
+        self.assertRaises(FileNotFoundError, self.store.get, DICTIONARY_KEY)
+
+    def test_cache_is_bounded(self) -> None:
+        for key in STORE.keys():
+            self.store.get(key)
+
+        self.assertLessEqual(self.store.stats()["resident_bytes"] - len(self.bundle.get(DICTIONARY_KEY)), 64 * 1024)
+
+    def test_cache_hits(self) -> None:
+        self.store.get("millman/tr/JSONs/11_2.json")
+        self.store.get("millman/tr/JSONs/11_2.json")
+
+        self.assertEqual((1, 1), (self.store.hits, self.store.misses))
+
+    def test_stats(self) -> None:
+        self.store.get("millman/tr/MDs/11_2.md")
+        stats = self.store.stats()
+
+        self.assertEqual(len(STORE.keys()), stats["entries"])
+        self.assertEqual(sum(len(STORE.get(key)) for key in STORE.keys()), stats["uncompressed_bytes"])
+        self.assertGreater(stats["compression_ratio"], 1)
+        self.assertGreater(stats["decompression_mean_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
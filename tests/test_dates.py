@@ -0,0 +1,71 @@
+from datetime import datetime
+from kahinbot.dates import extract_birthdates, parse_birthdate, to_birthdate
+
+import unittest
+
+
+class BirthdateExtractionTestCase(unittest.TestCase):
+    def test_bare_date(self) -> None:
+        self.assertListEqual([datetime(2002, 12, 22)], extract_birthdates("22.12.2002"))
+
+    def test_surrounding_text(self) -> None:
+        self.assertListEqual([datetime(2002, 12, 22)], extract_birthdates("Doğum tarihim 22.12.2002"))
+
+    def test_formats(self) -> None:
+        formats = {
+            "31.07.2002": datetime(2002, 7, 31),
+            "31/07/2002": datetime(2002, 7, 31),
+            "2002-07-31": datetime(2002, 7, 31),
+            "1.7.2002": datetime(2002, 7, 1),
+            "2002-7-1": datetime(2002, 7, 1),
+        }
+
+        for text, birthdate in formats.items():
+            with self.subTest(text=text):
+                self.assertListEqual([birthdate], extract_birthdates(text))
+
+    def test_multiple_dates(self) -> None:
+        self.assertListEqual(
+            [datetime(2002, 12, 22), datetime(2002, 7, 31), datetime(1990, 1, 5)],
+            extract_birthdates("Ben 22.12.2002, kardeşim 31/07/2002,\nbabam 1990-01-05 doğumlu."),
+        )
+
+    def test_limit(self) -> None:
+        self.assertListEqual(
+            [datetime(2002, 12, 22), datetime(2002, 7, 31)],
+            extract_birthdates("22.12.2002 31.02.2002 31.07.2002 01.01.2000", limit=2),
+        )
+
+    def test_mixed_separators(self) -> None:
+        self.assertListEqual([], extract_birthdates("22.12/2002"))
+
+    def test_longer_numbers(self) -> None:
+        self.assertListEqual([], extract_birthdates("122.12.2002 22.12.20021 12002-12-22"))
+
+    def test_no_date(self) -> None:
+        self.assertListEqual([], extract_birthdates("Merhaba!"))
+
+
+class BirthdateValidationTestCase(unittest.TestCase):
+    def test_invalid_dates(self) -> None:
+        for year, month, day in [(2002, 2, 29), (1900, 2, 29), (2002, 4, 31), (2002, 13, 1), (2002, 0, 1), (0, 1, 1)]:
+            with self.subTest(year=year, month=month, day=day):
+                self.assertIsNone(to_birthdate(year, month, day))
+
+    def test_leap_days(self) -> None:
+        self.assertEqual(datetime(2000, 2, 29), to_birthdate(2000, 2, 29))
+        self.assertEqual(datetime(2004, 2, 29), to_birthdate(2004, 2, 29))
+
+    def test_invalid_dates_are_skipped(self) -> None:
+        self.assertListEqual([datetime(2000, 2, 29)], extract_birthdates("31.02.2002 29.02.2000"))
+
+    def test_parse(self) -> None:
+        self.assertEqual(datetime(2002, 7, 1), parse_birthdate("2002-7-1"))
+        self.assertEqual(datetime(2002, 7, 1), parse_birthdate("01/07/2002"))
+        for text in ["31.02.2002", "22.12.2002 ", "Doğum tarihim 22.12.2002", ""]:
+            with self.subTest(text=text):
+                self.assertIsNone(parse_birthdate(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+from datetime import datetime
+from pathlib import Path
+from kahinbot.content import DirectoryStore
+from kahinbot.export import ExportKey, PdfExporter, markdown_to_html, pymupdf, reading_sections
+from kahinbot.metrics import Metrics
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class MarkdownToHtmlTestCase(unittest.TestCase):
+    def test_blocks(self) -> None:
+        content = "## Başlık\n\nBir **önemli**\nparagraf & devamı.\n\n- bir\n    * iki\n-\n### Alt"
+
+        self.assertEqual(
+            "<h3>Başlık</h3>\n<p>Bir <b>önemli</b> paragraf &amp; devamı.</p>\n<ul><li>bir</li><li>iki</li></ul>\n"
+            "<h4>Alt</h4>",
+            markdown_to_html(content),
+        )
+
+    def test_heading_level(self) -> None:
+        self.assertEqual("<h3>Başlık</h3>", markdown_to_html("# Başlık", heading_level=3))
+
+
+class ExportKeyTestCase(unittest.TestCase):
+    def test_key(self) -> None:
+        key = ExportKey.of(datetime(2002, 12, 22))
+
+        self.assertEqual(ExportKey((11, 2), (4, 3, 4, 2, 6, 7, 7, 5, 2), 6), key)
+        self.assertEqual("11_2-434267752-6-abc.pdf", key.file_name("abc"))
+
+    def test_sections(self) -> None:
+        sections = reading_sections(ExportKey.of(datetime(2002, 12, 22)), STORE)
+
+        self.assertListEqual(
+            ["Hayat Sayısı 11/2 (Millman)", "Pin Kodu 4 3 4 2 6 7 7 5 2 (Forbes)", "Mizaç 6 (Enneagram)"],
+            [title for title, _ in sections],
+        )
+
+    def test_missing_enneagram(self) -> None:
+        # The data has no enneagram type 5, the export of its sign is left without it
+        with self.assertLogs(level="WARNING"):
+            sections = reading_sections(ExportKey((11, 2), (4, 3, 4, 2, 6, 7, 7, 5, 2), 5), STORE)
+
+        self.assertEqual(2, len(sections))
+
+
+@unittest.skipIf(pymupdf is None, "PyMuPDF is not installed")
+class PdfExporterTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.metrics = Metrics()
+        self.exporter = PdfExporter(Path(self.directory.name), workers=1, max_files=2, metrics=self.metrics)
+
+    async def asyncTearDown(self) -> None:
+        self.exporter.close()
+        self.directory.cleanup()
+
+    async def test_export(self) -> None:
+        self.assertFalse(self.exporter.is_cached(datetime(2002, 12, 22), STORE))
+
+        path = await self.exporter.export(datetime(2002, 12, 22), STORE)
+
+        self.assertEqual(Path(self.directory.name) / f"11_2-434267752-6-{STORE.version}.pdf", path)
+        self.assertTrue(self.exporter.is_cached(datetime(2002, 12, 22), STORE))
+        self.assertListEqual([path], list(Path(self.directory.name).iterdir()))
+
+        with pymupdf.open(path) as document:
+            self.assertGreater(document.page_count, 1)
+            self.assertListEqual(
+                ["Hayat Sayısı 11/2 (Millman)", "Pin Kodu 4 3 4 2 6 7 7 5 2 (Forbes)", "Mizaç 6 (Enneagram)"],
+                [title for _, title, _ in document.get_toc()],
+            )
+            self.assertIn("Yaşam Amacını Anlamak", document[0].get_text())
+
+    async def test_cached(self) -> None:
+        # Same life path, pin code and enneagram type, rendered once
+        paths = await asyncio.gather(
+            self.exporter.export(datetime(2002, 12, 22), STORE),
+            self.exporter.export(datetime(2002, 12, 22), STORE),
+        )
+        await self.exporter.export(datetime(2002, 12, 22), STORE)
+
+        self.assertEqual(paths[0], paths[1])
+        self.assertEqual(1, self.metrics.get("export.render"))
+        self.assertEqual(1, self.metrics.get("export.shared"))
+        self.assertEqual(1, self.metrics.get("export.hit"))
+
+    async def test_started(self) -> None:
+        self.exporter.start()
+        workers = multiprocessing.active_children()
+
+        await self.exporter.export(datetime(2002, 12, 22), STORE)
+
+        # Rendered by the worker forked at startup
+        self.assertEqual(1, len(workers))
+        self.assertListEqual(workers, multiprocessing.active_children())
+
+    async def test_pruned(self) -> None:
+        first = await self.exporter.export(datetime(2002, 12, 22), STORE)
+        os.utime(first, (0, 0))
+        await self.exporter.export(datetime(1990, 1, 1), STORE)
+        await self.exporter.export(datetime(1983, 10, 1), STORE)
+
+        self.assertFalse(first.exists())
+        self.assertEqual(2, len(list(Path(self.directory.name).iterdir())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+from pathlib import Path
+from kahinbot.extract import (
+    BOOK_PARTS,
+    Line,
+    compare_directories,
+    compare_markdown,
+    extract_book,
+    lines_to_markdown,
+    page_lines,
+    pymupdf,
+    render_report,
+    split_pages,
+)
+
+import tempfile
+import unittest
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+
+def span(text: str, size: float = 10.0, bold: bool = False) -> dict:
+    return {"text": text, "size": size, "flags": 16 if bold else 0, "font": "Times"}
+
+
+def block(*lines: list[dict]) -> dict:
+    return {"type": 0, "lines": [{"spans": spans} for spans in lines]}
+
+
+class PageLinesTestCase(unittest.TestCase):
+    def test_lines(self) -> None:
+        page = {
+            "blocks": [
+                block([span("Başlık", 16.04)]),
+                {"type": 1, "image": b""},
+                block([span("Kalın ", bold=True), span("değil")], [span("  ")]),
+                block([{"text": "Bold", "size": 10, "flags": 0, "font": "Arial-Bold"}]),
+                block([span("132")]),
+            ]
+        }
+
+        self.assertListEqual(
+            [
+                Line("Başlık", 16.0, False, 0),
+                Line("Kalın değil", 10.0, False, 2),
+                Line("Bold", 10.0, True, 3),
+            ],
+            page_lines(page),
+        )
+
+
+class LinesToMarkdownTestCase(unittest.TestCase):
+    def test_headings(self) -> None:
+        pages = [
+            [
+                Line("Understanding Life Purpose", 16.0, False, 0),
+                Line("Working 12/3 in the Positive", 13.0, False, 1),
+                Line("These individuals do brilliant work.", 10.0, False, 2),
+                Line("Health", 10.0, True, 3),
+                Line("This is one of the strongest patterns.", 10.0, False, 4),
+            ]
+        ]
+
+        self.assertEqual(
+            "## Understanding Life Purpose\n\n### Working 12/3 in the Positive\n\n"
+            "These individuals do brilliant work.\n\n#### Health\n\nThis is one of the strongest patterns.\n",
+            lines_to_markdown(pages),
+        )
+
+    def test_paragraphs(self) -> None:
+        pages = [
+            [
+                Line("Those on the 21/3 life path are here to work through is-", 10.0, False, 0),
+                Line("sues of creativity and", 10.0, False, 0),
+                Line("emotional expression.", 10.0, False, 0),
+                Line("A new paragraph that goes on", 10.0, False, 1),
+            ],
+            [
+                Line("on the next page.", 10.0, False, 0),
+                Line("Another paragraph.", 10.0, False, 1),
+            ],
+        ]
+
+        self.assertEqual(
+            "Those on the 21/3 life path are here to work through issues of creativity and emotional expression.\n\n"
+            "A new paragraph that goes on on the next page.\n\nAnother paragraph.\n",
+            lines_to_markdown(pages),
+        )
+
+    def test_bullets(self) -> None:
+        pages = [
+            [
+                Line("Keys to Fulfilling Your Destiny", 14.0, False, 0),
+                Line("• Do something creative", 10.0, False, 1),
+                Line("every day.", 10.0, False, 1),
+                Line("• Find creative ways to be of service.", 10.0, False, 1),
+                Line("2) Numbered item.", 10.0, False, 2),
+                Line("The end of the chapter.", 10.0, False, 3),
+            ]
+        ]
+
+        self.assertEqual(
+            "## Keys to Fulfilling Your Destiny\n\n* Do something creative every day.\n"
+            "* Find creative ways to be of service.\n2. Numbered item.\n\nThe end of the chapter.\n",
+            lines_to_markdown(pages),
+        )
+
+    def test_empty(self) -> None:
+        self.assertEqual("", lines_to_markdown([[], []]))
+
+
+class SplitPagesTestCase(unittest.TestCase):
+    def test_ranges(self) -> None:
+        self.assertListEqual([[1, 2, 3], [4, 5, 7], [8, 9]], split_pages([1, 2, 3, 4, 5, 7, 8, 9], 3))
+        self.assertListEqual([[1], [2]], split_pages([1, 2], 8))
+        self.assertListEqual([], split_pages([], 4))
+
+
+@unittest.skipIf(pymupdf is None, "PyMuPDF is not installed")
+class ExtractBookTestCase(unittest.TestCase):
+    def test_extract_book(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            book = Path(directory) / "kitap.pdf"
+            with pymupdf.open() as document:  # type: ignore[reportOptionalMemberAccess]
+                for number in range(5):
+                    page = document.new_page()
+                    page.insert_text((72, 72), f"Bolum {number}", fontsize=18)
+                    page.insert_text((72, 110), f"Sayfa {number} metni burada.", fontsize=10)
+                    page.insert_text((72, 124), "Devami da burada.", fontsize=10)
+                document.save(book)
+
+            paths = extract_book(book, {"1_1": range(0, 2), "1_2": range(1, 5)}, Path(directory) / "MDs", workers=2)
+
+            self.assertListEqual(["1_1", "1_2"], sorted(paths))
+            self.assertEqual(
+                "## Bolum 0\n\nSayfa 0 metni burada. Devami da burada.\n\n"
+                "## Bolum 1\n\nSayfa 1 metni burada. Devami da burada.\n",
+                paths["1_1"].read_text(encoding="UTF-8"),
+            )
+            self.assertIn("## Bolum 4", paths["1_2"].read_text(encoding="UTF-8"))
+
+
+class BookPartsTestCase(unittest.TestCase):
+    def test_names(self) -> None:
+        # Every part has a file, some of the Millman files come from elsewhere in the book
+        for book, directory in (("millman", "millman/en/MDs"), ("forbes", "forbes/tr/MDs")):
+            with self.subTest(book=book):
+                names = {path.stem for path in (DATA_DIRECTORY / directory).glob("*.md")}
+                self.assertSetEqual(set(), set(BOOK_PARTS[book]) - names)
+
+    def test_pages(self) -> None:
+        self.assertEqual(range(202, 208), BOOK_PARTS["millman"]["12_3"])
+        self.assertEqual(BOOK_PARTS["millman"]["12_3"], BOOK_PARTS["millman"]["21_3"])
+        self.assertEqual(range(59, 61), BOOK_PARTS["forbes"]["1_initial"])
+
+
+class ReportTestCase(unittest.TestCase):
+    def test_same_file(self) -> None:
+        content = (DATA_DIRECTORY / "millman/en/MDs/12_3.md").read_text(encoding="UTF-8")
+        comparison = compare_markdown("12_3", content, content)
+
+        self.assertEqual(1.0, comparison.similarity)
+        self.assertEqual(comparison.headings[0], comparison.headings[1])
+        self.assertEqual(9, comparison.headings[0])
+
+    def test_markup_ignored(self) -> None:
+        comparison = compare_markdown("x", "## Başlık\n\n* **Bir** madde", "BAŞLIK\n\n- Bir madde")
+
+        self.assertEqual(1.0, comparison.similarity)
+        self.assertEqual((1, 0), comparison.headings)
+        self.assertEqual((1, 1), comparison.bullets)
+
+    def test_directories(self) -> None:
+        with tempfile.TemporaryDirectory() as extracted, tempfile.TemporaryDirectory() as existing:
+            (Path(extracted) / "1_1.md").write_text("## Başlık\n\nBir iki üç dört.\n", encoding="UTF-8")
+            (Path(existing) / "1_1.md").write_text("## Başlık\n\nBir iki üç beş.\n", encoding="UTF-8")
+            (Path(extracted) / "1_2.md").write_text("Yalnızca çıkarılan.\n", encoding="UTF-8")
+
+            comparisons = compare_directories(Path(extracted), Path(existing))
+
+        self.assertEqual(["1_1"], [comparison.name for comparison in comparisons])
+        self.assertAlmostEqual(0.8, comparisons[0].similarity)
+
+        report = render_report(comparisons)
+        self.assertIn("| 1_1 | 80.0% | 5 / 5 | 1 / 1 | 0 / 0 |", report)
+        self.assertIn("Mean similarity of 1 files: 80.0%", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+from kahinbot.fanout import (
+    MAX_SECTION_TOKENS,
+    MIN_SECTION_TOKENS,
+    SectionFanout,
+    render_static_section,
+    section_budget,
+)
+from kahinbot.metrics import Metrics
+
+import asyncio
+import threading
+import time
+import unittest
+
+SECTIONS = [f"## {position}. Hane - Özet\n\n* **Bölüm {position}:** metin" for position in range(1, 10)]
+
+
+class SectionBudgetTestCase(unittest.TestCase):
+    def test_bounds(self) -> None:
+        self.assertEqual(MIN_SECTION_TOKENS, section_budget("kısa"))
+        self.assertEqual(MAX_SECTION_TOKENS, section_budget("uzun " * 10000))
+
+    def test_grows_with_length(self) -> None:
+        self.assertLess(section_budget("a" * 1000), section_budget("a" * 2000))
+
+
+class RenderStaticSectionTestCase(unittest.TestCase):
+    def test_markdown(self) -> None:
+        self.assertEqual(
+            "<b><u>1. Hane - Özet</b></u>\n\n* <b>Bölüm 1:</b> metin", render_static_section(SECTIONS[0])
+        )
+
+
+class SectionFanoutTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.metrics = Metrics()
+        self.running = 0
+        self.max_running = 0
+        self.budgets: list[int] = []
+        self.lock = threading.Lock()
+
+    def paraphrase(self, section: str, budget: int) -> str:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.budgets.append(budget)
+
+        # Later sections finish first
+        position = int(section.split(".")[0].removeprefix("## "))
+        time.sleep(0.01 * (10 - position))
+
+        with self.lock:
+            self.running -= 1
+
+        if "5." in section:
+            raise RuntimeError("kota aşıldı")
+
+        return f"yeni {position}"
+
+    async def test_order_and_fallback(self) -> None:
+        fanout = SectionFanout(self.paraphrase, max_concurrent=3, metrics=self.metrics)
+
+        sections = [section async for section in fanout.stream(SECTIONS)]
+
+        self.assertListEqual(list(range(9)), [section.position for section in sections])
+        self.assertEqual(render_static_section(SECTIONS[4]), sections[4].content)
+        self.assertFalse(sections[4].paraphrased)
+        self.assertListEqual(
+            [f"yeni {position}" for position in (1, 2, 3, 4, 6, 7, 8, 9)],
+            [section.content for section in sections if section.paraphrased],
+        )
+        self.assertLessEqual(self.max_running, 3)
+        self.assertCountEqual([section_budget(section) for section in SECTIONS], self.budgets)
+        self.assertEqual(1, self.metrics.get("fanout.fallback"))
+        self.assertEqual(8, self.metrics.get("fanout.paraphrased"))
+
+    async def test_timeout(self) -> None:
+        fanout = SectionFanout(lambda section, budget: time.sleep(0.5) or "", timeout=0.05, metrics=self.metrics)
+
+        sections = [section async for section in fanout.stream(SECTIONS[:2])]
+
+        self.assertListEqual([False, False], [section.paraphrased for section in sections])
+
+    async def test_timed_out_section_keeps_slot(self) -> None:
+        release = threading.Event()
+        started: list[str] = []
+
+        def paraphrase(section: str, budget: int) -> str:
+            started.append(section)
+            if section is SECTIONS[0]:
+                release.wait(5)
+
+            return section
+
+        fanout = SectionFanout(paraphrase, max_concurrent=1, timeout=0.05, metrics=self.metrics)
+
+        self.assertFalse([section async for section in fanout.stream(SECTIONS[:1])][0].paraphrased)
+
+        # The thread of the timed out section still runs, the next section waits for its slot
+        next_section = asyncio.create_task(anext(fanout.stream(SECTIONS[1:2])))
+        await asyncio.sleep(0.1)
+        self.assertListEqual([SECTIONS[0]], started)
+
+        release.set()
+        self.assertTrue((await asyncio.wait_for(next_section, 1)).paraphrased)
+
+    async def test_cache(self) -> None:
+        fanout = SectionFanout(self.paraphrase, metrics=self.metrics)
+
+        [section async for section in fanout.stream(SECTIONS[:2])]
+        sections = [section async for section in fanout.stream(SECTIONS[:3])]
+
+        self.assertListEqual(["yeni 1", "yeni 2", "yeni 3"], [section.content for section in sections])
+        self.assertEqual(3, len(self.budgets))
+        self.assertEqual(2, self.metrics.get("fanout.cached"))
+
+    async def test_first_section_before_last(self) -> None:
+        release = threading.Event()
+
+        def paraphrase(section: str, budget: int) -> str:
+            if section is SECTIONS[-1]:
+                release.wait(5)
+
+            return section
+
+        fanout = SectionFanout(paraphrase, metrics=self.metrics)
+        stream = fanout.stream(SECTIONS)
+
+        first = await asyncio.wait_for(anext(stream), 1)
+        release.set()
+        await stream.aclose()
+
+        self.assertEqual(0, first.position)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+from kahinbot.inflight import InFlightRequests
+from kahinbot.metrics import Metrics
+
+import asyncio
+import unittest
+
+
+class InFlightRequestsTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.metrics = Metrics()
+        self.requests = InFlightRequests(metrics=self.metrics)
+        self.release = asyncio.Event()
+        self.sent: list[str] = []
+
+    def request(self, name: str) -> asyncio.Task[bool]:
+        async def send() -> None:
+            await self.release.wait()
+            self.sent.append(name)
+
+        return asyncio.create_task(self.requests.run(1, name, send))
+
+    async def test_duplicate(self) -> None:
+        first = self.request("a")
+        await asyncio.sleep(0)
+
+        self.assertTrue(self.requests.is_running(1, "a"))
+        self.assertFalse(await self.request("a"))
+
+        self.release.set()
+        self.assertTrue(await first)
+        self.assertListEqual(["a"], self.sent)
+        self.assertEqual(1, self.metrics.get("inflight.duplicate"))
+        self.assertFalse(self.requests.is_running(1, "a"))
+
+    async def test_again_after_finishing(self) -> None:
+        self.release.set()
+
+        self.assertTrue(await self.request("a"))
+        self.assertTrue(await self.request("a"))
+        self.assertListEqual(["a", "a"], self.sent)
+
+    async def test_superseded(self) -> None:
+        first = self.request("a")
+        await asyncio.sleep(0)
+        second = self.request("b")
+        await asyncio.sleep(0)
+
+        # The cancelled request can be made again right away
+        third = self.request("a")
+        await asyncio.sleep(0)
+        self.release.set()
+
+        self.assertTrue(await first)
+        self.assertTrue(await second)
+        self.assertTrue(await third)
+        self.assertListEqual(["a"], self.sent)
+        self.assertEqual(2, self.metrics.get("inflight.superseded"))
+
+    async def test_without_cancelling(self) -> None:
+        self.requests = InFlightRequests(cancel_superseded=False, metrics=self.metrics)
+
+        first = self.request("a")
+        await asyncio.sleep(0)
+        second = self.request("b")
+        await asyncio.sleep(0)
+        self.release.set()
+
+        await asyncio.gather(first, second)
+        self.assertListEqual(["a", "b"], sorted(self.sent))
+        self.assertEqual(0, self.metrics.get("inflight.superseded"))
+
+    async def test_users_are_separate(self) -> None:
+        first = self.request("a")
+        await asyncio.sleep(0)
+
+        async def send() -> None:
+            self.sent.append("other")
+
+        self.assertTrue(await self.requests.run(2, "a", send))
+        self.release.set()
+        await first
+
+        self.assertListEqual(["other", "a"], self.sent)
+
+    async def test_exception(self) -> None:
+        async def fail() -> None:
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            await self.requests.run(1, "a", fail)
+
+        self.assertFalse(self.requests.is_running(1, "a"))
+
+    async def test_caller_cancelled(self) -> None:
+        first = self.request("a")
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+        self.release.set()
+        await asyncio.sleep(0)
+        self.assertListEqual([], self.sent)
+        self.assertFalse(self.requests.is_running(1, "a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+from datetime import datetime
+from pathlib import Path
+from kahinbot.content import DirectoryStore
+from kahinbot.inline import INLINE_TEXT_LIMIT, InlineAnswerCache, truncate
+from kahinbot.reload import MemoryStore
+
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class TruncateTestCase(unittest.TestCase):
+    def test_short_content(self) -> None:
+        self.assertEqual("short", truncate("short", 10))
+
+    def test_line_break(self) -> None:
+        self.assertEqual("first line\n…", truncate("first line\nsecond line", 15))
+
+    def test_single_line(self) -> None:
+        self.assertEqual(10, len(truncate("a" * 20, 10).replace("\n", "")))
+
+
+class InlineAnswerCacheTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.cache = InlineAnswerCache(STORE)
+
+    def test_precomputed(self) -> None:
+        self.assertEqual(45, len(self.cache.life_paths))
+        self.assertEqual(81, len(self.cache.pin_sections))
+
+    def test_answers(self) -> None:
+        answers = self.cache.answers(datetime(2002, 12, 22))
+
+        self.assertListEqual(["life_path:11_2", "pin_code:434267752", "zodiac:Oğlak"], [answer.id for answer in answers])
+
+    def test_updated(self) -> None:
+        key = "forbes/tr/Summarizations/1_4.md"
+        updated = self.cache.updated(STORE, {key})
+
+        self.assertIsNot(self.cache.pin_sections, updated.pin_sections)
+        self.assertDictEqual(self.cache.pin_sections, updated.pin_sections)
+        self.assertIs(self.cache.life_paths[(11, 2)], updated.life_paths[(11, 2)])
+
+    def test_updated_removed(self) -> None:
+        store = MemoryStore({}, "")
+        updated = self.cache.updated(store, {"millman/tr/JSONs/11_2.json", "enneagram/tip1.md"})
+
+        self.assertNotIn((11, 2), updated.life_paths)
+        self.assertNotIn(1, updated.enneagram_types)
+        self.assertIn((11, 2), self.cache.life_paths)
+        self.assertIn(1, self.cache.enneagram_types)
+
+    def test_text_limit(self) -> None:
+        for answer in self.cache.answers(datetime(2002, 7, 31)):
+            with self.subTest(id=answer.id):
+                self.assertLessEqual(len(answer.text), INLINE_TEXT_LIMIT)
+
+    def test_missing_enneagram_type(self) -> None:
+        # There is no description of the fifth enneagram type yet
+        answers = self.cache.answers(datetime(2002, 2, 1))
+
+        self.assertTrue(answers[-1].text.endswith("5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
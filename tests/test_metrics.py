@@ -0,0 +1,32 @@
+from kahinbot.metrics import Metrics
+
+import unittest
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_increment(self) -> None:
+        metrics = Metrics()
+        metrics.increment("prefetch.hit")
+        metrics.increment("prefetch.hit", 2)
+
+        self.assertEqual(3, metrics.get("prefetch.hit"))
+        self.assertEqual(0, metrics.get("prefetch.miss"))
+
+    def test_ratio(self) -> None:
+        metrics = Metrics()
+        self.assertEqual(0.0, metrics.ratio("prefetch.hit", "prefetch.miss"))
+
+        metrics.increment("prefetch.hit", 3)
+        metrics.increment("prefetch.miss")
+        self.assertEqual(0.75, metrics.ratio("prefetch.hit", "prefetch.miss"))
+
+    def test_render(self) -> None:
+        metrics = Metrics()
+        metrics.increment("b")
+        metrics.increment("a", 2)
+
+        self.assertEqual("a: 2\nb: 1", metrics.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from datetime import datetime
+from kahinbot.callbacks import View
+from kahinbot.navigation import (
+    ACTIVE_MARKER,
+    MENU_ITEMS,
+    MESSAGE_LENGTH_LIMIT,
+    NEXT_PAGE_LABEL,
+    PREVIOUS_PAGE_LABEL,
+    menu_header,
+    menu_items,
+    page_items,
+    plan_view_update,
+    split_message,
+)
+
+import unittest
+
+BIRTHDATE = datetime(2002, 12, 22)
+
+LONG_CONTENT = "\n\n".join(f"Paragraf {i} " + "x" * 500 for i in range(20))
+
+
+class SplitMessageTestCase(unittest.TestCase):
+    def test_short(self) -> None:
+        self.assertListEqual(["a\n\nb"], split_message("a\n\nb"))
+
+    def test_empty(self) -> None:
+        self.assertListEqual([], split_message(""))
+
+    def test_long(self) -> None:
+        messages = split_message(LONG_CONTENT)
+
+        self.assertGreater(len(messages), 1)
+        self.assertTrue(all(len(message) <= MESSAGE_LENGTH_LIMIT for message in messages))
+        self.assertEqual(LONG_CONTENT, "\n\n".join(messages))
+
+
+class MenuTestCase(unittest.TestCase):
+    def test_header(self) -> None:
+        self.assertIn("11/2", menu_header(BIRTHDATE))
+
+    def test_active(self) -> None:
+        items = menu_items(View.ZODIAC_TRAITS)
+
+        self.assertEqual(len(MENU_ITEMS), len(items))
+        self.assertListEqual([View.ZODIAC_TRAITS], [view for label, view in items if label.startswith(ACTIVE_MARKER)])
+        self.assertFalse(any(label.startswith(ACTIVE_MARKER) for label, _ in menu_items()))
+
+
+class PlanViewUpdateTestCase(unittest.TestCase):
+    def test_classic(self) -> None:
+        update = plan_view_update("içerik", BIRTHDATE, View.ZODIAC_TRAITS, edit_in_place=False)
+
+        self.assertIsNone(update.edit)
+        self.assertListEqual(["içerik"], update.messages)
+        self.assertTrue(update.send_menu)
+
+    def test_classic_notice(self) -> None:
+        self.assertFalse(plan_view_update("...", BIRTHDATE, View.SUMMARY_MILLMAN, False, final=False).send_menu)
+
+    def test_short_view_in_place(self) -> None:
+        update = plan_view_update("içerik", BIRTHDATE, View.ZODIAC_TRAITS, edit_in_place=True)
+
+        self.assertEqual(f"{menu_header(BIRTHDATE)}\n\niçerik", update.edit)
+        self.assertListEqual([], update.messages)
+        self.assertFalse(update.send_menu)
+
+    def test_long_view_in_place(self) -> None:
+        update = plan_view_update(LONG_CONTENT, BIRTHDATE, View.FULL_TEXT_MILLMAN, edit_in_place=True)
+
+        self.assertLessEqual(len(update.edit), MESSAGE_LENGTH_LIMIT)
+        self.assertTrue(update.edit.startswith(menu_header(BIRTHDATE)))
+        self.assertLess(len(update.messages), len(split_message(LONG_CONTENT)))
+        self.assertFalse(update.send_menu)
+        self.assertEqual(
+            LONG_CONTENT, "\n\n".join([update.edit.removeprefix(f"{menu_header(BIRTHDATE)}\n\n"), *update.messages])
+        )
+
+    def test_oversized_paragraph_in_place(self) -> None:
+        content = "x" * (MESSAGE_LENGTH_LIMIT - 10)
+        update = plan_view_update(content, BIRTHDATE, View.FULL_TEXT_MILLMAN, edit_in_place=True)
+
+        self.assertEqual(menu_header(BIRTHDATE), update.edit)
+        self.assertListEqual([content], update.messages)
+
+    def test_page_turn_classic(self) -> None:
+        update = plan_view_update("sayfa", BIRTHDATE, View.FULL_TEXT_FORBES, edit_in_place=False, in_place=True)
+
+        self.assertEqual("sayfa", update.edit)
+        self.assertListEqual([], update.messages)
+        self.assertFalse(update.send_menu)
+
+    def test_page_turn_in_place(self) -> None:
+        update = plan_view_update("sayfa", BIRTHDATE, View.FULL_TEXT_FORBES, edit_in_place=True, in_place=True)
+
+        self.assertEqual(f"{menu_header(BIRTHDATE)}\n\nsayfa", update.edit)
+
+
+class PageItemsTestCase(unittest.TestCase):
+    def test_single_page(self) -> None:
+        self.assertListEqual([], page_items(0, 1))
+
+    def test_ends(self) -> None:
+        self.assertListEqual([(NEXT_PAGE_LABEL, 1)], page_items(0, 3))
+        self.assertListEqual([(PREVIOUS_PAGE_LABEL, 0), (NEXT_PAGE_LABEL, 2)], page_items(1, 3))
+        self.assertListEqual([(PREVIOUS_PAGE_LABEL, 1)], page_items(2, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
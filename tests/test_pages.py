@@ -0,0 +1,133 @@
+from pathlib import Path
+from kahinbot.bundle import Bundle, build_bundle
+from kahinbot.content import DirectoryStore
+from kahinbot.pages import (
+    PAGE_INDEX_KEY,
+    PAGE_LENGTH_LIMIT,
+    PageIndex,
+    build_page_index,
+    format_page,
+    page_index_to_json,
+    paginate,
+)
+from kahinbot.reload import MemoryStore
+from kahinbot.views import format_headings
+
+import re
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+FOOTER_PATTERN = re.compile(r"\n\n<i>Sayfa (\d+)/(\d+)</i>$")
+
+MILLMAN_KEY = "millman/tr/MDs/12_3.md"
+
+FORBES_KEYS = [f"forbes/tr/MDs/{position}_{digit}.md" for position, digit in enumerate([4, 4, 1, 6, 2, 1, 8, 9, 1], 1)]
+
+
+class PaginateTestCase(unittest.TestCase):
+    def test_pages_fit(self) -> None:
+        content = bytes(STORE.get(MILLMAN_KEY))
+        pages = paginate(MILLMAN_KEY, content)
+
+        self.assertGreater(len(pages), 1)
+        for start, end in pages:
+            self.assertLessEqual(len(format_page(MILLMAN_KEY, content[start:end])), PAGE_LENGTH_LIMIT)
+
+    def test_pages_cover_content(self) -> None:
+        content = bytes(STORE.get(MILLMAN_KEY))
+        pages = paginate(MILLMAN_KEY, content)
+
+        self.assertEqual(0, pages[0][0])
+        self.assertEqual(len(content), pages[-1][1])
+        self.assertListEqual([end for _, end in pages[:-1]], [start for start, _ in pages[1:]])
+
+    def test_heading_not_at_page_end(self) -> None:
+        content = bytes(STORE.get(MILLMAN_KEY))
+
+        for start, end in paginate(MILLMAN_KEY, content)[:-1]:
+            self.assertFalse(str(content[start:end], "UTF-8").strip().splitlines()[-1].startswith("#"))
+
+    def test_long_paragraph(self) -> None:
+        key = "forbes/tr/MDs/1_1.md"
+        content = "ş" * 5000
+
+        pages = paginate(key, content.encode("UTF-8"), limit=1000)
+
+        self.assertEqual(content, "".join(format_page(key, content.encode("UTF-8")[start:end]) for start, end in pages))
+
+    def test_unknown_key(self) -> None:
+        with self.assertRaises(KeyError):
+            paginate("enneagram/tip1.md", b"# Tip 1")
+
+
+class PageIndexTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.pages = build_page_index(STORE)
+        cls.index = PageIndex(cls.pages)
+
+    def render_all(self, keys: list[str]) -> list[str]:
+        return [self.index.render_page(keys, page, STORE) for page in range(self.index.count(keys))]
+
+    def test_keys(self) -> None:
+        self.assertIn(MILLMAN_KEY, self.pages)
+        self.assertIn("forbes/tr/MDs/1_initial.md", self.pages)
+        self.assertNotIn("enneagram/tip1.md", self.pages)
+
+    def test_footer(self) -> None:
+        pages = self.render_all(FORBES_KEYS)
+
+        self.assertGreater(len(pages), len(FORBES_KEYS))
+        for number, page in enumerate(pages, 1):
+            match = FOOTER_PATTERN.search(page)
+            self.assertIsNotNone(match)
+            self.assertEqual((str(number), str(len(pages))), match.groups())
+
+    def test_same_text_as_full_render(self) -> None:
+        pages = [FOOTER_PATTERN.sub("", page) for page in self.render_all([MILLMAN_KEY])]
+        full_text = format_headings(STORE.read_text(MILLMAN_KEY).strip(), join_next_line=True)
+
+        self.assertEqual(full_text.split(), "\n\n".join(pages).split())
+
+    def test_page_past_end(self) -> None:
+        count = self.index.count([MILLMAN_KEY])
+
+        self.assertEqual(
+            self.index.render_page([MILLMAN_KEY], count - 1, STORE),
+            self.index.render_page([MILLMAN_KEY], count + 10, STORE),
+        )
+
+    def test_missing_document(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            self.index.render_page(["forbes/tr/MDs/0_0.md"], 0, STORE)
+
+    def test_load_from_bundle(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "kahinbot.bundle"
+            build_bundle(STORE, path, extra_entries={PAGE_INDEX_KEY: page_index_to_json(self.pages)})
+
+            with Bundle(path) as bundle:
+                index = PageIndex.load(bundle)
+
+                self.assertEqual(self.index.pages, index.pages)
+                self.assertEqual(self.index.render_page(FORBES_KEYS, 3, STORE), index.render_page(FORBES_KEYS, 3, bundle))
+
+    def test_updated(self) -> None:
+        content = "# Başlık\n\n" + "\n\n".join("Paragraf " + "x" * 1000 for _ in range(10))
+        store = MemoryStore({MILLMAN_KEY: content.encode("UTF-8")}, "")
+
+        updated = self.index.updated(store, {MILLMAN_KEY, FORBES_KEYS[0], "enneagram/tip1.md"})
+
+        self.assertEqual(paginate(MILLMAN_KEY, content.encode("UTF-8")), updated.pages[MILLMAN_KEY])
+        self.assertNotIn(FORBES_KEYS[0], updated.pages)
+        self.assertEqual(self.pages[FORBES_KEYS[1]], updated.pages[FORBES_KEYS[1]])
+        self.assertIn(FORBES_KEYS[0], self.index.pages)
+
+    def test_load_from_directory(self) -> None:
+        self.assertEqual(self.pages, PageIndex.load(STORE).pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
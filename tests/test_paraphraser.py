@@ -0,0 +1,151 @@
+from pathlib import Path
+from kahinbot.content import DirectoryStore
+from kahinbot.metrics import Metrics
+from kahinbot.paraphraser import (
+    CHARACTERS_PER_TOKEN,
+    ExtractiveSummarizer,
+    FallbackSummarizer,
+    StubSummarizer,
+    open_summarizer,
+    rank_sentences,
+    split_sentences,
+)
+
+import os
+import time
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+FORBES_KEY = "forbes/tr/Summarizations/1_1.md"
+
+MILLMAN_KEY = "millman/tr/Summarizations/12_3.md"
+
+
+class SplitSentencesTestCase(unittest.TestCase):
+    def test_markdown(self) -> None:
+        title, sentences = split_sentences("## Başlık\n\n* **Öneri:** Birinci cümle. İkinci cümle!\n\n### Alt\nSon.")
+
+        self.assertEqual("Başlık", title)
+        self.assertListEqual(["Birinci cümle.", "İkinci cümle!", "Son."], sentences)
+
+    def test_without_title(self) -> None:
+        title, sentences = split_sentences(STORE.read_text(MILLMAN_KEY))
+
+        self.assertIsNone(title)
+        self.assertGreater(len(sentences), 10)
+        self.assertTrue(all("**" not in sentence for sentence in sentences))
+
+
+class RankSentencesTestCase(unittest.TestCase):
+    def test_central_sentence(self) -> None:
+        sentences = [
+            "Yaratıcı bir liderdir.",
+            "Yaratıcı ve duygusal bir liderdir.",
+            "Duygusal bir insandır.",
+            "Hava bugün yağmurlu.",
+        ]
+        scores = rank_sentences(sentences)
+
+        self.assertAlmostEqual(1.0, sum(scores))
+        self.assertEqual(1, scores.index(max(scores)))
+        self.assertEqual(3, scores.index(min(scores)))
+
+    def test_empty(self) -> None:
+        self.assertListEqual([], rank_sentences([]))
+
+
+class ExtractiveSummarizerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.summarizer = ExtractiveSummarizer()
+
+    def test_sentences_in_order(self) -> None:
+        _, sentences = split_sentences(STORE.read_text(MILLMAN_KEY))
+        summary = self.summarizer.paraphrase(STORE.read_text(MILLMAN_KEY))
+
+        positions = [sentences.index(sentence) for sentence in split_sentences(summary)[1]]
+        self.assertListEqual(sorted(positions), positions)
+        self.assertLess(len(positions), len(sentences))
+
+    def test_title(self) -> None:
+        summary = self.summarizer.paraphrase(STORE.read_text(FORBES_KEY))
+
+        self.assertTrue(summary.startswith("İnsan Pin Kodunuz: 1. Hane - Görme Duyusu (1 Rakamı)\n"))
+        self.assertNotIn("**", summary)
+
+    def test_budget(self) -> None:
+        summary = self.summarizer.paraphrase(STORE.read_text(MILLMAN_KEY), 100)
+
+        self.assertLessEqual(len(summary), 100 * CHARACTERS_PER_TOKEN)
+
+    def test_budget_keeps_a_sentence(self) -> None:
+        self.assertEqual("Tek bir cümle.", self.summarizer.paraphrase("Tek bir cümle.", 1))
+
+    def test_empty(self) -> None:
+        self.assertEqual("", self.summarizer.paraphrase(""))
+
+
+class StubSummarizerTestCase(unittest.TestCase):
+    def test_returns_content(self) -> None:
+        self.assertEqual("metin", StubSummarizer().paraphrase("metin"))
+        self.assertEqual("metin"[:CHARACTERS_PER_TOKEN], StubSummarizer().paraphrase("metin", 1))
+
+    def test_latency(self) -> None:
+        summarizer = StubSummarizer(latency=0.05, latency_per_token=0.01)
+
+        start = time.perf_counter()
+        summarizer.paraphrase("a" * 5 * CHARACTERS_PER_TOKEN)
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+
+    def test_failure_rate(self) -> None:
+        with self.assertRaises(RuntimeError):
+            StubSummarizer(failure_rate=1.0).paraphrase("metin")
+
+        summarizer = StubSummarizer(failure_rate=0.5, seed=1)
+        failures = 0
+        for _ in range(200):
+            try:
+                summarizer.paraphrase("metin")
+            except RuntimeError:
+                failures += 1
+
+        self.assertTrue(60 < failures < 140)
+
+
+class FallbackSummarizerTestCase(unittest.TestCase):
+    def test_fallback(self) -> None:
+        metrics = Metrics()
+        summarizer = FallbackSummarizer(StubSummarizer(failure_rate=1.0), ExtractiveSummarizer(), metrics)
+
+        self.assertEqual("Bir cümle.", summarizer.paraphrase("Bir cümle."))
+        self.assertEqual("stub", summarizer.name)
+        self.assertEqual(1, metrics.get("summarizer.fallback"))
+
+    def test_primary(self) -> None:
+        metrics = Metrics()
+        summarizer = FallbackSummarizer(StubSummarizer(), ExtractiveSummarizer(), metrics)
+
+        self.assertEqual("# Başlık", summarizer.paraphrase("# Başlık"))
+        self.assertEqual(0, metrics.get("summarizer.fallback"))
+
+
+class OpenSummarizerTestCase(unittest.TestCase):
+    def test_names(self) -> None:
+        self.assertIsInstance(open_summarizer("extractive"), ExtractiveSummarizer)
+        self.assertIsInstance(open_summarizer("stub"), StubSummarizer)
+
+        with self.assertRaises(ValueError):
+            open_summarizer("gpt")
+
+    def test_auto_without_gemini(self) -> None:
+        api_key = os.environ.pop("GEMINI_API_KEY", None)
+        try:
+            self.assertIsInstance(open_summarizer("auto"), ExtractiveSummarizer)
+        finally:
+            if api_key is not None:
+                os.environ["GEMINI_API_KEY"] = api_key
+
+
+if __name__ == "__main__":
+    unittest.main()
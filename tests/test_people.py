@@ -0,0 +1,62 @@
+from pathlib import Path
+from kahinbot.people import PeopleIndex, Person, aliases, clean_name, famous_people, normalize_name
+from kahinbot.content import DirectoryStore
+
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class NameTestCase(unittest.TestCase):
+    def test_normalize_name(self) -> None:
+        self.assertEqual("frederic chopin", normalize_name("Frédéric  Chopin"))
+        self.assertEqual("elisabeth kubler ross", normalize_name("Elisabeth Kübler-Ross"))
+        self.assertEqual("baskan", normalize_name("Başkan"))
+
+    def test_clean_name(self) -> None:
+        self.assertEqual("Martin Luther King, Jr.", clean_name("Martin Luther King, Jr."))
+        self.assertEqual("Isaac Asimov", clean_name("Isaac Asimov, bilimkurgu türündeki vizyoner eserleriyle tanınan ünlü bir yazardı."))
+
+    def test_aliases(self) -> None:
+        self.assertListEqual(["bill clinton", "baskan bill clinton"], aliases("Başkan Bill Clinton"))
+        self.assertListEqual(["madonna", "ciccone"], aliases("Madonna (Ciccone)"))
+
+
+class FamousPeopleTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.people = famous_people(STORE)
+        cls.index = PeopleIndex(cls.people)
+
+    def test_deduplicated_across_languages(self) -> None:
+        clintons = [person for person in self.people if "bill clinton" in person.aliases]
+
+        self.assertEqual(1, len(clintons))
+        self.assertIn("baskan bill clinton", clintons[0].aliases)
+        self.assertIn("president bill clinton", clintons[0].aliases)
+
+    def test_descriptions_removed(self) -> None:
+        self.assertTrue(all(len(person.name) < 60 for person in self.people))
+
+    def test_exact(self) -> None:
+        self.assertEqual(((19, 10),), self.index.search("Walt Disney")[0].life_paths)
+
+    def test_prefix(self) -> None:
+        self.assertEqual("Walt Disney", self.index.search("disn")[0].name)
+        self.assertIn("Martin Luther King, Jr.", [person.name for person in self.index.search("martin luther")])
+
+    def test_fuzzy(self) -> None:
+        self.assertEqual("Albert Einstein", self.index.search("Einstien")[0].name)
+        self.assertEqual("Walt Disney", self.index.search("walt dinsey")[0].name)
+
+    def test_short_queries_are_not_fuzzy(self) -> None:
+        self.assertListEqual([], self.index.search("xyz"))
+        self.assertListEqual([], self.index.search(""))
+
+    def test_limit(self) -> None:
+        self.assertEqual(3, len(self.index.search("a", limit=3)))
+        self.assertIsInstance(self.index.search("a")[0], Person)
+
+
+if __name__ == "__main__":
+    unittest.main()
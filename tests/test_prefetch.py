@@ -0,0 +1,237 @@
+from collections.abc import Callable
+from datetime import datetime
+from kahinbot.callbacks import View
+from kahinbot.metrics import Metrics
+from kahinbot.pin_code import get_pin_code
+from kahinbot.prefetch import PrefetchedView, Prefetcher
+
+import asyncio
+import threading
+import unittest
+
+BIRTHDATE = datetime(2002, 12, 22)
+
+
+class PrefetcherTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.renders: list[tuple[View, datetime]] = []
+        self.release = threading.Event()
+        self.metrics = Metrics()
+
+        def render(view: View) -> Callable[[datetime], str]:
+            def render_view(birthdate: datetime) -> str:
+                self.renders.append((view, birthdate))
+                if view == View.SUMMARY_MILLMAN:
+                    self.release.wait(5)
+
+                return f"{view.name} {birthdate.year}"
+
+            return render_view
+
+        self.prefetcher = Prefetcher(
+            {
+                View.FULL_TEXT_MILLMAN: PrefetchedView(lambda birthdate: birthdate.year, render(View.FULL_TEXT_MILLMAN)),
+                View.SUMMARY_MILLMAN: PrefetchedView(
+                    lambda birthdate: birthdate.year, render(View.SUMMARY_MILLMAN), expensive=True
+                ),
+                View.SUMMARY_FORBES: PrefetchedView(
+                    lambda birthdate: birthdate.year, render(View.SUMMARY_FORBES), speculative=False
+                ),
+            },
+            self.metrics,
+            max_expensive=1,
+        )
+
+    async def asyncTearDown(self) -> None:
+        self.release.set()
+        await asyncio.sleep(0.05)
+
+    async def test_hit(self) -> None:
+        self.prefetcher.prefetch(1, [BIRTHDATE])
+        await asyncio.sleep(0.05)
+
+        self.assertTrue(self.prefetcher.is_ready(View.FULL_TEXT_MILLMAN, BIRTHDATE))
+        self.assertEqual("FULL_TEXT_MILLMAN 2002", await self.prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE))
+        self.assertEqual(1, self.prefetcher.hit_rate(View.FULL_TEXT_MILLMAN))
+        self.assertEqual(1, self.renders.count((View.FULL_TEXT_MILLMAN, BIRTHDATE)))
+
+    async def test_miss_is_cached(self) -> None:
+        self.assertEqual("SUMMARY_FORBES 2002", await self.prefetcher.get(View.SUMMARY_FORBES, BIRTHDATE))
+        self.assertEqual("SUMMARY_FORBES 2002", await self.prefetcher.get(View.SUMMARY_FORBES, datetime(2002, 1, 1)))
+
+        self.assertEqual(1, self.metrics.get("prefetch.summary_forbes.miss"))
+        self.assertEqual(1, self.metrics.get("prefetch.summary_forbes.hit"))
+        self.assertEqual(0.5, self.prefetcher.hit_rate())
+
+    async def test_many_birthdates(self) -> None:
+        self.prefetcher.prefetch(1, [BIRTHDATE, datetime(1990, 1, 1)])
+        await asyncio.sleep(0.05)
+
+        self.assertTrue(self.prefetcher.is_ready(View.FULL_TEXT_MILLMAN, BIRTHDATE))
+        self.assertTrue(self.prefetcher.is_ready(View.FULL_TEXT_MILLMAN, datetime(1990, 1, 1)))
+        self.assertEqual(0, self.metrics.get("prefetch.cancelled"))
+
+    async def test_not_speculative(self) -> None:
+        self.prefetcher.prefetch(1, [BIRTHDATE])
+        await asyncio.sleep(0.05)
+
+        self.assertNotIn((View.SUMMARY_FORBES, BIRTHDATE), self.renders)
+
+    async def test_waiting_render_is_cancelled(self) -> None:
+        # The first expensive render takes the only slot, the second one waits for it
+        self.prefetcher.prefetch(1, [BIRTHDATE])
+        self.prefetcher.prefetch(2, [datetime(1990, 1, 1)])
+        await asyncio.sleep(0.05)
+
+        self.prefetcher.cancel(2)
+        self.release.set()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(1, self.metrics.get("prefetch.cancelled"))
+        self.assertNotIn((View.SUMMARY_MILLMAN, datetime(1990, 1, 1)), self.renders)
+        self.assertTrue(self.prefetcher.is_ready(View.SUMMARY_MILLMAN, BIRTHDATE))
+
+    async def test_shared_render_is_not_cancelled(self) -> None:
+        self.prefetcher.prefetch(1, [BIRTHDATE])
+        self.prefetcher.prefetch(2, [datetime(2002, 1, 1)])
+        self.prefetcher.cancel(1)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(0, self.metrics.get("prefetch.cancelled"))
+
+    async def test_click_does_not_wait_for_slot(self) -> None:
+        self.prefetcher.prefetch(1, [BIRTHDATE])
+        self.prefetcher.prefetch(2, [datetime(1990, 1, 1)])
+        await asyncio.sleep(0.05)
+
+        get = asyncio.create_task(self.prefetcher.get(View.SUMMARY_MILLMAN, datetime(1990, 1, 1)))
+        await asyncio.sleep(0.05)
+        self.release.set()
+
+        self.assertEqual("SUMMARY_MILLMAN 1990", await get)
+        self.assertEqual(1, self.metrics.get("prefetch.summary_millman.miss"))
+
+    async def test_failed_render_is_retried(self) -> None:
+        failures = [ValueError("failed")]
+
+        def render(birthdate: datetime) -> str:
+            if failures:
+                raise failures.pop()
+
+            return "rendered"
+
+        prefetcher = Prefetcher({View.MENU: PrefetchedView(lambda birthdate: None, render)}, self.metrics)
+
+        with self.assertRaises(ValueError):
+            await prefetcher.get(View.MENU, BIRTHDATE)
+        await asyncio.sleep(0)
+        self.assertEqual("rendered", await prefetcher.get(View.MENU, BIRTHDATE))
+
+    async def test_pages(self) -> None:
+        pages: list[int] = []
+
+        def render(birthdate: datetime, page: int) -> str:
+            pages.append(page)
+
+            return f"sayfa {page}"
+
+        prefetcher = Prefetcher(
+            {View.FULL_TEXT_FORBES: PrefetchedView(lambda birthdate: birthdate.year, render, paged=True)}, self.metrics
+        )
+
+        prefetcher.prefetch(1, [BIRTHDATE])
+        self.assertEqual("sayfa 0", await prefetcher.get(View.FULL_TEXT_FORBES, BIRTHDATE))
+        self.assertEqual("sayfa 2", await prefetcher.get(View.FULL_TEXT_FORBES, BIRTHDATE, 2))
+        self.assertEqual("sayfa 2", await prefetcher.get(View.FULL_TEXT_FORBES, BIRTHDATE, 2))
+
+        self.assertListEqual([0, 2], pages)
+        self.assertEqual(2, self.metrics.get("prefetch.hit"))
+
+    async def test_page_of_view_without_pages(self) -> None:
+        await self.prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE)
+
+        self.assertEqual("FULL_TEXT_MILLMAN 2002", await self.prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE, 3))
+        self.assertEqual(1, self.metrics.get("prefetch.hit"))
+
+    async def test_invalidate(self) -> None:
+        renders: list[int] = []
+
+        def render(birthdate: datetime) -> str:
+            renders.append(birthdate.year)
+
+            return str(len(renders))
+
+        prefetcher = Prefetcher(
+            {
+                View.JSON_SHORT_MILLMAN: PrefetchedView(
+                    lambda birthdate: birthdate.year, render, sources=lambda year: [f"{year}.json"]
+                ),
+                View.MENU: PrefetchedView(lambda birthdate: birthdate.year, render),
+            },
+            self.metrics,
+        )
+
+        for year in (2000, 2001):
+            await prefetcher.get(View.JSON_SHORT_MILLMAN, datetime(year, 1, 1))
+        await prefetcher.get(View.MENU, datetime(2000, 1, 1))
+
+        self.assertEqual(1, prefetcher.invalidate({"2000.json"}))
+
+        self.assertEqual("4", await prefetcher.get(View.JSON_SHORT_MILLMAN, datetime(2000, 1, 1)))
+        self.assertEqual("2", await prefetcher.get(View.JSON_SHORT_MILLMAN, datetime(2001, 1, 1)))
+        self.assertEqual("3", await prefetcher.get(View.MENU, datetime(2000, 1, 1)))
+        self.assertEqual(1, self.metrics.get("prefetch.invalidated"))
+
+    async def test_snapshot(self) -> None:
+        snapshots = ["eski"]
+
+        prefetcher = Prefetcher(
+            {
+                View.FULL_TEXT_MILLMAN: PrefetchedView(
+                    lambda birthdate: birthdate.year, lambda snapshot, birthdate, page: f"{snapshot} {page}", paged=True
+                )
+            },
+            self.metrics,
+            snapshot=lambda: snapshots[-1],
+        )
+
+        self.assertEqual("eski 0", await prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE))
+
+        # The request renders from the snapshot it passes, not the one reloaded meanwhile
+        snapshots.append("yeni")
+        self.assertEqual("eski 1", await prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE, 1, "eski"))
+        self.assertEqual("yeni 2", await prefetcher.get(View.FULL_TEXT_MILLMAN, BIRTHDATE, 2))
+
+    async def test_capacity(self) -> None:
+        prefetcher = Prefetcher(
+            {View.MENU: PrefetchedView(lambda birthdate: birthdate.year, lambda birthdate: "")}, self.metrics, capacity=2
+        )
+
+        for year in range(2000, 2005):
+            await prefetcher.get(View.MENU, datetime(year, 1, 1))
+        await prefetcher.get(View.MENU, datetime(2000, 1, 1))
+
+        self.assertEqual(6, self.metrics.get("prefetch.miss"))
+
+    async def test_pin_code_key(self) -> None:
+        # The Forbes views are keyed by the pin code, which get_pin_code returns as a list
+        prefetcher = Prefetcher(
+            {
+                View.FULL_TEXT_FORBES: PrefetchedView(
+                    lambda birthdate: tuple(get_pin_code(birthdate)), lambda birthdate: str(birthdate.day)
+                )
+            },
+            self.metrics,
+        )
+
+        prefetcher.prefetch(1, [BIRTHDATE])
+        await asyncio.sleep(0.05)
+
+        # 31.12.2002 has the pin code of 22.12.2002
+        self.assertTrue(prefetcher.is_ready(View.FULL_TEXT_FORBES, datetime(2002, 12, 31)))
+        self.assertEqual("22", await prefetcher.get(View.FULL_TEXT_FORBES, datetime(2002, 12, 31)))
+        self.assertEqual(1, self.metrics.get("prefetch.hit"))
+
+
+if __name__ == "__main__":
+    unittest.main()
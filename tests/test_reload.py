@@ -0,0 +1,142 @@
+from pathlib import Path
+from kahinbot.content import DirectoryStore
+from kahinbot.metrics import Metrics
+from kahinbot.reload import ContentReloader, MemoryStore, PollingWatcher, content_key
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+
+STORE = DirectoryStore(DATA_DIRECTORY)
+
+KEYS = ("millman/tr/MDs/11_2.md", "millman/tr/JSONs/11_2.json", "forbes/tr/MDs/1_4.md")
+
+
+class ContentDirectoryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_directory = Path(self.directory.name) / "data"
+        self.enneagram_directory = Path(self.directory.name) / "enneagram"
+        self.enneagram_directory.mkdir()
+
+        for key in KEYS:
+            (self.data_directory / key).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(DATA_DIRECTORY / key, self.data_directory / key)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def store(self) -> DirectoryStore:
+        return DirectoryStore(self.data_directory, self.enneagram_directory)
+
+
+class MemoryStoreTestCase(ContentDirectoryTestCase):
+    def test_load(self) -> None:
+        store = MemoryStore.load(self.store())
+
+        self.assertListEqual(sorted(KEYS), store.keys())
+        self.assertEqual(self.store().version, store.version)
+        self.assertEqual(STORE.read_text(KEYS[0]), store.read_text(KEYS[0]))
+
+    def test_missing(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            MemoryStore.load(self.store()).get("enneagram/tip1.md")
+
+    def test_updated(self) -> None:
+        store = MemoryStore.load(self.store())
+
+        (self.data_directory / KEYS[0]).write_text("yeni", encoding="UTF-8")
+        (self.data_directory / KEYS[1]).write_text("{}", encoding="UTF-8")
+        (self.data_directory / KEYS[2]).unlink()
+        updated = store.updated(self.store(), {KEYS[0], KEYS[2]})
+
+        self.assertEqual("yeni", updated.read_text(KEYS[0]))
+        self.assertEqual(STORE.read_text(KEYS[1]), updated.read_text(KEYS[1]))
+        self.assertNotIn(KEYS[2], updated.keys())
+        self.assertNotEqual(store.version, updated.version)
+
+        # The previous snapshot is left as it is
+        self.assertEqual(STORE.read_text(KEYS[0]), store.read_text(KEYS[0]))
+        self.assertIn(KEYS[2], store.keys())
+
+
+class ContentKeyTestCase(ContentDirectoryTestCase):
+    def test_content_file(self) -> None:
+        self.assertEqual(KEYS[0], content_key(self.data_directory / KEYS[0], self.data_directory, self.enneagram_directory))
+
+    def test_enneagram_type(self) -> None:
+        self.assertEqual(
+            "enneagram/tip3.md", content_key(self.enneagram_directory / "tip3.md", self.data_directory, self.enneagram_directory)
+        )
+
+    def test_other_file(self) -> None:
+        for path in (
+            self.data_directory / "millman/tr/MDs/.11_2.md.swp",
+            self.data_directory / "README.md",
+            self.enneagram_directory / "notes.md",
+            Path("/tmp/11_2.md"),
+        ):
+            with self.subTest(path=path):
+                self.assertIsNone(content_key(path, self.data_directory, self.enneagram_directory))
+
+
+class PollingWatcherTestCase(ContentDirectoryTestCase, unittest.IsolatedAsyncioTestCase):
+    async def test_changes(self) -> None:
+        watcher = PollingWatcher(self.data_directory, self.enneagram_directory, interval=0.01)
+
+        (self.data_directory / KEYS[0]).write_text("yeni", encoding="UTF-8")
+        (self.enneagram_directory / "tip1.md").write_text("# Tip 1", encoding="UTF-8")
+        (self.data_directory / KEYS[2]).unlink()
+
+        self.assertSetEqual({KEYS[0], KEYS[2], "enneagram/tip1.md"}, await asyncio.wait_for(watcher.changes(), 5))
+
+    async def test_no_changes(self) -> None:
+        watcher = PollingWatcher(self.data_directory, self.enneagram_directory, interval=0.01)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(watcher.changes(), 0.1)
+
+
+class ContentReloaderTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.metrics = Metrics()
+        self.reloaded: list[set[str]] = []
+        self.retired: list[tuple[tuple[str, ...], tuple[str, ...]]] = []
+
+        def build(previous: tuple[str, ...] | None, keys: set[str]) -> tuple[str, ...]:
+            if "bozuk" in keys:
+                raise ValueError("bozuk")
+
+            return (*(previous or ()), *sorted(keys))
+
+        self.reloader = ContentReloader(
+            build, self.reloaded.append, self.metrics, lambda previous, snapshot: self.retired.append((previous, snapshot))
+        )
+
+    async def test_reload(self) -> None:
+        snapshot = self.reloader.current
+
+        self.assertTrue(await self.reloader.reload({"a"}))
+
+        self.assertTupleEqual((), snapshot)
+        self.assertTupleEqual(("a",), self.reloader.current)
+        self.assertEqual(2, self.reloader.number)
+        self.assertListEqual([{"a"}], self.reloaded)
+        self.assertListEqual([((), ("a",))], self.retired)
+        self.assertEqual(1, self.metrics.get("reload.count"))
+
+    async def test_failed_reload(self) -> None:
+        self.assertFalse(await self.reloader.reload({"bozuk"}))
+
+        self.assertTupleEqual((), self.reloader.current)
+        self.assertEqual(1, self.reloader.number)
+        self.assertListEqual([], self.reloaded)
+        self.assertListEqual([], self.retired)
+        self.assertEqual(1, self.metrics.get("reload.failed"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+from pathlib import Path
+from kahinbot.search import SearchIndex, build_index, normalize, open_index, stem, tokenize
+from kahinbot.content import DirectoryStore
+
+import os
+import shutil
+import tempfile
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class NormalizationTestCase(unittest.TestCase):
+    def test_normalize(self) -> None:
+        self.assertEqual("iliski", normalize("İLİŞKİ"))
+        self.assertEqual("kiskanclik", normalize("KISKANÇLIK"))
+        self.assertEqual("saglik", normalize("Sağlık"))
+
+    def test_stem(self) -> None:
+        self.assertEqual(stem("iliski"), stem("iliskilerde"))
+        self.assertEqual(stem("saglik"), stem(normalize("sağlığı")))
+        self.assertEqual("para", stem("paralar"))
+
+    def test_tokenize(self) -> None:
+        self.assertListEqual([("para", 0), ("guc", 8)], tokenize("Para ve güç"))
+
+
+class SearchIndexTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.directory.name) / "kahinbot.index"
+        build_index(STORE, cls.path)
+        cls.index = SearchIndex(cls.path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.index.close()
+        cls.directory.cleanup()
+
+    def test_content_version(self) -> None:
+        self.assertEqual(STORE.version, self.index.content_version)
+
+    def test_search(self) -> None:
+        results = self.index.search("kıskançlık")
+
+        self.assertEqual(5, len(results))
+        self.assertListEqual(sorted(results, key=lambda result: -result.score), results)
+        self.assertIn("kıskan", results[0].snippet.lower())
+
+    def test_folded_query(self) -> None:
+        self.assertListEqual(self.index.search("kıskançlık"), self.index.search("KISKANCLIK"))
+
+    def test_section_titles(self) -> None:
+        titles = [result.title for result in self.index.search("beslenme diyet", limit=3)]
+
+        self.assertTrue(all(title.endswith("Sağlık") for title in titles), titles)
+
+    def test_no_results(self) -> None:
+        self.assertListEqual([], self.index.search("xyzzy"))
+        self.assertListEqual([], self.index.search("ve"))
+
+    def test_famous_people(self) -> None:
+        self.assertIn("Walt Disney", [person.name for person in self.index.famous_people()])
+
+    def test_open_index_rebuilds(self) -> None:
+        path = Path(self.directory.name) / "missing.index"
+        index = open_index(path, STORE)
+
+        self.assertTrue(path.exists())
+        self.assertEqual(STORE.version, index.content_version)
+        index.close()
+
+    def test_open_index_after_touch(self) -> None:
+        data = Path(self.directory.name) / "data"
+        shutil.copytree(STORE.data_directory, data)
+        store = DirectoryStore(data)
+
+        # A checkout or a copy changes the modification times of the files but not their content
+        for key in store.keys():
+            os.utime(store.path(key), (1e9, 1e9))
+        touched = DirectoryStore(data)
+
+        self.assertEqual(store.version, touched.version)
+        with self.assertNoLogs(level="WARNING"):
+            open_index(self.path, touched).close()
+
+        store.path("millman/tr/MDs/11_2.md").write_text("değişti")
+        self.assertNotEqual(store.version, DirectoryStore(data).version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from kahinbot.metrics import Metrics
+from kahinbot.session import BufferedSession
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+from telethon.tl.types import InputPeerUser, User
+from telethon.tl.types.updates import State
+
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+
+AUTH_KEY = AuthKey(data=bytes(range(256)))
+
+ALI = User(id=5, access_hash=7, username="Ali", phone="905551112233", first_name="Ali", last_name="Veli")
+
+AYSE = User(id=6, access_hash=8, username="ayse", first_name="Ayşe")
+
+
+def state(pts: int) -> State:
+    return State(pts, 0, datetime(2024, 1, 1, tzinfo=timezone.utc), 1, unread_count=0)
+
+
+class BufferedSessionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "bot.session"
+        self.metrics = Metrics()
+        self.session = BufferedSession(self.path, metrics=self.metrics)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.directory.cleanup()
+
+    def rows(self, table: str) -> list[tuple]:
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute(f"select * from {table}").fetchall()
+
+    def test_lookups_from_memory(self) -> None:
+        self.session.process_entities([ALI, AYSE])
+
+        self.assertEqual(InputPeerUser(5, 7), self.session.get_input_entity(5))
+        self.assertEqual(InputPeerUser(5, 7), self.session.get_input_entity("@ali"))
+        self.assertEqual(InputPeerUser(5, 7), self.session.get_input_entity("+905551112233"))
+        self.assertEqual(0, self.metrics.get("session.lookup"))
+        self.assertEqual(InputPeerUser(6, 8), self.session.get_input_entity("Ayşe"))
+
+        with self.assertRaises(ValueError):
+            self.session.get_input_entity("veli")
+
+    def test_misses_remembered(self) -> None:
+        for _ in range(3):
+            self.assertIsNone(self.session.get_entity_rows_by_username("ali"))
+            self.assertIsNone(self.session.get_entity_rows_by_id(5, exact=False))
+        self.assertEqual(2, self.metrics.get("session.lookup"))
+
+        self.session.process_entities([ALI])
+
+        self.assertEqual((5, 7), self.session.get_entity_rows_by_username("ali"))
+        self.assertEqual((5, 7), self.session.get_entity_rows_by_id(5, exact=False))
+        self.assertIsNone(self.session.get_entity_rows_by_username("veli"))
+        self.assertEqual(3, self.metrics.get("session.lookup"))
+
+    def test_written_in_batches(self) -> None:
+        self.session.process_entities([ALI])
+        self.session.set_update_state(0, state(10))
+        self.session.save()
+
+        self.assertListEqual([], self.rows("entities"))
+
+        self.session.process_entities([AYSE])
+        self.assertEqual(3, self.session.flush())
+        self.assertEqual(2, len(self.rows("entities")))
+        self.assertListEqual([(0, 10, 0, 1704067200, 1)], self.rows("update_state"))
+
+        # Entities and states seen again unchanged are not written again
+        self.session.process_entities([ALI, AYSE])
+        self.session.set_update_state(0, state(10))
+        self.assertEqual(0, self.session.flush())
+        self.assertEqual(1, self.metrics.get("session.flush"))
+
+    def test_authorization_written_right_away(self) -> None:
+        self.session.set_dc(2, "149.154.167.51", 443)
+        self.session.auth_key = AUTH_KEY
+        self.session.save()
+
+        self.assertListEqual([(2, "149.154.167.51", 443, AUTH_KEY.key, None)], self.rows("sessions"))
+
+    def test_reopened(self) -> None:
+        self.session.set_dc(2, "149.154.167.51", 443)
+        self.session.auth_key = AUTH_KEY
+        self.session.process_entities([ALI])
+        self.session.set_update_state(0, state(10))
+        self.session.close()
+
+        self.session = BufferedSession(self.path)
+
+        self.assertEqual(2, self.session.dc_id)
+        self.assertEqual(AUTH_KEY, self.session.auth_key)
+        self.assertEqual(InputPeerUser(5, 7), self.session.get_input_entity("ali"))
+        self.assertEqual(state(10), self.session.get_update_state(0))
+
+    def test_username_taken_over(self) -> None:
+        self.session.process_entities([ALI])
+        self.session.process_entities([User(id=9, access_hash=3, username="ali")])
+        self.session.process_entities([User(id=5, access_hash=7, first_name="Ali")])
+
+        self.assertEqual(InputPeerUser(9, 3), self.session.get_input_entity("ali"))
+
+    def test_shared_between_processes(self) -> None:
+        self.session.flush()
+        worker = BufferedSession(self.path, read_only=True, metrics=self.metrics)
+        try:
+            # Entities the bot met after the worker started are looked up in the file
+            self.session.process_entities([ALI])
+            self.session.flush()
+
+            self.assertEqual(InputPeerUser(5, 7), worker.get_input_entity("ali"))
+            self.assertEqual(1, self.metrics.get("session.lookup"))
+            self.assertEqual(InputPeerUser(5, 7), worker.get_input_entity(5))
+            self.assertEqual(1, self.metrics.get("session.lookup"))
+
+            # The worker keeps what it meets to itself
+            worker.process_entities([AYSE])
+            worker.set_update_state(0, state(20))
+            self.assertEqual(0, worker.flush())
+            self.assertEqual(1, len(self.rows("entities")))
+        finally:
+            worker.close()
+
+    def test_telethon_session_file(self) -> None:
+        self.session.close()
+        self.path.unlink()
+
+        telethon_session = SQLiteSession(str(self.path))
+        telethon_session.set_dc(2, "149.154.167.51", 443)
+        telethon_session.auth_key = AUTH_KEY
+        telethon_session.process_entities([ALI])
+        telethon_session.close()
+
+        self.session = BufferedSession(self.path)
+        self.assertEqual(AUTH_KEY, self.session.auth_key)
+        self.assertEqual(InputPeerUser(5, 7), self.session.get_input_entity("+905551112233"))
+
+        self.session.process_entities([AYSE])
+        self.session.close()
+
+        telethon_session = SQLiteSession(str(self.path))
+        self.assertEqual(InputPeerUser(6, 8), telethon_session.get_input_entity("ayse"))
+        telethon_session.close()
+
+        self.session = BufferedSession(self.path)
+
+    def test_other_version(self) -> None:
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("update version set version = 6")
+
+        with self.assertRaises(ValueError):
+            BufferedSession(self.path)
+
+    def test_delete(self) -> None:
+        self.session.process_entities([ALI])
+        self.session.delete()
+
+        self.assertFalse(self.path.exists())
+        self.session = BufferedSession(self.path)
+        with self.assertRaises(ValueError):
+            self.session.get_input_entity("ali")
+
+
+class BufferedSessionRunTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_run(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            session = BufferedSession(Path(directory) / "bot.session", metrics=Metrics())
+            task = asyncio.create_task(session.run(0.01))
+
+            session.process_entities([ALI])
+            await asyncio.sleep(0.1)
+
+            self.assertEqual(1, session.metrics.get("session.flush"))
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+from collections import Counter
+from pathlib import Path
+from kahinbot.metrics import Metrics
+from kahinbot.tracing import (
+    SamplingProfiler,
+    Tracer,
+    annotate,
+    current_trace_id,
+    span,
+    traced,
+    write_collapsed_stacks,
+)
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+
+
+@traced()
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+@traced("bekle")
+async def wait() -> str:
+    await asyncio.sleep(0)
+
+    return "tamam"
+
+
+class TracingTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "kahinbot.trace.json"
+        self.tracer = Tracer(self.path, metrics=Metrics())
+
+    def tearDown(self) -> None:
+        self.tracer.close()
+        self.directory.cleanup()
+
+    def events(self) -> list[dict]:
+        self.assertTrue(self.tracer.flush())
+
+        # Trace viewers close the array themselves
+        return json.loads(self.path.read_text(encoding="UTF-8").rstrip().removesuffix(",") + "]")
+
+    async def test_untraced(self) -> None:
+        with span("boş"):
+            self.assertEqual(3, add(1, 2))
+
+        self.assertIsNone(current_trace_id())
+        self.assertFalse(self.path.exists())
+
+    async def test_request(self) -> None:
+        with self.tracer.request("callback", user_id=42) as trace_id:
+            self.assertEqual(trace_id, current_trace_id())
+            annotate(view="ZODIAC_TRAITS")
+
+            with span("telegram.send_message"):
+                self.assertEqual(3, add(1, 2))
+            self.assertEqual("tamam", await wait())
+
+        events = {event["name"]: event for event in self.events()}
+
+        self.assertSetEqual({"callback", "telegram.send_message", "test_tracing.add", "bekle"}, set(events))
+        self.assertTrue(all(event["args"]["trace_id"] == trace_id for event in events.values()))
+        self.assertTrue(all(event["ph"] == "X" for event in events.values()))
+
+        root = events["callback"]["args"]
+        self.assertIsNone(root["parent_span_id"])
+        self.assertEqual(42, root["user_id"])
+        self.assertEqual("ZODIAC_TRAITS", root["view"])
+        self.assertEqual(events["telegram.send_message"]["args"]["span_id"], events["test_tracing.add"]["args"]["parent_span_id"])
+        self.assertEqual(root["span_id"], events["bekle"]["args"]["parent_span_id"])
+
+    async def test_worker_thread(self) -> None:
+        with self.tracer.request("callback"):
+            await asyncio.to_thread(add, 1, 2)
+
+        events = {event["name"]: event for event in self.events()}
+
+        self.assertNotEqual(events["callback"]["tid"], events["test_tracing.add"]["tid"])
+        self.assertEqual(events["callback"]["args"]["span_id"], events["test_tracing.add"]["args"]["parent_span_id"])
+
+    async def test_span_outliving_request(self) -> None:
+        release = asyncio.Event()
+
+        async def prefetch() -> None:
+            await release.wait()
+            with span("prefetch"):
+                pass
+
+        with self.tracer.request("birthdate"):
+            task = asyncio.create_task(prefetch())
+        release.set()
+        await task
+
+        self.assertListEqual(["birthdate", "prefetch"], [event["name"] for event in self.events()])
+
+    async def test_error(self) -> None:
+        with self.assertRaises(ValueError), self.tracer.request("callback"):
+            raise ValueError("hata")
+
+        self.assertEqual("ValueError", self.events()[0]["args"]["error"])
+
+    async def test_not_sampled(self) -> None:
+        tracer = Tracer(self.path, sample_rate=0.0)
+
+        with tracer.request("callback") as trace_id:
+            add(1, 2)
+
+        self.assertIsNone(trace_id)
+        self.assertFalse(self.path.exists())
+
+    async def test_handler(self) -> None:
+        @self.tracer.handler("birthdate")
+        async def handle(event: str) -> str:
+            return event
+
+        self.assertEqual("olay", await handle("olay"))
+        self.assertEqual("birthdate", self.events()[0]["name"])
+
+    async def test_writer_thread(self) -> None:
+        for user_id in range(100):
+            with self.tracer.request("callback", user_id=user_id):
+                pass
+
+        self.assertEqual(1, [thread.name for thread in threading.enumerate()].count("trace-writer"))
+        self.assertListEqual(list(range(100)), [event["args"]["user_id"] for event in self.events()])
+
+    async def test_unwritable_file(self) -> None:
+        tracer = Tracer(Path(self.directory.name) / "yok" / "kahinbot.trace.json", metrics=Metrics())
+
+        # The handler does not touch the file, the writer gives up on it
+        with self.assertLogs(level="ERROR"):
+            with tracer.request("callback") as trace_id:
+                pass
+            tracer.close()
+
+        self.assertIsNotNone(trace_id)
+        self.assertIsNone(tracer.path)
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class SamplingProfilerTestCase(unittest.TestCase):
+    def test_run(self) -> None:
+        stop = threading.Event()
+        thread = threading.Thread(target=busy_loop, args=(stop,), name="meşgul")
+        thread.start()
+        try:
+            stacks = SamplingProfiler(interval=0.001).run(0.2)
+        finally:
+            stop.set()
+            thread.join()
+
+        busy = [stack for stack in stacks if stack.startswith("meşgul;")]
+        self.assertTrue(busy)
+        self.assertTrue(any("test_tracing.busy_loop" in stack for stack in busy))
+
+    def test_single_profile(self) -> None:
+        profiler = SamplingProfiler()
+        thread = threading.Thread(target=profiler.run, args=(0.2,))
+        thread.start()
+        time.sleep(0.05)
+        try:
+            self.assertTrue(profiler.running)
+            with self.assertRaises(RuntimeError):
+                profiler.run(0.1)
+        finally:
+            thread.join()
+
+        self.assertFalse(profiler.running)
+
+    def test_collapsed_stacks(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "profiles" / "profile.collapsed"
+            write_collapsed_stacks(Counter({"MainThread;a;b": 3, "MainThread;a": 1}), path)
+
+            self.assertEqual("MainThread;a 1\nMainThread;a;b 3\n", path.read_text(encoding="UTF-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+from pathlib import Path
+from kahinbot.content import DirectoryStore
+from kahinbot.views import format_headings, render_full_text_forbes, render_json_summary
+
+import unittest
+
+STORE = DirectoryStore(Path(__file__).resolve().parent.parent / "data")
+
+
+class FormatHeadingsTestCase(unittest.TestCase):
+    def test_heading(self) -> None:
+        self.assertEqual("<b><u>Title</b></u>\n\nText", format_headings("# Title\n\nText"))
+
+    def test_join_next_line(self) -> None:
+        self.assertEqual("<b><u>Title</b></u>\nText", format_headings("## Title\n\nText", join_next_line=True))
+
+
+class RenderTestCase(unittest.TestCase):
+    def test_json_summary(self) -> None:
+        summary = render_json_summary((11, 2), STORE)
+
+        self.assertTrue(summary.startswith("<b><u>GENEL KISA ÖZET</b></u>"))
+        self.assertLess(summary.index("TEMEL ÖZELLİKLER"), summary.index("ZORLUKLAR"))
+
+    def test_full_text_forbes(self) -> None:
+        content = render_full_text_forbes([4, 3, 4, 2, 6, 7, 7, 5, 2], STORE)
+
+        self.assertTrue(content.startswith("<b><u>1. HANE</b></u>"))
+
+    def test_missing_file(self) -> None:
+        self.assertRaises(FileNotFoundError, render_json_summary, (1, 1), STORE)
+
+
+if __name__ == "__main__":
+    unittest.main()